@@ -1,20 +1,15 @@
 @echo off
 rem This batch file generates all my derived Pillar 1, Pillar 2 and COVID-19
 rem (England only) data files.
-erase log\log.txt
+rem log\log.txt is rotated by size and the messages kept in log\log.db
 erase data\pillar*.csv
 erase data\trust*.csv
 erase data\*.xlsx
 erase C:\temp\trust_deaths.*
-pillar1_covid_update.py nation.csv
-pillar1_covid_update.py region.csv
-pillar1_covid_update.py upper.csv
-rem Introduced a pause as there seems to be some gapping
-rem applied to requests for this data file.
-timeout 10 /nobreak
-pillar1_covid_update.py lower.csv
+rem The Pillar 1 tiers and the trust deaths are run in parallel, steps whose
+rem inputs are unchanged since the last run being skipped ( see covid_update/pipeline.py )
+python -m covid_update run nation.csv region.csv upper.csv lower.csv --scripts trust-deaths
 rem CSV files for Pillar testing and death data no longer updated 
-rem pillar2_covid_update.py
-nhs_trust_deaths.py
-rem Display any areas with no Pillar1 infectious cases !!!
-findstr /C:"No infectious" log\log.txt
\ No newline at end of file
+rem python -m covid_update run nation.csv region.csv upper.csv lower.csv --scripts trust-deaths,pillar2
+rem Display any areas with no Pillar1 infectious cases in this run !!!
+python -m covid_update logs --kind zero --last-run
\ No newline at end of file
@@ -0,0 +1,38 @@
+# covid_update
+#
+# Description
+# -----------
+# This package contains the processing procedures shared by the utility
+# scripts 'pillar1_covid_update.py', 'pillar2_covid_update.py' and
+# 'nhs_trust_deaths.py' together with supporting tools. The package
+# contains the following modules:
+#
+# common       - Procedures common to all scripts ( csv rows, file names, dates )
+# pillar1      - Parse, infectious window, alert and output phases for Pillar 1 data
+# pillar2      - Parse, rolling window, alert and output phases for Pillar 2 data
+# trust_deaths - Parse, alert and output phases for NHS trust death data
+# growth       - Daily growth rate, confidence band and doubling time of a series by rolling least squares
+# population   - Area populations from a population index or case rates for per capita values
+# records      - Compact column-wise storage of the parsed rows of an area
+# timeline     - Dense day indexed arrays of daily series with missing day fill policies
+# schema       - Columns of downloaded files located by header name, dated layout changes
+# corrections  - Data correction rules applied to whole columns
+# generators   - Synthetic data files in the same format as the downloaded files
+# benchmark    - Benchmark harness timing each processing phase
+# instrument   - Run report of per phase timings and counts, optional profiling
+# hierarchy    - Higher tier Pillar 1 data rolled up from lower tier local authority data
+# discovery    - Download file urls found from landing web pages, cached on disk
+# httpclient   - Pooled, compressed HTTP session with retries used for all downloads
+# fixtures     - Recorded HTTP responses replayed through a local server for offline runs
+# budget       - Memory budget mode reading large data files from disk
+# columnar     - Optional Arrow IPC or Parquet copies of the statistics files
+# attention    - Compact xlsx or HTML attention reports of the flagged areas, series and trusts
+# revisions    - Added and revised rows detected by row hashes kept between runs
+# alertstate   - Alert state kept between runs so that only new alerts are logged
+# store        - Optional SQLite store of the results of each run
+# server       - Local HTTP read API serving the latest results from memory
+# pipeline     - Daily updates run as a graph of cached tasks, replacing the serial batch file
+# logstore     - Log messages kept in an indexed SQLite database, text log rotated by size
+# paths        - Configurable log, configuration, data and scratch directories
+# cli          - Single command line for the scripts and tools ( python -m covid_update )
+#
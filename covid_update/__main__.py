@@ -0,0 +1,13 @@
+# covid_update/__main__.py
+#
+# Description
+# -----------
+# Allows the covid_update command line ( see cli.py ) to be run as
+# 'python -m covid_update'.
+#
+
+import sys
+
+from covid_update.cli import main
+
+sys.exit(main())
@@ -0,0 +1,136 @@
+# covid_update/alertstate.py
+#
+# Description
+# -----------
+# This module keeps the state of the alerts of a script between runs so
+# that only new alerts are logged. Each alert message is keyed by
+# ( area, metric, date ), the area being an area, series type or trust, and
+# the state of the key ( e.g. the increasing/decreasing indicator ) is
+# kept. A message is only logged if its key is new or its state has
+# changed, for example because the day was revised.
+#
+# The lifetime of each attention alert is also tracked per ( area, metric ):
+# an alert is raised on the first run on which its condition holds and
+# cleared on the first run on which it no longer holds. The attention flag
+# of a script, and so the spreadsheet, is only raised for a newly raised
+# alert and a message is logged when an alert is cleared.
+#
+# The state is kept in the JSON file <log dir>\<script>_alerts.json:
+#
+# {"seen": [[area, metric, date, state, run date], ...],
+#  "active": [[area, metric, date raised, run date raised], ...]}
+#
+# Keys which have not been seen for 'RetainDays' days are dropped.
+#
+# Options
+# -------
+# The following command line option is removed from the script arguments
+# by ParseOptions():
+#
+# --alert-state         Only log new alerts, keeping the alert state in the log directory
+#
+
+import json
+import os
+from datetime import date,timedelta
+
+# Number of days for which an alert key is kept after it was last seen
+RetainDays = 14
+
+# This procedure removes the alert state option from the list of command
+# line 'Arguments'. The remaining arguments and a dictionary of the
+# options are returned.
+def ParseOptions(Arguments) :
+
+    "This procedure removes the alert state option from 'Arguments'"
+
+    Options = {'alertstate':( '--alert-state' in Arguments )}
+    Remaining = [Argument for Argument in Arguments if Argument != '--alert-state']
+
+    return Remaining,Options
+
+# This procedure returns the default alert state file name for 'Module'
+# in directory 'LogDir'.
+def ReturnStateFileName(LogDir,Module) :
+
+    "This procedure returns the default alert state file name for 'Module'"
+
+    return os.path.join(LogDir,Module.split('.')[0] + '_alerts.json')
+
+# The alert state of a script kept between runs.
+class AlertState :
+
+    "The alert state of a script kept between runs"
+
+    def __init__(self,Filename,RunDate=None) :
+
+        self.Filename = Filename
+        self.RunDate = ( RunDate or date.today() ).isoformat()
+        self.Seen = {}
+        self.Active = {}
+        self.Cleared = []
+        self.Suppressed = 0
+
+        if ( os.path.exists(Filename) ) :
+            with open(Filename) as FileObject : State = json.load(FileObject)
+            for Area,Metric,Date,Value,RunDate in State['seen'] : self.Seen[(Area,Metric,Date)] = (Value,RunDate)
+            for Area,Metric,Date,RunDate in State['active'] : self.Active[(Area,Metric)] = (Date,RunDate)
+
+    # This procedure records the state 'Value' of the alert message keyed by
+    # ( 'Area', 'Metric', 'Date' ) and returns True if the message is new,
+    # i.e. the key has not been seen or its state has changed.
+    def IsNew(self,Area,Metric,Date,Value) :
+
+        "This procedure records the state 'Value' of an alert message and returns True if the message is new"
+
+        Key = (Area,Metric,str(Date))
+        Previous = self.Seen.get(Key)
+        self.Seen[Key] = (Value,self.RunDate)
+        if ( Previous is not None and Previous[0] == Value ) :
+            self.Suppressed += 1
+            return False
+
+        return True
+
+    # This procedure records whether the attention condition 'Attention' of
+    # ( 'Area', 'Metric' ) holds on 'Date' and returns True if the alert is
+    # newly raised. A cleared alert is added to the cleared list.
+    def IsRaised(self,Area,Metric,Date,Attention) :
+
+        "This procedure records the attention condition of ( 'Area', 'Metric' ) and returns True if the alert is newly raised"
+
+        Key = (Area,Metric)
+        Raised = self.Active.get(Key)
+
+        if ( Attention and Raised is None ) :
+            self.Active[Key] = (str(Date),self.RunDate)
+            return True
+
+        if ( not Attention and Raised is not None ) :
+            del self.Active[Key]
+            self.Cleared.append((Area,Metric,Raised[0],str(Date)))
+
+        return False
+
+    # This procedure writes the state to the state file, dropping the keys
+    # not seen in the last 'RetainDays' days.
+    def Write(self) :
+
+        "This procedure writes the state to the state file"
+
+        Oldest = ( date.fromisoformat(self.RunDate) - timedelta(days=RetainDays) ).isoformat()
+        State = {'seen':[[Area,Metric,Date,Value,RunDate] for (Area,Metric,Date),(Value,RunDate) in self.Seen.items() if RunDate >= Oldest],
+                 'active':[[Area,Metric,Date,RunDate] for (Area,Metric),(Date,RunDate) in self.Active.items()]}
+
+        TemporaryFilename = self.Filename + '.%i' % os.getpid()
+        with open(TemporaryFilename,'w') as FileObject : json.dump(State,FileObject)
+        os.replace(TemporaryFilename,self.Filename)
+
+# This procedure will generate a log message for each alert cleared in
+# 'State'.
+def GenerateClearedMessages(State) :
+
+    "This procedure will generate a log message for each alert cleared in 'State'"
+
+    for Area,Metric,Raised,Cleared in State.Cleared :
+        yield 'Alert for %s %s raised on %s cleared on %s' % (Area,Metric,Raised,Cleared)
@@ -0,0 +1,382 @@
+# covid_update/attention.py
+#
+# Description
+# -----------
+# This module writes the attention report of a script run, a compact
+# summary of only what raised the attention flag, for viewing in place of
+# the whole statistics file. The report holds the last 'Window' days of
+# each flagged area, series or trust with trend columns:
+#
+# pillar1      - Area, Date, Daily, Infectious, Change, Weekly Change, Trend
+#                ( Growth, Lower and Upper before Trend if alerted on growth )
+# pillar2      - Date, Daily, <alerted column>, Change, Weekly Change, Trend
+# trust_deaths - Trust, Date, Deaths, Weekly Deaths, Days Since Death
+#
+# where Change and Weekly Change are the changes in the alerted value
+# since the previous day and 7 days earlier and Trend is the increasing/
+# decreasing indicator of the alerts. When the Pillar 1 areas are flagged
+# by the growth alert ( --growth-alert ) Growth, Lower and Upper are the
+# daily growth rate of the infectious cases and its 95% band in percent
+# ( see growth.py ) and Trend is the growth indicator.
+#
+# The report is either a write-only xlsx workbook of a single worksheet or
+# an HTML table. Both are written a row at a time as the rows are generated,
+# the xlsx worksheet being streamed into its zip archive with its strings
+# inline ( no shared strings table ), so that the memory used does not
+# depend on the number of rows. Neither needs a spreadsheet application or
+# any module outside the standard library, so the report may be generated
+# headlessly.
+#
+# Options
+# -------
+# The following command line option is removed from the script arguments
+# by ParseOptions():
+#
+# --attention-report=xlsx|html   Write an attention report when the attention
+#                                flag is set and view it in place of the
+#                                statistics file
+#
+
+import os
+import zipfile
+from datetime import date,datetime
+from xml.sax.saxutils import escape
+
+import covid_update.growth as Growth
+from covid_update.common import GetDecimalPart,ReturnDateDeath,MonthConverter
+from covid_update.trust_deaths import TotalColumns,FindLastDeath
+
+# Report formats and their file extensions
+xlsx = 'xlsx'
+html = 'html'
+Formats = {xlsx:'.xlsx',html:'.html'}
+
+# Suffix of the report file name
+Suffix = '_attention'
+
+# Number of days of each flagged area, series or trust in the report
+Window = 14
+
+# Number of days of the weekly change
+Week = 7
+
+# Day 0 of the xlsx date serial numbers
+SerialEpoch = date(1899,12,30).toordinal()
+
+# Widths in characters of the first and other xlsx columns
+FirstWidth = 36
+Width = 14
+
+# Name of the xlsx worksheet
+SheetName = 'Attention'
+
+# Namespaces of the xlsx parts
+MainNamespace = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RelationshipNamespace = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PackageNamespace = 'http://schemas.openxmlformats.org/package/2006/relationships'
+Declaration = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Fixed parts of the xlsx archive
+Parts = {}
+Parts['[Content_Types].xml'] = (Declaration +
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>')
+Parts['_rels/.rels'] = (Declaration +
+    '<Relationships xmlns="%s">' % PackageNamespace +
+    '<Relationship Id="rId1" Type="%s/officeDocument" Target="xl/workbook.xml"/>' % RelationshipNamespace +
+    '</Relationships>')
+Parts['xl/workbook.xml'] = (Declaration +
+    '<workbook xmlns="%s" xmlns:r="%s">' % (MainNamespace,RelationshipNamespace) +
+    '<sheets><sheet name="%s" sheetId="1" r:id="rId1"/></sheets>' % SheetName +
+    '</workbook>')
+Parts['xl/_rels/workbook.xml.rels'] = (Declaration +
+    '<Relationships xmlns="%s">' % PackageNamespace +
+    '<Relationship Id="rId1" Type="%s/worksheet" Target="worksheets/sheet1.xml"/>' % RelationshipNamespace +
+    '<Relationship Id="rId2" Type="%s/styles" Target="styles.xml"/>' % RelationshipNamespace +
+    '</Relationships>')
+Parts['xl/styles.xml'] = (Declaration +
+    '<styleSheet xmlns="%s">' % MainNamespace +
+    '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>')
+
+# Styles of the xlsx date and heading cells ( see Parts['xl/styles.xml'] )
+DateStyle = 1
+HeadingStyle = 2
+
+# Style sheet of the HTML report
+HtmlStyle = ('body{font-family:sans-serif}table{border-collapse:collapse}'
+             'th,td{border:1px solid #ccc;padding:2px 6px}th{background:#eee}td.n{text-align:right}')
+
+# This procedure removes the attention report option from the list of
+# command line 'Arguments'. The remaining arguments and a dictionary of
+# the options are returned.
+def ParseOptions(Arguments) :
+
+    "This procedure removes the attention report option from 'Arguments'"
+
+    Options = {'attention':None}
+    Remaining = []
+
+    for Argument in Arguments :
+        if ( Argument.startswith('--attention-report=') ) :
+            Options['attention'] = Argument.split('=',1)[1]
+            if ( Options['attention'] not in Formats ) : raise ValueError('Attention report format must be one of %s' % str(list(Formats)))
+        else :
+            Remaining.append(Argument)
+
+    return Remaining,Options
+
+# This procedure returns the file name of the 'Format' attention report
+# written alongside the statistics file 'Filename'.
+def ReturnReportFileName(Filename,Format) :
+
+    "This procedure returns the file name of the 'Format' attention report written alongside 'Filename'"
+
+    return os.path.splitext(Filename)[0] + Suffix + Formats[Format]
+
+# This procedure returns the count 'Value', which may be a number or a
+# string, as a number, or None if empty.
+def ReturnNumber(Value) :
+
+    "This procedure returns the count 'Value' as a number, or None if empty"
+
+    if ( isinstance(Value,(int,float)) ) : return Value
+    if ( len(Value) == 0 ) : return None
+
+    return int(GetDecimalPart(Value))
+
+# This procedure returns the change from 'Previous' to 'Current', or None
+# if either is unknown. Changes in percentages are rounded to 2 decimal
+# places as the percentages are.
+def ReturnChange(Current,Previous) :
+
+    "This procedure returns the change from 'Previous' to 'Current'"
+
+    if ( Current is None or Previous is None ) : return None
+    if ( isinstance(Current,float) or isinstance(Previous,float) ) : return round(Current - Previous,2)
+
+    return Current - Previous
+
+# This procedure generates the report rows of the last 'Window' days of
+# the 'Value' column of 'Rows', each starting with the fields 'Key' and
+# followed by the 'Columns' fields, the changes in 'Value' and the trend of
+# the day given by 'Indicator' for the change and 'Variation', or None if
+# 'Indicator' is None.
+def GenerateTrendRows(Key,Rows,Columns,Value,Indicator,Variation) :
+
+    "This procedure generates the report rows of the last 'Window' days of 'Rows'"
+
+    Start = max(0,len(Rows) - Window)
+    for Index in range(Start,len(Rows)) :
+        Current = ReturnNumber(Rows[Index][Value])
+        Previous = None
+        if ( Index > 0 ) : Previous = ReturnNumber(Rows[Index - 1][Value])
+        Earlier = None
+        if ( Index >= Week ) : Earlier = ReturnNumber(Rows[Index - Week][Value])
+        Change = ReturnChange(Current,Previous)
+        Trend = None
+        if ( Change is not None and Indicator is not None ) : Trend = Indicator(Change,Variation)
+        yield Key + [ReturnNumber(Rows[Index][Column]) if Column != 'Date' else Rows[Index][Column] for Column in Columns] + [Change,ReturnChange(Current,Earlier),Trend]
+
+# This procedure generates the report rows of the last 'Window' days of
+# 'Rows' as GenerateTrendRows followed by the daily growth rate of the
+# infectious cases over the trailing 'GrowthWindow' rows and its 95% band
+# in percent, the trend being the growth indicator for 'Threshold' ( see
+# growth.py ).
+def GenerateGrowthRows(Key,Rows,Columns,Value,GrowthWindow,Threshold) :
+
+    "This procedure generates the report rows of the last 'Window' days of 'Rows' with the growth rate"
+
+    Start = max(0,len(Rows) - Window - GrowthWindow + 1)
+    Estimates = [None] * Start + Growth.ReturnGrowthSeries([OutData['Date'].toordinal() for OutData in Rows[Start:]],[OutData['Infectious'] for OutData in Rows[Start:]],GrowthWindow)
+    TrendRows = GenerateTrendRows(Key,Rows,Columns,Value,None,None)
+
+    for Estimate,Row in zip(Estimates[max(0,len(Rows) - Window):],TrendRows) :
+        if ( Estimate is None ) :
+            yield Row[:-1] + [None,None,None,None]
+        else :
+            yield Row[:-1] + [round(Rate * 100,2) for Rate in Estimate] + [Growth.ReturnIndicator(Estimate,Threshold)]
+
+# This procedure returns the heading and a generator of the rows of the
+# attention report of the Pillar 1 'AreaResults' ( see
+# pillar1.ComputeInfectious ) for the 'Flagged' areas, the trend being that
+# of 'Variation' in the 'Value' column. If the areas were flagged by the
+# growth alert of 'GrowthThreshold' the growth rate over 'GrowthWindow'
+# rows is added and the trend is that of the growth rate.
+def BuildPillar1Report(AreaResults,Flagged,Variation,Value='Infectious',GrowthWindow=0,GrowthThreshold=None) :
+
+    "This procedure returns the heading and rows of the attention report of the Pillar 1 'AreaResults'"
+
+    from covid_update.pillar1 import ReturnIndicator
+
+    Columns = ['Date','Daily',Value]
+    if ( GrowthThreshold is not None ) :
+        Heading = ['Area'] + Columns + ['Change','Weekly Change','Growth %/day','Lower %/day','Upper %/day','Trend']
+        Rows = ( Row for Area in Flagged if Area in AreaResults for Row in GenerateGrowthRows([Area],AreaResults[Area],Columns,Value,GrowthWindow,GrowthThreshold) )
+    else :
+        Heading = ['Area'] + Columns + ['Change','Weekly Change','Trend']
+        Rows = ( Row for Area in Flagged if Area in AreaResults for Row in GenerateTrendRows([Area],AreaResults[Area],Columns,Value,ReturnIndicator,Variation) )
+
+    return Heading,Rows
+
+# This procedure returns the heading and a generator of the rows of the
+# attention report of the Pillar 2 'SeriesResults' ( see
+# pillar2.ComputeSeries ), the trend being that of 'Variation' in the
+# 'Value' column.
+def BuildPillar2Report(SeriesResults,Variation,Value) :
+
+    "This procedure returns the heading and rows of the attention report of the Pillar 2 'SeriesResults'"
+
+    from covid_update.pillar2 import ReturnIndicator
+
+    Columns = ['Date','Daily',Value]
+    Heading = Columns + ['Change','Weekly Change','Trend']
+
+    return Heading,GenerateTrendRows([],SeriesResults,Columns,Value,ReturnIndicator,Variation)
+
+# This procedure generates the report rows of the last 'Window' days of
+# the 'Flagged' trusts of the trust deaths 'Matches' with specimen dates
+# 'SpecimenDates', the days since the last death being counted to
+# 'DateToday'.
+def GenerateTrustRows(SpecimenDates,Matches,Flagged,DateToday) :
+
+    "This procedure generates the report rows of the last 'Window' days of the 'Flagged' trusts"
+
+    for Trust,CSVFileDataList in Matches :
+        if ( Trust not in Flagged ) : continue
+        DailyList = CSVFileDataList[6:(len(CSVFileDataList) - TotalColumns)]
+        DaysLapsed = ( DateToday - SpecimenDates[FindLastDeath(DailyList)] ).days
+        Deaths = [ReturnNumber(Daily) for Daily in DailyList]
+        for Index in range(max(0,len(Deaths) - Window),len(Deaths)) :
+            Weekly = sum([Daily or 0 for Daily in Deaths[max(0,Index - Week + 1):Index + 1]])
+            yield [Trust,SpecimenDates[Index],Deaths[Index],Weekly,DaysLapsed]
+
+# This procedure returns the heading and a generator of the rows of the
+# attention report of the 'Flagged' trusts of the trust deaths 'Matches'
+# ( see trust_deaths.MatchTrusts ) with header 'HeaderList' on
+# 'DateToday'.
+def BuildTrustReport(HeaderList,Matches,Flagged,DateToday) :
+
+    "This procedure returns the heading and rows of the attention report of the trust deaths 'Matches'"
+
+    SpecimenDates = [ReturnDateDeath(Date,MonthConverter) for Date in HeaderList[6:(len(HeaderList) - TotalColumns)]]
+    Heading = ['Trust','Date','Deaths','Weekly Deaths','Days Since Death']
+
+    return Heading,GenerateTrustRows(SpecimenDates,Matches,Flagged,DateToday)
+
+# This procedure returns the xlsx column name ( A, B, ... Z, AA, ... ) of
+# the column 'Index' counted from 0.
+def ReturnColumnName(Index) :
+
+    "This procedure returns the xlsx column name of the column 'Index'"
+
+    Name = ''
+    Index += 1
+    while ( Index > 0 ) :
+        Index,Remainder = divmod(Index - 1,26)
+        Name = chr(ord('A') + Remainder) + Name
+
+    return Name
+
+# This procedure returns the xlsx cell 'Reference' holding 'Value' in the
+# style 'Style', or an empty string if 'Value' is None. Strings are held
+# inline and dates as date serial numbers.
+def ReturnXlsxCell(Reference,Value,Style=0) :
+
+    "This procedure returns the xlsx cell 'Reference' holding 'Value'"
+
+    if ( Value is None ) : return ''
+
+    StyleAttribute = ''
+    if ( Style ) : StyleAttribute = ' s="%i"' % Style
+
+    if ( isinstance(Value,datetime) ) : Value = Value.date()
+    if ( isinstance(Value,date) ) : return '<c r="%s" s="%i"><v>%i</v></c>' % (Reference,DateStyle,Value.toordinal() - SerialEpoch)
+    if ( isinstance(Value,bool) or not isinstance(Value,(int,float)) ) :
+        return '<c r="%s"%s t="inlineStr"><is><t>%s</t></is></c>' % (Reference,StyleAttribute,escape(str(Value)))
+
+    return '<c r="%s"%s><v>%s</v></c>' % (Reference,StyleAttribute,repr(Value))
+
+# This procedure writes the xlsx workbook 'Filename' of a worksheet of the
+# 'Heading' row followed by 'Rows', streaming the worksheet into the
+# archive a row at a time. The number of bytes written is returned.
+def WriteXlsx(Filename,Heading,Rows) :
+
+    "This procedure writes the xlsx workbook 'Filename' of the 'Heading' row followed by 'Rows'"
+
+    Names = [ReturnColumnName(Index) for Index in range(0,len(Heading))]
+
+    TemporaryFilename = Filename + '.%i' % os.getpid()
+    with zipfile.ZipFile(TemporaryFilename,'w',zipfile.ZIP_DEFLATED) as Archive :
+        for Name,Part in Parts.items() : Archive.writestr(Name,Part)
+
+        with Archive.open('xl/worksheets/sheet1.xml','w') as Stream :
+            Stream.write((Declaration + '<worksheet xmlns="%s">' % MainNamespace +
+                          '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+                          '<cols><col min="1" max="1" width="%i" customWidth="1"/>' % FirstWidth +
+                          '<col min="2" max="%i" width="%i" customWidth="1"/></cols><sheetData>' % (max(2,len(Heading)),Width)).encode())
+
+            Cells = ''.join([ReturnXlsxCell(Names[Index] + '1',Heading[Index],HeadingStyle) for Index in range(0,len(Heading))])
+            Stream.write(('<row r="1">%s</row>' % Cells).encode())
+
+            RowNumber = 1
+            for Row in Rows :
+                RowNumber += 1
+                Cells = ''.join([ReturnXlsxCell(Names[Index] + str(RowNumber),Row[Index]) for Index in range(0,len(Row))])
+                Stream.write(('<row r="%i">%s</row>' % (RowNumber,Cells)).encode())
+
+            Stream.write(b'</sheetData></worksheet>')
+    os.replace(TemporaryFilename,Filename)
+
+    return os.path.getsize(Filename)
+
+# This procedure returns the HTML table cell holding 'Value'.
+def ReturnHtmlCell(Value) :
+
+    "This procedure returns the HTML table cell holding 'Value'"
+
+    if ( Value is None ) : return '<td></td>'
+    if ( isinstance(Value,(int,float)) and not isinstance(Value,bool) ) : return '<td class="n">%s</td>' % str(Value)
+
+    return '<td>%s</td>' % escape(str(Value))
+
+# This procedure writes the HTML page 'Filename' titled 'Title' of a table
+# of the 'Heading' row followed by 'Rows', a row at a time. The number of
+# bytes written is returned.
+def WriteHtml(Filename,Title,Heading,Rows) :
+
+    "This procedure writes the HTML page 'Filename' of a table of the 'Heading' row followed by 'Rows'"
+
+    TemporaryFilename = Filename + '.%i' % os.getpid()
+    with open(TemporaryFilename,'w',encoding='utf-8') as FileObject :
+        FileObject.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>%s</title><style>%s</style></head>\n' % (escape(Title),HtmlStyle))
+        FileObject.write('<body><h1>%s</h1>\n<table><thead><tr>%s</tr></thead><tbody>\n' % (escape(Title),''.join(['<th>%s</th>' % escape(Name) for Name in Heading])))
+        for Row in Rows : FileObject.write('<tr>%s</tr>\n' % ''.join([ReturnHtmlCell(Value) for Value in Row]))
+        FileObject.write('</tbody></table></body></html>\n')
+    os.replace(TemporaryFilename,Filename)
+
+    return os.path.getsize(Filename)
+
+# This procedure writes the 'Format' attention report 'Filename' titled
+# 'Title' of the 'Heading' row followed by 'Rows' and returns the number of
+# bytes written.
+def WriteReport(Filename,Format,Title,Heading,Rows) :
+
+    "This procedure writes the 'Format' attention report 'Filename'"
+
+    if ( Format == xlsx ) : return WriteXlsx(Filename,Heading,Rows)
+
+    return WriteHtml(Filename,Title,Heading,Rows)
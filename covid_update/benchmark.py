@@ -0,0 +1,575 @@
+# covid_update/benchmark.py
+#
+# Description
+# -----------
+# This module times the processing phases of the covid_update scripts
+# against synthetic data files ( see generators.py ) recorded as fixtures
+# and served by the replay server ( see fixtures.py ). For each workload
+# size the following phases are timed separately:
+#
+# download - HTTP GET of the data file from the replay server
+# parse    - Extraction of the data rows
+# compute  - Derivation of the infectious or rolling window columns
+# alert    - Generation of the increasing/decreasing messages
+# output   - Writing of the statistics file
+# scan     - Ranking of every area by infectious growth ( Pillar 1 only )
+#
+# The fastest time of a number of repeats is recorded for each phase and
+# the results are stored as a JSON file so that results from different
+# versions of the scripts can be compared. The replay server may add a
+# latency to each response and limit the bandwidth at which files are
+# sent ( '--latency' and '--bandwidth' ) so that the download phase is
+# timed under network conditions closer to those of the real servers.
+#
+# The start up time of the 'replay' subcommand ( see cli.py ), which makes
+# no network access, is also measured in a separate interpreter together
+# with any of the 'HeavyModules' it imports. The memory held by the parsed
+# Pillar 1 rows is measured with tracemalloc for both the compact column
+# representation ( see records.py ) and the lists of strings it replaced,
+# and reported in bytes per million rows. The size and reload time of the
+# Pillar 1 statistics file is compared with those of the columnar formats
+# ( see columnar.py ) if pyarrow is installed.
+#
+# The peak memory of processing a reference Pillar 1 file of 'PeakSize'
+# areas x days for the 'DefaultWatch' monitored areas is measured in a
+# separate interpreter, both with tracemalloc and as the peak resident set
+# size ( RSS, where the platform reports it ), without a memory budget and
+# with a budget of 'PeakBudget' megabytes ( see budget.py ). The run fails
+# if the peak traced with the budget exceeds '--peak-limit' megabytes, or
+# grows by more than the '--threshold' fraction over a baseline, so that
+# the check may be run on its own with '--peak-only' as a memory
+# regression test.
+#
+# Usage
+# -----
+# python -m covid_update.benchmark
+# python -m covid_update.benchmark --sizes 10x100,300x800 --repeat 5
+# python -m covid_update.benchmark --latency 50 --bandwidth 1000
+# python -m covid_update.benchmark --output new.json --baseline old.json
+# python -m covid_update.benchmark --peak-only --peak-limit 4
+#
+# Where each size is <number of areas>x<number of days>. When a baseline
+# results file is specified any phase that is slower than the baseline by
+# more than the '--threshold' fraction is reported as a regression and the
+# exit status is non-zero.
+#
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date,datetime
+
+import covid_update.columnar as Columnar
+import covid_update.fixtures as Fixtures
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+import covid_update.pillar2 as Pillar2
+import covid_update.trust_deaths as TrustDeaths
+from covid_update.common import GetDecimalPart,ReturnDateString
+
+# Default workload sizes ( areas x days ) and settings
+DefaultSizes = '10x100,300x800'
+DefaultRepeat = 3
+DefaultWatch = 10
+DefaultThreshold = 0.2
+InfectiousPeriod = 7
+Variation = 5
+RollingPeriod = 7
+
+# Results file format version
+ResultsVersion = 1
+
+# Url the synthetic data files are recorded for and the subdirectory of the
+# working directory they are recorded to
+SourceUrl = 'https://example.org/benchmark/'
+FixturesDirName = 'fixtures'
+
+# Workload size ( areas x days ) of the parsed row memory measurement
+MemorySize = (20,2500)
+
+# Reference workload size ( areas x days ) of the peak memory measurement,
+# memory budget in megabytes of the budgeted run and default limit in
+# megabytes of its traced peak
+PeakSize = (100,500)
+PeakBudget = 1
+DefaultPeakLimit = 4
+
+# Modules which should not be imported by subcommands making no network access
+HeavyModules = ['requests','subprocess','File.Operations','Interface.Prompts']
+
+# Statement run in a separate interpreter to measure the replay start up
+StartupStatement = '''
+import sys,time
+Start = time.perf_counter()
+from covid_update.cli import main
+main(['replay',sys.argv[1],sys.argv[2]])
+print(time.perf_counter() - Start)
+print(','.join([Module for Module in sys.argv[3].split(',') if Module in sys.modules]))
+'''
+
+# Statement run in a separate interpreter to measure the peak memory of
+# processing a Pillar 1 file, traced if the last argument is 'trace'
+PeakStatement = '''
+import sys
+import covid_update.budget as Budget
+import covid_update.pillar1 as Pillar1
+Filename,Limit,Areas,Mode = sys.argv[1],int(sys.argv[2]),sys.argv[3].split(','),sys.argv[4]
+if ( Mode == 'trace' ) :
+    import tracemalloc
+    tracemalloc.start()
+Lines = Budget.ReturnLines(Filename,'utf-8',Limit or None)
+AreaData,AreaDataCount = Pillar1.ParseData(Lines,'ltla',Areas)
+AreaResults = Pillar1.ComputeInfectious(AreaData,%i)
+Messages = Pillar1.GenerateAlerts(AreaResults,%i,%i)
+for Line in Pillar1.GenerateStatisticsLines(AreaResults) : pass
+if ( Mode == 'trace' ) :
+    print(tracemalloc.get_traced_memory()[1])
+else :
+    try :
+        import resource
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * ( 1 if sys.platform == 'darwin' else 1024 ))
+    except ImportError :
+        print(0)
+''' % (InfectiousPeriod,InfectiousPeriod,Variation)
+
+# This procedure records the synthetic data file 'Text' as the fixture of
+# 'Filename' in the fixtures subdirectory of 'Directory' and returns the
+# url of the fixture on the replay server 'BaseUrl'.
+def RecordFixture(BaseUrl,Directory,Filename,Text) :
+
+    "This procedure records the synthetic data file 'Text' as the fixture of 'Filename' and returns its replay url"
+
+    Url = SourceUrl + Filename
+    Fixtures.RecordContent(os.path.join(Directory,FixturesDirName),Url,Text.encode(),{'Content-Type':'text/csv'})
+
+    return Fixtures.ReturnReplayUrl(BaseUrl,Url)
+
+# This procedure parses a sizes string of the form <areas>x<days>,...
+# and returns a list of ( areas, days ) pairs.
+def ParseSizes(string) :
+
+    "This procedure parses a sizes string of the form <areas>x<days>,..."
+
+    Sizes = []
+    for Size in string.split(',') :
+        Areas,Days = Size.lower().split('x')
+        Sizes.append((int(Areas),int(Days)))
+
+    return Sizes
+
+# This procedure calls 'Procedure' with 'Arguments' 'Repeat' times and
+# returns the fastest elapsed time in seconds and the last result.
+def TimePhase(Repeat,Procedure,*Arguments) :
+
+    "This procedure returns the fastest elapsed time of 'Repeat' calls of 'Procedure' and its result"
+
+    Fastest = None
+    for Count in range(0,Repeat) :
+        Start = time.perf_counter()
+        Result = Procedure(*Arguments)
+        Elapsed = time.perf_counter() - Start
+        if ( Fastest is None or Elapsed < Fastest ) : Fastest = Elapsed
+
+    return Fastest,Result
+
+# This procedure downloads 'Url' and returns the lines of the file.
+def Download(Url) :
+
+    "This procedure downloads 'Url' and returns the lines of the file"
+
+    from covid_update.common import Fetch
+
+    Response = Fetch(Url)
+    Response.raise_for_status()
+
+    return Response.text.splitlines()
+
+# This procedure writes 'Lines' to 'Filename'.
+def WriteLines(Filename,Lines) :
+
+    "This procedure writes 'Lines' to 'Filename'"
+
+    with open(Filename,'w') as FileObject :
+        for Line in Lines : FileObject.write(Line)
+
+# This procedure reads the csv statistics file 'Filename' into a list of
+# rows with the counts converted to integers.
+def ReloadCSV(Filename) :
+
+    "This procedure reads the csv statistics file 'Filename' into a list of rows"
+
+    import csv
+
+    with open(Filename,newline='') as FileObject :
+        Reader = csv.reader(FileObject)
+        Header = next(Reader)
+        return [[Row[0],date.fromisoformat(Row[1]),int(Row[2]),int(Row[3]),int(Row[4]),Row[5]] for Row in Reader]
+
+# This procedure compares the size and fastest reload time of 'Repeat'
+# reloads of the csv statistics file 'Filename' with those of each columnar
+# format for 'AreaResults'. The columnar formats are left out if pyarrow
+# is not installed.
+def MeasureFormats(Filename,AreaResults,Repeat) :
+
+    "This procedure compares the size and reload time of the csv statistics file with the columnar formats"
+
+    Formats = {'csv':{'bytes':os.path.getsize(Filename),'reload':TimePhase(Repeat,ReloadCSV,Filename)[0]}}
+
+    try :
+        Table = Columnar.BuildPillar1Table(AreaResults)
+    except ImportError :
+        return Formats
+
+    for Format in Columnar.Formats :
+        ColumnarFilename = Columnar.ReturnColumnarFileName(Filename,Format)
+        Formats[Format] = {'bytes':Columnar.WriteTable(Table,ColumnarFilename,Format),'reload':TimePhase(Repeat,Columnar.ReadTable,ColumnarFilename,Format)[0]}
+
+    return Formats
+
+# This procedure times the Pillar 1 phases for a file of 'Areas' areas
+# and 'Days' days. 'Watch' areas are monitored as in pillar1_configuration.csv.
+def BenchmarkPillar1(BaseUrl,Directory,Areas,Days,Watch,Repeat) :
+
+    "This procedure times the Pillar 1 phases for a file of 'Areas' areas and 'Days' days"
+
+    Filename = 'pillar1_%ix%i.csv' % (Areas,Days)
+    Text = Generators.GeneratePillar1Data(Areas,Days)
+    Url = RecordFixture(BaseUrl,Directory,Filename,Text)
+
+    WatchList = []
+    for Index in range(0,min(Watch,Areas)) : WatchList.append(Generators.ReturnAreaName(Index * Areas // min(Watch,Areas)))
+
+    Phases = {}
+    Phases['download'],Lines = TimePhase(Repeat,Download,Url)
+    Phases['parse'],Parsed = TimePhase(Repeat,Pillar1.ParseData,Lines,'ltla',WatchList)
+    AreaData = Parsed[0]
+    Phases['compute'],AreaResults = TimePhase(Repeat,Pillar1.ComputeInfectious,AreaData,InfectiousPeriod)
+    Phases['alert'],Alerts = TimePhase(Repeat,Pillar1.GenerateAlerts,AreaResults,InfectiousPeriod,Variation)
+    Output = os.path.join(Directory,'out_' + Filename)
+    Phases['output'],Result = TimePhase(Repeat,lambda : WriteLines(Output,Pillar1.GenerateStatisticsLines(AreaResults)))
+    Phases['scan'],Hotspots = TimePhase(Repeat,Pillar1.ScanHotspots,Lines,'ltla',InfectiousPeriod)
+    Formats = MeasureFormats(Output,AreaResults,Repeat)
+
+    return {'workload':'pillar1','areas':Areas,'days':Days,'watch':len(WatchList),'rows':len(Lines) - 1,
+            'bytes':len(Text.encode()),'messages':len(Alerts[0]),'phases':Phases,'formats':Formats}
+
+# This procedure times the Pillar 2 phases for a series file of type
+# 'DataType' containing 'Days' days.
+def BenchmarkPillar2(BaseUrl,Directory,DataType,Days,Repeat) :
+
+    "This procedure times the Pillar 2 phases for a series file of type 'DataType' containing 'Days' days"
+
+    Filename = 'pillar2_%s_%i.csv' % (DataType,Days)
+    if ( DataType == Pillar2.testing ) : Text = Generators.GenerateTestingData(Days)
+    if ( DataType == Pillar2.death ) : Text = Generators.GenerateDeathData(Days)
+    Url = RecordFixture(BaseUrl,Directory,Filename,Text)
+
+    if ( DataType == Pillar2.testing ) : Variation = 0.02
+    if ( DataType == Pillar2.death ) : Variation = 30
+
+    Phases = {}
+    Phases['download'],Lines = TimePhase(Repeat,Download,Url)
+    Phases['parse'],Parsed = TimePhase(Repeat,Pillar2.ParseSeries,Lines,DataType,'Pillar 2')
+    SeriesData = Parsed[0]
+    Phases['compute'],SeriesResults = TimePhase(Repeat,Pillar2.ComputeSeries,SeriesData,DataType,RollingPeriod)
+    Phases['alert'],Alerts = TimePhase(Repeat,Pillar2.GenerateAlerts,SeriesResults,DataType,Variation)
+    Output = os.path.join(Directory,'out_' + Filename)
+    Phases['output'],Result = TimePhase(Repeat,lambda : WriteLines(Output,Pillar2.GenerateStatisticsLines(SeriesResults,DataType)))
+
+    return {'workload':'pillar2_' + DataType,'areas':1,'days':Days,'rows':len(SeriesData),
+            'bytes':len(Text.encode()),'messages':len(Alerts[0]),'phases':Phases}
+
+# This procedure times the trust deaths phases for a file of 'Trusts'
+# trusts and 'Days' days. 'Watch' trusts are monitored as in trust_deaths.csv.
+def BenchmarkTrustDeaths(BaseUrl,Directory,Trusts,Days,Watch,Repeat) :
+
+    "This procedure times the trust deaths phases for a file of 'Trusts' trusts and 'Days' days"
+
+    Filename = 'trust_deaths_%ix%i.csv' % (Trusts,Days)
+    Text = Generators.GenerateTrustData(Trusts,Days)
+    Url = RecordFixture(BaseUrl,Directory,Filename,Text)
+
+    TrustsList = []
+    for Index in range(0,min(Watch,Trusts)) : TrustsList.append(Generators.ReturnTrustName(Index * Trusts // min(Watch,Trusts)))
+
+    Phases = {}
+    Phases['download'],Lines = TimePhase(Repeat,Download,Url)
+    Phases['parse'],Parsed = TimePhase(Repeat,TrustDeaths.ParseTrustData,Lines)
+    HeaderList,CSVFileDataLists = Parsed
+    Phases['compute'],Matches = TimePhase(Repeat,TrustDeaths.MatchTrusts,CSVFileDataLists,TrustsList)
+    Phases['alert'],Alerts = TimePhase(Repeat,TrustDeaths.GenerateAlerts,HeaderList,Matches,date.today())
+    Output = os.path.join(Directory,'out_' + Filename)
+    Phases['output'],Result = TimePhase(Repeat,lambda : WriteLines(Output,TrustDeaths.GenerateTrustLines(HeaderList,Matches)))
+
+    return {'workload':'trust_deaths','areas':Trusts,'days':Days,'watch':len(TrustsList),'rows':len(CSVFileDataLists),
+            'bytes':len(Text.encode()),'messages':len(Alerts[0]),'phases':Phases}
+
+# This procedure measures the start up of the replay subcommand for a
+# small data file in a separate interpreter. The fastest elapsed time of
+# 'Repeat' runs and the list of 'HeavyModules' imported are returned.
+def MeasureStartup(Directory,Repeat) :
+
+    "This procedure measures the start up of the replay subcommand in a separate interpreter"
+
+    DataFilename = os.path.join(Directory,'startup.csv')
+    ConfigurationFilename = os.path.join(Directory,'startup_configuration.csv')
+    with open(DataFilename,'w') as FileObject : FileObject.write(Generators.GeneratePillar1Data(1,30))
+    with open(ConfigurationFilename,'w') as FileObject : FileObject.write('file:startup.csv,ltla,%i,%i,%s' % (InfectiousPeriod,Variation,Generators.ReturnAreaName(0)))
+
+    PackageDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    Environment = dict(os.environ,PYTHONPATH=PackageDir)
+    Command = [sys.executable,'-c',StartupStatement,DataFilename,ConfigurationFilename,','.join(HeavyModules)]
+
+    Fastest = None
+    for Count in range(0,Repeat) :
+        Start = time.perf_counter()
+        Output = subprocess.run(Command,env=Environment,capture_output=True,text=True,check=True).stdout.splitlines()
+        Elapsed = time.perf_counter() - Start
+        if ( Fastest is None or Elapsed < Fastest ) : Fastest = Elapsed
+
+    Imported = [Module for Module in Output[-1].split(',') if Module]
+
+    return {'process':Fastest,'command':float(Output[-2]),'imported':Imported}
+
+# This procedure returns the rows of the Pillar 1 data lines 'Lines' in
+# the representation used before records.py, a list of strings per row
+# with a date object and the count fields truncated to integer strings.
+def ParseRowLists(Lines) :
+
+    "This procedure returns the rows of the Pillar 1 data lines 'Lines' as lists of strings"
+
+    Rows = []
+    for Line in Lines[1:] :
+        Row = Line.split(',')
+        Row[3] = Pillar1.ReturnDate(Row[3])
+        Row[4] = GetDecimalPart(Row[4])
+        Row[6] = GetDecimalPart(Row[6])
+        Rows.append(Row)
+
+    return Rows
+
+# This procedure returns the memory in bytes traced by tracemalloc while
+# the result of calling 'Procedure' with 'Arguments' is held.
+def TraceMemory(Procedure,*Arguments) :
+
+    "This procedure returns the memory traced while the result of 'Procedure' is held"
+
+    tracemalloc.start()
+    try :
+        Result = Procedure(*Arguments)
+        Current,Peak = tracemalloc.get_traced_memory()
+    finally :
+        tracemalloc.stop()
+    del Result
+
+    return Current
+
+# This procedure measures the memory held by the parsed rows of a Pillar 1
+# file of 'Areas' areas and 'Days' days for the lists of strings and the
+# compact column representation. The results are in bytes per million rows.
+def MeasureRowMemory(Areas,Days) :
+
+    "This procedure measures the memory held by the parsed rows of a Pillar 1 file"
+
+    Lines = Generators.GeneratePillar1Data(Areas,Days).splitlines()
+    AreaNames = [Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+    Rows = len(Lines) - 1
+
+    Lists = TraceMemory(ParseRowLists,Lines)
+    Records = TraceMemory(Pillar1.ParseData,Lines,'ltla',AreaNames)
+
+    return {'rows':Rows,'lists':Lists * 1000000 // Rows,'records':Records * 1000000 // Rows}
+
+# This procedure measures the peak memory of processing a Pillar 1 file of
+# 'Areas' areas and 'Days' days for 'Watch' monitored areas in a separate
+# interpreter, without a memory budget and with a budget of 'Budget'
+# megabytes. The peaks traced by tracemalloc and the peak RSS ( 0 if not
+# reported by the platform ) of each are returned in bytes.
+def MeasurePeakMemory(Directory,Areas,Days,Watch,Budget=PeakBudget) :
+
+    "This procedure measures the peak memory of processing a Pillar 1 file in a separate interpreter"
+
+    DataFilename = os.path.join(Directory,'peak.csv')
+    with open(DataFilename,'w') as FileObject : FileObject.write(Generators.GeneratePillar1Data(Areas,Days))
+    AreaNames = ','.join([Generators.ReturnAreaName(Index) for Index in range(0,min(Watch,Areas))])
+
+    PackageDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    Environment = dict(os.environ,PYTHONPATH=PackageDir)
+
+    Peak = {'areas':Areas,'days':Days,'bytes':os.path.getsize(DataFilename),'budget':Budget}
+    for Name,Limit in [('full',0),('budgeted',int(Budget * 1024 * 1024))] :
+        Peak[Name] = {}
+        for Mode in ['trace','rss'] :
+            Command = [sys.executable,'-c',PeakStatement,DataFilename,str(Limit),AreaNames,Mode]
+            Peak[Name][Mode] = int(subprocess.run(Command,env=Environment,capture_output=True,text=True,check=True).stdout.split()[-1])
+
+    return Peak
+
+# This procedure returns a list of memory regression messages if the peak
+# traced with a budget in 'Current' exceeds 'Limit' megabytes or that in
+# 'Baseline' by more than the fraction 'Threshold'.
+def ComparePeakMemory(Baseline,Current,Limit=DefaultPeakLimit,Threshold=DefaultThreshold) :
+
+    "This procedure returns a list of memory regression messages for the peak traced with a budget"
+
+    Regressions = []
+    Traced = Current['peak']['budgeted']['trace']
+    if ( Limit and Traced > Limit * 1024 * 1024 ) :
+        Regressions.append('peak memory with a %i MB budget was %i bytes, more than the limit of %i MB' % (Current['peak']['budget'],Traced,Limit))
+
+    Previous = ( ( Baseline or {} ).get('peak') or {} ).get('budgeted',{}).get('trace')
+    if ( Previous and Traced > Previous * (1 + Threshold) ) :
+        Regressions.append('peak memory with a %i MB budget was %i bytes compared with %i ( %+.0f%% )' % (Current['peak']['budget'],Traced,Previous,(Traced / Previous - 1) * 100))
+
+    return Regressions
+
+# This procedure runs all benchmarks for each of 'Sizes' and returns
+# the results dictionary. The data files are downloaded from a replay
+# server adding 'Latency' milliseconds to each response and sending at
+# 'Bandwidth' kB/s ( 0 for no limit ).
+def RunBenchmarks(Sizes,Repeat=DefaultRepeat,Watch=DefaultWatch,PeakOnly=False,Latency=0.0,Bandwidth=0.0) :
+
+    "This procedure runs all benchmarks for each of 'Sizes' and returns the results dictionary"
+
+    Results = []
+
+    with tempfile.TemporaryDirectory() as Directory :
+        Peak = MeasurePeakMemory(Directory,PeakSize[0],PeakSize[1],Watch)
+        if ( PeakOnly ) :
+            return {'version':ResultsVersion,'created':datetime.now().isoformat(timespec='seconds'),
+                    'python':platform.python_version(),'platform':platform.platform(),'peak':Peak,'results':Results}
+        Startup = MeasureStartup(Directory,Repeat)
+        Memory = MeasureRowMemory(*MemorySize)
+        Server,BaseUrl = Fixtures.StartReplayServer(os.path.join(Directory,FixturesDirName),Latency / 1000.0,int(Bandwidth * 1000))
+        try :
+            for Areas,Days in Sizes :
+                Results.append(BenchmarkPillar1(BaseUrl,Directory,Areas,Days,Watch,Repeat))
+                Results.append(BenchmarkPillar2(BaseUrl,Directory,Pillar2.testing,Days,Repeat))
+                Results.append(BenchmarkPillar2(BaseUrl,Directory,Pillar2.death,Days,Repeat))
+                Results.append(BenchmarkTrustDeaths(BaseUrl,Directory,Areas,Days,Watch,Repeat))
+        finally :
+            Server.shutdown()
+            Server.server_close()
+
+    return {'version':ResultsVersion,'created':datetime.now().isoformat(timespec='seconds'),
+            'python':platform.python_version(),'platform':platform.platform(),'repeat':Repeat,'latency':Latency,'bandwidth':Bandwidth,'startup':Startup,'memory':Memory,'peak':Peak,'results':Results}
+
+# This procedure returns the key identifying a benchmark result.
+def ReturnResultKey(Result) :
+
+    "This procedure returns the key identifying a benchmark result"
+
+    return '%s_%ix%i' % (Result['workload'],Result['areas'],Result['days'])
+
+# This procedure compares 'Current' results with 'Baseline' results and
+# returns a list of regression messages for each phase that is slower by
+# more than the fraction 'Threshold'.
+def CompareResults(Baseline,Current,Threshold=DefaultThreshold) :
+
+    "This procedure returns a list of regression messages for phases slower than 'Baseline' by more than 'Threshold'"
+
+    Regressions = []
+
+    BaselineResults = {}
+    for Result in Baseline['results'] : BaselineResults[ReturnResultKey(Result)] = Result
+
+    for Result in Current['results'] :
+        Key = ReturnResultKey(Result)
+        if ( Key not in BaselineResults ) : continue
+        for Phase,Elapsed in Result['phases'].items() :
+            Previous = BaselineResults[Key]['phases'].get(Phase)
+            if ( not Previous ) : continue
+            if ( Elapsed > Previous * (1 + Threshold) ) :
+                Regressions.append('%s %s phase took %.6fs compared with %.6fs ( %+.0f%% )' % (Key,Phase,Elapsed,Previous,(Elapsed / Previous - 1) * 100))
+
+    return Regressions
+
+# This procedure prints a table of 'Results' to standard output.
+def PrintResults(Results) :
+
+    "This procedure prints a table of 'Results' to standard output"
+
+    Phases = ['download','parse','compute','alert','output','scan']
+    if ( Results['results'] ) : print('%-30s %10s' % ('workload','bytes') + ''.join(['%12s' % Phase for Phase in Phases]))
+    for Result in Results['results'] :
+        Line = '%-30s %10i' % (ReturnResultKey(Result),Result['bytes'])
+        for Phase in Phases :
+            if ( Phase in Result['phases'] ) : Line = Line + '%12.6f' % Result['phases'][Phase]
+            else : Line = Line + '%12s' % '-'
+        print(Line)
+
+    if ( Results.get('latency') or Results.get('bandwidth') ) :
+        print('downloads replayed with %gms latency at %s' % (Results['latency'],'%g kB/s' % Results['bandwidth'] if Results['bandwidth'] else 'unlimited bandwidth'))
+
+    for Result in Results['results'] :
+        for Format,Measures in Result.get('formats',{}).items() :
+            print('%-30s %-8s %10i bytes reloaded in %.6fs' % (ReturnResultKey(Result),Format,Measures['bytes'],Measures['reload']))
+
+    Startup = Results.get('startup')
+    if ( Startup ) :
+        print('replay start up %.6fs ( %.6fs in process ) heavy modules imported: %s' % (Startup['process'],Startup['command'],','.join(Startup['imported']) or 'none'))
+
+    Memory = Results.get('memory')
+    if ( Memory ) :
+        print('parsed rows %i bytes per million rows ( %i as lists of strings )' % (Memory['records'],Memory['lists']))
+
+    Peak = Results.get('peak')
+    if ( Peak ) :
+        for Name in ['full','budgeted'] :
+            print('peak memory %s %ix%i file of %i bytes: %i bytes traced, %i bytes RSS' % (Name,Peak['areas'],Peak['days'],Peak['bytes'],Peak[Name]['trace'],Peak[Name]['rss']))
+
+############
+### MAIN ###
+############
+
+def main(Arguments=None) :
+
+    "Runs the benchmarks and stores the results as a JSON file"
+
+    Parser = argparse.ArgumentParser(prog='covid_update.benchmark',description='Time the covid_update processing phases against synthetic data')
+    Parser.add_argument('--sizes',default=DefaultSizes,help='comma separated <areas>x<days> workload sizes')
+    Parser.add_argument('--repeat',type=int,default=DefaultRepeat,help='number of times each phase is repeated')
+    Parser.add_argument('--watch',type=int,default=DefaultWatch,help='number of monitored areas or trusts')
+    Parser.add_argument('--latency',type=float,default=0.0,help='milliseconds added to each download response')
+    Parser.add_argument('--bandwidth',type=float,default=0.0,help='kB/s at which files are downloaded, 0 for no limit')
+    Parser.add_argument('--output',default=os.path.join('benchmark','benchmark_' + ReturnDateString() + '.json'),help='results file')
+    Parser.add_argument('--baseline',help='results file of a previous version to compare with')
+    Parser.add_argument('--threshold',type=float,default=DefaultThreshold,help='fractional slow down reported as a regression')
+    Parser.add_argument('--peak-limit',type=float,default=DefaultPeakLimit,help='megabytes of the peak memory traced with a budget reported as a regression, 0 for no limit')
+    Parser.add_argument('--peak-only',action='store_true',help='only measure the peak memory')
+    Options = Parser.parse_args(Arguments)
+
+    Results = RunBenchmarks(ParseSizes(Options.sizes),Options.repeat,Options.watch,Options.peak_only,Options.latency,Options.bandwidth)
+    PrintResults(Results)
+
+    OutputDir = os.path.dirname(Options.output)
+    if ( OutputDir ) : os.makedirs(OutputDir,exist_ok=True)
+    with open(Options.output,'w') as FileObject : json.dump(Results,FileObject,indent=2)
+    print('Results written to %s' % Options.output)
+
+    Status = 0
+    Baseline = None
+    if ( Options.baseline ) :
+        with open(Options.baseline) as FileObject : Baseline = json.load(FileObject)
+        Regressions = CompareResults(Baseline,Results,Options.threshold)
+        for Regression in Regressions : print('REGRESSION: ' + Regression)
+        if ( Regressions ) : Status = 1
+
+    Regressions = ComparePeakMemory(Baseline,Results,Options.peak_limit,Options.threshold)
+    for Regression in Regressions : print('REGRESSION: ' + Regression)
+    if ( Regressions ) : Status = 1
+
+    if ( 'startup' in Results and Results['startup']['imported'] ) :
+        print('REGRESSION: replay imported %s' % ','.join(Results['startup']['imported']))
+        Status = 1
+
+    return Status
+
+if __name__ == '__main__' :
+    sys.exit(main())
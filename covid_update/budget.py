@@ -0,0 +1,120 @@
+# covid_update/budget.py
+#
+# Description
+# -----------
+# This module provides the memory budget mode of the covid_update scripts,
+# for running many tiers in parallel in a small amount of memory. Without
+# a budget a downloaded data file is read into memory and split into a list
+# of lines, both the text and the lines being held while the file is
+# processed, so the peak memory of a script is several times the size of
+# the file. With a budget a data file larger than the budget is not read
+# into memory: its lines are read from the file on disk, one buffer at a
+# time, each time a phase passes over them ( see FileLines ). Data files
+# fetched into memory are downloaded to the scratch directory instead, so
+# that no file larger than the budget is held in memory whatever its size.
+# Only the rows of the configured areas or trusts are kept.
+#
+# A file no larger than the budget is read into memory as before, so that a
+# budget only costs the time of re-reading a large file.
+#
+# Options
+# -------
+# The following command line option is removed from the script arguments
+# by ParseOptions(). It may also be given by the environment variable
+# shown, the command line option taking precedence:
+#
+# --memory-budget=<MB>  COVID_UPDATE_MEMORY_BUDGET  Largest data file read into memory
+#
+
+import os
+from itertools import islice
+
+# Environment variable of the budget
+EnvironmentVariable = 'COVID_UPDATE_MEMORY_BUDGET'
+
+# Number of bytes in a megabyte of the budget
+Megabyte = 1024 * 1024
+
+# Size in bytes of the buffer of a file read line by line
+BufferSize = 65536
+
+# This procedure removes the memory budget option from the list of command
+# line 'Arguments'. The remaining arguments and a dictionary of the options
+# are returned, the budget being in bytes or None if not set.
+def ParseOptions(Arguments,Environment=None) :
+
+    "This procedure removes the memory budget option from 'Arguments'"
+
+    if ( Environment is None ) : Environment = os.environ
+
+    Budget = Environment.get(EnvironmentVariable) or None
+    Remaining = []
+    for Argument in Arguments :
+        if ( Argument.startswith('--memory-budget=') ) : Budget = Argument.split('=',1)[1]
+        else : Remaining.append(Argument)
+
+    Options = {'budget':None}
+    if ( Budget ) : Options['budget'] = int(float(Budget) * Megabyte)
+
+    return Remaining,Options
+
+# The lines of a text file read from disk each time they are iterated, in
+# place of the list of lines of the file. The lines have no line endings.
+# Only the first line ( the header ) is kept in memory, the number of lines
+# being found on the first pass.
+class FileLines :
+
+    "The lines of a text file read from disk each time they are iterated"
+
+    def __init__(self,Filename,Encoding='utf-8') :
+
+        self.Filename = Filename
+        self.Encoding = Encoding or 'utf-8'
+        self.Count = None
+        self.Header = next(iter(self),None)
+
+    def __iter__(self) :
+
+        Count = 0
+        with open(self.Filename,encoding=self.Encoding,errors='replace',newline='',buffering=BufferSize) as FileObject :
+            for Line in FileObject :
+                Count += 1
+                yield Line.rstrip('\r\n')
+        self.Count = Count
+
+    def __len__(self) :
+
+        if ( self.Count is None ) :
+            for Line in self : pass
+
+        return self.Count
+
+    def __getitem__(self,Index) :
+
+        if ( isinstance(Index,slice) ) : return islice(self,Index.start,Index.stop,Index.step)
+        if ( Index == 0 and self.Header is not None ) : return self.Header
+        if ( Index < 0 ) : raise IndexError('FileLines does not support negative indexes')
+
+        Line = next(islice(self,Index,None),None)
+        if ( Line is None ) : raise IndexError('FileLines index out of range')
+
+        return Line
+
+# This procedure returns the lines of the text file 'Filename' in encoding
+# 'Encoding'. If the file is larger than 'Budget' bytes the lines are read
+# from disk as they are used ( see FileLines ), otherwise the file is read
+# into a list of lines.
+def ReturnLines(Filename,Encoding=None,Budget=None) :
+
+    "This procedure returns the lines of the text file 'Filename'"
+
+    if ( Budget is not None and os.path.getsize(Filename) > Budget ) : return FileLines(Filename,Encoding)
+
+    with open(Filename,encoding=Encoding or 'utf-8',errors='replace',newline='') as FileObject : return FileObject.read().splitlines()
+
+# This procedure returns True if 'Lines' are read from disk.
+def IsSpilled(Lines) :
+
+    "This procedure returns True if 'Lines' are read from disk"
+
+    return isinstance(Lines,FileLines)
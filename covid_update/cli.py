@@ -0,0 +1,405 @@
+# covid_update/cli.py
+#
+# Description
+# -----------
+# This module provides a single command line for the covid_update scripts
+# and tools. Each subcommand only imports the modules it needs so that the
+# subcommands which make no network access start quickly:
+#
+# pillar1      - Run pillar1_covid_update.py
+# pillar2      - Run pillar2_covid_update.py
+# trust-deaths - Run nhs_trust_deaths.py
+# run          - Run the daily updates as a graph of cached tasks ( see pipeline.py )
+# replay       - Process a locally stored Pillar 1 data file
+# sweep        - Evaluate Pillar 1 trends over a range of periods and variations
+# growth       - Estimate the daily growth rate of the infectious cases of each area in a Pillar 1 data file
+# scan         - Rank every area of a tier in a Pillar 1 data file by infectious growth
+# rollup-check - Compare higher tier data rolled up from a lower tier file with an official file
+# rising       - List the areas in a results store whose infectious cases rose on consecutive days
+# logs         - Query the log messages kept in the log store ( see logstore.py )
+# serve        - Serve the latest results over HTTP from memory ( see server.py )
+# fixtures     - List, add, generate or serve recorded HTTP fixtures ( see fixtures.py )
+# benchmark    - Run the benchmark harness ( see benchmark.py )
+#
+# Usage
+# -----
+# python -m covid_update pillar1 [<configuration file>]
+# python -m covid_update pillar2
+# python -m covid_update trust-deaths
+# python -m covid_update run [<configuration file> ...] [--scripts trust-deaths] [--workers 4]
+# python -m covid_update replay <data file> <configuration file> [--output <file>]
+# python -m covid_update sweep <data file> <configuration file> --periods 5,7,10 --variations 0,5,10
+# python -m covid_update growth <data file> <configuration file> [--window 7] [--all]
+# python -m covid_update scan <data file> [--tier ltla] [--period 7] [--top 10] [--minimum 10]
+# python -m covid_update rollup-check <ltla file> <tier file> <hierarchy file> --tier utla
+# python -m covid_update rising <store file> [--tier ltla] [--days 5]
+# python -m covid_update logs [--module <module>] [--level WARNING] [--kind zero] [--area <area>] [--days 30] [--last-run] [--text <text>] [--areas]
+# python -m covid_update serve [--port 8080] [--bind 127.0.0.1] [--interval 30] [--variation 5]
+# python -m covid_update fixtures {list,add,generate,serve} <fixtures directory> ...
+# python -m covid_update benchmark [--sizes 10x100 ...]
+#
+# The options following the pillar1, pillar2, trust-deaths, run and benchmark
+# subcommands are passed unchanged to the script or tool.
+#
+
+import sys
+
+# Subcommands passed unchanged to the Main procedure of a module.
+Scripts = {'pillar1':'covid_update.pillar1','pillar2':'covid_update.pillar2','trust-deaths':'covid_update.trust_deaths',
+           'run':'covid_update.pipeline'}
+
+# This procedure parses a comma separated list of integers.
+def ParseIntegers(string) :
+
+    "This procedure parses a comma separated list of integers"
+
+    return [int(item) for item in string.split(',')]
+
+# This procedure runs the replay subcommand.
+def Replay(Arguments) :
+
+    "This procedure runs the replay subcommand"
+
+    import argparse
+    import covid_update.pillar1 as Pillar1
+
+    Parser = argparse.ArgumentParser(prog='covid_update replay',description='Process a locally stored Pillar 1 data file')
+    Parser.add_argument('data',help='Pillar 1 data file')
+    Parser.add_argument('configuration',help='configuration file in the format of pillar1_configuration.csv')
+    Parser.add_argument('--output',help='statistics file')
+    Options = Parser.parse_args(Arguments)
+
+    Messages,AttentionFlag = Pillar1.Replay(Options.data,Options.configuration,Options.output)
+    for Message,Level in Messages : print('%s: %s' % (Level,Message))
+    if ( AttentionFlag ) : print('Attention flag set')
+
+    return 0
+
+# This procedure runs the sweep subcommand.
+def Sweep(Arguments) :
+
+    "This procedure runs the sweep subcommand"
+
+    import argparse
+    import covid_update.pillar1 as Pillar1
+
+    Parser = argparse.ArgumentParser(prog='covid_update sweep',description='Evaluate Pillar 1 trends over a range of periods and variations')
+    Parser.add_argument('data',help='Pillar 1 data file')
+    Parser.add_argument('configuration',help='configuration file in the format of pillar1_configuration.csv')
+    Parser.add_argument('--periods',type=ParseIntegers,default=[7],help='comma separated infectious periods')
+    Parser.add_argument('--variations',type=ParseIntegers,default=[5],help='comma separated variations')
+    Options = Parser.parse_args(Arguments)
+
+    print('period,variation,increasing')
+    for InfectiousPeriod,Variation,Increasing in Pillar1.Sweep(Options.data,Options.configuration,Options.periods,Options.variations) :
+        print('%i,%i,%s' % (InfectiousPeriod,Variation,';'.join(Increasing)))
+
+    return 0
+
+# This procedure runs the growth subcommand.
+def GrowthRates(Arguments) :
+
+    "This procedure runs the growth subcommand"
+
+    import argparse
+    import covid_update.pillar1 as Pillar1
+    import covid_update.growth as Growth
+
+    Parser = argparse.ArgumentParser(prog='covid_update growth',description='Estimate the daily growth rate of the infectious cases of each area in a Pillar 1 data file')
+    Parser.add_argument('data',help='Pillar 1 data file')
+    Parser.add_argument('configuration',help='configuration file in the format of pillar1_configuration.csv')
+    Parser.add_argument('--window',type=int,default=Growth.DefaultWindow,help='trailing window in days')
+    Parser.add_argument('--all',action='store_true',help='list every date rather than the latest')
+    Options = Parser.parse_args(Arguments)
+
+    with open(Options.configuration) as FileObject : Configuration = Pillar1.ReadConfiguration(FileObject.read())
+    with open(Options.data) as FileObject : ResponseLines = FileObject.read().splitlines()
+
+    AreaData,AreaDataCount = Pillar1.ParseData(ResponseLines,Configuration['tier'],Configuration['areas'])
+    AreaResults = Pillar1.ComputeInfectious(AreaData,Configuration['period'])
+
+    print('area,date,infectious,rate,lower,upper,doubling')
+    for Area in AreaResults :
+        Rows = AreaResults[Area]
+        Series = Growth.ReturnGrowthSeries([OutData['Date'].toordinal() for OutData in Rows],[OutData['Infectious'] for OutData in Rows],Options.window)
+        if ( not Options.all ) :
+            Rows = Rows[-1:]
+            Series = Series[-1:]
+        for OutData,Estimate in zip(Rows,Series) :
+            if ( Estimate is None ) : continue
+            DoublingTime = Growth.ReturnDoublingTime(Estimate[0])
+            print('%s,%s,%i,%.4f,%.4f,%.4f,%s' % (OutData['Area'],OutData['Date'],OutData['Infectious'],Estimate[0],Estimate[1],Estimate[2],'' if DoublingTime is None else '%.1f' % DoublingTime))
+
+    return 0
+
+# This procedure runs the scan subcommand.
+def Scan(Arguments) :
+
+    "This procedure runs the scan subcommand"
+
+    import argparse
+    import covid_update.pillar1 as Pillar1
+
+    Parser = argparse.ArgumentParser(prog='covid_update scan',description='Rank every area of a tier in a Pillar 1 data file by infectious growth')
+    Parser.add_argument('data',help='Pillar 1 data file')
+    Parser.add_argument('--tier',default='ltla',help='area tier type')
+    Parser.add_argument('--period',type=int,default=7,help='infectious period')
+    Parser.add_argument('--top',type=int,default=Pillar1.HotspotCount,help='number of areas listed')
+    Parser.add_argument('--minimum',type=int,default=Pillar1.HotspotMinimum,help='minimum earlier infectious cases of a ranked area')
+    Options = Parser.parse_args(Arguments)
+
+    with open(Options.data) as FileObject : ResponseLines = FileObject.read().splitlines()
+
+    print('area,date,infectious,earlier,increase,growth')
+    for Growth,Increase,Area,Infectious,Earlier,Date in Pillar1.ScanHotspots(ResponseLines,Options.tier,Options.period,Options.top,Options.minimum) :
+        print('%s,%s,%i,%i,%i,%.3f' % (Area,Date,Infectious,Earlier,Increase,Growth))
+
+    return 0
+
+# This procedure runs the rollup-check subcommand. The exit status is
+# non-zero if any differences are found.
+def RollUpCheck(Arguments) :
+
+    "This procedure runs the rollup-check subcommand"
+
+    import argparse
+    import covid_update.hierarchy as Hierarchy
+
+    Parser = argparse.ArgumentParser(prog='covid_update rollup-check',description='Compare higher tier data rolled up from a lower tier file with an official file')
+    Parser.add_argument('ltla',help='lower tier local authority data file')
+    Parser.add_argument('official',help='official data file of the higher tier')
+    Parser.add_argument('hierarchy',help='area hierarchy file')
+    Parser.add_argument('--tier',choices=Hierarchy.Tiers[1:],required=True,help='tier of the official data file')
+    Parser.add_argument('--limit',type=int,default=20,help='maximum number of differences listed')
+    Options = Parser.parse_args(Arguments)
+
+    with open(Options.hierarchy) as FileObject : AreaHierarchy = Hierarchy.ReadHierarchy(FileObject.read())
+    with open(Options.ltla) as FileObject : LtlaLines = FileObject.read().splitlines()
+    with open(Options.official) as FileObject : OfficialLines = FileObject.read().splitlines()
+
+    RolledLines,Unmapped = Hierarchy.RollUp(LtlaLines,AreaHierarchy,Options.tier)
+    Differences = Hierarchy.CompareTiers(RolledLines,OfficialLines,Options.tier)
+
+    for Area in Unmapped : print('Not in hierarchy: %s' % Area)
+    for Difference in Differences[:Options.limit] : print(Difference)
+    print('%i rows rolled up, %i differences' % (len(RolledLines) - 1,len(Differences)))
+
+    return 1 if Differences else 0
+
+# This procedure runs the rising subcommand.
+def Rising(Arguments) :
+
+    "This procedure runs the rising subcommand"
+
+    import argparse
+    import covid_update.store as Store
+
+    Parser = argparse.ArgumentParser(prog='covid_update rising',description='List the areas in a results store whose infectious cases rose on consecutive days')
+    Parser.add_argument('store',help='results store file ( see store.py )')
+    Parser.add_argument('--tier',default='ltla',help='area tier type')
+    Parser.add_argument('--days',type=int,default=5,help='minimum number of consecutive days')
+    Options = Parser.parse_args(Arguments)
+
+    Connection = Store.Open(Options.store)
+    print('area,first,last,days,infectious')
+    for Area,First,Last,Days,Infectious in Store.ReturnRisingAreas(Connection,Options.tier,Options.days) :
+        print('%s,%s,%s,%i,%i' % (Area,First,Last,Days,Infectious))
+    Connection.close()
+
+    return 0
+
+# This procedure runs the logs subcommand. The log directory is given by
+# the directory options of paths.py.
+def Logs(Arguments) :
+
+    "This procedure runs the logs subcommand"
+
+    import argparse
+    import os
+    import covid_update.paths as Paths
+    import covid_update.logstore as LogStore
+    import covid_update.pipeline as Pipeline
+
+    Arguments,PathOptions = Paths.ParseOptions(Arguments)
+    Directories = Paths.ReturnDirectories(PathOptions)
+
+    Parser = argparse.ArgumentParser(prog='covid_update logs',description='Query the log messages kept in the log store')
+    Parser.add_argument('--module',help='script logging the messages')
+    Parser.add_argument('--level',choices=['INFO','WARNING','ERROR'],help='message level')
+    Parser.add_argument('--kind',choices=[Kind for Kind,Pattern in LogStore.MessageKinds],help='kind of alert message')
+    Parser.add_argument('--area',help='area, series type or trust')
+    Parser.add_argument('--days',type=float,help='only messages logged in the last <days> days')
+    Parser.add_argument('--last-run',action='store_true',help='only messages logged since the start of the last run of --module ( default the pipeline )')
+    Parser.add_argument('--text',help='only messages containing <text>')
+    Parser.add_argument('--limit',type=int,help='maximum number of messages listed')
+    Parser.add_argument('--areas',action='store_true',help='list the areas with messages of --kind rather than the messages')
+    Options = Parser.parse_args(Arguments)
+    if ( Options.areas and Options.kind is None ) : Parser.error('--areas requires --kind')
+
+    Filename = os.path.join(Directories[Paths.log],LogStore.StoreFileName)
+    if ( not os.path.exists(Filename) ) :
+        print('No log store %s' % Filename)
+        return 1
+
+    Since = None
+    if ( Options.days is not None ) : Since = LogStore.ReturnSince(Options.days)
+
+    Connection = LogStore.Open(Filename)
+    if ( Options.last_run ) :
+        LastRun = LogStore.ReturnLastRun(Connection,Options.module or Pipeline.module)
+        if ( LastRun is None ) :
+            print('No run of %s in the log store' % ( Options.module or Pipeline.module ))
+            Connection.close()
+            return 1
+        if ( Since is None or LastRun > Since ) : Since = LastRun
+    if ( Options.areas ) :
+        print('area,messages,first,last')
+        for Area,Count,First,Last in LogStore.ReturnAreas(Connection,Options.kind,Since) : print('%s,%i,%s,%s' % (Area,Count,First,Last))
+    else :
+        for Time,Module,Level,Message in LogStore.Query(Connection,Options.module,Options.level,Options.kind,Options.area,Since,Options.text,Options.limit) :
+            print('%s %s: %s: %s' % (Time,Level,Module,Message))
+    Connection.close()
+
+    return 0
+
+# This procedure runs the serve subcommand. The directory options of
+# paths.py give the data directory served and the log directory of the
+# run reports.
+def Serve(Arguments) :
+
+    "This procedure runs the serve subcommand"
+
+    import argparse
+    import covid_update.paths as Paths
+    import covid_update.server as Server
+
+    Arguments,PathOptions = Paths.ParseOptions(Arguments)
+    Directories = Paths.ReturnDirectories(PathOptions)
+
+    Parser = argparse.ArgumentParser(prog='covid_update serve',description='Serve the latest results over HTTP from memory')
+    Parser.add_argument('--port',type=int,default=Server.DefaultPort,help='port listened on')
+    Parser.add_argument('--bind',default=Server.DefaultBind,help='address listened on')
+    Parser.add_argument('--interval',type=float,default=Server.DefaultInterval,help='seconds between checks for completed runs')
+    Parser.add_argument('--variation',type=int,default=Server.DefaultVariation,help='Pillar 1 variation of the alerts')
+    Options = Parser.parse_args(Arguments)
+
+    HTTPServer = Server.StartServer(Directories['data'],Directories['log'],Options.bind,Options.port,Options.interval,Options.variation,Directories['config'])
+    print('Serving %s on http://%s:%i/' % (Directories['data'],Options.bind,Options.port))
+    try :
+        HTTPServer.serve_forever()
+    except KeyboardInterrupt :
+        pass
+    HTTPServer.server_close()
+
+    return 0
+
+# This procedure runs the fixtures subcommand, which lists, adds,
+# generates or serves the recorded responses of a fixtures directory.
+def FixturesCommand(Arguments) :
+
+    "This procedure runs the fixtures subcommand"
+
+    import argparse
+    import covid_update.fixtures as Fixtures
+
+    Parser = argparse.ArgumentParser(prog='covid_update fixtures',description='List, add, generate or serve recorded HTTP fixtures')
+    Actions = Parser.add_subparsers(dest='action',required=True)
+    Action = Actions.add_parser('list',help='list the fixtures of a directory')
+    Action.add_argument('directory',help='fixtures directory')
+    Action = Actions.add_parser('add',help='add a local file as the fixture of a url')
+    Action.add_argument('directory',help='fixtures directory')
+    Action.add_argument('url',help='url the file is served for')
+    Action.add_argument('file',help='file served')
+    Action.add_argument('--type',default='text/csv',help='content type')
+    Action = Actions.add_parser('generate',help='add a synthetic data file as the fixture of a url')
+    Action.add_argument('directory',help='fixtures directory')
+    Action.add_argument('url',help='url the file is served for')
+    Action.add_argument('--kind',choices=['pillar1','testing','death','trust'],default='pillar1',help='kind of data file')
+    Action.add_argument('--size',default='300x800',help='<areas>x<days> ( areas and trusts are ignored for testing and death files )')
+    Action.add_argument('--seed',type=int,default=1,help='random seed')
+    Action = Actions.add_parser('serve',help='serve the fixtures of a directory')
+    Action.add_argument('directory',help='fixtures directory')
+    Action.add_argument('--port',type=int,default=8765,help='port listened on')
+    Action.add_argument('--bind',default='127.0.0.1',help='address listened on')
+    Action.add_argument('--latency',type=float,default=0.0,help='milliseconds added to each response')
+    Action.add_argument('--bandwidth',type=float,default=0.0,help='kB/s at which bodies are sent, 0 for no limit')
+    Options = Parser.parse_args(Arguments)
+
+    if ( Options.action == 'list' ) :
+        print('url,type,bytes,sha256')
+        for Description in Fixtures.ReturnFixtures(Options.directory) : print('%s,%s,%i,%s' % (Description['url'],Description['type'],Description['bytes'],Description['sha256']))
+
+    if ( Options.action == 'add' ) :
+        Description = Fixtures.RecordFile(Options.directory,Options.url,Options.file,{'Content-Type':Options.type})
+        print('%s added, %i bytes' % (Options.url,Description['bytes']))
+
+    if ( Options.action == 'generate' ) :
+        import covid_update.generators as Generators
+        Areas,Days = [int(Value) for Value in Options.size.lower().split('x')]
+        if ( Options.kind == 'pillar1' ) : Text = Generators.GeneratePillar1Data(Areas,Days,Seed=Options.seed)
+        if ( Options.kind == 'testing' ) : Text = Generators.GenerateTestingData(Days,Seed=Options.seed)
+        if ( Options.kind == 'death' ) : Text = Generators.GenerateDeathData(Days,Seed=Options.seed)
+        if ( Options.kind == 'trust' ) : Text = Generators.GenerateTrustData(Areas,Days,Seed=Options.seed)
+        Description = Fixtures.RecordContent(Options.directory,Options.url,Text.encode(),{'Content-Type':'text/csv'})
+        print('%s generated, %i bytes' % (Options.url,Description['bytes']))
+
+    if ( Options.action == 'serve' ) :
+        import time
+        Server,BaseUrl = Fixtures.StartReplayServer(Options.directory,Options.latency / 1000.0,int(Options.bandwidth * 1000),Options.port,Options.bind)
+        for Description in Fixtures.ReturnFixtures(Options.directory) : print('%s -> %s' % (Description['url'],Fixtures.ReturnReplayUrl(BaseUrl,Description['url'])))
+        print('Serving %s on %s' % (Options.directory,BaseUrl))
+        try :
+            while ( True ) : time.sleep(3600)
+        except KeyboardInterrupt :
+            pass
+        Server.shutdown()
+        Server.server_close()
+
+    return 0
+
+# This procedure runs the benchmark subcommand.
+def Benchmark(Arguments) :
+
+    "This procedure runs the benchmark subcommand"
+
+    import covid_update.benchmark as Benchmark
+
+    return Benchmark.main(Arguments)
+
+# This procedure prints the usage message.
+def Usage() :
+
+    "This procedure prints the usage message"
+
+    print('usage: python -m covid_update {%s} ...' % ','.join(list(Scripts) + list(Commands)))
+
+# Subcommands handled by this module.
+Commands = {'replay':Replay,'sweep':Sweep,'growth':GrowthRates,'scan':Scan,'rollup-check':RollUpCheck,'rising':Rising,'logs':Logs,'serve':Serve,'fixtures':FixturesCommand,'benchmark':Benchmark}
+
+############
+### MAIN ###
+############
+
+def main(Arguments=None) :
+
+    "Runs the subcommand given as the first of 'Arguments'"
+
+    if ( Arguments is None ) : Arguments = sys.argv[1:]
+
+    if ( len(Arguments) == 0 or Arguments[0] in ['-h','--help'] ) :
+        Usage()
+        return 0
+
+    Command = Arguments[0]
+
+    if ( Command in Scripts ) :
+        import importlib
+        return importlib.import_module(Scripts[Command]).Main(Arguments[1:])
+
+    if ( Command in Commands ) : return Commands[Command](Arguments[1:])
+
+    Usage()
+    return 2
+
+if __name__ == '__main__' :
+    sys.exit(main())
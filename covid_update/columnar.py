@@ -0,0 +1,172 @@
+# covid_update/columnar.py
+#
+# Description
+# -----------
+# This module writes the results of the scripts in a columnar format,
+# Apache Arrow IPC or Parquet, alongside the statistics files so that they
+# may be reloaded downstream without parsing csv text. Area and trust names
+# are dictionary encoded, dates are stored as date32 and counts as int64.
+# The columns of each output are:
+#
+# pillar1      - Area, Date, Daily, Infectious, Cumulative, Rate
+# pillar2      - the columns of the statistics file of the series type
+# trust_deaths - Trust, Date, Deaths ( one row per trust and date )
+#
+# The pyarrow module is only imported when a columnar file is written or
+# read and is not required otherwise.
+#
+# Options
+# -------
+# The following command line option is removed from the script arguments
+# by ParseOptions():
+#
+# --columnar=arrow|parquet   Also write the results in the given format
+#
+
+import os
+
+from covid_update.common import GetDecimalPart,ReturnDateDeath,MonthConverter
+from covid_update.trust_deaths import TotalColumns
+
+# Columnar formats and their file extensions
+arrow = 'arrow'
+parquet = 'parquet'
+Formats = {arrow:'.arrow',parquet:'.parquet'}
+
+# This procedure removes the columnar option from the list of command
+# line 'Arguments'. The remaining arguments and a dictionary of the
+# options are returned.
+def ParseOptions(Arguments) :
+
+    "This procedure removes the columnar option from 'Arguments'"
+
+    Options = {'columnar':None}
+    Remaining = []
+
+    for Argument in Arguments :
+        if ( Argument.startswith('--columnar=') ) :
+            Options['columnar'] = Argument.split('=',1)[1]
+            if ( Options['columnar'] not in Formats ) : raise ValueError('Columnar format must be one of %s' % str(list(Formats)))
+        else :
+            Remaining.append(Argument)
+
+    return Remaining,Options
+
+# This procedure returns the file name of the 'Format' columnar file
+# written alongside the statistics file 'Filename'.
+def ReturnColumnarFileName(Filename,Format) :
+
+    "This procedure returns the file name of the 'Format' columnar file written alongside 'Filename'"
+
+    return os.path.splitext(Filename)[0] + Formats[Format]
+
+# This procedure returns 'String' as a float, or None if empty.
+def ReturnFloat(String) :
+
+    "This procedure returns 'String' as a float, or None if empty"
+
+    if ( len(String) == 0 ) : return None
+
+    return float(String)
+
+# This procedure returns the count 'Value', which may be an integer or a
+# string, as an integer, or None if empty.
+def ReturnInteger(Value) :
+
+    "This procedure returns the count 'Value' as an integer, or None if empty"
+
+    if ( isinstance(Value,int) ) : return Value
+    if ( len(Value) == 0 ) : return None
+
+    return int(GetDecimalPart(Value))
+
+# This procedure returns the table of the Pillar 1 'AreaResults' ( see
+# pillar1.ComputeInfectious ).
+def BuildPillar1Table(AreaResults) :
+
+    "This procedure returns the table of the Pillar 1 'AreaResults'"
+
+    import pyarrow
+
+    Rows = [OutData for Area in AreaResults for OutData in AreaResults[Area]]
+
+    return pyarrow.table({'Area':pyarrow.array([OutData['Area'] for OutData in Rows],pyarrow.string()).dictionary_encode(),
+                          'Date':pyarrow.array([OutData['Date'] for OutData in Rows],pyarrow.date32()),
+                          'Daily':pyarrow.array([OutData['Daily'] for OutData in Rows],pyarrow.int64()),
+                          'Infectious':pyarrow.array([OutData['Infectious'] for OutData in Rows],pyarrow.int64()),
+                          'Cumulative':pyarrow.array([OutData['Cumulative'] for OutData in Rows],pyarrow.int64()),
+                          'Rate':pyarrow.array([ReturnFloat(OutData['Rate']) for OutData in Rows],pyarrow.float64())})
+
+# This procedure returns the table of the Pillar 2 'SeriesResults' ( see
+# pillar2.ComputeSeries ) with the columns 'OutColumns'.
+def BuildPillar2Table(SeriesResults,OutColumns) :
+
+    "This procedure returns the table of the Pillar 2 'SeriesResults'"
+
+    import pyarrow
+
+    Table = {}
+    for Column in OutColumns :
+        Values = [OutData[Column] for OutData in SeriesResults]
+        if ( Column == 'Date' ) : Table[Column] = pyarrow.array(Values,pyarrow.date32())
+        elif ( Column == 'Percentage' ) : Table[Column] = pyarrow.array(Values,pyarrow.float64())
+        else : Table[Column] = pyarrow.array([ReturnInteger(Value) for Value in Values],pyarrow.int64())
+
+    return pyarrow.table(Table)
+
+# This procedure returns the table of the daily deaths of each of the
+# trust deaths 'Matches' ( see trust_deaths.MatchTrusts ) with header
+# 'HeaderList'. Empty fields are left out.
+def BuildTrustTable(HeaderList,Matches) :
+
+    "This procedure returns the table of the daily deaths of each of the trust deaths 'Matches'"
+
+    import pyarrow
+
+    SpecimenDates = []
+    for Date in HeaderList[6:(len(HeaderList) - TotalColumns)] : SpecimenDates.append(ReturnDateDeath(Date,MonthConverter))
+
+    Trusts = []
+    Dates = []
+    Deaths = []
+    for Trust,CSVFileDataList in Matches :
+        for SpecimenDate,Count in zip(SpecimenDates,CSVFileDataList[6:(len(CSVFileDataList) - TotalColumns)]) :
+            if ( len(Count) == 0 ) : continue
+            Trusts.append(CSVFileDataList[4])
+            Dates.append(SpecimenDate)
+            Deaths.append(int(Count))
+
+    return pyarrow.table({'Trust':pyarrow.array(Trusts,pyarrow.string()).dictionary_encode(),
+                          'Date':pyarrow.array(Dates,pyarrow.date32()),
+                          'Deaths':pyarrow.array(Deaths,pyarrow.int64())})
+
+# This procedure writes 'Table' to 'Filename' in format 'Format'. The
+# number of bytes written is returned.
+def WriteTable(Table,Filename,Format) :
+
+    "This procedure writes 'Table' to 'Filename' in format 'Format'"
+
+    import pyarrow
+
+    if ( Format == parquet ) :
+        import pyarrow.parquet
+        pyarrow.parquet.write_table(Table,Filename)
+
+    if ( Format == arrow ) :
+        with pyarrow.OSFile(Filename,'wb') as Sink :
+            with pyarrow.ipc.new_file(Sink,Table.schema) as Writer : Writer.write_table(Table)
+
+    return os.path.getsize(Filename)
+
+# This procedure reads the table in 'Filename' of format 'Format'.
+def ReadTable(Filename,Format) :
+
+    "This procedure reads the table in 'Filename' of format 'Format'"
+
+    import pyarrow
+
+    if ( Format == parquet ) :
+        import pyarrow.parquet
+        return pyarrow.parquet.read_table(Filename)
+
+    with pyarrow.memory_map(Filename,'r') as Source : return pyarrow.ipc.open_file(Source).read_all()
@@ -0,0 +1,145 @@
+# covid_update/common.py
+#
+# Description
+# -----------
+# This module contains procedures and constants used by more than one
+# of the covid_update scripts.
+#
+
+import re
+from datetime import date
+
+# Function return values
+invalid = failure = 0
+empty = ''
+success = 1
+
+# Error levels
+error = 'ERROR'
+warning = 'WARNING'
+info = 'INFO'
+
+# Month conversion data
+MonthConverter = {'Jan':1,'Feb':2,'Mar':3,'Apr':4,'May':5,'Jun':6,'Jul':7,'Aug':8,'Sep':9,'Oct':10,'Nov':11,'Dec':12}
+
+# This procedure will determine if 'string' is present
+# at 'index' in 'list'
+def IsPresent(string,index,list) :
+
+    "This procedure will determine if 'string' is  present at 'index' in 'list'"
+
+    result = False
+    if ( re.match(string,list[index]) ) : result = True
+
+    return result
+
+# This procedure will return a string containing the
+# elements of list separated by a comma. All elements are
+# cast to strings.
+def GenerateCSVRow(list) :
+
+    "This procedure will generate a string containing the elements of 'list' separated by a comma"
+
+    string = ''
+    for item in list : string = string + str(item) + ','
+    string = string.rstrip(',')
+
+    return string
+
+# This procedure will return a list of values contained
+# in 'dictionary' referenced by 'keys'.
+def GenerateFieldList(keys,dictionary) :
+
+    "This procedure will return a list of values contained in 'dictionary' referenced by 'keys'"
+
+    list = []
+    for key in keys : list.append(dictionary[key])
+
+    return list
+
+# This procedure returns a date string of the form <YYYY><MM><DD>
+# for todays date.
+def ReturnDateString() :
+
+    "This procedure returns a date string of the form <YYYY><MM><DD> for todays date"
+
+    today = date.today()
+    month = str(today.month)
+    year = str(today.year)
+    day = str((today.day))
+
+    # Add leading 0 if required
+    if ( len(month) == 1 ) : month = '0' + month
+    if ( len(day) == 1 ) : day = '0' + day
+
+    return year + month + day
+
+# This procedure returns a file name string based on todays date
+# a 'base' string and a teir type string.
+def ReturnFileName(base,type) :
+
+    "This procedure returns a file name string based on todays date and a 'base' name"
+
+    return base + '_' + type + '_' + ReturnDateString() + '.csv'
+
+# This procedure returns a file name string based on todays date
+# a 'base' string.
+def ReturnOutputFileName(base) :
+
+    "This procedure returns a file name string based on todays date and a 'base' name"
+
+    return base + '_' + ReturnDateString() + '.csv'
+
+# This procedure will remove the decimal part of a string representation
+# of a float.
+def GetDecimalPart(string) :
+
+    "This procedure will remove the decimal part of a string representation of a float"
+
+    part = string.split('.')[0]
+    # Protection against empty fields in csv file.
+    if ( len(part) == 0 ) : part = '0'
+
+    return part
+
+# This procedure returns a date object from a 'specimendate' of the
+# form <DD>-<Mon>-<YY>. The dictionary 'conversion' is used to convert
+# month strings to month numbers
+def ReturnDateDeath(specimendate,conversion) :
+
+    "This procedure returns a date object from a 'specimendate'. The dictionary 'conversion' is used to convert month strings to month numbers"
+
+    list = specimendate.split('-')
+    yearstring = '20' + list[2]
+    year = int(yearstring)
+    daystring = list[0]
+    day = int(daystring)
+    monthstring = list[1]
+    month = conversion[monthstring]
+
+    return date(year, month, day)
+
+# This procedure will download 'Url' and return the response. The
+# download is made by the shared HTTP client ( see httpclient.py ).
+def Fetch(Url) :
+
+    "This procedure will download 'Url' and return the response"
+
+    import covid_update.httpclient as HttpClient
+
+    return HttpClient.Fetch(Url)
+
+# This procedure will write each of 'Lines' to 'FileObject' opened by
+# File.Open. The number of characters written is returned.
+def WriteLines(FileObject,Lines) :
+
+    "This procedure will write each of 'Lines' to 'FileObject' opened by File.Open"
+
+    import File.Operations as File
+
+    Characters = 0
+    for Line in Lines :
+        File.Writeline(FileObject,Line,failure)
+        Characters += len(Line)
+
+    return Characters
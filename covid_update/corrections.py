@@ -0,0 +1,105 @@
+# covid_update/corrections.py
+#
+# Description
+# -----------
+# This module applies data correction rules to whole columns of parsed data
+# rather than row by row. The rules are read from a csv file with one rule
+# per line of the form:
+#
+# <data type>,<column>,<rule>,<argument>,<value>
+#
+# where <rule> is one of:
+#
+# replace - Values of <column> starting with <argument> are replaced by <value>
+# offset  - <value> is added to values of <column> dated on or after the date
+#           <argument> ( YYYY-MM-DD ) when the change in the column over a
+#           period is calculated. The values themselves are not changed.
+#
+# Blank lines and lines starting with '#' are ignored. Each distinct value
+# of a column is only examined once by a replace rule and the number of rows
+# affected by each rule is returned so that it may be logged once.
+#
+
+from collections import Counter
+from datetime import date
+
+# Rule types
+replace = 'replace'
+offset = 'offset'
+RuleTypes = [replace,offset]
+
+# This procedure will parse the contents of a correction rules file and
+# return a list of rule dictionaries.
+def ReadCorrections(CorrectionsFileData) :
+
+    "This procedure will parse the contents of a correction rules file"
+
+    Rules = []
+
+    for CorrectionsFileDataLine in CorrectionsFileData.splitlines() :
+        if ( len(CorrectionsFileDataLine.strip()) == 0 or CorrectionsFileDataLine.startswith('#') ) : continue
+        Fields = [Field.strip() for Field in CorrectionsFileDataLine.split(',')]
+        if ( len(Fields) != 5 or Fields[2] not in RuleTypes ) : raise ValueError('Invalid correction rule %s' % CorrectionsFileDataLine)
+        Rule = {'type':Fields[0],'column':Fields[1],'rule':Fields[2],'argument':Fields[3],'value':Fields[4]}
+        if ( Rule['rule'] == offset ) :
+            Rule['argument'] = date.fromisoformat(Rule['argument'])
+            Rule['value'] = int(Rule['value'])
+        Rules.append(Rule)
+
+    return Rules
+
+# This procedure returns the rules of 'Rules' of rule type 'RuleType' for
+# column 'Column' of data type 'DataType'.
+def SelectRules(Rules,DataType,Column,RuleType) :
+
+    "This procedure returns the rules of 'Rules' of rule type 'RuleType' for column 'Column' of data type 'DataType'"
+
+    return [Rule for Rule in Rules if Rule['type'] == DataType and Rule['column'] == Column and Rule['rule'] == RuleType]
+
+# This procedure returns a description of 'Rule' for log messages.
+def DescribeRule(Rule) :
+
+    "This procedure returns a description of 'Rule' for log messages"
+
+    if ( Rule['rule'] == replace ) : return "%s %s values starting '%s' replaced by %s" % (Rule['type'],Rule['column'],Rule['argument'],Rule['value'])
+
+    return '%s %s offset by %i from %s' % (Rule['type'],Rule['column'],Rule['value'],str(Rule['argument']))
+
+# This procedure applies the replace rules 'Rules' to the list of column
+# values 'Values'. The corrected list and a list of ( rule description,
+# rows affected ) are returned.
+def ApplyReplaceRules(Values,Rules) :
+
+    "This procedure applies the replace rules 'Rules' to the list of column values 'Values'"
+
+    Applied = []
+
+    for Rule in Rules :
+        Distinct = Counter(Values)
+        Replacements = {}
+        for Value in Distinct :
+            if ( Value.startswith(Rule['argument']) ) : Replacements[Value] = Rule['value']
+        if ( len(Replacements) > 0 ) : Values = [Replacements.get(Value,Value) for Value in Values]
+        Applied.append((DescribeRule(Rule),sum([Distinct[Value] for Value in Replacements])))
+
+    return Values,Applied
+
+# This procedure returns the total offset of the offset rules 'Rules' for
+# each of the dates 'Dates' together with a list of ( rule description,
+# rows affected ).
+def ReturnOffsets(Dates,Rules) :
+
+    "This procedure returns the total offset of the offset rules 'Rules' for each of the dates 'Dates'"
+
+    Offsets = [0] * len(Dates)
+    Applied = []
+
+    for Rule in Rules :
+        Affected = 0
+        for Index in range(0,len(Dates)) :
+            if ( Dates[Index] >= Rule['argument'] ) :
+                Offsets[Index] += Rule['value']
+                Affected += 1
+        Applied.append((DescribeRule(Rule),Affected))
+
+    return Offsets,Applied
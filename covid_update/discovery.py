@@ -0,0 +1,106 @@
+# covid_update/discovery.py
+#
+# Description
+# -----------
+# This module finds the urls of download files referenced by landing web
+# pages. Each distinct page is downloaded once per run and the lines of
+# the page are scanned once, all of the file name patterns for that page
+# being applied in the same pass. Pages are also cached on disk so that
+# runs within 'PageTTL' seconds of each other do not download the page
+# again. Pages are downloaded straight to the cache file, a large file
+# such as a data file read through the cache being written in chunks and
+# resumed if the connection is dropped. The cache files are named:
+#
+# <cache directory>/page_<sha1 of url>.html
+#
+
+import hashlib
+import os
+import re
+import time
+
+import covid_update.httpclient as HttpClient
+from covid_update.common import Fetch
+
+# Number of seconds a cached page remains valid
+PageTTL = 3600
+
+# This procedure returns the cache file name of 'Url' in 'CacheDir'.
+def ReturnCacheFileName(CacheDir,Url) :
+
+    "This procedure returns the cache file name of 'Url' in 'CacheDir'"
+
+    return os.path.join(CacheDir,'page_' + hashlib.sha1(Url.encode()).hexdigest() + '.html')
+
+# This procedure returns the cache file name of the web page 'Url' in
+# 'CacheDir', downloading the page to the cache unless a cached copy less
+# than 'TTL' seconds old is present. None is returned if the download to
+# the cache fails.
+def CachePage(Url,CacheDir,TTL=PageTTL) :
+
+    "This procedure returns the cache file name of the web page 'Url', downloading the page if not cached"
+
+    # Download in chunks straight to the cache file if not cached. When
+    # replaying the cache is not used and when recording a cached page is
+    # recorded as it is not downloaded ( see fixtures.py ).
+    CacheFilename = ReturnCacheFileName(CacheDir,Url)
+    if ( not os.path.exists(CacheFilename) or time.time() - os.path.getmtime(CacheFilename) >= TTL or HttpClient.ReplayUrl is not None ) :
+        if ( not HttpClient.Download(Url,CacheFilename)['complete'] ) : return None
+    else :
+        HttpClient.RecordFile(Url,CacheFilename,{'Content-Type':'text/html'})
+
+    return CacheFilename
+
+# This procedure returns the text of the web page 'Url'. If 'CacheDir' is
+# specified a cached copy less than 'TTL' seconds old is used if present,
+# otherwise the page is downloaded to the cache. An empty string is
+# returned if the download to the cache fails.
+def ReadPage(Url,CacheDir=None,TTL=PageTTL) :
+
+    "This procedure returns the text of the web page 'Url', using a cached copy if less than 'TTL' seconds old"
+
+    if ( not CacheDir ) : return Fetch(Url).text
+
+    CacheFilename = CachePage(Url,CacheDir,TTL)
+    if ( CacheFilename is None ) : return ''
+
+    with open(CacheFilename,encoding='utf-8',errors='replace') as FileObject : return FileObject.read()
+
+# This procedure returns a list of the first match of each pattern in
+# 'Patterns' in the lines of 'Text'. An empty string is returned for a
+# pattern which does not match any line.
+def SearchPage(Text,Patterns) :
+
+    "This procedure returns a list of the first match of each pattern in 'Patterns' in the lines of 'Text'"
+
+    Links = [''] * len(Patterns)
+    Remaining = list(range(0,len(Patterns)))
+    Compiled = [re.compile(Pattern) for Pattern in Patterns]
+
+    for Httpline in Text.split('\n') :
+        for Index in list(Remaining) :
+            Httpmatch = Compiled[Index].search(Httpline)
+            if Httpmatch :
+                Links[Index] = Httpmatch.group(0)
+                Remaining.remove(Index)
+        if ( len(Remaining) == 0 ) : break
+
+    return Links
+
+# This procedure returns the download file url for each of the
+# ( page url, file name pattern ) pairs in 'Requests'. Each distinct page
+# is only read once ( see ReadPage ). An empty string is returned for a
+# request with no matching link.
+def FindDownloadFiles(Requests,CacheDir=None,TTL=PageTTL) :
+
+    "This procedure returns the download file url for each of the ( page url, file name pattern ) pairs in 'Requests'"
+
+    Pages = {}
+    for Index,(Url,Pattern) in enumerate(Requests) : Pages.setdefault(Url,[]).append(Index)
+
+    Links = [''] * len(Requests)
+    for Url,Indexes in Pages.items() :
+        Found = SearchPage(ReadPage(Url,CacheDir,TTL),[Requests[Index][1] for Index in Indexes])
+        for Index,Link in zip(Indexes,Found) : Links[Index] = Link
+
+    return Links
@@ -0,0 +1,290 @@
+# covid_update/fixtures.py
+#
+# Description
+# -----------
+# This module records the responses downloaded by the covid_update scripts
+# ( landing pages, csv and xlsx files ) as fixtures in a directory and
+# replays them through a local stand-in server, so that the scripts, the
+# pipeline and the benchmarks may be run offline and reproducibly against
+# the same data. Each fixture is held in two files named by the SHA-1 of
+# its url:
+#
+# <fixtures directory>/<sha1 of url>.body  - response body as downloaded
+# <fixtures directory>/<sha1 of url>.json  - url, content type, validators,
+#                                            size and SHA-256 checksum
+#
+# so that scripts recording in parallel never write the same file. A
+# fixture may also be added from a local file, e.g. a large synthetic data
+# file made by generators.py, for the url it is to be served for.
+#
+# The replay server serves the fixture of a url at /<sha1 of url>, the HTTP
+# client rewriting the url of each request when replaying ( see
+# httpclient.py ). It honours conditional requests ( If-None-Match,
+# If-Modified-Since ) and range requests as the servers of the data files
+# do, and may add a fixed latency to each response and limit the bandwidth
+# at which bodies are sent. A url without a fixture is answered with 404.
+#
+# Usage
+# -----
+# The scripts record or replay with the HTTP client options '--record=<dir>'
+# and '--replay=<dir>' ( see httpclient.py ). Fixtures may be listed, added
+# and served with:
+#
+# python -m covid_update fixtures list <dir>
+# python -m covid_update fixtures add <dir> <url> <file> [--type text/csv]
+# python -m covid_update fixtures generate <dir> <url> --kind pillar1 --size 300x800
+# python -m covid_update fixtures serve <dir> [--port 8765] [--latency 50] [--bandwidth 1000]
+#
+
+import hashlib
+import http.server
+import json
+import os
+import shutil
+import threading
+import time
+from email.utils import formatdate,parsedate_to_datetime
+
+# Suffixes of the body and description files of a fixture
+BodySuffix = '.body'
+DescriptionSuffix = '.json'
+
+# Size in bytes of the chunks in which a body is copied and sent
+ChunkSize = 65536
+
+# Number of chunks sent per second when the bandwidth is limited
+ChunksPerSecond = 20
+
+# Content type of a fixture without one
+DefaultType = 'application/octet-stream'
+
+# This procedure returns the key of the fixture of 'Url'.
+def ReturnFixtureKey(Url) :
+
+    "This procedure returns the key of the fixture of 'Url'"
+
+    return hashlib.sha1(Url.encode()).hexdigest()
+
+# This procedure returns the body and description file names of the
+# fixture of 'Url' in 'Directory'.
+def ReturnFixtureFileNames(Directory,Url) :
+
+    "This procedure returns the body and description file names of the fixture of 'Url'"
+
+    Key = ReturnFixtureKey(Url)
+
+    return os.path.join(Directory,Key + BodySuffix),os.path.join(Directory,Key + DescriptionSuffix)
+
+# This procedure writes the description of the fixture of 'Url', whose body
+# has been written to 'BodyFilename', from the response 'Headers'. The
+# body file is checksummed in chunks. An ETag is made from the checksum if
+# the response had no validator.
+def WriteDescription(Directory,Url,BodyFilename,Headers) :
+
+    "This procedure writes the description of the fixture of 'Url'"
+
+    Digest = hashlib.sha256()
+    with open(BodyFilename,'rb') as FileObject :
+        for Chunk in iter(lambda : FileObject.read(ChunkSize),b'') : Digest.update(Chunk)
+
+    Headers = Headers or {}
+    Description = {'url':Url,'type':Headers.get('Content-Type') or DefaultType,'etag':Headers.get('ETag'),
+                   'modified':Headers.get('Last-Modified'),'bytes':os.path.getsize(BodyFilename),'sha256':Digest.hexdigest()}
+    if ( not Description['etag'] and not Description['modified'] ) : Description['etag'] = '"%s"' % Description['sha256'][:32]
+    if ( not Description['modified'] ) : Description['modified'] = formatdate(os.path.getmtime(BodyFilename),usegmt=True)
+
+    DescriptionFilename = ReturnFixtureFileNames(Directory,Url)[1]
+    TemporaryFilename = DescriptionFilename + '.%i.%i' % (os.getpid(),threading.get_ident())
+    with open(TemporaryFilename,'w') as FileObject : json.dump(Description,FileObject,indent=1)
+    os.replace(TemporaryFilename,DescriptionFilename)
+
+    return Description
+
+# This procedure records the downloaded file 'Filename' as the fixture of
+# 'Url' with the response 'Headers'. The fixture description is returned.
+def RecordFile(Directory,Url,Filename,Headers=None) :
+
+    "This procedure records the downloaded file 'Filename' as the fixture of 'Url'"
+
+    os.makedirs(Directory,exist_ok=True)
+    BodyFilename = ReturnFixtureFileNames(Directory,Url)[0]
+    TemporaryFilename = BodyFilename + '.%i.%i' % (os.getpid(),threading.get_ident())
+    shutil.copyfile(Filename,TemporaryFilename)
+    os.replace(TemporaryFilename,BodyFilename)
+
+    return WriteDescription(Directory,Url,BodyFilename,Headers)
+
+# This procedure records the response body 'Content' as the fixture of
+# 'Url' with the response 'Headers'. The fixture description is returned.
+def RecordContent(Directory,Url,Content,Headers=None) :
+
+    "This procedure records the response body 'Content' as the fixture of 'Url'"
+
+    os.makedirs(Directory,exist_ok=True)
+    BodyFilename = ReturnFixtureFileNames(Directory,Url)[0]
+    TemporaryFilename = BodyFilename + '.%i.%i' % (os.getpid(),threading.get_ident())
+    with open(TemporaryFilename,'wb') as FileObject : FileObject.write(Content)
+    os.replace(TemporaryFilename,BodyFilename)
+
+    return WriteDescription(Directory,Url,BodyFilename,Headers)
+
+# This procedure returns the description of the fixture with key 'Key' in
+# 'Directory', or None if there is no such fixture.
+def ReadDescription(Directory,Key) :
+
+    "This procedure returns the description of the fixture with key 'Key'"
+
+    DescriptionFilename = os.path.join(Directory,Key + DescriptionSuffix)
+    if ( not os.path.exists(DescriptionFilename) or not os.path.exists(os.path.join(Directory,Key + BodySuffix)) ) : return None
+
+    with open(DescriptionFilename) as FileObject : return json.load(FileObject)
+
+# This procedure returns the descriptions of the fixtures in 'Directory',
+# ordered by url.
+def ReturnFixtures(Directory) :
+
+    "This procedure returns the descriptions of the fixtures in 'Directory'"
+
+    Fixtures = []
+    for Filename in sorted(os.listdir(Directory)) :
+        if ( Filename.endswith(DescriptionSuffix) ) :
+            Description = ReadDescription(Directory,Filename[:-len(DescriptionSuffix)])
+            if ( Description is not None ) : Fixtures.append(Description)
+
+    return sorted(Fixtures,key=lambda Description : Description['url'])
+
+# This procedure returns True if the conditional headers of a request
+# 'Headers' match the fixture 'Description', i.e. the client's copy is
+# unchanged.
+def IsUnchanged(Headers,Description) :
+
+    "This procedure returns True if the conditional headers of a request match the fixture 'Description'"
+
+    if ( Headers.get('If-None-Match') ) : return ( Headers['If-None-Match'] == Description['etag'] )
+
+    if ( Headers.get('If-Modified-Since') and Description['modified'] ) :
+        try :
+            return ( parsedate_to_datetime(Description['modified']) <= parsedate_to_datetime(Headers['If-Modified-Since']) )
+        except ( TypeError,ValueError ) :
+            return False
+
+    return False
+
+# This procedure returns the first byte of the range request 'Headers' for
+# the fixture 'Description', or 0 if the whole body is to be sent. A range
+# is ignored if the If-Range validator does not match the fixture.
+def ReturnRangeStart(Headers,Description) :
+
+    "This procedure returns the first byte of the range request 'Headers'"
+
+    Range = Headers.get('Range','')
+    if ( not Range.startswith('bytes=') or not Range.endswith('-') ) : return 0
+
+    IfRange = Headers.get('If-Range')
+    if ( IfRange and IfRange not in [Description['etag'],Description['modified']] ) : return 0
+
+    return int(Range[len('bytes='):-1])
+
+# Request handler replaying the fixtures of a directory.
+class ReplayHandler(http.server.BaseHTTPRequestHandler) :
+
+    "Request handler replaying the fixtures of a directory"
+
+    # Fixtures directory, latency in seconds and bandwidth in bytes per
+    # second ( 0 for no limit ), set by StartReplayServer()
+    Directory = '.'
+    Latency = 0.0
+    Bandwidth = 0
+
+    def log_message(self,format,*args) :
+        pass
+
+    def do_HEAD(self) :
+
+        self.Replay(False)
+
+    def do_GET(self) :
+
+        self.Replay(True)
+
+    # This procedure answers the request with the fixture of its path,
+    # sending the body if 'SendBody' is set.
+    def Replay(self,SendBody) :
+
+        "This procedure answers the request with the fixture of its path"
+
+        if ( self.Latency > 0 ) : time.sleep(self.Latency)
+
+        Key = self.path.split('?',1)[0].strip('/')
+        Description = None
+        if ( Key.isalnum() ) : Description = ReadDescription(self.Directory,Key)
+        if ( Description is None ) :
+            self.send_error(404,'No fixture')
+            return
+
+        Validators = {'ETag':Description['etag'],'Last-Modified':Description['modified']}
+
+        if ( IsUnchanged(self.headers,Description) ) :
+            self.send_response(304)
+            for Name,Value in Validators.items() :
+                if ( Value ) : self.send_header(Name,Value)
+            self.end_headers()
+            return
+
+        Size = Description['bytes']
+        Start = ReturnRangeStart(self.headers,Description)
+        if ( Start >= Size and Start > 0 ) :
+            self.send_response(416)
+            self.send_header('Content-Range','bytes */%i' % Size)
+            self.send_header('Content-Length','0')
+            self.end_headers()
+            return
+
+        if ( Start > 0 ) :
+            self.send_response(206)
+            self.send_header('Content-Range','bytes %i-%i/%i' % (Start,Size - 1,Size))
+        else :
+            self.send_response(200)
+        self.send_header('Content-Type',Description['type'])
+        self.send_header('Content-Length',str(Size - Start))
+        self.send_header('Accept-Ranges','bytes')
+        for Name,Value in Validators.items() :
+            if ( Value ) : self.send_header(Name,Value)
+        self.end_headers()
+        if ( not SendBody ) : return
+
+        # Send the body in chunks, pacing the chunks if the bandwidth is limited
+        Chunk = ChunkSize
+        if ( self.Bandwidth > 0 ) : Chunk = max(1,min(ChunkSize,self.Bandwidth // ChunksPerSecond))
+        with open(os.path.join(self.Directory,Key + BodySuffix),'rb') as FileObject :
+            FileObject.seek(Start)
+            for Data in iter(lambda : FileObject.read(Chunk),b'') :
+                try :
+                    self.wfile.write(Data)
+                except ( BrokenPipeError,ConnectionResetError ) :
+                    return
+                if ( self.Bandwidth > 0 ) : time.sleep(len(Data) / self.Bandwidth)
+
+# This procedure starts a replay server for the fixtures of 'Directory'
+# in a background thread, adding 'Latency' seconds to each response and
+# limiting bodies to 'Bandwidth' bytes per second ( 0 for no limit ). The
+# server and its base url are returned.
+def StartReplayServer(Directory,Latency=0.0,Bandwidth=0,Port=0,Bind='127.0.0.1') :
+
+    "This procedure starts a replay server for the fixtures of 'Directory' in a background thread"
+
+    Handler = type('ReplayHandler',(ReplayHandler,),{'Directory':Directory,'Latency':Latency,'Bandwidth':Bandwidth})
+    Server = http.server.ThreadingHTTPServer((Bind,Port),Handler)
+    Server.daemon_threads = True
+    Thread = threading.Thread(target=Server.serve_forever,daemon=True)
+    Thread.start()
+
+    return Server,'http://%s:%i/' % (Bind,Server.server_address[1])
+
+# This procedure returns the url of the fixture of 'Url' on the replay
+# server at 'BaseUrl'.
+def ReturnReplayUrl(BaseUrl,Url) :
+
+    "This procedure returns the url of the fixture of 'Url' on the replay server at 'BaseUrl'"
+
+    return BaseUrl + ReturnFixtureKey(Url)
@@ -0,0 +1,179 @@
+# covid_update/generators.py
+#
+# Description
+# -----------
+# This module generates synthetic data files with the same layout as the
+# files downloaded by the covid_update scripts so that the processing
+# phases can be exercised and timed without network access. The size of
+# each file is set by the number of areas ( or trusts ) and the number of
+# days of data. The same 'Seed' always generates the same data.
+#
+# GeneratePillar1Data  - API format csv ( as pillar1_configuration.csv urls )
+# GenerateTestingData  - Pillar 2 testing time series csv
+# GenerateDeathData    - Pillar 2 deaths time series csv
+# GenerateTrustData    - Trust deaths csv as extracted by convert_workbook.vbs
+#
+
+import random
+from datetime import date,timedelta
+
+from covid_update.pillar2 import TestingDataChangeDate,DataDecrement
+
+# Pillar 1 API column headers
+Pillar1Headers = ['areaCode','areaName','areaType','date','cumCasesBySpecimenDate','cumCasesBySpecimenDateRate','newCasesBySpecimenDate']
+
+# Pillar 2 testing series column headers
+TestingHeaders = ['Date','Nation','Type','Pillar','Source','Notes','Daily','CumulativeDaily','People','CumulativePeople',
+                  'Positive','CumulativePositive','PositiveNew','CumulativePositiveNew']
+
+# Pillar 2 testing series pillar strings
+Pillar1String = 'Pillar 1 (NHS and PHE)'
+Pillar2String = 'Pillar 2 (includes commercial partners)'
+
+# Month strings used in death and trust dates
+MonthStrings = ['Jan','Feb','Mar','Apr','May','Jun','Jul','Aug','Sep','Oct','Nov','Dec']
+
+# Number of trailing total columns in trust data
+TrustTotalColumns = 18
+
+# Default first date of generated data
+StartDate = date(2020,4,1)
+
+# This procedure returns the name of synthetic area 'index'. Names are
+# of a fixed width so that no name is a prefix of another.
+def ReturnAreaName(index) :
+
+    "This procedure returns the name of synthetic area 'index'"
+
+    return 'Area %05i' % index
+
+# This procedure returns the name of synthetic trust 'index'.
+def ReturnTrustName(index) :
+
+    "This procedure returns the name of synthetic trust 'index'"
+
+    return 'TRUST %05i NHS FOUNDATION TRUST' % index
+
+# This procedure returns a date string of the form <DD>-<Mon>-<YY>
+def ReturnDeathDateString(day) :
+
+    "This procedure returns a date string of the form <DD>-<Mon>-<YY>"
+
+    return '%02i-%s-%02i' % (day.day,MonthStrings[day.month - 1],day.year % 100)
+
+# This procedure returns a list of 'Days' daily counts following a
+# random walk starting at 'Start'.
+def GenerateDailyCounts(Generator,Days,Start) :
+
+    "This procedure returns a list of 'Days' daily counts following a random walk"
+
+    Counts = []
+    Count = Start
+    for Day in range(0,Days) :
+        Count = max(0,Count + Generator.randint(-3,3))
+        Counts.append(Count)
+
+    return Counts
+
+# This procedure returns the text of a Pillar 1 API csv file containing
+# 'Days' rows for each of 'Areas' areas of tier type 'TierString'. As with
+# the API the rows for each area are in descending date order.
+def GeneratePillar1Data(Areas,Days,TierString='ltla',Seed=1) :
+
+    "This procedure returns the text of a Pillar 1 API csv file for 'Areas' areas and 'Days' days"
+
+    Generator = random.Random(Seed)
+    Lines = [','.join(Pillar1Headers)]
+
+    for Index in range(0,Areas) :
+        Code = 'E%08i' % Index
+        Name = ReturnAreaName(Index)
+        Population = Generator.randint(50000,1500000)
+        Counts = GenerateDailyCounts(Generator,Days,Generator.randint(0,50))
+
+        Cumulative = 0
+        Rows = []
+        for Day in range(0,Days) :
+            Cumulative += Counts[Day]
+            Rate = round(Cumulative * 100000.0 / Population,1)
+            Rows.append('%s,%s,%s,%s,%i,%s,%i' % (Code,Name,TierString,StartDate + timedelta(days=Day),Cumulative,Rate,Counts[Day]))
+
+        Rows.reverse()
+        Lines.extend(Rows)
+
+    return '\n'.join(Lines) + '\n'
+
+# This procedure returns the text of a Pillar 2 testing series csv file
+# containing 'Days' days of data with a Pillar 1 and Pillar 2 row for
+# each day. Rows after the data change date use the new positive columns.
+def GenerateTestingData(Days,Seed=1) :
+
+    "This procedure returns the text of a Pillar 2 testing series csv file for 'Days' days"
+
+    Generator = random.Random(Seed)
+    Lines = [','.join(TestingHeaders)]
+
+    Cumulative = {Pillar1String:0,Pillar2String:0}
+    CumulativePositive = {Pillar1String:0,Pillar2String:0}
+
+    for Day in range(0,Days) :
+        SpecimenDate = StartDate + timedelta(days=Day)
+        DateString = '%02i/%02i/%i' % (SpecimenDate.day,SpecimenDate.month,SpecimenDate.year)
+        for Pillar in [Pillar1String,Pillar2String] :
+            Daily = Generator.randint(1000,100000)
+            Positive = Generator.randint(0,Daily // 20)
+            Cumulative[Pillar] += Daily
+            CumulativePositive[Pillar] += Positive
+            Row = [DateString,'UK','Tests',Pillar,'','',str(Daily),str(Cumulative[Pillar]),'','']
+            if ( SpecimenDate >= TestingDataChangeDate ) :
+                Row.extend(['','',str(Positive),str(CumulativePositive[Pillar] + DataDecrement)])
+            else :
+                Row.extend([str(Positive),str(CumulativePositive[Pillar]),'',''])
+            Lines.append(','.join(Row))
+
+    return '\n'.join(Lines) + '\n'
+
+# This procedure returns the text of a Pillar 2 deaths series csv file
+# containing 'Days' days of data.
+def GenerateDeathData(Days,Seed=1) :
+
+    "This procedure returns the text of a Pillar 2 deaths series csv file for 'Days' days"
+
+    Generator = random.Random(Seed)
+    Lines = ['Date,Nation,Cumulative,Daily']
+
+    Cumulative = 0
+    for Day in range(0,Days) :
+        Daily = Generator.randint(0,200)
+        Cumulative += Daily
+        Lines.append('%s,UK,%i,%i' % (ReturnDeathDateString(StartDate + timedelta(days=Day)),Cumulative,Daily))
+
+    return '\n'.join(Lines) + '\n'
+
+# This procedure returns the text of a trust deaths csv file, as extracted
+# from the NHS Excel file, containing 'Days' days of data for each of
+# 'Trusts' trusts.
+def GenerateTrustData(Trusts,Days,Seed=1) :
+
+    "This procedure returns the text of a trust deaths csv file for 'Trusts' trusts and 'Days' days"
+
+    Generator = random.Random(Seed)
+
+    Header = ['NHS England Region','','Code','','Name','']
+    for Day in range(0,Days) : Header.append(ReturnDeathDateString(StartDate + timedelta(days=Day)))
+    for Column in range(0,TrustTotalColumns) : Header.append('Total %i' % Column)
+    Lines = [','.join(Header)]
+
+    for Index in range(0,Trusts) :
+        Row = ['Region','','R%04i' % Index,'',ReturnTrustName(Index),'']
+        Daily = []
+        for Day in range(0,Days) : Daily.append(Generator.randint(0,1) * Generator.randint(0,5))
+
+        # Every trust must have at least one death
+        if ( sum(Daily) == 0 ) : Daily[0] = 1
+
+        Row.extend([str(Count) for Count in Daily])
+        Row.extend([str(sum(Daily))] * TrustTotalColumns)
+        Lines.append(','.join(Row))
+
+    return '\n'.join(Lines) + '\n'
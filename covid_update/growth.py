@@ -0,0 +1,123 @@
+# covid_update/growth.py
+#
+# Description
+# -----------
+# This module estimates the daily growth rate of a series of counts, e.g.
+# the infectious cases of an area, so that areas of very different sizes
+# may be compared and alerted on relative rather than absolute growth. For
+# each day the natural logarithm of the counts of the trailing window of
+# 'Window' rows is fitted against the day by least squares:
+#
+# log( count ) = a + rate * day
+#
+# 'rate' being the daily growth rate ( negative if falling ), with a
+# confidence band of the rate from its standard error and Student's t
+# distribution. The doubling time ( or halving time if falling ) is
+# log( 2 ) / abs( rate ) days.
+#
+# The sums of the least squares fit of every window are found from prefix
+# sums of the days, logarithms and their products, so the whole series is
+# estimated in a single pass whatever the window size. Windows including a
+# count of zero have no estimate as its logarithm is undefined.
+#
+
+import math
+from itertools import accumulate
+
+# Default trailing window in rows
+DefaultWindow = 7
+
+# Daily growth rates smaller than this are taken as zero, the fitted rate of
+# a flat series being only rounding error
+RateTolerance = 1e-9
+
+# Two sided 95% critical values of Student's t distribution by degrees of
+# freedom. Larger degrees of freedom use the normal value.
+TValues = {1:12.706,2:4.303,3:3.182,4:2.776,5:2.571,6:2.447,7:2.365,8:2.306,9:2.262,10:2.228,
+           11:2.201,12:2.179,13:2.160,14:2.145,15:2.131,16:2.120,17:2.110,18:2.101,19:2.093,20:2.086,
+           21:2.080,22:2.074,23:2.069,24:2.064,25:2.060,26:2.056,27:2.052,28:2.048,29:2.045,30:2.042}
+NormalValue = 1.960
+
+# This procedure returns the prefix sums of 'Values', starting with 0.
+def ReturnPrefixSums(Values) :
+
+    "This procedure returns the prefix sums of 'Values', starting with 0"
+
+    return list(accumulate(Values,initial=0.0))
+
+# This procedure returns the estimated daily growth rate of the counts
+# 'Values' on the days 'Ordinals' ( date ordinals ) over the trailing
+# 'Window' rows ending at each row. A list of ( rate, lower, upper ) per
+# row, or None for rows without an estimate, is returned, lower and upper
+# being the 95% confidence band of the rate.
+def ReturnGrowthSeries(Ordinals,Values,Window=DefaultWindow) :
+
+    "This procedure returns the estimated daily growth rate of the counts 'Values' over the trailing 'Window' rows ending at each row"
+
+    RowCount = len(Values)
+    if ( RowCount == 0 ) : return []
+    if ( Window < 3 ) : raise ValueError('Growth window must be at least 3 rows')
+
+    # Days relative to the first row keep the sums small
+    Days = [Ordinal - Ordinals[0] for Ordinal in Ordinals]
+    Logarithms = [math.log(Value) if Value > 0 else 0.0 for Value in Values]
+
+    X = ReturnPrefixSums(Days)
+    Y = ReturnPrefixSums(Logarithms)
+    XX = ReturnPrefixSums([Day * Day for Day in Days])
+    XY = ReturnPrefixSums([Day * Logarithm for Day,Logarithm in zip(Days,Logarithms)])
+    YY = ReturnPrefixSums([Logarithm * Logarithm for Logarithm in Logarithms])
+    Zeros = list(accumulate([1 if Value <= 0 else 0 for Value in Values],initial=0))
+
+    n = Window
+    TValue = TValues.get(n - 2,NormalValue)
+
+    Series = [None] * min(Window - 1,RowCount)
+    for End in range(Window,RowCount + 1) :
+        Start = End - Window
+        if ( Zeros[End] - Zeros[Start] > 0 ) :
+            Series.append(None)
+            continue
+
+        Sx = X[End] - X[Start]
+        Sy = Y[End] - Y[Start]
+        Sxx = XX[End] - XX[Start] - Sx * Sx / n
+        Sxy = XY[End] - XY[Start] - Sx * Sy / n
+        Syy = YY[End] - YY[Start] - Sy * Sy / n
+        if ( Sxx <= 0 ) :
+            Series.append(None)
+            continue
+
+        Rate = Sxy / Sxx
+        if ( abs(Rate) < RateTolerance ) : Rate = 0.0
+        Residual = max(Syy - Rate * Sxy,0.0) / ( n - 2 )
+        Margin = TValue * math.sqrt(Residual / Sxx)
+        Series.append((Rate,Rate - Margin,Rate + Margin))
+
+    return Series
+
+# This procedure returns the doubling time in days of the daily growth
+# rate 'Rate', negative for a halving time, or None if 'Rate' is zero
+# ( within 'RateTolerance' ).
+def ReturnDoublingTime(Rate) :
+
+    "This procedure returns the doubling time in days of the daily growth rate 'Rate'"
+
+    if ( abs(Rate) < RateTolerance ) : return None
+
+    return math.log(2) / Rate
+
+# This procedure returns an indicator string for the growth rate estimate
+# 'Estimate' ( rate, lower, upper ) against the daily growth rate
+# 'Threshold'. Growth is only 'Increasing' if the whole confidence band is
+# above 'Threshold', so a flat series is not increasing at a threshold of 0.
+def ReturnIndicator(Estimate,Threshold) :
+
+    "This procedure returns an indicator string for the growth rate estimate 'Estimate'"
+
+    Rate,Lower,Upper = Estimate
+    Indicator = 'Decreasing'
+    if ( Rate > 0 ) : Indicator = 'Potentially Increasing'
+    if ( Lower > Threshold ) : Indicator = 'Increasing'
+
+    return Indicator
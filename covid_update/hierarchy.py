@@ -0,0 +1,166 @@
+# covid_update/hierarchy.py
+#
+# Description
+# -----------
+# This module derives the Pillar 1 data of the upper tier local authority,
+# region and nation tiers from the data of the lower tier local authorities
+# so that a single lower tier download may be used for all tiers. The area
+# hierarchy is read from a local lookup file with the following format:
+#
+# ltla,utla,region,nation
+# <lower tier name>,<upper tier name>,<region name>,<nation name>
+# ...
+#
+# The columns may be in any order and other columns are ignored. The daily
+# and cumulative case counts of each higher tier area are the sums of those
+# of its lower tier areas. The cumulative count of a lower tier area missing
+# on a date is carried forward from its previous date. Case rates can not
+# be derived by summing and are left empty.
+#
+# The following procedures are provided:
+#
+# ReadHierarchy  - Parse the contents of an area hierarchy file
+# ReturnLtlaUrl  - Return the lower tier download url for the url of any tier
+# RollUp         - Build the data rows of a higher tier from lower tier data rows
+# CompareTiers   - Compare rolled up data rows with those of an official tier file
+#
+
+import re
+
+import covid_update.schema as Schema
+from covid_update.common import GetDecimalPart,IsPresent
+from covid_update.pillar1 import ColumnSchema,ReturnHeader
+
+# Tier types, lowest first
+ltla = 'ltla'
+utla = 'utla'
+region = 'region'
+nation = 'nation'
+Tiers = [ltla,utla,region,nation]
+
+# Data file header
+Header = 'areaCode,areaName,areaType,date,cumCasesBySpecimenDate,cumCasesBySpecimenDateRate,newCasesBySpecimenDate'
+
+# This procedure will parse the contents of an area hierarchy file and
+# return a dictionary, keyed by tier, of dictionaries mapping each lower
+# tier area to the area containing it.
+def ReadHierarchy(HierarchyFileData) :
+
+    "This procedure will parse the contents of an area hierarchy file"
+
+    HierarchyFileDataLines = HierarchyFileData.splitlines()
+    HeaderList = [Field.strip().lower() for Field in HierarchyFileDataLines[0].split(',')]
+    for Tier in Tiers :
+        if ( Tier not in HeaderList ) : raise ValueError('Area hierarchy file has no %s column' % Tier)
+
+    Hierarchy = {}
+    for Tier in Tiers : Hierarchy[Tier] = {}
+
+    for HierarchyFileDataLine in HierarchyFileDataLines[1:] :
+        if ( len(HierarchyFileDataLine.strip()) == 0 ) : continue
+        Fields = [Field.strip() for Field in HierarchyFileDataLine.split(',')]
+        Area = Fields[HeaderList.index(ltla)]
+        for Tier in Tiers : Hierarchy[Tier][Area] = Fields[HeaderList.index(Tier)]
+
+    return Hierarchy
+
+# This procedure returns the lower tier local authority download url
+# corresponding to the download url 'Url' of any tier.
+def ReturnLtlaUrl(Url) :
+
+    "This procedure returns the lower tier local authority download url corresponding to 'Url'"
+
+    return re.sub('areaType=[A-Za-z]+','areaType=' + ltla,Url)
+
+# This procedure will build the data rows of tier 'TierString' from the
+# lower tier data rows in 'ResponseLines' using 'Hierarchy'. Only the areas
+# matching 'Areas' are built if specified, an area matching a configured
+# name as in pillar1.ParseData ( the name matching from its start ). The
+# data lines, in the same format and descending date order as the
+# downloaded file, and the list of lower tier areas missing from
+# 'Hierarchy' are returned.
+def RollUp(ResponseLines,Hierarchy,TierString,Areas=None) :
+
+    "This procedure will build the data rows of tier 'TierString' from the lower tier data rows in 'ResponseLines'"
+
+    Mapping = Hierarchy[TierString]
+    Selected = {}
+    Unmapped = set()
+    Columns = Schema.ResolveColumns(ReturnHeader(ResponseLines),ColumnSchema)[0]
+    Width = max(Columns.values())
+
+    # Daily sums and lower tier cumulative counts of each area by date
+    Daily = {}
+    Cumulative = {}
+
+    for ResponseLine in ResponseLines :
+
+        DataRow = ResponseLine.split(',')
+        if ( len(DataRow) <= Width or DataRow[Columns['Type']] != ltla ) : continue
+
+        LowerArea = DataRow[Columns['Area']]
+        if ( LowerArea not in Mapping ) :
+            Unmapped.add(LowerArea)
+            continue
+
+        Area = Mapping[LowerArea]
+        if ( Areas and Area not in Selected ) : Selected[Area] = any([IsPresent(Configured,0,[Area]) for Configured in Areas])
+        if ( Areas and not Selected[Area] ) : continue
+
+        Date = DataRow[Columns['Date']]
+        AreaDaily = Daily.setdefault(Area,{})
+        AreaDaily[Date] = AreaDaily.get(Date,0) + int(GetDecimalPart(DataRow[Columns['Daily']]))
+        Cumulative.setdefault(Area,{}).setdefault(Date,[]).append((LowerArea,int(GetDecimalPart(DataRow[Columns['Cumulative']]))))
+
+    Lines = [Header]
+
+    for Area in Daily :
+
+        # Sum cumulative counts in ascending date order carrying forward
+        # the latest count of each lower tier area.
+        Latest = {}
+        Total = 0
+        AreaLines = []
+        for Date in sorted(Daily[Area]) :
+            for LowerArea,Count in Cumulative[Area][Date] :
+                Total += Count - Latest.get(LowerArea,0)
+                Latest[LowerArea] = Count
+            AreaLines.append(',%s,%s,%s,%i,,%i' % (Area,TierString,Date,Total,Daily[Area][Date]))
+
+        AreaLines.reverse()
+        Lines.extend(AreaLines)
+
+    return Lines,sorted(Unmapped)
+
+# This procedure will compare the rolled up data lines 'RolledLines' of
+# tier 'TierString' with the data lines 'OfficialLines' of the official file
+# of that tier. A list of difference messages is returned.
+def CompareTiers(RolledLines,OfficialLines,TierString) :
+
+    "This procedure will compare the rolled up data lines 'RolledLines' with those of an official tier file"
+
+    Series = []
+    for Lines in [RolledLines,OfficialLines] :
+        Columns = Schema.ResolveColumns(ReturnHeader(Lines),ColumnSchema)[0]
+        Width = max(Columns.values())
+        Values = {}
+        for Line in Lines :
+            DataRow = Line.split(',')
+            if ( len(DataRow) <= Width or DataRow[Columns['Type']] != TierString ) : continue
+            Key = (DataRow[Columns['Area']],DataRow[Columns['Date']])
+            Values[Key] = (int(GetDecimalPart(DataRow[Columns['Cumulative']])),int(GetDecimalPart(DataRow[Columns['Daily']])))
+        Series.append(Values)
+
+    Rolled,Official = Series
+    RolledAreas = set([Area for Area,Date in Rolled])
+
+    Differences = []
+    for Key in sorted(Official) :
+        Area,Date = Key
+        if ( Area not in RolledAreas ) : continue
+        if ( Key not in Rolled ) :
+            Differences.append('%s %s missing from rolled up data' % Key)
+        elif ( Rolled[Key] != Official[Key] ) :
+            Differences.append('%s %s cumulative/daily %i/%i rolled up, %i/%i official' % (Area,Date,Rolled[Key][0],Rolled[Key][1],Official[Key][0],Official[Key][1]))
+
+    return Differences
@@ -0,0 +1,458 @@
+# covid_update/httpclient.py
+#
+# Description
+# -----------
+# This module provides the HTTP client used for all downloads made by the
+# covid_update scripts. A single pooled session is shared by every request
+# of a run so that connections to the same host ( e.g. the landing page and
+# the data files of api.coronavirus.data.gov.uk ) are kept alive and reused.
+# Requests:
+#
+# - Ask for a compressed ( gzip/deflate ) transfer, the response being
+#   decompressed chunk by chunk as it is read
+# - Time out if no connection is made within the connect timeout or no data
+#   is received within the read timeout
+# - Are retried, with an exponential backoff, on connection errors and on
+#   the 'throttling' and server error statuses in 'RetryStatuses'. A
+#   Retry-After header sent by the server is honoured.
+#
+# The number of bytes received on the wire ( compressed ) is returned by
+# ReturnWireBytes() so that it may be reported against the decoded size.
+#
+# Large files are downloaded to disk by Download(), which writes the file
+# in chunks to a partial file '<file>.part' so that memory use does not
+# depend on the size of the file. If the connection is dropped the request
+# is repeated for the remaining bytes only ( an HTTP Range request ), the
+# validator ( ETag or Last-Modified ) of the first response being sent
+# with it so that a file changed on the server is downloaded again in
+# full. A partial file left by an interrupted run is resumed in the same
+# way. The length of the completed file is verified against that sent by
+# the server before it is renamed into place. Its SHA-256 checksum is
+# always computed and returned, but is only verified if an expected
+# checksum is known: one given by the caller or, when replaying, that of
+# the recorded fixture. The data sources publish no checksums, so a live
+# download is otherwise only checked for length. These downloads are
+# not compressed in transfer as a range must refer to the bytes of the
+# file itself. Their connection errors and timeouts are retried by
+# Download() itself, which resumes from the bytes already received, so the
+# session they use ( see ReturnDownloadSession ) only retries statuses.
+# The validator of a completed file is kept so that a later download may
+# be made conditional on it, the file being kept if it has not changed on
+# the server.
+#
+# Options
+# -------
+# The following command line options are removed from the script arguments
+# by ParseOptions(). Each may also be given by the environment variable
+# shown, the command line option taking precedence:
+#
+# --timeout=<seconds>       COVID_UPDATE_TIMEOUT           Read timeout
+# --retries=<count>         COVID_UPDATE_RETRIES           Retries of a failed request
+# --record=<dir>            COVID_UPDATE_RECORD            Record each response as a fixture in <dir>
+# --replay=<dir>            COVID_UPDATE_REPLAY            Replay the fixtures of <dir> instead of downloading
+# --replay-latency=<ms>     COVID_UPDATE_REPLAY_LATENCY    Latency added to each replayed response
+# --replay-bandwidth=<kB/s> COVID_UPDATE_REPLAY_BANDWIDTH  Bandwidth at which replayed bodies are sent
+#
+# When replaying, a local replay server ( see fixtures.py ) is started for
+# the run and each url is rewritten to that of its fixture, so that a run
+# makes no network access.
+#
+
+import hashlib
+import os
+import re
+import time
+
+# Connect and read timeouts in seconds
+ConnectTimeout = 10
+ReadTimeout = 60
+
+# Retries of a failed request and backoff factor in seconds. Retry n waits
+# for Backoff * 2 ** ( n - 1 ) seconds.
+Retries = 5
+Backoff = 2
+
+# Response statuses which are retried
+RetryStatuses = [429,500,502,503,504]
+
+# Maximum number of pooled connections per host
+PoolSize = 4
+
+# Size in bytes of the chunks in which a download is written to disk
+ChunkSize = 65536
+
+# Suffixes of the partial file of a download and of the file holding the
+# validator of the partial file
+PartialSuffix = '.part'
+ValidatorSuffix = '.validator'
+
+# Environment variable prefix
+EnvironmentPrefix = 'COVID_UPDATE_'
+
+# Shared session, created by ReturnSession(), and session of the chunked
+# downloads, created by ReturnDownloadSession()
+Session = None
+DownloadSession = None
+
+# Fixtures directory responses are recorded to, and the fixtures directory
+# replayed, the replay server and its base url, set by Configure()
+RecordDir = None
+ReplayDir = None
+ReplayServer = None
+ReplayUrl = None
+
+# This procedure removes the HTTP client options from the list of command
+# line 'Arguments'. The remaining arguments and a dictionary of the options
+# are returned. Options not given on the command line are taken from the
+# environment.
+def ParseOptions(Arguments,Environment=None) :
+
+    "This procedure removes the HTTP client options from 'Arguments'"
+
+    if ( Environment is None ) : Environment = os.environ
+
+    Options = {'timeout':float(Environment.get(EnvironmentPrefix + 'TIMEOUT') or ReadTimeout),
+               'retries':int(Environment.get(EnvironmentPrefix + 'RETRIES') or Retries),
+               'record':Environment.get(EnvironmentPrefix + 'RECORD') or None,
+               'replay':Environment.get(EnvironmentPrefix + 'REPLAY') or None,
+               'latency':float(Environment.get(EnvironmentPrefix + 'REPLAY_LATENCY') or 0),
+               'bandwidth':float(Environment.get(EnvironmentPrefix + 'REPLAY_BANDWIDTH') or 0)}
+    Remaining = []
+
+    for Argument in Arguments :
+        if ( Argument.startswith('--timeout=') ) :
+            Options['timeout'] = float(Argument.split('=',1)[1])
+        elif ( Argument.startswith('--retries=') ) :
+            Options['retries'] = int(Argument.split('=',1)[1])
+        elif ( Argument.startswith('--record=') ) :
+            Options['record'] = Argument.split('=',1)[1]
+        elif ( Argument.startswith('--replay=') ) :
+            Options['replay'] = Argument.split('=',1)[1]
+        elif ( Argument.startswith('--replay-latency=') ) :
+            Options['latency'] = float(Argument.split('=',1)[1])
+        elif ( Argument.startswith('--replay-bandwidth=') ) :
+            Options['bandwidth'] = float(Argument.split('=',1)[1])
+        else :
+            Remaining.append(Argument)
+
+    return Remaining,Options
+
+# This procedure applies the HTTP client 'Options' returned by
+# ParseOptions(). Any existing session is closed so that the next request
+# uses the new settings.
+def Configure(Options) :
+
+    "This procedure applies the HTTP client 'Options' returned by ParseOptions()"
+
+    global ReadTimeout,Retries,Session,DownloadSession,RecordDir,ReplayDir,ReplayServer,ReplayUrl
+
+    ReadTimeout = Options['timeout']
+    Retries = Options['retries']
+    RecordDir = Options.get('record')
+    ReplayDir = Options.get('replay')
+
+    if ( Session is not None ) :
+        Session.close()
+        Session = None
+
+    if ( DownloadSession is not None ) :
+        DownloadSession.close()
+        DownloadSession = None
+
+    if ( ReplayServer is not None ) :
+        ReplayServer.shutdown()
+        ReplayServer.server_close()
+        ReplayServer,ReplayUrl = None,None
+
+    if ( Options.get('replay') ) :
+        import covid_update.fixtures as Fixtures
+        ReplayServer,ReplayUrl = Fixtures.StartReplayServer(Options['replay'],Options['latency'] / 1000.0,int(Options['bandwidth'] * 1000))
+
+# This procedure returns the shared session, creating it on first use.
+# The requests module is only imported when a download is made.
+def ReturnSession() :
+
+    "This procedure returns the shared session, creating it on first use"
+
+    global Session
+
+    if ( Session is None ) :
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        RetryPolicy = Retry(total=Retries,backoff_factor=Backoff,status_forcelist=RetryStatuses,
+                            allowed_methods=['GET','HEAD'],respect_retry_after_header=True,raise_on_status=False)
+        Adapter = HTTPAdapter(pool_connections=PoolSize,pool_maxsize=PoolSize,max_retries=RetryPolicy)
+
+        Session = requests.Session()
+        Session.mount('https://',Adapter)
+        Session.mount('http://',Adapter)
+        Session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    return Session
+
+# This procedure returns the session of the chunked downloads made by
+# Download(), creating it on first use. Its requests are only retried on
+# the statuses in 'RetryStatuses', connection errors and timeouts being
+# retried by Download() so that they are not retried at two levels.
+def ReturnDownloadSession() :
+
+    "This procedure returns the session of the chunked downloads made by Download(), creating it on first use"
+
+    global DownloadSession
+
+    if ( DownloadSession is None ) :
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        RetryPolicy = Retry(total=Retries,connect=0,read=0,other=0,backoff_factor=Backoff,status_forcelist=RetryStatuses,
+                            allowed_methods=['GET','HEAD'],respect_retry_after_header=True,raise_on_status=False)
+        Adapter = HTTPAdapter(pool_connections=PoolSize,pool_maxsize=PoolSize,max_retries=RetryPolicy)
+
+        DownloadSession = requests.Session()
+        DownloadSession.mount('https://',Adapter)
+        DownloadSession.mount('http://',Adapter)
+
+    return DownloadSession
+
+# This procedure returns the expected SHA-256 checksum of the download of
+# 'Url', that of its fixture when replaying, or None if not known.
+def ReturnExpectedChecksum(Url) :
+
+    "This procedure returns the expected SHA-256 checksum of the download of 'Url'"
+
+    if ( ReplayDir is None ) : return None
+
+    import covid_update.fixtures as Fixtures
+
+    Description = Fixtures.ReadDescription(ReplayDir,Fixtures.ReturnFixtureKey(Url))
+    if ( Description is None ) : return None
+
+    return Description.get('sha256')
+
+# This procedure returns the url requested for 'Url', that of its fixture
+# on the replay server when replaying.
+def ReturnRequestUrl(Url) :
+
+    "This procedure returns the url requested for 'Url'"
+
+    if ( ReplayUrl is None ) : return Url
+
+    import covid_update.fixtures as Fixtures
+
+    return Fixtures.ReturnReplayUrl(ReplayUrl,Url)
+
+# This procedure records the downloaded file 'Filename' of 'Url' as a
+# fixture with the response 'Headers' when recording.
+def RecordFile(Url,Filename,Headers) :
+
+    "This procedure records the downloaded file 'Filename' of 'Url' as a fixture when recording"
+
+    if ( RecordDir is None ) : return
+
+    import covid_update.fixtures as Fixtures
+
+    Fixtures.RecordFile(RecordDir,Url,Filename,Headers)
+
+# This procedure will download 'Url' using the shared session and return
+# the response. Additional keyword arguments are passed to the get. A
+# successful response is recorded as a fixture when recording.
+def Fetch(Url,**Details) :
+
+    "This procedure will download 'Url' using the shared session and return the response"
+
+    Details.setdefault('timeout',(ConnectTimeout,ReadTimeout))
+
+    Response = ReturnSession().get(ReturnRequestUrl(Url),**Details)
+    if ( RecordDir is not None and Response.status_code == 200 and not Details.get('stream') ) :
+        import covid_update.fixtures as Fixtures
+        Fixtures.RecordContent(RecordDir,Url,Response.content,Response.headers)
+
+    return Response
+
+# This procedure returns the number of bytes of 'Response' received on the
+# wire, before decompression. The decoded size is returned if this is not
+# known.
+def ReturnWireBytes(Response) :
+
+    "This procedure returns the number of bytes of 'Response' received on the wire"
+
+    try :
+        return Response.raw.tell()
+    except AttributeError :
+        return len(Response.content)
+
+# This procedure returns the number of retries made for 'Response'.
+def ReturnRetries(Response) :
+
+    "This procedure returns the number of retries made for 'Response'"
+
+    History = getattr(getattr(Response.raw,'retries',None),'history',None)
+
+    return len(History) if History else 0
+
+# This procedure returns the first byte and the total length of the
+# Content-Range header of 'Response'. None is returned for either if not
+# known.
+def ReturnContentRange(Response) :
+
+    "This procedure returns the first byte and the total length of the Content-Range header of 'Response'"
+
+    Match = re.match(r'bytes (\d+)-\d+/(\d+|\*)',Response.headers.get('Content-Range',''))
+    if ( not Match ) : return None,None
+
+    Total = None
+    if ( Match.group(2) != '*' ) : Total = int(Match.group(2))
+
+    return int(Match.group(1)),Total
+
+# This procedure returns the SHA-256 checksum of the file 'Filename',
+# read in chunks.
+def ReturnChecksum(Filename) :
+
+    "This procedure returns the SHA-256 checksum of the file 'Filename'"
+
+    Digest = hashlib.sha256()
+    with open(Filename,'rb') as FileObject :
+        for Chunk in iter(lambda : FileObject.read(ChunkSize),b'') : Digest.update(Chunk)
+
+    return Digest.hexdigest()
+
+# This procedure removes the partial file 'PartialFilename' of a download
+# and its validator file.
+def RemovePartial(PartialFilename) :
+
+    "This procedure removes the partial file 'PartialFilename' of a download and its validator file"
+
+    for Filename in [PartialFilename,PartialFilename + ValidatorSuffix] :
+        if ( os.path.exists(Filename) ) : os.remove(Filename)
+
+# This procedure will download 'Url' to the file 'Filename' in chunks,
+# resuming the download if the connection is dropped ( see above ). If
+# 'Checksum' is specified, or is that of the fixture when replaying ( see
+# ReturnExpectedChecksum ), the SHA-256 checksum of the file must match it.
+# If 'Revalidate' is set and 'Filename' was completed by an earlier download
+# the request is conditional on its validator and 'Filename' is kept if
+# unchanged on the server ( status 304 ).
+# A dictionary of the response status, file size, bytes received, number
+# of retries and resumes, checksum, response encoding and whether the
+# download completed is returned. 'Filename' is only replaced if the
+# download completed. A completed file is recorded as a fixture when
+# recording.
+def Download(Url,Filename,Checksum=None,Revalidate=False) :
+
+    "This procedure will download 'Url' to the file 'Filename' in chunks, resuming the download if the connection is dropped"
+
+    import requests
+
+    Result = {'status':None,'bytes':0,'wire':0,'retries':0,'resumes':0,'sha256':None,'encoding':None,'complete':False}
+    PartialFilename = Filename + PartialSuffix
+    ValidatorFilename = PartialFilename + ValidatorSuffix
+    CompleteValidatorFilename = Filename + ValidatorSuffix
+
+    # A partial file can only be resumed if its validator is known
+    if ( os.path.exists(PartialFilename) and not os.path.exists(ValidatorFilename) ) : RemovePartial(PartialFilename)
+
+    if ( Checksum is None ) : Checksum = ReturnExpectedChecksum(Url)
+
+    for Attempt in range(0,Retries + 1) :
+
+        if ( Attempt > 0 ) :
+            time.sleep(Backoff * 2 ** ( Attempt - 1 ))
+            Result['retries'] += 1
+
+        Offset = 0
+        Headers = {'Accept-Encoding':'identity'}
+        if ( os.path.exists(PartialFilename) ) :
+            Offset = os.path.getsize(PartialFilename)
+            with open(ValidatorFilename) as FileObject : Headers['If-Range'] = FileObject.read()
+            Headers['Range'] = 'bytes=%i-' % Offset
+        elif ( Revalidate and os.path.exists(Filename) and os.path.exists(CompleteValidatorFilename) ) :
+            with open(CompleteValidatorFilename) as FileObject : Validator = FileObject.read()
+            if ( Validator.startswith('"') or Validator.startswith('W/') ) : Headers['If-None-Match'] = Validator
+            else : Headers['If-Modified-Since'] = Validator
+
+        try :
+            with ReturnDownloadSession().get(ReturnRequestUrl(Url),headers=Headers,stream=True,timeout=(ConnectTimeout,ReadTimeout)) as Response :
+
+                Result['status'] = Response.status_code
+                Result['retries'] += ReturnRetries(Response)
+                Result['encoding'] = Response.encoding
+                ResponseHeaders = Response.headers
+
+                # File unchanged on the server
+                if ( Response.status_code == 304 and 'Range' not in Headers ) :
+                    Result['bytes'] = os.path.getsize(Filename)
+                    Result['sha256'] = ReturnChecksum(Filename)
+                    Result['complete'] = True
+                    RecordFile(Url,Filename,ResponseHeaders)
+                    return Result
+
+                # Partial file longer than the file on the server
+                if ( Response.status_code == 416 ) :
+                    RemovePartial(PartialFilename)
+                    continue
+
+                if ( Response.status_code not in [200,206] ) : return Result
+
+                Start,Total = ReturnContentRange(Response)
+                if ( Response.status_code == 206 and Start != Offset ) :
+                    RemovePartial(PartialFilename)
+                    continue
+
+                if ( Response.status_code == 206 ) :
+                    Mode = 'ab'
+                    if ( Offset > 0 ) : Result['resumes'] += 1
+                else :
+                    # Whole file sent, start again
+                    Mode = 'wb'
+                    Total = None
+                    if ( 'Content-Length' in Response.headers ) : Total = int(Response.headers['Content-Length'])
+                    Validator = Response.headers.get('ETag') or Response.headers.get('Last-Modified')
+                    if ( not Validator ) :
+                        if ( os.path.exists(ValidatorFilename) ) : os.remove(ValidatorFilename)
+                    else :
+                        with open(ValidatorFilename,'w') as FileObject : FileObject.write(Validator)
+
+                with open(PartialFilename,Mode) as FileObject :
+                    for Chunk in Response.iter_content(ChunkSize) :
+                        FileObject.write(Chunk)
+                        Result['wire'] += len(Chunk)
+
+        except ( requests.ConnectionError,requests.Timeout,requests.exceptions.ChunkedEncodingError ) :
+            # Resume from the partial file, if it may be resumed
+            if ( not os.path.exists(ValidatorFilename) ) : RemovePartial(PartialFilename)
+            continue
+
+        # Length check, resuming a truncated file
+        Result['bytes'] = os.path.getsize(PartialFilename)
+        if ( Total is not None and Result['bytes'] < Total ) :
+            if ( not os.path.exists(ValidatorFilename) ) : RemovePartial(PartialFilename)
+            continue
+        if ( Total is not None and Result['bytes'] > Total ) :
+            RemovePartial(PartialFilename)
+            continue
+
+        break
+
+    else :
+        return Result
+
+    # Checksum check
+    Result['sha256'] = ReturnChecksum(PartialFilename)
+    if ( Checksum and Result['sha256'] != Checksum.lower() ) :
+        RemovePartial(PartialFilename)
+        return Result
+
+    os.replace(PartialFilename,Filename)
+    if ( os.path.exists(ValidatorFilename) ) : os.replace(ValidatorFilename,CompleteValidatorFilename)
+    elif ( os.path.exists(CompleteValidatorFilename) ) : os.remove(CompleteValidatorFilename)
+    RemovePartial(PartialFilename)
+    Result['complete'] = True
+    RecordFile(Url,Filename,ResponseHeaders)
+
+    return Result
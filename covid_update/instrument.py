@@ -0,0 +1,196 @@
+# covid_update/instrument.py
+#
+# Description
+# -----------
+# This module provides the run report used by the covid_update scripts to
+# record the elapsed time, byte counts and row counts of each phase of a
+# run in a machine readable ( JSON ) form. A phase is started with Start()
+# and ended with Stop(), any keyword arguments given being stored with the
+# phase, e.g.
+#
+# Phase = Report.Start('download',url=CovidPage)
+# Response = Fetch(CovidPage)
+# Report.Stop(Phase,status=Response.status_code,bytes=len(Response.content))
+#
+# Totals of numeric values are kept per phase name so that, for example,
+# the per area 'compute' phases can be summed.
+#
+# Options
+# -------
+# The following command line options are removed from the script arguments
+# by ParseOptions() and control the report and optional profiling:
+#
+# --report=<file>                 Write the run report to <file>
+# --profile=cprofile              Profile the run with cProfile ( <report>.prof )
+# --profile=tracemalloc           Trace memory allocations ( <report>.memory.txt )
+#
+
+import json
+import os
+import time
+from datetime import datetime
+
+# Profiling modes
+cprofile = 'cprofile'
+tracemalloc = 'tracemalloc'
+ProfileModes = [cprofile,tracemalloc]
+
+# Number of entries listed in profile summaries
+ProfileEntries = 25
+
+# This procedure removes the instrumentation options from the list of
+# command line 'Arguments'. The remaining arguments and a dictionary of
+# the options are returned.
+def ParseOptions(Arguments) :
+
+    "This procedure removes the instrumentation options from 'Arguments'"
+
+    Options = {'report':None,'profile':None}
+    Remaining = []
+
+    for Argument in Arguments :
+        if ( Argument.startswith('--report=') ) :
+            Options['report'] = Argument.split('=',1)[1]
+        elif ( Argument.startswith('--profile=') ) :
+            Options['profile'] = Argument.split('=',1)[1]
+            if ( Options['profile'] not in ProfileModes ) : raise ValueError('Profile mode must be one of %s' % str(ProfileModes))
+        else :
+            Remaining.append(Argument)
+
+    return Remaining,Options
+
+# The run report of a single script run.
+class RunReport :
+
+    "The run report of a single script run"
+
+    def __init__(self,Module) :
+
+        self.Module = Module
+        self.Started = datetime.now()
+        self.StartCounter = time.perf_counter()
+        self.Phases = []
+        self.Counters = {}
+
+    # This procedure starts the timing of phase 'Name'. The phase entry is
+    # returned and must be passed to Stop().
+    def Start(self,Name,**Details) :
+
+        "This procedure starts the timing of phase 'Name'"
+
+        Entry = {'phase':Name}
+        Entry.update(Details)
+        Entry['start'] = time.perf_counter()
+
+        return Entry
+
+    # This procedure ends the timing of phase 'Entry' and stores it with
+    # any further 'Details' in the report.
+    def Stop(self,Entry,**Details) :
+
+        "This procedure ends the timing of phase 'Entry'"
+
+        Entry['seconds'] = time.perf_counter() - Entry.pop('start')
+        Entry.update(Details)
+        self.Phases.append(Entry)
+
+        return Entry
+
+    # This procedure adds 'Value' to the counter 'Name'.
+    def Count(self,Name,Value=1) :
+
+        "This procedure adds 'Value' to the counter 'Name'"
+
+        self.Counters[Name] = self.Counters.get(Name,0) + Value
+
+    # This procedure returns the totals of the numeric values of each
+    # phase name.
+    def Totals(self) :
+
+        "This procedure returns the totals of the numeric values of each phase name"
+
+        Totals = {}
+        for Entry in self.Phases :
+            Total = Totals.setdefault(Entry['phase'],{'count':0})
+            Total['count'] += 1
+            for Key,Value in Entry.items() :
+                if ( isinstance(Value,bool) or not isinstance(Value,(int,float)) ) : continue
+                if ( Key == 'status' ) : continue
+                Total[Key] = Total.get(Key,0) + Value
+
+        return Totals
+
+    # This procedure returns the report as a dictionary.
+    def Summary(self) :
+
+        "This procedure returns the report as a dictionary"
+
+        return {'module':self.Module,'started':self.Started.isoformat(timespec='seconds'),
+                'seconds':time.perf_counter() - self.StartCounter,'totals':self.Totals(),
+                'counters':self.Counters,'phases':self.Phases}
+
+    # This procedure writes the report as JSON to 'Filename'.
+    def Write(self,Filename) :
+
+        "This procedure writes the report as JSON to 'Filename'"
+
+        with open(Filename,'w') as FileObject : json.dump(self.Summary(),FileObject,indent=2,default=str)
+
+# This procedure returns the default report file name for 'Module' in
+# directory 'LogDir'.
+def ReturnReportFileName(LogDir,Module) :
+
+    "This procedure returns the default report file name for 'Module'"
+
+    return os.path.join(LogDir,Module.split('.')[0] + '_report.json')
+
+# This procedure starts profiling in mode 'Mode'. The profiler object,
+# or None if 'Mode' is None, is returned.
+def StartProfiling(Mode) :
+
+    "This procedure starts profiling in mode 'Mode'"
+
+    Profiler = None
+
+    if ( Mode == cprofile ) :
+        import cProfile
+        Profiler = cProfile.Profile()
+        Profiler.enable()
+
+    if ( Mode == tracemalloc ) :
+        import tracemalloc as Tracemalloc
+        Tracemalloc.start()
+        Profiler = Tracemalloc
+
+    return Profiler
+
+# This procedure stops 'Profiler' started in mode 'Mode' and writes the
+# profile alongside 'ReportFilename'. The peak traced memory is added
+# to 'Report' in tracemalloc mode. The profile file name is returned.
+def StopProfiling(Profiler,Mode,ReportFilename,Report) :
+
+    "This procedure stops 'Profiler' and writes the profile alongside 'ReportFilename'"
+
+    ProfileFilename = None
+    Base = os.path.splitext(ReportFilename)[0]
+
+    if ( Mode == cprofile ) :
+        Profiler.disable()
+        import pstats
+        ProfileFilename = Base + '.prof'
+        Profiler.dump_stats(ProfileFilename)
+        with open(Base + '.profile.txt','w') as FileObject :
+            Statistics = pstats.Stats(Profiler,stream=FileObject)
+            Statistics.sort_stats('cumulative').print_stats(ProfileEntries)
+
+    if ( Mode == tracemalloc ) :
+        Snapshot = Profiler.take_snapshot()
+        Current,Peak = Profiler.get_traced_memory()
+        Profiler.stop()
+        Report.Counters['traced_memory_peak_bytes'] = Peak
+        ProfileFilename = Base + '.memory.txt'
+        with open(ProfileFilename,'w') as FileObject :
+            FileObject.write('Peak traced memory %i bytes\n' % Peak)
+            for Statistic in Snapshot.statistics('lineno')[:ProfileEntries] : FileObject.write(str(Statistic) + '\n')
+
+    return ProfileFilename
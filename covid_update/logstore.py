@@ -0,0 +1,218 @@
+# covid_update/logstore.py
+#
+# Description
+# -----------
+# This module keeps the log messages of the scripts in a SQLite database,
+# <log dir>\log.db, in addition to the text log <log dir>\log.txt, so that
+# the history of the messages may be queried without scanning the text
+# log. Each message is stored in the 'log' table:
+#
+# time     - time the message was logged ( ISO format )
+# module   - script logging the message
+# level    - INFO, WARNING or ERROR
+# kind     - kind of alert message ( see 'MessageKinds' ) or NULL
+# area     - area, series type or trust of an alert message or NULL
+# date     - data date of an alert message or NULL
+# state    - increasing/decreasing indicator of an alert message or NULL
+# message  - message text
+#
+# which is indexed by time, by module and level and by kind, area and date.
+# The store is opened in WAL mode so that scripts run in parallel may log
+# to it and it may be queried while they run. Messages are recorded by
+# wrapping the File.Operations module of a script with RecordingFile, so
+# each message passed to File.Logerror is also stored.
+#
+# The text log is rotated when it reaches 'RotateBytes', the last
+# 'RotateCount' logs being kept as log.txt.1 ( the latest ) to log.txt.<n>,
+# rather than being deleted at the start of each day's runs.
+#
+
+import os
+import re
+import sqlite3
+from datetime import datetime,timedelta
+
+# Log store file name in the log directory
+StoreFileName = 'log.db'
+
+# Size in bytes at which the text log is rotated and number of rotated logs kept
+RotateBytes = 5 * 1024 * 1024
+RotateCount = 5
+
+# Seconds waited for a lock held by a parallel script
+LockTimeout = 30
+
+# Kinds of alert messages and the patterns extracting their area, date and
+# state ( see the GenerateAlerts procedures )
+MessageKinds = [('growth',re.compile(r'^Infectious cases growth (?P<state>.+) in (?P<area>.+) on (?P<date>\d{4}-\d{2}-\d{2}),')),
+                ('infectious',re.compile(r'^Infectious cases (?P<state>.+) in (?P<area>.+) on (?P<date>\d{4}-\d{2}-\d{2})$')),
+                ('zero',re.compile(r'^No infectious Pillar 1 cases in (?P<area>.+) on (?P<date>\d{4}-\d{2}-\d{2})$')),
+                ('last_death',re.compile(r'^The last death in (?P<area>.+) was on (?P<date>\d{4}-\d{2}-\d{2})')),
+                ('rolling',re.compile(r'^The rolling number of deaths was (?P<state>.+) on (?P<date>\d{4}-\d{2}-\d{2})$')),
+                ('percentage',re.compile(r'^The  percentage number of positive tests was (?P<state>.+) on (?P<date>\d{4}-\d{2}-\d{2})$')),
+                ('hotspot',re.compile(r'^Hotspot (?P<area>.+) infectious cases \d+ on (?P<date>\d{4}-\d{2}-\d{2}),'))]
+
+# Columns of the log table
+Columns = ['time','module','level','kind','area','date','state','message']
+
+# This procedure opens the log store 'Filename', creating the table and
+# indexes if not present, and returns the connection.
+def Open(Filename) :
+
+    "This procedure opens the log store 'Filename', creating the table and indexes if not present"
+
+    Connection = sqlite3.connect(Filename,timeout=LockTimeout,isolation_level=None,check_same_thread=False)
+    Connection.execute('PRAGMA journal_mode=WAL')
+    Connection.execute('PRAGMA synchronous=NORMAL')
+    Connection.execute('CREATE TABLE IF NOT EXISTS log (id INTEGER PRIMARY KEY,%s)' % ','.join(Columns))
+    Connection.execute('CREATE INDEX IF NOT EXISTS log_time ON log (time)')
+    Connection.execute('CREATE INDEX IF NOT EXISTS log_module ON log (module,level,time)')
+    Connection.execute('CREATE INDEX IF NOT EXISTS log_kind ON log (kind,area,date)')
+
+    return Connection
+
+# This procedure returns the kind, area, date and state of the alert
+# message 'Message', each None if not found.
+def ReturnMessageFields(Message) :
+
+    "This procedure returns the kind, area, date and state of the alert message 'Message'"
+
+    for Kind,Pattern in MessageKinds :
+        Match = Pattern.match(Message)
+        if ( Match ) :
+            Fields = Match.groupdict()
+            return Kind,Fields.get('area'),Fields.get('date'),Fields.get('state')
+
+    return None,None,None,None
+
+# This procedure stores the message 'Message' of level 'Level' logged by
+# 'Module'.
+def Record(Connection,Module,Message,Level) :
+
+    "This procedure stores the message 'Message' of level 'Level' logged by 'Module'"
+
+    Kind,Area,Date,State = ReturnMessageFields(Message)
+    Connection.execute('INSERT INTO log (%s) VALUES (?,?,?,?,?,?,?,?)' % ','.join(Columns),
+                       (datetime.now().isoformat(timespec='seconds'),Module,Level,Kind,Area,Date,State,Message))
+
+# File.Operations module of a script whose log messages are also stored in
+# the log store. All other procedures are those of the module.
+class RecordingFile :
+
+    "File.Operations module of a script whose log messages are also stored in the log store"
+
+    def __init__(self,FileModule,Connection) :
+
+        self.FileModule = FileModule
+        self.Connection = Connection
+
+    def __getattr__(self,Name) :
+
+        return getattr(self.FileModule,Name)
+
+    # This procedure logs 'Message' through the File.Operations module and
+    # stores it in the log store.
+    def Logerror(self,FileObject,Module,Message,Level) :
+
+        "This procedure logs 'Message' through the File.Operations module and stores it in the log store"
+
+        Result = self.FileModule.Logerror(FileObject,Module,Message,Level)
+        try :
+            Record(self.Connection,Module,Message,Level)
+        except sqlite3.Error :
+            pass
+
+        return Result
+
+# This procedure rotates the text log 'Filename' if it has reached
+# 'RotateBytes'. The rotated logs are <file>.1 ( the latest ) to
+# <file>.<RotateCount>.
+def RotateLog(Filename) :
+
+    "This procedure rotates the text log 'Filename' if it has reached 'RotateBytes'"
+
+    if ( not os.path.exists(Filename) or os.path.getsize(Filename) < RotateBytes ) : return False
+
+    for Number in range(RotateCount - 1,0,-1) :
+        if ( os.path.exists('%s.%i' % (Filename,Number)) ) : os.replace('%s.%i' % (Filename,Number),'%s.%i' % (Filename,Number + 1))
+    os.replace(Filename,Filename + '.1')
+
+    return True
+
+# This procedure returns the File.Operations module 'FileModule' wrapped so
+# that the log messages are also stored in the log store of 'LogDir', after
+# rotating the text log 'ErrorFilename' if required. If the log store
+# cannot be opened 'FileModule' is returned unchanged.
+def ReturnRecordingFile(FileModule,LogDir,ErrorFilename) :
+
+    "This procedure returns the File.Operations module 'FileModule' wrapped so that the log messages are also stored"
+
+    try :
+        RotateLog(ErrorFilename)
+    except OSError :
+        pass
+
+    try :
+        return RecordingFile(FileModule,Open(os.path.join(LogDir,StoreFileName)))
+    except sqlite3.Error :
+        return FileModule
+
+# This procedure returns the stored messages matching the given criteria,
+# oldest first. 'Since' is an ISO date or time. A list of ( time, module,
+# level, message ) is returned.
+def Query(Connection,Module=None,Level=None,Kind=None,Area=None,Since=None,Text=None,Limit=None) :
+
+    "This procedure returns the stored messages matching the given criteria"
+
+    Conditions = []
+    Parameters = []
+    for Column,Value in [('module',Module),('level',Level),('kind',Kind),('area',Area)] :
+        if ( Value is not None ) :
+            Conditions.append('%s = ?' % Column)
+            Parameters.append(Value)
+    if ( Since is not None ) :
+        Conditions.append('time >= ?')
+        Parameters.append(Since)
+    if ( Text is not None ) :
+        Conditions.append('instr(message,?) > 0')
+        Parameters.append(Text)
+
+    Statement = 'SELECT time,module,level,message FROM log'
+    if ( Conditions ) : Statement += ' WHERE ' + ' AND '.join(Conditions)
+    Statement += ' ORDER BY time,id'
+    if ( Limit ) : Statement += ' LIMIT %i' % Limit
+
+    return Connection.execute(Statement,Parameters).fetchall()
+
+# This procedure returns the areas with a stored message of kind 'Kind'
+# ( e.g. zero infectious cases ) logged since 'Since'. A list of ( area,
+# messages, first data date, last data date ) is returned, most recent
+# first.
+def ReturnAreas(Connection,Kind,Since=None) :
+
+    "This procedure returns the areas with a stored message of kind 'Kind' logged since 'Since'"
+
+    Statement = 'SELECT area,COUNT(*),MIN(date),MAX(date) FROM log WHERE kind = ? AND area IS NOT NULL'
+    Parameters = [Kind]
+    if ( Since is not None ) :
+        Statement += ' AND time >= ?'
+        Parameters.append(Since)
+    Statement += ' GROUP BY area ORDER BY MAX(date) DESC,area'
+
+    return Connection.execute(Statement,Parameters).fetchall()
+
+# This procedure returns the ISO time of the latest 'Started' message
+# logged by 'Module', that is the start of its last run, or None if it has
+# not been run.
+def ReturnLastRun(Connection,Module) :
+
+    "This procedure returns the ISO time of the latest 'Started' message logged by 'Module'"
+
+    return Connection.execute("SELECT MAX(time) FROM log WHERE module = ? AND message = 'Started'",(Module,)).fetchone()[0]
+
+# This procedure returns the ISO time 'Days' days before now.
+def ReturnSince(Days) :
+
+    "This procedure returns the ISO time 'Days' days before now"
+
+    return ( datetime.now() - timedelta(days=Days) ).isoformat(timespec='seconds')
@@ -0,0 +1,117 @@
+# covid_update/paths.py
+#
+# Description
+# -----------
+# This module determines the directories used by the covid_update scripts
+# so that they may be run on Windows desktops and on Linux batch hosts. By
+# default the directories are the following, relative to the current
+# directory:
+#
+# log     - .\log            Log file and run report
+# config  - .\config         Configuration files
+# data    - .\data           Statistics files
+# scratch - c:\temp          Intermediate files ( the system temporary
+#                            directory if not running on Windows )
+#
+# Options
+# -------
+# The following command line options are removed from the script arguments
+# by ParseOptions(). Each may also be given by the environment variable
+# shown, the command line option taking precedence:
+#
+# --log-dir=<dir>       COVID_UPDATE_LOG_DIR       Log directory
+# --config-dir=<dir>    COVID_UPDATE_CONFIG_DIR    Configuration directory
+# --data-dir=<dir>      COVID_UPDATE_DATA_DIR      Data directory
+# --scratch-dir=<dir>   COVID_UPDATE_SCRATCH_DIR   Scratch directory
+# --instance=<name>     COVID_UPDATE_INSTANCE      Use a <name> sub-directory of the
+#                                                  log, data and scratch directories
+# --headless            COVID_UPDATE_HEADLESS=1    Do not launch the spreadsheet
+#
+# The '--instance' option allows several runs of a script to take place at
+# the same time without writing to the same files. Headless mode is the
+# default if not running on Windows.
+#
+
+import os
+import tempfile
+
+# Directory types
+log = 'log'
+config = 'config'
+data = 'data'
+scratch = 'scratch'
+DirectoryTypes = [log,config,data,scratch]
+
+# Command line option for each directory type
+DirectoryOptions = {'--log-dir':log,'--config-dir':config,'--data-dir':data,'--scratch-dir':scratch}
+
+# Directory types which are created if not present and which are
+# separated per instance.
+WritableTypes = [log,data,scratch]
+
+# Environment variable prefix
+EnvironmentPrefix = 'COVID_UPDATE_'
+
+# Windows scratch directory, required by convert_workbook.vbs
+WindowsScratchDir = 'c:\\temp'
+
+# This procedure removes the path options from the list of command line
+# 'Arguments'. The remaining arguments and a dictionary of the options
+# are returned. Options not given on the command line are taken from
+# the environment.
+def ParseOptions(Arguments,Environment=None) :
+
+    "This procedure removes the path options from 'Arguments'"
+
+    if ( Environment is None ) : Environment = os.environ
+
+    Options = {}
+    for DirectoryType in DirectoryTypes : Options[DirectoryType] = Environment.get(EnvironmentPrefix + DirectoryType.upper() + '_DIR') or None
+    Options['instance'] = Environment.get(EnvironmentPrefix + 'INSTANCE') or None
+    Options['headless'] = Environment.get(EnvironmentPrefix + 'HEADLESS','') not in ['','0']
+    if ( os.name != 'nt' ) : Options['headless'] = True
+
+    Remaining = []
+
+    for Argument in Arguments :
+        Name,Separator,Value = Argument.partition('=')
+        if ( Separator and Name in DirectoryOptions ) :
+            Options[DirectoryOptions[Name]] = Value
+        elif ( Separator and Name == '--instance' ) :
+            Options['instance'] = Value
+        elif ( Argument == '--headless' ) :
+            Options['headless'] = True
+        else :
+            Remaining.append(Argument)
+
+    return Remaining,Options
+
+# This procedure returns the default directory of type 'DirectoryType'
+# for the current directory 'Currentdir'.
+def ReturnDefaultDirectory(DirectoryType,Currentdir) :
+
+    "This procedure returns the default directory of type 'DirectoryType'"
+
+    if ( DirectoryType != scratch ) : return os.path.join(Currentdir,DirectoryType)
+    if ( os.name == 'nt' ) : return WindowsScratchDir
+
+    return tempfile.gettempdir()
+
+# This procedure returns a dictionary of the directories given by
+# 'Options' ( see ParseOptions ). The log, data and scratch directories
+# are created if not present.
+def ReturnDirectories(Options,Currentdir=None) :
+
+    "This procedure returns a dictionary of the directories given by 'Options'"
+
+    if ( Currentdir is None ) : Currentdir = os.getcwd()
+
+    Directories = {}
+    for DirectoryType in DirectoryTypes :
+        Directory = Options.get(DirectoryType) or ReturnDefaultDirectory(DirectoryType,Currentdir)
+        if ( DirectoryType in WritableTypes ) :
+            if ( Options.get('instance') ) : Directory = os.path.join(Directory,Options['instance'])
+            os.makedirs(Directory,exist_ok=True)
+        Directories[DirectoryType] = Directory
+
+    return Directories
@@ -0,0 +1,898 @@
+# covid_update/pillar1.py
+#
+# Description
+# -----------
+# This module contains the processing phases of 'pillar1_covid_update.py'.
+# Each phase is a separate procedure so that it may be timed or reused
+# independently of the download of the data file:
+#
+# ReturnHeader            - Return the header line of a downloaded file
+# ParseData               - Extract rows for the monitored areas from the downloaded file
+# ComputeInfectious       - Derive the 'Infectious' column for each area
+# GenerateAlerts          - Generate increasing/decreasing log messages and the attention flag
+# GenerateGrowthAlerts    - Generate growth rate log messages and the attention flag
+# GenerateStatisticsLines - Generate the lines of the statistics file
+# ScanHotspots            - Rank every area of a tier by infectious growth
+# ReturnRevisionRows      - Return the key and values of every row of a tier for revision detection
+# GenerateRunAlerts       - Generate the increasing/decreasing, growth and cleared alert messages of a run
+#
+# together with the following procedures which use them:
+#
+# ParseOptions            - Remove the Pillar 1 processing options from the command line arguments
+# ReadConfiguration       - Parse the contents of a configuration file
+# Replay                  - Process a locally stored data file without network access
+# Sweep                   - Evaluate trends over a range of infectious periods and variations
+# Main                    - Run pillar1_covid_update.py
+#
+
+import heapq
+import os
+from datetime import date
+
+import covid_update.growth as Growth
+import covid_update.population as Population
+import covid_update.records as Records
+import covid_update.timeline as Timeline
+import covid_update.schema as Schema
+from covid_update.common import IsPresent,GenerateCSVRow,GenerateFieldList,GetDecimalPart,info,warning
+
+# Input data columns ( see schema.py ) and their positions in the data rows
+ColumnSchema = [('Area','areaName',1),('Type','areaType',2),('Date','date',3),('Daily','newCasesBySpecimenDate',6),
+                ('Cumulative','cumCasesBySpecimenDate',4),('Rate','cumCasesBySpecimenDateRate',5)]
+Columns = Schema.ReturnColumns(ColumnSchema)
+
+# Output data columns
+OutColumns = ['Area','Date','Daily','Infectious','Cumulative','Rate']
+
+# Script names
+module = 'pillar1_covid_update'
+
+# Spreadsheet
+Spreadsheet = 'excel.exe'
+
+# Hotspot scan defaults. Areas with fewer than 'HotspotMinimum' infectious
+# cases a week before the latest date are not ranked.
+HotspotCount = 10
+HotspotMinimum = 10
+HotspotDays = 7
+
+# This procedure returns a date object from a 'specimendate'.
+def ReturnDate(specimendate) :
+
+    "This procedure returns a date object from a 'specimendate'"
+
+    list = specimendate.split('-')
+    year = int(list[0])
+    month = int(list[1])
+    day = int(list[2])
+
+    return date(year, month, day)
+
+# This procedure will return a tier type string
+def ReturnTierType(string) :
+
+    "This procedure will return a shortened teir type string"
+
+    result = string
+
+    if ( string.startswith('utla') ) : result = 'upper'
+    if ( string.startswith('ltla') ) : result = 'lower'
+
+    return result
+
+# This procedure returns the header line of 'ResponseLines'.
+def ReturnHeader(ResponseLines) :
+
+    "This procedure returns the header line of 'ResponseLines'"
+
+    if ( len(ResponseLines) == 0 ) : return ''
+
+    return ResponseLines[0]
+
+# This procedure will extract the data rows for each of 'Areas' of tier
+# type 'TierString' from 'ResponseLines'. The columns are located using the
+# header line and the rows of each area are stored column by column in an
+# AreaSeries ( see records.py ). A dictionary of series in ascending date
+# order and a dictionary of row counts, both keyed by area, are returned.
+def ParseData(ResponseLines,TierString,Areas) :
+
+    "This procedure will extract the data rows for each of 'Areas' from 'ResponseLines'"
+
+    Header = ReturnHeader(ResponseLines)
+    Indexes,Unresolved = Schema.ResolveColumns(Header,ColumnSchema)
+    Ordinals = {}
+
+    # Intialize Area data sets and line counts
+    AreaData = {}
+    AreaDataCount = {}
+    for Area in Areas :
+        AreaData[Area] = Records.AreaSeries(Area,TierString)
+        AreaDataCount[Area] = 0
+
+    for ResponseLine in ResponseLines :
+
+        # Skip empty lines, the rows after them still being parsed
+        if ( len(ResponseLine) == 0 ) : continue
+
+        ResponseRow = ResponseLine.split(',')
+        if ( IsPresent(TierString,Indexes['Type'],ResponseRow) ) :
+            for Area in Areas :
+                if ( IsPresent(Area,Indexes['Area'],ResponseRow) ) :
+
+                    AreaDataCount[Area] += 1
+
+                    # Store date as an ordinal so date differences can be
+                    # calculated. Protects against decimal and null values
+                    # in the count fields which makes no sense.
+                    AreaData[Area].Append(ResponseRow[Indexes['Area']],Records.ReturnOrdinal(ResponseRow[Indexes['Date']],ReturnDate,Ordinals),
+                                          int(GetDecimalPart(ResponseRow[Indexes['Daily']])),
+                                          int(GetDecimalPart(ResponseRow[Indexes['Cumulative']])),
+                                          ResponseRow[Indexes['Rate']])
+
+    # Note: data is provided in descending date order and is sorted
+    for Area in Areas : AreaData[Area].Sort()
+
+    return AreaData,AreaDataCount
+
+# This procedure returns the ( message, level ) pairs of the header line of
+# 'ResponseLines' downloaded from 'Source', a warning being returned if any
+# columns are not found in the header.
+def ReturnHeaderMessages(ResponseLines,Source) :
+
+    "This procedure returns the ( message, level ) pairs of the header line of 'ResponseLines'"
+
+    Messages = []
+    Unresolved = Schema.ResolveColumns(ReturnHeader(ResponseLines),ColumnSchema)[1]
+    if ( len(Unresolved) > 0 ) :
+        Message = 'Columns %s not found in header of %s, default positions used' % (str(Unresolved),Source)
+        Messages.append((Message,warning))
+
+    return Messages
+
+# This procedure returns the ( message, level ) pairs of the parsed rows
+# 'AreaData' and row counts 'AreaDataCount' ( see ParseData ) of each of
+# 'Areas' of tier type 'TierString': the number of rows found and a warning
+# of any days missing from the data.
+def ReturnAreaMessages(AreaData,AreaDataCount,TierString,Areas) :
+
+    "This procedure returns the ( message, level ) pairs of the parsed rows of each of 'Areas'"
+
+    Messages = []
+    for Area in Areas :
+        Message = '%i data rows were found for %s %s ' % (AreaDataCount[Area],TierString,Area)
+        Messages.append((Message,info))
+        MissingCount = Timeline.BuildDaySeries(AreaData[Area].Dates,AreaData[Area].Cumulative).ReturnMissingCount()
+        if ( MissingCount > 0 ) :
+            Message = '%i days missing from the data for %s %s, the cumulative cases of the previous day used' % (MissingCount,TierString,Area)
+            Messages.append((Message,warning))
+
+    return Messages
+
+# This procedure returns the ( message, level ) pairs of each of 'Areas' of
+# tier type 'TierString' without a population in 'Populations', which are
+# not alerted per capita.
+def ReturnPopulationMessages(Populations,TierString,Areas) :
+
+    "This procedure returns the ( message, level ) pairs of each of 'Areas' without a population"
+
+    Messages = []
+    for Area in Areas :
+        if ( Area not in Populations ) :
+            Message = 'No population found for %s %s, not alerted per capita' % (TierString,Area)
+            Messages.append((Message,warning))
+
+    return Messages
+
+# This procedure will derive the number of infectious cases for each row
+# of 'AreaData'. The number of infectious cases is the cumulative number of
+# cases less the cumulative number of cases 'InfectiousPeriod' days earlier.
+# If the population of each area 'Populations' is given the infectious cases
+# per 100,000 people are added as 'InfectiousRate'. A dictionary keyed by
+# area of lists of output data dictionaries is returned.
+def ComputeInfectious(AreaData,InfectiousPeriod,Populations=None) :
+
+    "This procedure will derive the number of infectious cases for each row of 'AreaData'"
+
+    AreaResults = {}
+
+    for Area in AreaData :
+
+        Series = AreaData[Area]
+        Infectious = ReturnInfectiousSeries(Series.Dates,Series.Cumulative,InfectiousPeriod)
+        AreaResults[Area] = []
+
+        # Infectious cases per 100,000 people
+        InfectiousRates = None
+        if ( Populations is not None and Area in Populations ) :
+            InfectiousRates = [Population.ReturnPerCapita(Value,Populations[Area]) for Value in Infectious]
+
+        for SpecimenPeriod in range(0,len(Series)) :
+            OutData = {'Area':Series.Names[SpecimenPeriod],'Type':Series.Type,'Date':Series.ReturnDate(SpecimenPeriod),
+                       'Daily':Series.Daily[SpecimenPeriod],'Cumulative':Series.Cumulative[SpecimenPeriod],
+                       'Rate':Series.Rates[SpecimenPeriod],'Infectious':Infectious[SpecimenPeriod]}
+            if ( InfectiousRates is not None ) : OutData['InfectiousRate'] = InfectiousRates[SpecimenPeriod]
+            AreaResults[Area].append(OutData)
+
+    return AreaResults
+
+# This procedure returns an increasing/decreasing indicator string
+# for an 'Increase' in infectious cases.
+def ReturnIndicator(Increase,Variation) :
+
+    "This procedure returns an increasing/decreasing indicator string for an 'Increase' in infectious cases"
+
+    Indicator = 'Decreasing'
+    if ( Increase > 0 ) : Indicator = 'Potentially Increasing'
+    if ( Increase >= Variation ) : Indicator = 'Increasing'
+
+    return Indicator
+
+# This procedure will generate the increasing/decreasing log messages for
+# the last 'InfectiousPeriod' days of each area in 'AreaResults'. A list of
+# ( message, level ) pairs and the attention flag are returned. The attention
+# flag is set if the infectious count of any area has increased by at least
+# 'Variation' on the latest date. If 'PerCapita' is set the infectious cases
+# per 100,000 people are compared, 'Variation' being per 100,000, and areas
+# without a population are left out. If the alert state 'State' ( see
+# alertstate.py ) is given only new messages are returned and the attention
+# flag is only set for a newly raised alert. The areas raising the flag are
+# appended to the list 'Flagged' if given.
+def GenerateAlerts(AreaResults,InfectiousPeriod,Variation,State=None,PerCapita=False,Flagged=None) :
+
+    "This procedure will generate the increasing/decreasing log messages for each area in 'AreaResults'"
+
+    Messages = []
+    AttentionFlag = False
+
+    Value = 'Infectious'
+    if ( PerCapita ) : Value = 'InfectiousRate'
+
+    for Area in AreaResults :
+
+        Rows = AreaResults[Area]
+        RowCount = len(Rows)
+        if ( RowCount == 0 or Value not in Rows[0] ) : continue
+
+        # Messages for the days preceding the latest date
+        for SpecimenPeriod in range(2,RowCount) :
+            InfectiousPrevious = Rows[SpecimenPeriod - 2][Value]
+            if ( InfectiousPrevious == 0 ) : continue
+            if ( RowCount - SpecimenPeriod >= InfectiousPeriod ) : continue
+            Infectious = Rows[SpecimenPeriod - 1][Value]
+            Indicator = ReturnIndicator(Infectious - InfectiousPrevious,Variation)
+            if ( State is not None and not State.IsNew(Area,'infectious',Rows[SpecimenPeriod - 1]['Date'],Indicator) ) : continue
+            Message = 'Infectious cases %s in %s on %s' % (Indicator,Area,str(Rows[SpecimenPeriod - 1]['Date']))
+            Messages.append((Message,info))
+
+        # Generate final trend message and determine if attention flag should be raised
+        Infectious = Rows[RowCount - 1][Value]
+        InfectiousPrevious = 0
+        if ( RowCount > 1 ) : InfectiousPrevious = Rows[RowCount - 2][Value]
+        CurrentSpecimenDate = Rows[RowCount - 1]['Date']
+        Indicator = ReturnIndicator(Infectious - InfectiousPrevious,Variation)
+        Attention = ( Indicator == 'Increasing' )
+        if ( State is not None ) : Attention = State.IsRaised(Area,'infectious',CurrentSpecimenDate,Attention)
+        if ( Attention ) : AttentionFlag = True
+        if ( Attention and Flagged is not None ) : Flagged.append(Area)
+        if ( State is None or State.IsNew(Area,'infectious',CurrentSpecimenDate,Indicator) ) :
+            Message = 'Infectious cases %s in %s on %s' % (Indicator,Area,str(CurrentSpecimenDate))
+            Messages.append((Message,info))
+
+        # Log some good news
+        if ( Infectious == 0 and ( State is None or State.IsNew(Area,'zero',CurrentSpecimenDate,Infectious) ) ) :
+            Message = 'No infectious Pillar 1 cases in %s on %s' % (Area,str(CurrentSpecimenDate))
+            Messages.append((Message,info))
+
+    return Messages,AttentionFlag
+
+# This procedure will generate the growth log messages for the latest date
+# of each area in 'AreaResults' from the daily growth rate of its
+# infectious cases over the trailing 'Window' rows ( see growth.py ). A list
+# of ( message, level ) pairs and the attention flag are returned. The
+# attention flag is set if the whole confidence band of the growth rate of
+# any area is at least 'Threshold' a day, so that areas of any size are
+# alerted on relative growth. If the alert state 'State' is given only new
+# messages are returned and the attention flag is only set for a newly
+# raised alert. The areas raising the flag are appended to the list
+# 'Flagged' if given.
+def GenerateGrowthAlerts(AreaResults,Window,Threshold,State=None,Flagged=None) :
+
+    "This procedure will generate the growth log messages for the latest date of each area in 'AreaResults'"
+
+    Messages = []
+    AttentionFlag = False
+
+    for Area in AreaResults :
+
+        Rows = AreaResults[Area][-Window:]
+        if ( len(Rows) < Window ) : continue
+
+        Estimate = Growth.ReturnGrowthSeries([OutData['Date'].toordinal() for OutData in Rows],[OutData['Infectious'] for OutData in Rows],Window)[-1]
+        if ( Estimate is None ) : continue
+
+        CurrentSpecimenDate = Rows[-1]['Date']
+        Indicator = Growth.ReturnIndicator(Estimate,Threshold)
+        Attention = ( Indicator == 'Increasing' )
+        if ( State is not None ) : Attention = State.IsRaised(Area,'growth',CurrentSpecimenDate,Attention)
+        if ( Attention ) : AttentionFlag = True
+        if ( Attention and Flagged is not None ) : Flagged.append(Area)
+        if ( State is not None and not State.IsNew(Area,'growth',CurrentSpecimenDate,Indicator) ) : continue
+
+        Rate,Lower,Upper = Estimate
+        Message = 'Infectious cases growth %s in %s on %s, %+.1f%% a day ( %+.1f%% to %+.1f%% )' % (Indicator,Area,str(CurrentSpecimenDate),Rate * 100,Lower * 100,Upper * 100)
+        DoublingTime = Growth.ReturnDoublingTime(Rate)
+        if ( DoublingTime is not None and DoublingTime > 0 ) : Message += ' doubling in %.1f days' % DoublingTime
+        if ( DoublingTime is not None and DoublingTime < 0 ) : Message += ' halving in %.1f days' % -DoublingTime
+        Messages.append((Message,info))
+
+    return Messages,AttentionFlag
+
+# This procedure will generate the increasing/decreasing messages of
+# 'AreaResults' and, if 'GrowthWindow' is set, the growth rate messages
+# over 'GrowthWindow' rows, using the alert state 'State' if given ( see
+# alertstate.py ) and adding a message for each alert cleared. The areas
+# are flagged by the growth alert of 'GrowthThreshold' in place of the
+# increase in infectious cases if it is given. A list of ( message, level )
+# pairs, the attention flag and the list of flagged areas are returned.
+def GenerateRunAlerts(AreaResults,InfectiousPeriod,Variation,State=None,PerCapita=False,GrowthWindow=0,GrowthThreshold=None) :
+
+    "This procedure will generate the increasing/decreasing, growth and cleared alert messages of 'AreaResults'"
+
+    from covid_update.alertstate import GenerateClearedMessages
+
+    Flagged = []
+    Messages,AttentionFlag = GenerateAlerts(AreaResults,InfectiousPeriod,Variation,State,PerCapita,Flagged)
+
+    # Log the growth rate of each area, alerting on relative growth if a threshold is given
+    if ( GrowthWindow ) :
+        GrowthFlagged = []
+        GrowthMessages,GrowthAttentionFlag = GenerateGrowthAlerts(AreaResults,GrowthWindow,GrowthThreshold or 0.0,State,GrowthFlagged)
+        if ( GrowthThreshold is not None ) :
+            AttentionFlag = GrowthAttentionFlag
+            Flagged = GrowthFlagged
+        Messages += GrowthMessages
+
+    if ( State is not None ) : Messages += [(Message,info) for Message in GenerateClearedMessages(State)]
+
+    return Messages,AttentionFlag,Flagged
+
+# This procedure will generate the lines of the statistics file,
+# including the heading line, for 'AreaResults'.
+def GenerateStatisticsLines(AreaResults) :
+
+    "This procedure will generate the lines of the statistics file for 'AreaResults'"
+
+    # Column headings
+    yield GenerateCSVRow(OutColumns) + '\n'
+
+    for Area in AreaResults :
+        for OutData in AreaResults[Area] :
+            yield GenerateCSVRow(GenerateFieldList(OutColumns,OutData)) + '\n'
+
+# This procedure will return the number of infectious cases for each of
+# the date ordinals 'Ordinals' given the cumulative case counts
+# 'Cumulative'. The cumulative count 'InfectiousPeriod' days earlier is
+# looked up in a dense series of the counts ( see timeline.py ), missing
+# days taking the count of the latest earlier day, so the rows may have
+# gaps and be in any order. The first day of the series is not used as the
+# earlier day so that the counts of the first 'InfectiousPeriod' days are
+# the cumulative counts.
+def ReturnInfectiousSeries(Ordinals,Cumulative,InfectiousPeriod) :
+
+    "This procedure will return the number of infectious cases for each of the date ordinals 'Ordinals'"
+
+    Days = Timeline.BuildDaySeries(Ordinals,Cumulative,Timeline.forward)
+    Series = []
+
+    for Ordinal,Value in zip(Ordinals,Cumulative) :
+        Recovered = 0
+        if ( Days.ReturnIndex(Ordinal - InfectiousPeriod) > 0 ) : Recovered = Days.ReturnValue(Ordinal - InfectiousPeriod)
+        Series.append(Value - Recovered)
+
+    return Series
+
+# This procedure will compute the infectious cases of every area of tier
+# type 'TierString' in 'ResponseLines' in a single pass and return the
+# 'Count' areas with the highest growth in infectious cases over the last
+# 'HotspotDays' days. Areas with fewer than 'Minimum' infectious cases at
+# the start of that period are not ranked. A list of ( growth, increase,
+# area, infectious cases, earlier infectious cases, date ) is returned in
+# descending order of growth.
+def ScanHotspots(ResponseLines,TierString,InfectiousPeriod,Count=HotspotCount,Minimum=HotspotMinimum) :
+
+    "This procedure will return the 'Count' areas of tier type 'TierString' with the highest growth in infectious cases"
+
+    Indexes,Unresolved = Schema.ResolveColumns(ReturnHeader(ResponseLines),ColumnSchema)
+    Width = max(Indexes.values())
+    TypeIndex,AreaIndex,DateIndex,CumulativeIndex = Indexes['Type'],Indexes['Area'],Indexes['Date'],Indexes['Cumulative']
+
+    # Group rows by area converting each distinct date once
+    Ordinals = {}
+    AreaRows = {}
+    for ResponseLine in ResponseLines :
+        DataRow = ResponseLine.split(',')
+        if ( len(DataRow) <= Width or not DataRow[TypeIndex].startswith(TierString) ) : continue
+        DateString = DataRow[DateIndex]
+        if ( DateString not in Ordinals ) : Ordinals[DateString] = ReturnDate(DateString).toordinal()
+        AreaRows.setdefault(DataRow[AreaIndex],[]).append((Ordinals[DateString],int(GetDecimalPart(DataRow[CumulativeIndex])),DateString))
+
+    Candidates = []
+    for Area,Rows in AreaRows.items() :
+
+        # Note: data is provided in descending date order and is sorted
+        Rows.sort()
+        AreaOrdinals = [Row[0] for Row in Rows]
+        Series = ReturnInfectiousSeries(AreaOrdinals,[Row[1] for Row in Rows],InfectiousPeriod)
+
+        # Find the infectious cases 'HotspotDays' before the latest date
+        Earlier = Timeline.BuildDaySeries(AreaOrdinals,Series,Timeline.forward).ReturnValue(AreaOrdinals[-1] - HotspotDays)
+        if ( Earlier is None or Earlier < max(Minimum,1) ) : continue
+
+        Increase = Series[-1] - Earlier
+        Candidates.append((Increase / Earlier,Increase,Area,Series[-1],Earlier,Rows[-1][2]))
+
+    return heapq.nlargest(Count,Candidates)
+
+# This procedure returns the ( message, level ) pairs of the 'Hotspots'
+# found by ScanHotspots.
+def ReturnHotspotMessages(Hotspots) :
+
+    "This procedure returns the ( message, level ) pairs of the 'Hotspots' found by ScanHotspots"
+
+    Messages = []
+    for HotspotGrowth,Increase,Area,Infectious,Earlier,Date in Hotspots :
+        Message = 'Hotspot %s infectious cases %i on %s, up %i ( %+.0f%% ) in %i days' % (Area,Infectious,Date,Increase,HotspotGrowth * 100,HotspotDays)
+        Messages.append((Message,info))
+
+    return Messages
+
+# This procedure will return the ( ( area, date ), values ) pair of each
+# row of tier type 'TierString' in 'ResponseLines' for revision detection
+# ( see revisions.py ). The values are the daily and cumulative case
+# counts and the case rate as given in the file.
+def ReturnRevisionRows(ResponseLines,TierString) :
+
+    "This procedure will return the ( ( area, date ), values ) pair of each row of tier type 'TierString'"
+
+    Indexes,Unresolved = Schema.ResolveColumns(ReturnHeader(ResponseLines),ColumnSchema)
+    Width = max(Indexes.values())
+    TypeIndex,AreaIndex,DateIndex = Indexes['Type'],Indexes['Area'],Indexes['Date']
+    ValueIndexes = [Indexes['Daily'],Indexes['Cumulative'],Indexes['Rate']]
+
+    for ResponseLine in ResponseLines :
+        DataRow = ResponseLine.split(',')
+        if ( len(DataRow) <= Width or not DataRow[TypeIndex].startswith(TierString) ) : continue
+        yield (DataRow[AreaIndex],DataRow[DateIndex]),[DataRow[Index] for Index in ValueIndexes]
+
+# This procedure returns the ( message, level ) pairs of the revision
+# 'Changes' and 'Removed' row count ( see revisions.CompareRows ) written
+# to 'RevisionsFilename', a message being returned for each of 'Areas' of
+# tier type 'TierString' revised.
+def ReturnRevisionMessages(Changes,Removed,RevisionsFilename,TierString,Areas) :
+
+    "This procedure returns the ( message, level ) pairs of the revision 'Changes'"
+
+    from covid_update.revisions import ReturnRevisedAreas,revised
+
+    RevisionCount = len([Change for Change in Changes if Change[2] == revised])
+    Messages = [('%i rows added, %i rows revised and %i rows removed since the previous run, see %s' % (len(Changes) - RevisionCount,RevisionCount,Removed,RevisionsFilename),info)]
+    RevisedAreas = ReturnRevisedAreas(Changes)
+    for Area in Areas :
+        if ( Area in RevisedAreas ) : Messages.append(('Data for %s %s revised from %s' % (TierString,Area,RevisedAreas[Area]),info))
+
+    return Messages
+
+# This procedure returns the ( message, level ) pairs of the lower tier
+# areas 'Unmapped' missing from the area hierarchy 'HierarchyFilename' when
+# rolling up ( see hierarchy.RollUp ).
+def ReturnRollUpMessages(Unmapped,HierarchyFilename) :
+
+    "This procedure returns the ( message, level ) pairs of the lower tier areas 'Unmapped' missing from the area hierarchy"
+
+    Messages = []
+    if ( len(Unmapped) > 0 ) :
+        Message = '%i lower tier areas are not in %s e.g. %s' % (len(Unmapped),HierarchyFilename,Unmapped[0])
+        Messages.append((Message,warning))
+
+    return Messages
+
+# This procedure removes the Pillar 1 processing options from the list of
+# command line 'Arguments' ( see pillar1_covid_update.py ). The remaining
+# arguments and a dictionary of the options are returned:
+#
+# rollup      - Roll the higher tiers up from the lower tier file ( --rollup )
+# revisions   - Detect the rows revised since the previous run ( --revisions )
+# scan        - Number of hotspot areas of the whole tier logged ( --scan=<count> ), 0 for none
+# growth      - Growth rate window in rows ( --growth=<days> ), 0 for none
+# growthalert - Daily growth rate alerted on ( --growth-alert=<percent> ), None to alert on the increase
+def ParseOptions(Arguments) :
+
+    "This procedure removes the Pillar 1 processing options from 'Arguments'"
+
+    Options = {'rollup':False,'revisions':False,'scan':0,'growth':0,'growthalert':None}
+    Remaining = []
+
+    for Argument in Arguments :
+        if ( Argument == '--rollup' ) : Options['rollup'] = True
+        elif ( Argument == '--revisions' ) : Options['revisions'] = True
+        elif ( Argument.startswith('--scan=') ) : Options['scan'] = int(Argument.split('=',1)[1])
+        elif ( Argument.startswith('--growth=') ) : Options['growth'] = int(Argument.split('=',1)[1])
+        elif ( Argument.startswith('--growth-alert=') ) : Options['growthalert'] = float(Argument.split('=',1)[1]) / 100
+        else : Remaining.append(Argument)
+    if ( Options['growthalert'] is not None and Options['growth'] == 0 ) : Options['growth'] = Growth.DefaultWindow
+
+    return Remaining,Options
+
+# This procedure will parse the contents of a configuration file of the
+# form <url>,<tier type>,<infectious period>,<variation>,<area 1>,...
+# and return a configuration dictionary. The variation may be per capita
+# ( see population.py ).
+def ReadConfiguration(ConfigurationFileData) :
+
+    "This procedure will parse the contents of a configuration file and return a configuration dictionary"
+
+    ConfigurationFileDataList = ConfigurationFileData.strip().split(',')
+
+    Configuration = {}
+    Configuration['url'] = ConfigurationFileDataList[0]
+    Configuration['tier'] = ConfigurationFileDataList[1]
+    Configuration['period'] = int(ConfigurationFileDataList[2])
+    Configuration['variation'],Configuration['percapita'] = Population.ParseVariation(ConfigurationFileDataList[3])
+    Configuration['areas'] = ConfigurationFileDataList[4:]
+
+    return Configuration
+
+# This procedure will process the locally stored data file 'DataFilename'
+# using the configuration file 'ConfigurationFilename' without any network
+# access. The statistics file is written to 'OutputFilename' if specified.
+# The list of ( message, level ) pairs and the attention flag are returned.
+def Replay(DataFilename,ConfigurationFilename,OutputFilename=None) :
+
+    "This procedure will process the locally stored data file 'DataFilename' without any network access"
+
+    with open(ConfigurationFilename) as FileObject : Configuration = ReadConfiguration(FileObject.read())
+    with open(DataFilename) as FileObject : ResponseLines = FileObject.read().splitlines()
+
+    AreaData,AreaDataCount = ParseData(ResponseLines,Configuration['tier'],Configuration['areas'])
+    AreaResults = ComputeInfectious(AreaData,Configuration['period'],Population.ReturnAreaPopulations(AreaData,{}))
+    Messages,AttentionFlag = GenerateAlerts(AreaResults,Configuration['period'],Configuration['variation'],PerCapita=Configuration['percapita'])
+
+    if ( OutputFilename ) :
+        with open(OutputFilename,'w') as FileObject :
+            for Line in GenerateStatisticsLines(AreaResults) : FileObject.write(Line)
+
+    return Messages,AttentionFlag
+
+# This procedure will evaluate the final trend of each area in the locally
+# stored data file 'DataFilename' for each combination of infectious period
+# in 'Periods' and variation in 'Variations'. The data file is only parsed
+# once. A list of ( period, variation, increasing areas ) is returned.
+def Sweep(DataFilename,ConfigurationFilename,Periods,Variations) :
+
+    "This procedure will evaluate the final trend of each area for each combination of 'Periods' and 'Variations'"
+
+    with open(ConfigurationFilename) as FileObject : Configuration = ReadConfiguration(FileObject.read())
+    with open(DataFilename) as FileObject : ResponseLines = FileObject.read().splitlines()
+
+    AreaData,AreaDataCount = ParseData(ResponseLines,Configuration['tier'],Configuration['areas'])
+
+    Results = []
+    for InfectiousPeriod in Periods :
+        AreaResults = ComputeInfectious(AreaData,InfectiousPeriod)
+        for Variation in Variations :
+            Increasing = []
+            for Area in AreaResults :
+                Rows = AreaResults[Area]
+                if ( len(Rows) < 2 ) : continue
+                Increase = int(Rows[-1]['Infectious']) - int(Rows[-2]['Infectious'])
+                if ( ReturnIndicator(Increase,Variation) == 'Increasing' ) : Increasing.append(Area)
+            Results.append((InfectiousPeriod,Variation,Increasing))
+
+    return Results
+
+# This procedure runs pillar1_covid_update for the command line
+# 'Arguments' ( see pillar1_covid_update.py ).
+def Main(Arguments) :
+
+    "This procedure runs pillar1_covid_update for the command line 'Arguments'"
+
+    import File.Operations as File
+    import covid_update.instrument as Instrument
+    import covid_update.logstore as LogStore
+    import covid_update.paths as Paths
+    import covid_update.httpclient as HttpClient
+    import covid_update.store as Store
+    import covid_update.columnar as Columnar
+    import covid_update.hierarchy as Hierarchy
+    import covid_update.revisions as Revisions
+    import covid_update.alertstate as AlertState
+    import covid_update.budget as Budget
+    import covid_update.attention as Attention
+    from covid_update.discovery import CachePage
+    from covid_update.common import WriteLines,ReturnFileName,failure,empty,error,warning
+
+    # Process path options
+    Arguments,PathOptions = Paths.ParseOptions(Arguments)
+    Directories = Paths.ReturnDirectories(PathOptions)
+
+    # Process roll up, revision detection, hotspot scan and growth rate options
+    Arguments,ProcessingOptions = ParseOptions(Arguments)
+    RollUpTiers = ProcessingOptions['rollup']
+    TrackRevisions = ProcessingOptions['revisions']
+    HotspotScan = ProcessingOptions['scan']
+    GrowthWindow = ProcessingOptions['growth']
+    GrowthThreshold = ProcessingOptions['growthalert']
+
+    # File names and modes
+    LogDir = Directories[Paths.log]
+    ErrorFilename = os.path.join(LogDir,'log.txt')
+    ConfigDir = Directories[Paths.config]
+    ConfigurationFilename = os.path.join(ConfigDir,'pillar1_configuration.csv')
+    HierarchyFilename = os.path.join(ConfigDir,'area_hierarchy.csv')
+    PopulationFilename = os.path.join(ConfigDir,Population.IndexFileName)
+    DataDir = Directories[Paths.data]
+    append = 'a'
+    read = 'r'
+    overwrite = 'w'
+
+    # Process HTTP client options
+    Arguments,HttpOptions = HttpClient.ParseOptions(Arguments)
+    HttpClient.Configure(HttpOptions)
+
+    # Process results store option
+    Arguments,StoreOptions = Store.ParseOptions(Arguments)
+
+    # Process columnar output option
+    Arguments,ColumnarOptions = Columnar.ParseOptions(Arguments)
+
+    # Process alert state option
+    Arguments,AlertOptions = AlertState.ParseOptions(Arguments)
+
+    # Process memory budget option
+    Arguments,BudgetOptions = Budget.ParseOptions(Arguments)
+
+    # Process attention report option
+    Arguments,AttentionOptions = Attention.ParseOptions(Arguments)
+
+    # Process instrumentation options and start run report
+    Arguments,Options = Instrument.ParseOptions(Arguments)
+    ReportFilename = Options['report'] or Instrument.ReturnReportFileName(LogDir,module)
+    Report = Instrument.RunReport(module)
+    Profiler = Instrument.StartProfiling(Options['profile'])
+
+    # Store log messages in the log store, rotating the text log
+    File = LogStore.ReturnRecordingFile(File,LogDir,ErrorFilename)
+
+    # Create/open log file
+    ErrorFileObject = File.Open(ErrorFilename,append,failure)
+    Errormessage = 'Could not open ' + ErrorFilename
+    if ( ErrorFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    # Log start of script
+    File.Logerror(ErrorFileObject,module,'Started',info)
+
+    # Process optional configuration file argument
+    if ( len(Arguments) > 0 ) : ConfigurationFilename = os.path.join(ConfigDir,Arguments[0])
+
+    # Log progress messages
+    Errormessage = 'Reading configuration file %s ' % ConfigurationFilename
+    File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+    # Open and parse configuration file
+    Phase = Report.Start('config',file=ConfigurationFilename)
+    ConfigurationFileObject = File.Open(ConfigurationFilename,read,failure)
+    Errormessage = 'Could not open ' + ConfigurationFilename
+    if ( ConfigurationFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    ConfigurationFileData = File.Read(ConfigurationFileObject,empty)
+    if ( ConfigurationFileData != empty ) :
+        Configuration = ReadConfiguration(ConfigurationFileData)
+        CovidPage = Configuration['url']
+        TierString = Configuration['tier']
+        StatisticsFilename = os.path.join(DataDir,ReturnFileName('pillar1',ReturnTierType(TierString)))
+        DownloadFilename = os.path.join(Directories[Paths.scratch],'pillar1_%s.csv' % ReturnTierType(TierString))
+        InfectiousPeriod = Configuration['period']
+        Variation = Configuration['variation']
+        PerCapita = Configuration['percapita']
+        Areas = Configuration['areas']
+    else:
+        Errormessage = 'No data in ' + ConfigurationFilename
+        File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    # Close Configuration file
+    Errormessage = 'Could not close ' + ConfigurationFilename
+    if ( File.Close(ConfigurationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+    Report.Stop(Phase,areas=len(Areas))
+
+    # Higher tier data is derived from the lower tier file if rolling up
+    if ( TierString == Hierarchy.ltla ) : RollUpTiers = False
+    if ( RollUpTiers ) : CovidPage = Hierarchy.ReturnLtlaUrl(CovidPage)
+
+    # Log progress messages
+    Errormessage = 'Retrieving file %s ' % CovidPage
+    File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+    # 'Download' data file to the scratch directory in chunks. The lower tier
+    # file is shared by the runs for each tier when rolling up so is read
+    # through the page cache.
+    Phase = Report.Start('download',url=CovidPage)
+    # The lines of a downloaded file larger than the memory budget are read
+    # from disk as they are used
+    ResponseLines = []
+    if ( RollUpTiers ) :
+        DownloadFilename = CachePage(CovidPage,Directories[Paths.scratch])
+        Report.Stop(Phase,bytes=os.path.getsize(DownloadFilename) if DownloadFilename else 0)
+        if ( DownloadFilename ) :
+            ResponseLines = Budget.ReturnLines(DownloadFilename,'utf-8',BudgetOptions['budget'])
+    else :
+        Result = HttpClient.Download(CovidPage,DownloadFilename)
+        Report.Stop(Phase,status=Result['status'],bytes=Result['bytes'],wire=Result['wire'],retries=Result['retries'],resumes=Result['resumes'],sha256=Result['sha256'])
+        if ( Result['complete'] ) :
+            ResponseLines = Budget.ReturnLines(DownloadFilename,Result['encoding'],BudgetOptions['budget'])
+        else :
+            Errormessage = 'GET operation for %s failed' % CovidPage
+            File.Logerror(ErrorFileObject,module,Errormessage,error)
+    if ( Budget.IsSpilled(ResponseLines) ) :
+        Errormessage = '%s is larger than the memory budget, its lines are read from disk' % DownloadFilename
+        File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+    Phase = Report.Start('parse')
+    if ( len(ResponseLines) == 0 ) :
+        Errormessage = '%s is an empty file' % CovidPage
+        File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    # Warn of columns not found in the header line
+    for Message,Level in ReturnHeaderMessages(ResponseLines,CovidPage) : File.Logerror(ErrorFileObject,module,Message,Level)
+
+    # Build higher tier data rows from the lower tier data rows
+    if ( RollUpTiers ) :
+        HierarchyFileObject = File.Open(HierarchyFilename,read,failure)
+        Errormessage = 'Could not open ' + HierarchyFilename
+        if ( HierarchyFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+        AreaHierarchy = Hierarchy.ReadHierarchy(File.Read(HierarchyFileObject,empty))
+        Errormessage = 'Could not close ' + HierarchyFilename
+        if ( File.Close(HierarchyFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+        RollUpAreas = Areas
+        if ( HotspotScan ) : RollUpAreas = None
+        ResponseLines,Unmapped = Hierarchy.RollUp(ResponseLines,AreaHierarchy,TierString,RollUpAreas)
+        for Message,Level in ReturnRollUpMessages(Unmapped,HierarchyFilename) : File.Logerror(ErrorFileObject,module,Message,Level)
+
+    # Log progress messages
+    Errormessage = 'Extracting data for %s %s ' % (TierString,str(Areas))
+    File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+    # Extract data for specified Area's.
+    AreaData,AreaDataCount = ParseData(ResponseLines,TierString,Areas)
+    Report.Stop(Phase,lines=len(ResponseLines),rows=sum(AreaDataCount.values()))
+
+    # Dislay the number of data items detected for each area
+    for Message,Level in ReturnAreaMessages(AreaData,AreaDataCount,TierString,Areas) : File.Logerror(ErrorFileObject,module,Message,Level)
+
+    # Compare the rows of the tier with those of the previous run and report
+    # the added and revised rows
+    if ( TrackRevisions ) :
+        Phase = Report.Start('revisions')
+        HashFilename = os.path.join(DataDir,'pillar1_%s_hashes.txt' % ReturnTierType(TierString))
+        RevisionsFilename = os.path.join(DataDir,ReturnFileName('revisions',ReturnTierType(TierString)))
+        Hashes,Changes,Removed = Revisions.CompareRows(ReturnRevisionRows(ResponseLines,TierString),Revisions.ReadHashes(HashFilename))
+        Revisions.WriteHashes(HashFilename,Hashes)
+
+        RevisionsFileObject = File.Open(RevisionsFilename,overwrite,failure)
+        Errormessage = 'Could not open ' + RevisionsFilename
+        if ( RevisionsFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+        WriteLines(RevisionsFileObject,Revisions.GenerateRevisionLines(Changes))
+        Errormessage = 'Could not close ' + RevisionsFilename
+        if ( File.Close(RevisionsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+        for Message,Level in ReturnRevisionMessages(Changes,Removed,RevisionsFilename,TierString,Areas) : File.Logerror(ErrorFileObject,module,Message,Level)
+        RevisionCount = len([Change for Change in Changes if Change[2] == Revisions.revised])
+        Report.Stop(Phase,added=len(Changes) - RevisionCount,revised=RevisionCount,removed=Removed)
+
+    # Open Statics file
+    StatisticsFileObject = File.Open(StatisticsFilename,overwrite,failure)
+    Errormessage = 'Could not open ' + StatisticsFilename
+    if ( StatisticsFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    # Find the population of each area from the optional population index,
+    # else estimated from the case rate
+    PopulationIndex = {}
+    if ( os.path.exists(PopulationFilename) ) :
+        PopulationFileObject = File.Open(PopulationFilename,read,failure)
+        Errormessage = 'Could not open ' + PopulationFilename
+        if ( PopulationFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+        PopulationIndex = Population.ReadPopulations(File.Read(PopulationFileObject,empty))
+        Errormessage = 'Could not close ' + PopulationFilename
+        if ( File.Close(PopulationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+    Populations = Population.ReturnAreaPopulations(AreaData,PopulationIndex)
+    if ( PerCapita ) :
+        for Message,Level in ReturnPopulationMessages(Populations,TierString,Areas) : File.Logerror(ErrorFileObject,module,Message,Level)
+
+    # Derive infectious data
+    AreaResults = {}
+    for Area in AreaData :
+        Phase = Report.Start('compute',area=Area)
+        AreaResults.update(ComputeInfectious({Area:AreaData[Area]},InfectiousPeriod,Populations))
+        Report.Stop(Phase,rows=len(AreaResults[Area]))
+
+    # Print enhanced data
+    Phase = Report.Start('output',file=StatisticsFilename)
+    OutputBytes = WriteLines(StatisticsFileObject,GenerateStatisticsLines(AreaResults))
+    Report.Stop(Phase,bytes=OutputBytes)
+
+    # Write columnar copy of results
+    if ( ColumnarOptions['columnar'] ) :
+        ColumnarFilename = Columnar.ReturnColumnarFileName(StatisticsFilename,ColumnarOptions['columnar'])
+        Phase = Report.Start('columnar',file=ColumnarFilename)
+        try :
+            ColumnarBytes = Columnar.WriteTable(Columnar.BuildPillar1Table(AreaResults),ColumnarFilename,ColumnarOptions['columnar'])
+        except ImportError :
+            ColumnarBytes = 0
+            Errormessage = 'pyarrow is not installed, %s not written' % ColumnarFilename
+            File.Logerror(ErrorFileObject,module,Errormessage,warning)
+        Report.Stop(Phase,bytes=ColumnarBytes)
+
+    # Store results, replacing any revised days
+    if ( StoreOptions['store'] ) :
+        Phase = Report.Start('store',file=StoreOptions['store'])
+        Connection = Store.Open(StoreOptions['store'])
+        StoredRows = Store.StorePillar1(Connection,TierString,AreaResults,date.today())
+        Connection.close()
+        Report.Stop(Phase,rows=StoredRows)
+        Errormessage = '%i rows stored or revised in %s' % (StoredRows,StoreOptions['store'])
+        File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+    # Log increase/decrease messages and determine if attention flag should be raised
+    Phase = Report.Start('alert')
+    State = None
+    if ( AlertOptions['alertstate'] ) : State = AlertState.AlertState(AlertState.ReturnStateFileName(LogDir,module))
+    Messages,AttentionFlag,Flagged = GenerateRunAlerts(AreaResults,InfectiousPeriod,Variation,State,PerCapita,GrowthWindow,GrowthThreshold)
+    for Message,Level in Messages : File.Logerror(ErrorFileObject,module,Message,Level)
+    if ( State is not None ) :
+        State.Write()
+        Report.Count('suppressed',State.Suppressed)
+    Report.Stop(Phase,messages=len(Messages),attention=AttentionFlag)
+
+    # Log the areas of the whole tier with the highest growth in infectious cases
+    if ( HotspotScan ) :
+        Phase = Report.Start('scan',count=HotspotScan)
+        Hotspots = ScanHotspots(ResponseLines,TierString,InfectiousPeriod,HotspotScan)
+        for Message,Level in ReturnHotspotMessages(Hotspots) : File.Logerror(ErrorFileObject,module,Message,Level)
+        Report.Stop(Phase,areas=len(Hotspots))
+
+    # Close Statistics file
+    Errormessage = 'Could not close ' + StatisticsFilename
+    if ( File.Close(StatisticsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    # Display manual step message and launch Excel if increase in infectious total detected,
+    # writing an attention report of the flagged areas to view if requested
+    if ( AttentionFlag )  :
+        ViewFilename = StatisticsFilename
+        if ( AttentionOptions['attention'] ) :
+            ViewFilename = Attention.ReturnReportFileName(StatisticsFilename,AttentionOptions['attention'])
+            Phase = Report.Start('attention',file=ViewFilename)
+            Value = 'Infectious'
+            if ( PerCapita ) : Value = 'InfectiousRate'
+            Heading,Rows = Attention.BuildPillar1Report(AreaResults,Flagged,Variation,Value,GrowthWindow,GrowthThreshold)
+            AttentionBytes = Attention.WriteReport(ViewFilename,AttentionOptions['attention'],'Pillar 1 %s attention report' % TierString,Heading,Rows)
+            Report.Stop(Phase,bytes=AttentionBytes,areas=len(Flagged))
+        Errormessage = 'Increase in infectious count detected, please view %s' % ViewFilename
+        File.Logerror(ErrorFileObject,module,Errormessage,warning)
+        if ( not PathOptions['headless'] ) :
+            import Interface.Prompts as Interface
+            Interface.ViewSpeadsheet(Spreadsheet,ViewFilename)
+
+    # Stop any profiling and write run report
+    ProfileFilename = Instrument.StopProfiling(Profiler,Options['profile'],ReportFilename,Report)
+    if ( ProfileFilename ) : File.Logerror(ErrorFileObject,module,'Profile written to %s' % ProfileFilename,info)
+    Report.Write(ReportFilename)
+    File.Logerror(ErrorFileObject,module,'Run report written to %s' % ReportFilename,info)
+
+    # Log end of script
+    File.Logerror(ErrorFileObject,module,'Completed',info)
+
+    # Close error log file
+    Errormessage = 'Could not close ' + ErrorFilename
+    if ( File.Close(ErrorFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    return 0
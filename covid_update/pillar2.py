@@ -0,0 +1,669 @@
+# covid_update/pillar2.py
+#
+# Description
+# -----------
+# This module contains the processing phases of 'pillar2_covid_update.py'.
+# Each phase is a separate procedure so that it may be timed or reused
+# independently of the download of the data files:
+#
+# ReturnHeader            - Return the header line of a downloaded file
+# ParseSeries             - Extract the data rows of a testing or death series file
+# CorrectSeries           - Apply the correction rules to the columns of the data rows
+# ComputeSeries           - Derive the 'Rolling' and 'Percentage' columns
+# GenerateAlerts          - Generate increasing/decreasing log messages and the attention flag
+# GenerateStatisticsLines - Generate the lines of the statistics file
+#
+# together with the procedure Main which runs pillar2_covid_update.py
+#
+
+import os
+from datetime import date
+
+import covid_update.schema as Schema
+import covid_update.corrections as Corrections
+import covid_update.population as Population
+import covid_update.timeline as Timeline
+from covid_update.common import IsPresent,GenerateCSVRow,GenerateFieldList,ReturnDateDeath,MonthConverter,info
+
+# Data (file) types
+testing = 'testing'
+death = 'death'
+ConfigurationDataTypes = [testing,death]
+
+# Input data columns ( see schema.py ) and their positions in the data rows
+ColumnSchemas = {}
+ColumnSchemas[testing] = [('Date','Date',0),('Pillar','Pillar',3),('Daily','Daily',6),('CumulativeDaily','CumulativeDaily',7),
+                          ('Positive','Positive',10),('CumulativePositive','CumulativePositive',11)]
+ColumnSchemas[death] = [('Date','Date',0),('Daily','Daily',3),('Cumulative','Cumulative',2)]
+
+Columns = {}
+for DataType in ConfigurationDataTypes : Columns[DataType] = Schema.ReturnColumns(ColumnSchemas[DataType])
+
+# Columns converted to integers and the column whose change over the
+# rolling period is calculated
+NumericColumns = {}
+NumericColumns[testing] = ['Daily','Positive','CumulativePositive']
+NumericColumns[death] = ['Cumulative']
+RollingColumns = {testing:'CumulativePositive',death:'Cumulative'}
+
+# Data format change date when new columns relevant
+TestingDataChangeDate = date(2020,7,1)
+DeathDataFailDate = date(2020,7,16)
+DataDecrement = 30301
+
+# Default correction rules ( see corrections.py ), used if the file
+# pillar2_corrections.csv is not present. The date of one testing row
+# was published as text, and the cumulative positive tests restarted
+# from a lower total at the data change date.
+DefaultCorrections = 'testing,Date,replace,the,20/06/2020\ntesting,CumulativePositive,offset,%s,%i\n' % (TestingDataChangeDate.isoformat(),DataDecrement)
+DefaultRules = Corrections.ReadCorrections(DefaultCorrections)
+
+# Changes of data file layout from a given date
+LayoutChanges = {}
+LayoutChanges[testing] = [(TestingDataChangeDate,[('Positive','PositiveNew',12),('CumulativePositive','CumulativePositiveNew',13)])]
+LayoutChanges[death] = []
+
+# Script names
+module = 'pillar2_covid_update'
+
+# Area of the series in the population index ( see population.py )
+NationArea = 'England'
+
+# Spreadsheet
+Spreadsheet = 'excel.exe'
+
+# Output data columns
+Output = {}
+Output[testing] = {'Date':0,'Daily':1,'CumulativeDaily':2,'Positive':3,'Percentage':4,'CumulativePositive':5,'Rolling':6}
+Output[death] = {'Date':0,'Daily':1,'Cumulative':2,'Rolling':3}
+
+# This procedure returns a date object from a 'specimendate'.
+def ReturnDateTesting(specimendate) :
+
+    "This procedure returns a date object from a 'specimendate'"
+
+    list = specimendate.split('/')
+    year = int(list[2])
+    month = int(list[1])
+    day = int(list[0])
+
+    return date(year, month, day)
+
+# This procedure returns the header line of 'ResponseLines'.
+def ReturnHeader(ResponseLines) :
+
+    "This procedure returns the header line of 'ResponseLines'"
+
+    if ( len(ResponseLines) == 0 ) : return ''
+
+    return ResponseLines[0]
+
+# This procedure will extract the data rows of a series file of type
+# 'DataType' from 'ResponseLines'. The first line of 'ResponseLines' is
+# a header line used to locate the columns, the data rows being remapped
+# to the layout of 'Columns' applying on their date. Testing series rows
+# are only included if they match 'PillarString'. The date correction
+# rules of 'Rules' ( see corrections.py ) are applied to the date column
+# before the dates are converted and the remaining rules by CorrectSeries.
+# A list of data rows and a list of ( rule description, rows affected ) are
+# returned.
+def ParseSeries(ResponseLines,DataType,PillarString,Rules=None) :
+
+    "This procedure will extract the data rows of a series file of type 'DataType' from 'ResponseLines'"
+
+    if ( Rules is None ) : Rules = DefaultRules
+
+    SeriesData = []
+
+    Header = ReturnHeader(ResponseLines)
+    Indexes,Unresolved = Schema.ResolveColumns(Header,ColumnSchemas[DataType])
+    Mappers = Schema.ReturnLayoutMappers(Header,ColumnSchemas[DataType],LayoutChanges[DataType],date.min)
+
+    ResponseRows = []
+
+    for ResponseLine in ResponseLines[1:] :
+
+        # Skip empty lines, the rows after them still being parsed
+        if ( len(ResponseLine) == 0 ) : continue
+
+        # split data line
+        ResponseRow = ResponseLine.split(',')
+
+        # Skip any data lines in testing data that do not contain the right Pillar identification
+        # or are empty
+        if ( DataType == testing ) :
+            if not ( IsPresent(PillarString,Indexes['Pillar'],ResponseRow ) ) : continue
+            if ( len(ResponseRow[Indexes['Daily']]) == 0 ) : continue
+
+        # Skip any data lines with non numeric data where there should be.
+        if ( DataType == death ) :
+            if not ( ResponseRow[Indexes['Cumulative']].isdigit() ) : continue
+
+        ResponseRows.append(ResponseRow)
+
+    # Correct and convert the dates of all rows
+    DateStrings,Applied = Corrections.ApplyReplaceRules([ResponseRow[Indexes['Date']] for ResponseRow in ResponseRows],Corrections.SelectRules(Rules,DataType,'Date',Corrections.replace))
+
+    for ResponseRow,DateString in zip(ResponseRows,DateStrings) :
+
+        if ( DataType == death ) : ConvertedDate = ReturnDateDeath(DateString,MonthConverter)
+        if ( DataType == testing ) : ConvertedDate = ReturnDateTesting(DateString)
+
+        DataRow = Schema.SelectMapper(Mappers,ConvertedDate)(ResponseRow)
+        DataRow[Columns[DataType]['Date']] = ConvertedDate
+
+        # Protect against non numerical values after data change date.
+        if ( DataType == testing and ConvertedDate >= TestingDataChangeDate ) :
+            if not ( DataRow[Columns[testing]['Positive']].isdigit() ) : continue
+
+        # Build data structure
+        SeriesData.append(DataRow)
+
+    Applied.extend(CorrectSeries(SeriesData,DataType,Rules))
+
+    return SeriesData,Applied
+
+# This procedure will apply the correction rules of 'Rules', other than
+# those for the date column, to the columns of 'SeriesData' of type
+# 'DataType'. The 'NumericColumns' are converted to integers and the
+# offset of the 'RollingColumns' value is appended to each row. A list of
+# ( rule description, rows affected ) is returned.
+def CorrectSeries(SeriesData,DataType,Rules) :
+
+    "This procedure will apply the correction rules of 'Rules' to the columns of 'SeriesData'"
+
+    Applied = []
+
+    for Column in NumericColumns[DataType] :
+        Position = Columns[DataType][Column]
+        Values,ColumnApplied = Corrections.ApplyReplaceRules([DataRow[Position] for DataRow in SeriesData],Corrections.SelectRules(Rules,DataType,Column,Corrections.replace))
+        for DataRow,Value in zip(SeriesData,Values) : DataRow[Position] = int(Value)
+        Applied.extend(ColumnApplied)
+
+    Dates = [DataRow[Columns[DataType]['Date']] for DataRow in SeriesData]
+    Offsets,OffsetApplied = Corrections.ReturnOffsets(Dates,Corrections.SelectRules(Rules,DataType,RollingColumns[DataType],Corrections.offset))
+    for DataRow,Offset in zip(SeriesData,Offsets) : DataRow.append(Offset)
+    Applied.extend(OffsetApplied)
+
+    return Applied
+
+# This procedure will derive the 'Rolling' column and, for testing
+# series, the 'Percentage' column for each row of 'SeriesData'. The
+# rolling value is the change in the 'RollingColumns' value, including
+# any correction offset, over 'RollingPeriod' days, the earlier value being
+# looked up in a dense series of the values ( see timeline.py ). Missing
+# days take the value of the latest earlier day, so the rows may have gaps
+# and be in any order. The rolling value is zero until 'RollingPeriod' days
+# after the first day. If the population 'NationPopulation' is given the
+# rolling value per 100,000 people is added as 'RollingRate'. A list of
+# output data dictionaries is returned.
+def ComputeSeries(SeriesData,DataType,RollingPeriod,NationPopulation=None) :
+
+    "This procedure will derive the 'Rolling' and 'Percentage' columns for each row of 'SeriesData'"
+
+    SeriesResults = []
+
+    DateColumn = Columns[DataType]['Date']
+    CumulativeColumn = Columns[DataType][RollingColumns[DataType]]
+    OffsetColumn = len(Columns[DataType])
+
+    Ordinals = [DataRow[DateColumn].toordinal() for DataRow in SeriesData]
+    Totals = [DataRow[CumulativeColumn] + DataRow[OffsetColumn] for DataRow in SeriesData]
+    Days = Timeline.BuildDaySeries(Ordinals,Totals,Timeline.forward)
+
+    for SpecimenPeriod in range(0,len(SeriesData)) :
+
+        OutData = {}
+        for Column in Columns[DataType] : OutData[Column] = SeriesData[SpecimenPeriod][Columns[DataType][Column]]
+
+        Rolling = 0
+        PreviousOrdinal = Ordinals[SpecimenPeriod] - RollingPeriod
+        if ( Days.ReturnIndex(PreviousOrdinal) > 0 ) : Rolling = Totals[SpecimenPeriod] - Days.ReturnValue(PreviousOrdinal)
+
+        # Output derived fields
+        OutData['Rolling'] = Rolling
+        if ( NationPopulation ) : OutData['RollingRate'] = Population.ReturnPerCapita(Rolling,NationPopulation)
+
+        if ( DataType == testing ) :
+            Percentage = (SeriesData[SpecimenPeriod][Columns[testing]['Positive']]/SeriesData[SpecimenPeriod][Columns[testing]['Daily']]) * 100
+            OutData['Percentage'] = round(Percentage,2)
+
+        SeriesResults.append(OutData)
+
+    return SeriesResults
+
+# This procedure returns an increasing/decreasing indicator string
+# for an 'Increase' in a series value.
+def ReturnIndicator(Increase,Variation) :
+
+    "This procedure returns an increasing/decreasing indicator string for an 'Increase' in a series value"
+
+    Indicator = 'Decreasing'
+    if ( Increase > 0 ) : Indicator = 'Potentially increasing'
+    if ( Increase >= Variation ) : Indicator = 'Increasing'
+
+    return Indicator
+
+# This procedure returns the column of the series of type 'DataType' which
+# is alerted on: the rolling number of deaths, per 100,000 people if
+# 'PerCapita' is set, or the percentage of positive tests.
+def ReturnAlertColumn(DataType,PerCapita=False) :
+
+    "This procedure returns the column of the series of type 'DataType' which is alerted on"
+
+    if ( DataType == testing ) : return 'Percentage'
+    if ( PerCapita ) : return 'RollingRate'
+
+    return 'Rolling'
+
+# This procedure will generate the increasing/decreasing log messages for
+# 'SeriesResults' of type 'DataType'. For death series the rolling number
+# of deaths is compared, per 100,000 people if 'PerCapita' is set, and for
+# testing series the percentage of positive tests ( see ReturnAlertColumn ). A list of ( message,
+# level ) pairs and the attention flag are returned. If the alert state
+# 'State' ( see alertstate.py ) is given only new messages are returned and
+# the attention flag is only set for a newly raised alert.
+def GenerateAlerts(SeriesResults,DataType,Variation,State=None,PerCapita=False) :
+
+    "This procedure will generate the increasing/decreasing log messages for 'SeriesResults'"
+
+    Messages = []
+    AttentionFlag = False
+
+    Value = ReturnAlertColumn(DataType,PerCapita)
+    if ( DataType == death ) : Text = 'The rolling number of deaths was %s on %s'
+    if ( DataType == testing ) : Text = 'The  percentage number of positive tests was %s on %s'
+
+    RowCount = len(SeriesResults)
+    if ( RowCount == 0 or Value not in SeriesResults[0] ) : return Messages,AttentionFlag
+
+    # Messages for the dates preceding the latest date
+    for SpecimenPeriod in range(2,RowCount) :
+        Previous = SeriesResults[SpecimenPeriod - 2][Value]
+        if ( Previous == 0 ) : continue
+        Current = SeriesResults[SpecimenPeriod - 1][Value]
+        Indicator = ReturnIndicator(Current - Previous,Variation)
+        if ( State is not None and not State.IsNew(DataType,Value.lower(),SeriesResults[SpecimenPeriod - 1]['Date'],Indicator) ) : continue
+        Messages.append((Text % (Indicator,SeriesResults[SpecimenPeriod - 1]['Date']),info))
+
+    # Generate final trend messages and determine if an attention flag should be set
+    Current = SeriesResults[RowCount - 1][Value]
+    Previous = 0
+    if ( RowCount > 1 ) : Previous = SeriesResults[RowCount - 2][Value]
+    Indicator = ReturnIndicator(Current - Previous,Variation)
+    AttentionFlag = ( Indicator == 'Increasing' )
+    if ( State is not None ) : AttentionFlag = State.IsRaised(DataType,Value.lower(),SeriesResults[RowCount - 1]['Date'],AttentionFlag)
+    if ( State is None or State.IsNew(DataType,Value.lower(),SeriesResults[RowCount - 1]['Date'],Indicator) ) :
+        Messages.append((Text % (Indicator,SeriesResults[RowCount - 1]['Date']),info))
+
+    return Messages,AttentionFlag
+
+# This procedure will generate the lines of the statistics file,
+# including the heading line, for 'SeriesResults' of type 'DataType'.
+def GenerateStatisticsLines(SeriesResults,DataType) :
+
+    "This procedure will generate the lines of the statistics file for 'SeriesResults'"
+
+    # Column headings
+    yield GenerateCSVRow(Output[DataType]) + '\n'
+
+    for OutData in SeriesResults :
+        yield GenerateCSVRow(GenerateFieldList(Output[DataType],OutData)) + '\n'
+
+# This procedure will determine if the data type specified
+# by string is valid. It compares string with all the key
+# values of dictionary.
+def ConfigurationDataTypeValid(string,dictionary) :
+
+    "This procedure will determine if the data type specified by string is valid"
+
+    result = False
+
+    for key in dictionary :
+        if ( key == string ) : result = True
+
+    return result
+
+# This procedure runs pillar2_covid_update for the command line
+# 'Arguments' ( see pillar2_covid_update.py ).
+def Main(Arguments) :
+
+    "This procedure runs pillar2_covid_update for the command line 'Arguments'"
+
+    import File.Operations as File
+    import covid_update.instrument as Instrument
+    import covid_update.logstore as LogStore
+    import covid_update.paths as Paths
+    import covid_update.httpclient as HttpClient
+    import covid_update.store as Store
+    import covid_update.columnar as Columnar
+    import covid_update.alertstate as AlertState
+    import covid_update.budget as Budget
+    import covid_update.attention as Attention
+    from covid_update.discovery import FindDownloadFiles
+    from covid_update.common import Fetch,WriteLines,ReturnFileName,failure,empty,error,warning
+
+    # Process path options
+    Arguments,PathOptions = Paths.ParseOptions(Arguments)
+    Directories = Paths.ReturnDirectories(PathOptions)
+
+    # File names and modes
+    LogDir = Directories[Paths.log]
+    ErrorFilename = os.path.join(LogDir,'log.txt')
+    ConfigDir = Directories[Paths.config]
+    ConfigurationFilename = os.path.join(ConfigDir,'pillar2_configuration.csv')
+    CorrectionsFilename = os.path.join(ConfigDir,'pillar2_corrections.csv')
+    PopulationFilename = os.path.join(ConfigDir,Population.IndexFileName)
+    DataDir = Directories[Paths.data]
+    append = 'a'
+    read = 'r'
+    overwrite = 'w'
+
+    # Process HTTP client options
+    Arguments,HttpOptions = HttpClient.ParseOptions(Arguments)
+    HttpClient.Configure(HttpOptions)
+
+    # Process results store option
+    Arguments,StoreOptions = Store.ParseOptions(Arguments)
+
+    # Process columnar output option
+    Arguments,ColumnarOptions = Columnar.ParseOptions(Arguments)
+
+    # Process memory budget option
+    Arguments,BudgetOptions = Budget.ParseOptions(Arguments)
+
+    # Process attention report option
+    Arguments,AttentionOptions = Attention.ParseOptions(Arguments)
+
+    # Process alert state option
+    Arguments,AlertOptions = AlertState.ParseOptions(Arguments)
+    State = None
+    if ( AlertOptions['alertstate'] ) : State = AlertState.AlertState(AlertState.ReturnStateFileName(LogDir,module))
+
+    # Process instrumentation options and start run report
+    Arguments,Options = Instrument.ParseOptions(Arguments)
+    ReportFilename = Options['report'] or Instrument.ReturnReportFileName(LogDir,module)
+    Report = Instrument.RunReport(module)
+    Profiler = Instrument.StartProfiling(Options['profile'])
+
+    # Data (file) types
+    ConfigurationDataTypePresent = {}
+    ConfigurationDataTypeIndex = {}
+    AttentionFlag = {}
+    ViewFilenames = {}
+
+    for ConfigurationDataType in ConfigurationDataTypes :
+        ConfigurationDataTypePresent[ConfigurationDataType] = False
+        ConfigurationDataTypeIndex[ConfigurationDataType] = 0
+        AttentionFlag[ConfigurationDataType] = False
+
+    # Store log messages in the log store, rotating the text log
+    File = LogStore.ReturnRecordingFile(File,LogDir,ErrorFilename)
+
+    # Create/open log file
+    ErrorFileObject = File.Open(ErrorFilename,append,failure)
+    Errormessage = 'Could not open ' + ErrorFilename
+    if ( ErrorFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    # Log start of script
+    File.Logerror(ErrorFileObject,module,'Started',info)
+
+    # Log progress messages
+    Errormessage = 'Reading configuration file %s ' % ConfigurationFilename
+    File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+    # Open and parse configuration file
+    Phase = Report.Start('config',file=ConfigurationFilename)
+    ConfigurationFileObject = File.Open(ConfigurationFilename,read,failure)
+    Errormessage = 'Could not open ' + ConfigurationFilename
+    if ( ConfigurationFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    ConfigurationFileData = File.Read(ConfigurationFileObject,empty)
+    if ( ConfigurationFileData != empty ) :
+        ConfigurationFileDataLines = ConfigurationFileData.split('\n')
+    else:
+        Errormessage = 'No data in ' + ConfigurationFilename
+        File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+    # Close Configuration file
+    Errormessage = 'Could not close ' + ConfigurationFilename
+    if ( File.Close(ConfigurationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    # Parse configuration file.
+    ConfigurationFileDataLists = []
+    DataIndex = 0
+
+    for ConfigurationFileDataLine in ConfigurationFileDataLines :
+
+        ConfigurationFileDataList = ConfigurationFileDataLine.split(',')
+        ConfigurationDataType = ConfigurationFileDataList[0]
+
+        if ( ConfigurationDataTypeValid(ConfigurationDataType,ConfigurationDataTypePresent) ) :
+            ConfigurationFileDataLists.append(ConfigurationFileDataList)
+            ConfigurationDataTypePresent[ConfigurationDataType] = True
+            ConfigurationDataTypeIndex[ConfigurationDataType] = DataIndex
+        else :
+            Errormessage = 'Data type %s specified in line %i is not valid ' % (ConfigurationDataType,(DataIndex + 1))
+            File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+        DataIndex += 1
+
+    Report.Stop(Phase,lines=len(ConfigurationFileDataLists))
+
+    # Read correction rules file if present
+    Rules = DefaultRules
+    if ( os.path.exists(CorrectionsFilename) ) :
+        Errormessage = 'Reading correction rules file %s ' % CorrectionsFilename
+        File.Logerror(ErrorFileObject,module,Errormessage,info)
+        CorrectionsFileObject = File.Open(CorrectionsFilename,read,failure)
+        Errormessage = 'Could not open ' + CorrectionsFilename
+        if ( CorrectionsFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+        Rules = Corrections.ReadCorrections(File.Read(CorrectionsFileObject,empty))
+        Errormessage = 'Could not close ' + CorrectionsFilename
+        if ( File.Close(CorrectionsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    # Find the population of England for per capita death alerts from the
+    # optional population index
+    NationPopulation = None
+    if ( os.path.exists(PopulationFilename) ) :
+        PopulationFileObject = File.Open(PopulationFilename,read,failure)
+        Errormessage = 'Could not open ' + PopulationFilename
+        if ( PopulationFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+        NationPopulation = Population.ReadPopulations(File.Read(PopulationFileObject,empty)).get(NationArea)
+        Errormessage = 'Could not close ' + PopulationFilename
+        if ( File.Close(PopulationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    # Scrape web content to determine download file urls. Each distinct
+    # web page is only downloaded once.
+    DownLoadRequests = []
+    for ConfigurationFileDataList in ConfigurationFileDataLists : DownLoadRequests.append((ConfigurationFileDataList[1],ConfigurationFileDataList[2]))
+
+    Phase = Report.Start('discovery',pages=len(set([Request[0] for Request in DownLoadRequests])))
+    FoundFiles = FindDownloadFiles(DownLoadRequests,Directories[Paths.scratch])
+    Report.Stop(Phase,found=len([DownLoadFile for DownLoadFile in FoundFiles if DownLoadFile]))
+
+    # Determine url's for download files.
+    DownLoadFiles = []
+
+    for ConfigurationFileDataList,DownLoadFile in zip(ConfigurationFileDataLists,FoundFiles) :
+
+        ConfigurationDataType = ConfigurationFileDataList[0]
+        if ( len(DownLoadFile) == 0 ) :
+            Errormessage = 'No download file for data type %s found' % ConfigurationDataType
+            File.Logerror(ErrorFileObject,module,Errormessage,error)
+        else:
+            DownLoadFiles.append(DownLoadFile)
+
+
+    # Intialize series data sets
+    SeriesData = {}
+    for ConfigurationDataType in ConfigurationDataTypes : SeriesData[ConfigurationDataType] = []
+
+    # Initialize series line counts
+    SeriesDataCount = {}
+    for ConfigurationDataType in ConfigurationDataTypes : SeriesDataCount[ConfigurationDataType] = 0
+
+    # Download and parse data files
+    for ConfigurationDataType in ConfigurationDataTypes :
+
+        if ( ConfigurationDataTypePresent[ConfigurationDataType] ) :
+
+            # Retrieve configuration items
+            DownLoadFile = DownLoadFiles[ConfigurationDataTypeIndex[ConfigurationDataType]]
+            ConfigurationFileDataList = ConfigurationFileDataLists[ConfigurationDataTypeIndex[ConfigurationDataType]]
+            PillarString = ConfigurationFileDataList[3]
+
+            # Log progress messages
+            Errormessage = 'Retrieving %s data file ' % ConfigurationDataType
+            File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+            # With a memory budget the file is downloaded to the scratch
+            # directory and its lines read from disk if larger than the budget
+            Phase = Report.Start('download',url=DownLoadFile,type=ConfigurationDataType)
+            if ( BudgetOptions['budget'] is None ) :
+                Response = Fetch(DownLoadFile)
+                Report.Stop(Phase,status=Response.status_code,bytes=len(Response.content),wire=HttpClient.ReturnWireBytes(Response),retries=HttpClient.ReturnRetries(Response),latency=Response.elapsed.total_seconds())
+                Complete = ( Response.status_code == 200 )
+            else :
+                DownloadFilename = os.path.join(Directories[Paths.scratch],'pillar2_%s.csv' % ConfigurationDataType)
+                Result = HttpClient.Download(DownLoadFile,DownloadFilename)
+                Report.Stop(Phase,status=Result['status'],bytes=Result['bytes'],wire=Result['wire'],retries=Result['retries'],resumes=Result['resumes'],sha256=Result['sha256'])
+                Complete = Result['complete']
+            if ( not Complete ) :
+                Errormessage = 'GET operation for %s failed' % DownLoadFile
+                File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+            Phase = Report.Start('parse',type=ConfigurationDataType)
+            if ( BudgetOptions['budget'] is None ) :
+                ResponseLines = Response.text.splitlines()
+                del Response
+            else :
+                ResponseLines = []
+                if ( Complete ) : ResponseLines = Budget.ReturnLines(DownloadFilename,Result['encoding'],BudgetOptions['budget'])
+            if ( len(ResponseLines) == 0 ) :
+                Errormessage = '%s is an empty file' % DownLoadFile
+                File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+            # Warn of columns not found in the header line
+            Unresolved = Schema.ResolveColumns(ReturnHeader(ResponseLines),ColumnSchemas[ConfigurationDataType])[1]
+            if ( len(Unresolved) > 0 ) :
+                Errormessage = 'Columns %s not found in header of %s, default positions used' % (str(Unresolved),DownLoadFile)
+                File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+            # Extract data rows
+            SeriesData[ConfigurationDataType],Applied = ParseSeries(ResponseLines,ConfigurationDataType,PillarString,Rules)
+            SeriesDataCount[ConfigurationDataType] = len(SeriesData[ConfigurationDataType])
+            Report.Stop(Phase,lines=len(ResponseLines),rows=SeriesDataCount[ConfigurationDataType])
+
+            # Log the rows affected by each correction rule
+            for Description,Affected in Applied :
+                Errormessage = 'Correction %s applied to %i rows' % (Description,Affected)
+                File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+
+    # Process file data.
+    for ConfigurationDataType in ConfigurationDataTypes :
+
+        # Log progress messages
+        Errormessage = 'Processing %s data file ' % ConfigurationDataType
+        File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+        # Retrieve configuration information
+        ConfigurationFileDataList = ConfigurationFileDataLists[ConfigurationDataTypeIndex[ConfigurationDataType]]
+        RollingPeriod =  int(ConfigurationFileDataList[4])
+        PerCapita = False
+        if ( ConfigurationDataType == death) : Variation,PerCapita = Population.ParseVariation(ConfigurationFileDataList[5])
+        if ( ConfigurationDataType == testing) : Variation = float(ConfigurationFileDataList[5])
+        if ( PerCapita and NationPopulation is None ) :
+            Errormessage = 'No population found for %s in %s, %s not alerted per capita' % (NationArea,PopulationFilename,ConfigurationDataType)
+            File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+        # Generate statistics file name
+        StatisticsFilename = os.path.join(DataDir,ReturnFileName('pillar2',ConfigurationDataType))
+
+        # Open statics file
+        StatisticsFileObject = File.Open(StatisticsFilename,overwrite,failure)
+        Errormessage = 'Could not open ' + StatisticsFilename
+        if ( StatisticsFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+        # Generate derived data
+        Phase = Report.Start('compute',type=ConfigurationDataType)
+        SeriesResults = ComputeSeries(SeriesData[ConfigurationDataType],ConfigurationDataType,RollingPeriod,NationPopulation)
+        Report.Stop(Phase,rows=len(SeriesResults))
+
+        # Print enhanced data
+        Phase = Report.Start('output',file=StatisticsFilename,type=ConfigurationDataType)
+        OutputBytes = WriteLines(StatisticsFileObject,GenerateStatisticsLines(SeriesResults,ConfigurationDataType))
+        Report.Stop(Phase,bytes=OutputBytes)
+
+        # Write columnar copy of results
+        if ( ColumnarOptions['columnar'] ) :
+            ColumnarFilename = Columnar.ReturnColumnarFileName(StatisticsFilename,ColumnarOptions['columnar'])
+            Phase = Report.Start('columnar',file=ColumnarFilename,type=ConfigurationDataType)
+            try :
+                ColumnarBytes = Columnar.WriteTable(Columnar.BuildPillar2Table(SeriesResults,Output[ConfigurationDataType]),ColumnarFilename,ColumnarOptions['columnar'])
+            except ImportError :
+                ColumnarBytes = 0
+                Errormessage = 'pyarrow is not installed, %s not written' % ColumnarFilename
+                File.Logerror(ErrorFileObject,module,Errormessage,warning)
+            Report.Stop(Phase,bytes=ColumnarBytes)
+
+        # Store results, replacing any revised days
+        if ( StoreOptions['store'] ) :
+            Phase = Report.Start('store',file=StoreOptions['store'],type=ConfigurationDataType)
+            Connection = Store.Open(StoreOptions['store'])
+            StoredRows = Store.StorePillar2(Connection,ConfigurationDataType,SeriesResults,date.today())
+            Connection.close()
+            Report.Stop(Phase,rows=StoredRows)
+            Errormessage = '%i %s rows stored or revised in %s' % (StoredRows,ConfigurationDataType,StoreOptions['store'])
+            File.Logerror(ErrorFileObject,module,Errormessage,info)
+
+        # Generate trend messages and determine if an attention flag should be set
+        Phase = Report.Start('alert',type=ConfigurationDataType)
+        Messages,AttentionFlag[ConfigurationDataType] = GenerateAlerts(SeriesResults,ConfigurationDataType,Variation,State,PerCapita)
+        for Message,Level in Messages : File.Logerror(ErrorFileObject,module,Message,Level)
+        Report.Stop(Phase,messages=len(Messages),attention=AttentionFlag[ConfigurationDataType])
+
+        # Write an attention report of the latest days to view if requested
+        if ( AttentionFlag[ConfigurationDataType] and AttentionOptions['attention'] ) :
+            ViewFilenames[ConfigurationDataType] = Attention.ReturnReportFileName(StatisticsFilename,AttentionOptions['attention'])
+            Phase = Report.Start('attention',file=ViewFilenames[ConfigurationDataType],type=ConfigurationDataType)
+            Heading,Rows = Attention.BuildPillar2Report(SeriesResults,Variation,ReturnAlertColumn(ConfigurationDataType,PerCapita))
+            AttentionBytes = Attention.WriteReport(ViewFilenames[ConfigurationDataType],AttentionOptions['attention'],'Pillar 2 %s attention report' % ConfigurationDataType,Heading,Rows)
+            Report.Stop(Phase,bytes=AttentionBytes)
+
+        # Close Statistics file
+        Errormessage = 'Could not close ' + StatisticsFilename
+        if ( File.Close(StatisticsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    # Log cleared alerts and keep the alert state for the next run
+    if ( State is not None ) :
+        for Message in AlertState.GenerateClearedMessages(State) : File.Logerror(ErrorFileObject,module,Message,info)
+        State.Write()
+        Report.Count('suppressed',State.Suppressed)
+
+    # Processes attention flags.
+    for ConfigurationDataType in ConfigurationDataTypes :
+        StatisticsFilename = os.path.join(DataDir,ReturnFileName('pillar2',ConfigurationDataType))
+        ViewFilename = ViewFilenames.get(ConfigurationDataType,StatisticsFilename)
+        if ( AttentionFlag[ConfigurationDataType] ) :
+            Errormessage = 'Attention flag set for %s please view' % ViewFilename
+            File.Logerror(ErrorFileObject,module,Errormessage,warning)
+            if ( not PathOptions['headless'] ) :
+                import Interface.Prompts as Interface
+                Interface.ViewSpeadsheet(Spreadsheet,ViewFilename)
+
+    # Stop any profiling and write run report
+    ProfileFilename = Instrument.StopProfiling(Profiler,Options['profile'],ReportFilename,Report)
+    if ( ProfileFilename ) : File.Logerror(ErrorFileObject,module,'Profile written to %s' % ProfileFilename,info)
+    Report.Write(ReportFilename)
+    File.Logerror(ErrorFileObject,module,'Run report written to %s' % ReportFilename,info)
+
+    # Log end of script
+    File.Logerror(ErrorFileObject,module,'Completed',info)
+
+    # Close error log file
+    Errormessage = 'Could not close ' + ErrorFilename
+    if ( File.Close(ErrorFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    return 0
@@ -0,0 +1,637 @@
+# covid_update/pipeline.py
+#
+# Description
+# -----------
+# This module runs the daily updates of covid_update.bat as a graph of
+# tasks rather than a fixed serial list. Each Pillar 1 configuration file
+# is a branch of tasks using the processing phases of pillar1.py:
+#
+# config:<file>    - Read the configuration file
+# fetch:<file>     - Download the data file to the scratch directory, kept if
+#                    unchanged on the server ( a conditional request )
+# parse:<file>     - Extract the rows of the configured areas
+# compute:<file>   - Derive the infectious cases of each area
+# alert:<file>     - Generate the increasing/decreasing and growth messages
+# write:<file>     - Write the statistics file
+#
+# and, if the corresponding options are given:
+#
+# hierarchy        - Read the area hierarchy, the higher tiers being rolled
+#                    up from the lower tier file ( --rollup )
+# revisions:<file> - Report the rows revised since the previous run ( --revisions )
+# scan:<file>      - Log the hotspot areas of the whole tier ( --scan=<count> )
+# columnar:<file>  - Write the columnar copy of the statistics file ( --columnar=<format> )
+# store:<file>     - Store the results in the results store ( --store=<file> )
+#
+# and each other script ( e.g. trust-deaths ) is a single task run in a
+# separate process. Tasks are run by a pool of threads as soon as the
+# tasks they depend on have completed, so the branches of each tier and
+# the other scripts run in parallel.
+#
+# The result of each task is identified by a key. The key of a cached
+# task is the hash of its name, parameters and the keys of its inputs, and
+# the result is kept in the cache directory under that key, so a task whose
+# inputs are unchanged is not run again but its result read from the
+# cache. A cached task with output files is only skipped if they exist.
+# The key of an uncached task ( e.g. a download ) is the hash of its
+# result, so the tasks depending on it are skipped if its content is
+# unchanged. A second run on unchanged data therefore only revalidates the
+# downloads and writes any missing statistics files.
+#
+# The cached results are pickle files <scratch dir>\pipeline\<key>.pickle.
+# 'CacheVersion' and a fingerprint of the source of the modules of the
+# processing phases ( 'PhaseModules' ) are part of every key, so a cached
+# result is not used once the phases change. 'CacheVersion' must still be
+# changed when the form of a cached result changes.
+#
+# Usage
+# -----
+# python -m covid_update run [<configuration file> ...] [--scripts trust-deaths] [--workers 4]
+#
+# The Pillar 1 configuration files default to those run by covid_update.bat.
+# The directory options of paths.py, the HTTP client options of
+# httpclient.py, the memory budget option of budget.py, the attention
+# report option of attention.py, the results store option of store.py, the
+# columnar option of columnar.py and the alert state option of
+# alertstate.py may also be given and are passed on to the other scripts.
+# The Pillar 1 options --rollup, --revisions, --scan=<count>,
+# --growth=<days> and --growth-alert=<percent> ( see
+# pillar1_covid_update.py ) apply to every configuration file. The options
+# are parameters of the tasks using them, so cached results are not used
+# once they change. With --alert-state the alert tasks are not cached and
+# share the alert state file of pillar1_covid_update.py, one at a time.
+# Task statuses and messages are logged to .\log\log.txt and a run report
+# with a phase per task is written to .\log\covid_update_pipeline_report.json
+#
+
+import hashlib
+import os
+import pickle
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor,wait,FIRST_COMPLETED
+
+import covid_update.budget as Budget
+import covid_update.hierarchy as Hierarchy
+import covid_update.pillar1 as Pillar1
+import covid_update.population as Population
+
+# Version of the cached results
+CacheVersion = '4'
+
+# Modules of the processing phases whose source is part of every key
+PhaseModules = ['pillar1','records','timeline','schema','population','growth','common','budget','hierarchy','columnar','store','alertstate']
+
+# Fingerprint of the source of 'PhaseModules', set by ReturnSourceFingerprint()
+SourceFingerprint = None
+
+# Default number of worker threads
+DefaultWorkers = 4
+
+# Default Pillar 1 configuration files and other scripts ( see covid_update.bat )
+DefaultConfigurations = ['nation.csv','region.csv','upper.csv','lower.csv']
+DefaultScripts = ['trust-deaths']
+
+# Largest data file in bytes read into memory by the parse tasks, None for
+# no memory budget ( see budget.py ), set by Main()
+MemoryBudget = None
+
+# Lock held by an alert task while it reads and writes the alert state
+StateLock = threading.Lock()
+
+# Module name used in the log
+module = 'covid_update_pipeline'
+
+# Task statuses
+run = 'run'
+cached = 'cached'
+failed = 'failed'
+skipped = 'skipped'
+
+# A task of the pipeline.
+class Task :
+
+    "A task of the pipeline"
+
+    def __init__(self,Name,Function,Inputs=(),Parameters=(),Cached=True,Outputs=()) :
+
+        self.Name = Name
+        self.Function = Function
+        self.Inputs = list(Inputs)
+        self.Parameters = tuple(Parameters)
+        self.Cached = Cached
+        self.Outputs = list(Outputs)
+
+    # This procedure returns the phase of the task, the part of its name
+    # before any ':'.
+    def Phase(self) :
+
+        "This procedure returns the phase of the task"
+
+        return self.Name.split(':')[0]
+
+# This procedure returns the hash of the object 'Value'.
+def ReturnHash(Value) :
+
+    "This procedure returns the hash of the object 'Value'"
+
+    return hashlib.sha256(pickle.dumps(Value,protocol=4)).hexdigest()
+
+# This procedure returns the hash of the source files of 'PhaseModules',
+# computed once per run.
+def ReturnSourceFingerprint() :
+
+    "This procedure returns the hash of the source files of 'PhaseModules'"
+
+    global SourceFingerprint
+
+    if ( SourceFingerprint is None ) :
+        Digest = hashlib.sha256()
+        Directory = os.path.dirname(os.path.abspath(__file__))
+        for Name in PhaseModules :
+            with open(os.path.join(Directory,Name + '.py'),'rb') as FileObject : Digest.update(FileObject.read())
+        SourceFingerprint = Digest.hexdigest()
+
+    return SourceFingerprint
+
+# This procedure returns the key of the cached task 'Task' with input keys
+# 'InputKeys'.
+def ReturnTaskKey(Task,InputKeys) :
+
+    "This procedure returns the key of the cached task 'Task'"
+
+    return ReturnHash((CacheVersion,ReturnSourceFingerprint(),Task.Name,Task.Parameters,InputKeys))
+
+# This procedure returns the cache file name of 'Key' in 'CacheDir'.
+def ReturnCacheFileName(CacheDir,Key) :
+
+    "This procedure returns the cache file name of 'Key' in 'CacheDir'"
+
+    return os.path.join(CacheDir,Key + '.pickle')
+
+# This procedure writes the result 'Result' of key 'Key' to the cache.
+def WriteCache(CacheDir,Key,Result) :
+
+    "This procedure writes the result 'Result' of key 'Key' to the cache"
+
+    Filename = ReturnCacheFileName(CacheDir,Key)
+    TemporaryFilename = Filename + '.%i' % os.getpid()
+    with open(TemporaryFilename,'wb') as FileObject : pickle.dump(Result,FileObject,protocol=4)
+    os.replace(TemporaryFilename,Filename)
+
+# This procedure runs 'Task' with the results 'InputResults' and keys
+# 'InputKeys' of its inputs. The result, key and status of the task are
+# returned.
+def RunTask(Task,InputResults,InputKeys,CacheDir) :
+
+    "This procedure runs 'Task' with the results and keys of its inputs"
+
+    if ( Task.Cached ) :
+        Key = ReturnTaskKey(Task,InputKeys)
+        Filename = ReturnCacheFileName(CacheDir,Key)
+        if ( os.path.exists(Filename) and all([os.path.exists(Output) for Output in Task.Outputs]) ) :
+            with open(Filename,'rb') as FileObject : return pickle.load(FileObject),Key,cached
+
+    Result = Task.Function(*(Task.Parameters + tuple(InputResults)))
+
+    if ( Task.Cached ) :
+        WriteCache(CacheDir,Key,Result)
+    else :
+        Key = ReturnHash(Result)
+
+    return Result,Key,run
+
+# This procedure runs 'Tasks' on 'Workers' threads, each task being
+# started when its inputs have completed. Tasks depending on a failed task
+# are skipped. If 'Report' ( see instrument.py ) is given a phase is
+# recorded for each task. A dictionary of the results, a dictionary of
+# the statuses and a dictionary of the errors of the tasks are returned.
+def RunTasks(Tasks,CacheDir,Workers=DefaultWorkers,Report=None) :
+
+    "This procedure runs 'Tasks' on 'Workers' threads, each task being started when its inputs have completed"
+
+    os.makedirs(CacheDir,exist_ok=True)
+
+    Waiting = dict([(Task.Name,Task) for Task in Tasks])
+    Results = {}
+    Keys = {}
+    Statuses = {}
+    Errors = {}
+    Running = {}
+
+    # Task wrapper recording the phase of the task
+    def Execute(Task) :
+        Phase = None
+        if ( Report is not None ) : Phase = Report.Start(Task.Phase(),task=Task.Name)
+        Status = failed
+        try :
+            Result,Key,Status = RunTask(Task,[Results[Input] for Input in Task.Inputs],[Keys[Input] for Input in Task.Inputs],CacheDir)
+        finally :
+            if ( Phase is not None ) : Report.Stop(Phase,status=Status)
+        return Result,Key,Status
+
+    with ThreadPoolExecutor(max_workers=Workers) as Executor :
+
+        while ( Waiting or Running ) :
+
+            # Skip the tasks depending on a failed or skipped task
+            for Name,Task in list(Waiting.items()) :
+                if ( any([Statuses.get(Input) in [failed,skipped] for Input in Task.Inputs]) ) :
+                    Statuses[Name] = skipped
+                    del Waiting[Name]
+
+            # Start the tasks whose inputs have completed
+            for Name,Task in list(Waiting.items()) :
+                if ( all([Statuses.get(Input) in [run,cached] for Input in Task.Inputs]) ) :
+                    Running[Executor.submit(Execute,Task)] = Name
+                    del Waiting[Name]
+
+            if ( not Running ) :
+                if ( Waiting ) : raise ValueError('Tasks %s depend on unknown tasks' % str(list(Waiting)))
+                break
+
+            Done,NotDone = wait(list(Running),return_when=FIRST_COMPLETED)
+            for Future in Done :
+                Name = Running.pop(Future)
+                try :
+                    Results[Name],Keys[Name],Statuses[Name] = Future.result()
+                except Exception as Error :
+                    Statuses[Name] = failed
+                    Errors[Name] = str(Error) or type(Error).__name__
+
+    return Results,Statuses,Errors
+
+# This procedure reads the Pillar 1 configuration file 'Filename' and the
+# population index in the same directory, if present, as 'populations'.
+def ReadConfigurationTask(Filename) :
+
+    "This procedure reads the Pillar 1 configuration file 'Filename'"
+
+    with open(Filename) as FileObject : Configuration = Pillar1.ReadConfiguration(FileObject.read())
+
+    Configuration['populations'] = {}
+    PopulationFilename = os.path.join(os.path.dirname(Filename),Population.IndexFileName)
+    if ( os.path.exists(PopulationFilename) ) :
+        with open(PopulationFilename) as FileObject : Configuration['populations'] = Population.ReadPopulations(FileObject.read())
+
+    return Configuration
+
+# This procedure reads the area hierarchy file 'Filename' ( see
+# hierarchy.py ) and returns its file name and the hierarchy.
+def ReadHierarchyTask(Filename) :
+
+    "This procedure reads the area hierarchy file 'Filename'"
+
+    with open(Filename) as FileObject : return Filename,Hierarchy.ReadHierarchy(FileObject.read())
+
+# This procedure returns True if the tier of 'Configuration' is rolled up
+# from the lower tier file with the area hierarchy 'AreaHierarchy'.
+def IsRolledUp(Configuration,AreaHierarchy) :
+
+    "This procedure returns True if the tier of 'Configuration' is rolled up from the lower tier file"
+
+    return ( AreaHierarchy is not None and Configuration['tier'] != Hierarchy.ltla )
+
+# This procedure downloads the data file of 'Configuration', the lower tier
+# file if 'RollUpTiers' is set, to the scratch directory 'ScratchDir',
+# keeping the file if unchanged on the server, and returns the file name
+# and checksum. The result only depends on the content of the file so that
+# it is the same whether or not the file was downloaded again.
+def FetchTask(ScratchDir,RollUpTiers,Configuration) :
+
+    "This procedure downloads the data file of 'Configuration' to the scratch directory 'ScratchDir'"
+
+    import covid_update.httpclient as HttpClient
+
+    Url = Configuration['url']
+    if ( RollUpTiers and Configuration['tier'] != Hierarchy.ltla ) : Url = Hierarchy.ReturnLtlaUrl(Url)
+    Filename = os.path.join(ScratchDir,'pillar1_%s.csv' % Pillar1.ReturnTierType(Configuration['tier']))
+    Result = HttpClient.Download(Url,Filename,Revalidate=True)
+    if ( not Result['complete'] ) : raise IOError('GET operation for %s failed ( status %s )' % (Url,Result['status']))
+
+    return {'file':Filename,'sha256':Result['sha256']}
+
+# This procedure returns the lines of the downloaded data file 'Fetched'
+# of 'Configuration' and the ( message, level ) pairs of the header. The
+# data file is read as UTF-8, from disk as it is used if larger than the
+# memory budget. If 'HierarchyResult' ( see ReadHierarchyTask ) is
+# given the lines of the tier are rolled up from the lower tier lines, for
+# the matching 'Areas' only if given.
+def ReturnTaskLines(Configuration,Fetched,HierarchyResult=None,Areas=None) :
+
+    "This procedure returns the lines of the downloaded data file 'Fetched'"
+
+    ResponseLines = Budget.ReturnLines(Fetched['file'],'utf-8',MemoryBudget)
+    Messages = Pillar1.ReturnHeaderMessages(ResponseLines,Configuration['url'])
+
+    AreaHierarchy = None
+    if ( HierarchyResult is not None ) : HierarchyFilename,AreaHierarchy = HierarchyResult
+    if ( IsRolledUp(Configuration,AreaHierarchy) ) :
+        ResponseLines,Unmapped = Hierarchy.RollUp(ResponseLines,AreaHierarchy,Configuration['tier'],Areas)
+        Messages += Pillar1.ReturnRollUpMessages(Unmapped,HierarchyFilename)
+
+    return ResponseLines,Messages
+
+# This procedure parses the downloaded data file 'Fetched', rolled up with
+# 'HierarchyResult' if given, and returns the rows and row counts of the areas of
+# 'Configuration' and the ( message, level ) pairs of the header and of
+# each area logged by pillar1.Main. If 'AllAreas' is set every area of the
+# tier is rolled up, as for a hotspot scan.
+def ParseTask(AllAreas,Configuration,Fetched,HierarchyResult=None) :
+
+    "This procedure parses the downloaded data file 'Fetched'"
+
+    ResponseLines,Messages = ReturnTaskLines(Configuration,Fetched,HierarchyResult,None if AllAreas else Configuration['areas'])
+    AreaData,AreaDataCount = Pillar1.ParseData(ResponseLines,Configuration['tier'],Configuration['areas'])
+    Messages += Pillar1.ReturnAreaMessages(AreaData,AreaDataCount,Configuration['tier'],Configuration['areas'])
+
+    return AreaData,AreaDataCount,Messages
+
+# This procedure compares the rows of the tier of the downloaded data file
+# 'Fetched', rolled up with 'HierarchyResult' if given, with those of the
+# previous run, writing the revisions file and row hashes of the tier to
+# 'DataDir'. The ( message, level ) pairs of the revisions are returned.
+def RevisionsTask(DataDir,Configuration,Fetched,HierarchyResult=None) :
+
+    "This procedure compares the rows of the tier of the downloaded data file 'Fetched' with those of the previous run"
+
+    import covid_update.revisions as Revisions
+    from covid_update.common import ReturnFileName
+
+    TierType = Pillar1.ReturnTierType(Configuration['tier'])
+    HashFilename = os.path.join(DataDir,'pillar1_%s_hashes.txt' % TierType)
+    RevisionsFilename = os.path.join(DataDir,ReturnFileName('revisions',TierType))
+
+    ResponseLines = ReturnTaskLines(Configuration,Fetched,HierarchyResult,Configuration['areas'])[0]
+    Hashes,Changes,Removed = Revisions.CompareRows(Pillar1.ReturnRevisionRows(ResponseLines,Configuration['tier']),Revisions.ReadHashes(HashFilename))
+    Revisions.WriteHashes(HashFilename,Hashes)
+
+    TemporaryFilename = RevisionsFilename + '.%i' % os.getpid()
+    with open(TemporaryFilename,'w') as FileObject :
+        for Line in Revisions.GenerateRevisionLines(Changes) : FileObject.write(Line)
+    os.replace(TemporaryFilename,RevisionsFilename)
+
+    return Pillar1.ReturnRevisionMessages(Changes,Removed,RevisionsFilename,Configuration['tier'],Configuration['areas'])
+
+# This procedure returns the ( message, level ) pairs of the 'Count'
+# hotspot areas of the whole tier of the downloaded data file 'Fetched',
+# rolled up with 'HierarchyResult' if given.
+def ScanTask(Count,Configuration,Fetched,HierarchyResult=None) :
+
+    "This procedure returns the ( message, level ) pairs of the 'Count' hotspot areas of the whole tier"
+
+    ResponseLines = ReturnTaskLines(Configuration,Fetched,HierarchyResult)[0]
+
+    return Pillar1.ReturnHotspotMessages(Pillar1.ScanHotspots(ResponseLines,Configuration['tier'],Configuration['period'],Count))
+
+# This procedure derives the infectious cases of the parsed rows 'Parsed'.
+def ComputeTask(Configuration,Parsed) :
+
+    "This procedure derives the infectious cases of the parsed rows 'Parsed'"
+
+    Populations = Population.ReturnAreaPopulations(Parsed[0],Configuration['populations'])
+
+    return Pillar1.ComputeInfectious(Parsed[0],Configuration['period'],Populations)
+
+# This procedure generates the increasing/decreasing and growth messages,
+# the attention flag and the flagged areas of 'AreaResults' ( see
+# pillar1.GenerateRunAlerts ) with the growth options 'GrowthWindow' and
+# 'GrowthThreshold'. If 'StateFilename' is given only new alerts are
+# generated using the alert state file ( see alertstate.py ), which is
+# read and written by one alert task at a time.
+def AlertTask(StateFilename,GrowthWindow,GrowthThreshold,Configuration,AreaResults) :
+
+    "This procedure generates the increasing/decreasing and growth messages, the attention flag and the flagged areas of 'AreaResults'"
+
+    import covid_update.alertstate as AlertState
+
+    if ( StateFilename is None ) :
+        return Pillar1.GenerateRunAlerts(AreaResults,Configuration['period'],Configuration['variation'],None,Configuration['percapita'],GrowthWindow,GrowthThreshold)
+
+    with StateLock :
+        State = AlertState.AlertState(StateFilename)
+        Result = Pillar1.GenerateRunAlerts(AreaResults,Configuration['period'],Configuration['variation'],State,Configuration['percapita'],GrowthWindow,GrowthThreshold)
+        State.Write()
+
+    return Result
+
+# This procedure writes the statistics file 'Filename' of 'AreaResults'
+# and returns its file name.
+def WriteTask(Filename,AreaResults) :
+
+    "This procedure writes the statistics file 'Filename' of 'AreaResults'"
+
+    TemporaryFilename = Filename + '.%i' % os.getpid()
+    with open(TemporaryFilename,'w') as FileObject :
+        for Line in Pillar1.GenerateStatisticsLines(AreaResults) : FileObject.write(Line)
+    os.replace(TemporaryFilename,Filename)
+
+    return Filename
+
+# This procedure writes the 'Format' columnar copy 'Filename' of
+# 'AreaResults' ( see columnar.py ) and returns its size in bytes, or None
+# if pyarrow is not installed.
+def ColumnarTask(Format,Filename,AreaResults) :
+
+    "This procedure writes the 'Format' columnar copy 'Filename' of 'AreaResults'"
+
+    import covid_update.columnar as Columnar
+
+    try :
+        return Columnar.WriteTable(Columnar.BuildPillar1Table(AreaResults),Filename,Format)
+    except ImportError :
+        return None
+
+# This procedure stores 'AreaResults' of 'Configuration' in the results
+# store 'Filename' ( see store.py ), replacing any revised days, and
+# returns the number of rows stored or revised.
+def StoreTask(Filename,Configuration,AreaResults) :
+
+    "This procedure stores 'AreaResults' of 'Configuration' in the results store 'Filename'"
+
+    from datetime import date
+    import covid_update.store as Store
+
+    Connection = Store.Open(Filename)
+    try :
+        return Store.StorePillar1(Connection,Configuration['tier'],AreaResults,date.today())
+    finally :
+        Connection.close()
+
+# This procedure runs the script subcommand 'Command' ( see cli.py ) with
+# 'Arguments' in a separate process and returns its exit status. A non-zero
+# exit status is an error.
+def ScriptTask(Command,Arguments) :
+
+    "This procedure runs the script subcommand 'Command' in a separate process"
+
+    Status = subprocess.run([sys.executable,'-m','covid_update',Command] + list(Arguments)).returncode
+    if ( Status != 0 ) : raise RuntimeError('%s exited with status %i' % (Command,Status))
+
+    return Status
+
+# This procedure returns the tasks of the pipeline for the Pillar 1
+# configuration files 'Configurations' and script subcommands 'Scripts'
+# using the directories 'Directories' ( see paths.py ). The Pillar 1 tasks
+# use the options 'ProcessingOptions' ( see pillar1.ParseOptions ) and the
+# dictionary 'Options' of the store, columnar and alert state options. The
+# script subcommands are given 'ScriptArguments'.
+def BuildTasks(Configurations,Scripts,Directories,ScriptArguments=(),ProcessingOptions=None,Options=None) :
+
+    "This procedure returns the tasks of the pipeline"
+
+    import covid_update.alertstate as AlertState
+    import covid_update.columnar as Columnar
+    from covid_update.common import ReturnFileName
+
+    if ( ProcessingOptions is None ) : ProcessingOptions = Pillar1.ParseOptions([])[1]
+    Options = dict({'store':None,'columnar':None,'alertstate':False},**( Options or {} ))
+
+    StateFilename = None
+    if ( Options['alertstate'] ) : StateFilename = AlertState.ReturnStateFileName(Directories['log'],Pillar1.module)
+    GrowthOptions = [ProcessingOptions['growth'],ProcessingOptions['growthalert']]
+
+    Tasks = []
+    HierarchyInputs = []
+    if ( ProcessingOptions['rollup'] ) :
+        Tasks.append(Task('hierarchy',ReadHierarchyTask,Parameters=[os.path.join(Directories['config'],'area_hierarchy.csv')],Cached=False))
+        HierarchyInputs = ['hierarchy']
+
+    for Configuration in Configurations :
+        Filename = os.path.join(Directories['config'],Configuration)
+        TierType = Pillar1.ReturnTierType(ReadConfigurationTask(Filename)['tier'])
+        StatisticsFilename = os.path.join(Directories['data'],ReturnFileName('pillar1',TierType))
+        Inputs = ['config:' + Configuration,'fetch:' + Configuration] + HierarchyInputs
+        Tasks += [Task('config:' + Configuration,ReadConfigurationTask,Parameters=[Filename],Cached=False),
+                  Task('fetch:' + Configuration,FetchTask,['config:' + Configuration],[Directories['scratch'],ProcessingOptions['rollup']],Cached=False),
+                  Task('parse:' + Configuration,ParseTask,Inputs,[ProcessingOptions['scan'] > 0]),
+                  Task('compute:' + Configuration,ComputeTask,['config:' + Configuration,'parse:' + Configuration]),
+                  Task('alert:' + Configuration,AlertTask,['config:' + Configuration,'compute:' + Configuration],[StateFilename] + GrowthOptions,Cached=( StateFilename is None )),
+                  Task('write:' + Configuration,WriteTask,['compute:' + Configuration],[StatisticsFilename],Outputs=[StatisticsFilename])]
+        if ( ProcessingOptions['revisions'] ) : Tasks.append(Task('revisions:' + Configuration,RevisionsTask,Inputs,[Directories['data']],Cached=False))
+        if ( ProcessingOptions['scan'] ) : Tasks.append(Task('scan:' + Configuration,ScanTask,Inputs,[ProcessingOptions['scan']]))
+        if ( Options['columnar'] ) :
+            ColumnarFilename = Columnar.ReturnColumnarFileName(StatisticsFilename,Options['columnar'])
+            Tasks.append(Task('columnar:' + Configuration,ColumnarTask,['compute:' + Configuration],[Options['columnar'],ColumnarFilename],Outputs=[ColumnarFilename]))
+        if ( Options['store'] ) :
+            Tasks.append(Task('store:' + Configuration,StoreTask,['config:' + Configuration,'compute:' + Configuration],[Options['store']],Outputs=[Options['store']]))
+
+    for Script in Scripts : Tasks.append(Task('script:' + Script,ScriptTask,Parameters=[Script,tuple(ScriptArguments)],Cached=False))
+
+    return Tasks
+
+# This procedure runs the pipeline for the command line 'Arguments'.
+def Main(Arguments) :
+
+    "This procedure runs the pipeline for the command line 'Arguments'"
+
+    import argparse
+    import File.Operations as File
+    import covid_update.instrument as Instrument
+    import covid_update.logstore as LogStore
+    import covid_update.paths as Paths
+    import covid_update.httpclient as HttpClient
+    import covid_update.attention as Attention
+    import covid_update.store as Store
+    import covid_update.columnar as Columnar
+    import covid_update.alertstate as AlertState
+    from covid_update.common import failure,error,warning,info
+
+    global MemoryBudget
+
+    # Process path, HTTP client, memory budget, attention report, results
+    # store, columnar and alert state options, which are passed on to the scripts
+    Remaining,PathOptions = Paths.ParseOptions(Arguments)
+    Directories = Paths.ReturnDirectories(PathOptions)
+    Remaining,HttpOptions = HttpClient.ParseOptions(Remaining)
+    HttpClient.Configure(HttpOptions)
+    Remaining,BudgetOptions = Budget.ParseOptions(Remaining)
+    MemoryBudget = BudgetOptions['budget']
+    Remaining,AttentionOptions = Attention.ParseOptions(Remaining)
+    Remaining,StoreOptions = Store.ParseOptions(Remaining)
+    Remaining,ColumnarOptions = Columnar.ParseOptions(Remaining)
+    Remaining,AlertOptions = AlertState.ParseOptions(Remaining)
+    ScriptArguments = [Argument for Argument in Arguments if Argument not in Remaining]
+
+    # Process the Pillar 1 processing options, which apply to every configuration file
+    Remaining,ProcessingOptions = Pillar1.ParseOptions(Remaining)
+    TaskOptions = dict(StoreOptions,**ColumnarOptions,**AlertOptions)
+
+    Parser = argparse.ArgumentParser(prog='covid_update run',description='Run the daily updates as a graph of cached tasks')
+    Parser.add_argument('configurations',nargs='*',default=DefaultConfigurations,help='Pillar 1 configuration files')
+    Parser.add_argument('--scripts',default=','.join(DefaultScripts),help='comma separated other script subcommands')
+    Parser.add_argument('--workers',type=int,default=DefaultWorkers,help='number of worker threads')
+    Options = Parser.parse_args(Remaining)
+    Scripts = [Script for Script in Options.scripts.split(',') if Script]
+
+    LogDir = Directories[Paths.log]
+    ErrorFilename = os.path.join(LogDir,'log.txt')
+    ReportFilename = Instrument.ReturnReportFileName(LogDir,module)
+    Report = Instrument.RunReport(module)
+
+    # Store log messages in the log store, rotating the text log
+    File = LogStore.ReturnRecordingFile(File,LogDir,ErrorFilename)
+
+    # Create/open log file
+    ErrorFileObject = File.Open(ErrorFilename,'a',failure)
+    Errormessage = 'Could not open ' + ErrorFilename
+    if ( ErrorFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
+    File.Logerror(ErrorFileObject,module,'Started',info)
+
+    # Run the tasks
+    Tasks = BuildTasks(Options.configurations,Scripts,Directories,ScriptArguments,ProcessingOptions,TaskOptions)
+    Results,Statuses,Errors = RunTasks(Tasks,os.path.join(Directories[Paths.scratch],'pipeline'),Options.workers,Report)
+
+    for Task in Tasks :
+        Status = Statuses.get(Task.Name,skipped)
+        Report.Count(Status)
+        if ( Status == failed ) : File.Logerror(ErrorFileObject,module,'Task %s failed: %s' % (Task.Name,Errors[Task.Name]),warning)
+        elif ( Status == skipped ) : File.Logerror(ErrorFileObject,module,'Task %s skipped' % Task.Name,warning)
+        else : File.Logerror(ErrorFileObject,module,'Task %s %s' % (Task.Name,Status),info)
+
+    # Log the parse, population, revision, store, increasing/decreasing and
+    # hotspot messages of each configuration
+    for Configuration in Options.configurations :
+        if ( 'parse:' + Configuration in Results ) :
+            Settings,Parsed = Results['config:' + Configuration],Results['parse:' + Configuration]
+            for Message,Level in Parsed[2] : File.Logerror(ErrorFileObject,Pillar1.module,Message,Level)
+            if ( Settings['percapita'] ) :
+                Populations = Population.ReturnAreaPopulations(Parsed[0],Settings['populations'])
+                for Message,Level in Pillar1.ReturnPopulationMessages(Populations,Settings['tier'],Settings['areas']) : File.Logerror(ErrorFileObject,Pillar1.module,Message,Level)
+        for Message,Level in Results.get('revisions:' + Configuration,[]) : File.Logerror(ErrorFileObject,Pillar1.module,Message,Level)
+        if ( 'columnar:' + Configuration in Results and Results['columnar:' + Configuration] is None ) :
+            Errormessage = 'pyarrow is not installed, %s not written' % Columnar.ReturnColumnarFileName(Results['write:' + Configuration],ColumnarOptions['columnar'])
+            File.Logerror(ErrorFileObject,Pillar1.module,Errormessage,warning)
+        if ( Statuses.get('store:' + Configuration) == run ) :
+            Errormessage = '%i rows stored or revised in %s' % (Results['store:' + Configuration],StoreOptions['store'])
+            File.Logerror(ErrorFileObject,Pillar1.module,Errormessage,info)
+        if ( 'alert:' + Configuration in Results ) :
+            Messages,AttentionFlag,Flagged = Results['alert:' + Configuration]
+            for Message,Level in Messages : File.Logerror(ErrorFileObject,Pillar1.module,Message,Level)
+        for Message,Level in Results.get('scan:' + Configuration,[]) : File.Logerror(ErrorFileObject,Pillar1.module,Message,Level)
+        if ( 'alert:' + Configuration not in Results ) : continue
+        if ( AttentionFlag and 'write:' + Configuration in Results ) :
+            ViewFilename = Results['write:' + Configuration]
+            if ( AttentionOptions['attention'] ) :
+                ViewFilename = Attention.ReturnReportFileName(ViewFilename,AttentionOptions['attention'])
+                Settings,AreaResults = Results['config:' + Configuration],Results['compute:' + Configuration]
+                Value = 'Infectious'
+                if ( Settings['percapita'] ) : Value = 'InfectiousRate'
+                Heading,Rows = Attention.BuildPillar1Report(AreaResults,Flagged,Settings['variation'],Value,ProcessingOptions['growth'],ProcessingOptions['growthalert'])
+                Attention.WriteReport(ViewFilename,AttentionOptions['attention'],'Pillar 1 %s attention report' % Settings['tier'],Heading,Rows)
+            Errormessage = 'Increase in infectious count detected, please view %s' % ViewFilename
+            File.Logerror(ErrorFileObject,Pillar1.module,Errormessage,warning)
+            if ( not PathOptions['headless'] ) :
+                import Interface.Prompts as Interface
+                Interface.ViewSpeadsheet(Pillar1.Spreadsheet,ViewFilename)
+
+    # Write run report
+    Report.Write(ReportFilename)
+    File.Logerror(ErrorFileObject,module,'Run report written to %s' % ReportFilename,info)
+    File.Logerror(ErrorFileObject,module,'Completed',info)
+
+    Errormessage = 'Could not close ' + ErrorFilename
+    if ( File.Close(ErrorFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    return 1 if Errors else 0
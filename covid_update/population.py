@@ -0,0 +1,98 @@
+# covid_update/population.py
+#
+# Description
+# -----------
+# This module provides the population of each area so that counts may be
+# normalised per 100,000 people and alert thresholds given per capita, a
+# single threshold then serving a nation and a small local authority
+# alike. The population of an area is taken from the optional population
+# index .\config\area_population.csv, of the form:
+#
+# <area code>,<area name>,<population>
+# ...
+#
+# which is read once and may be looked up by area code or name. An area not
+# in the index has its population estimated from its latest cumulative
+# cases and case rate per 100,000 ( cumCasesBySpecimenDateRate ).
+#
+# A variation in a configuration file is per capita if it ends in '/100k',
+# e.g. '2.5/100k' is an increase of 2.5 infectious cases per 100,000 people.
+#
+
+# Population index file name in the configuration directory
+IndexFileName = 'area_population.csv'
+
+# Number of people to which per capita values are normalised
+PerCapita = 100000
+
+# Suffix of a per capita variation
+PerCapitaSuffix = '/100k'
+
+# This procedure parses the variation string 'String' of a configuration
+# file and returns the variation and whether it is per capita.
+def ParseVariation(String,Converter=int) :
+
+    "This procedure parses the variation string 'String' of a configuration file"
+
+    String = String.strip()
+    if ( String.endswith(PerCapitaSuffix) ) : return float(String[:-len(PerCapitaSuffix)]),True
+
+    return Converter(String),False
+
+# This procedure reads the contents 'FileData' of a population index and
+# returns a dictionary of populations keyed by both area code and area
+# name. A header line is ignored.
+def ReadPopulations(FileData) :
+
+    "This procedure reads the contents 'FileData' of a population index"
+
+    Populations = {}
+    for Line in FileData.splitlines() :
+        Fields = [Field.strip() for Field in Line.split(',')]
+        if ( len(Fields) < 3 or not Fields[2].isdigit() ) : continue
+        Populations[Fields[0]] = int(Fields[2])
+        Populations[Fields[1]] = int(Fields[2])
+
+    return Populations
+
+# This procedure returns the population estimated from the cumulative
+# cases 'Cumulative' and the case rate string 'Rate' per 100,000, or None
+# if there is no rate.
+def EstimatePopulation(Cumulative,Rate) :
+
+    "This procedure returns the population estimated from the cumulative cases 'Cumulative' and the case rate string 'Rate'"
+
+    try :
+        Rate = float(Rate)
+    except ValueError :
+        return None
+    if ( Rate <= 0 or Cumulative <= 0 ) : return None
+
+    return int(round(Cumulative * PerCapita / Rate))
+
+# This procedure returns the population of each area of the parsed Pillar 1
+# 'AreaData' ( see records.py ) from the population index 'Index', or
+# estimated from its latest case rate. Areas without a population are left
+# out.
+def ReturnAreaPopulations(AreaData,Index) :
+
+    "This procedure returns the population of each area of the parsed Pillar 1 'AreaData'"
+
+    Populations = {}
+    for Area,Series in AreaData.items() :
+        Population = Index.get(Area)
+        if ( Population is None and len(Series) > 0 ) : Population = Index.get(Series.Names[-1])
+        Row = len(Series) - 1
+        while ( Population is None and Row >= 0 ) :
+            Population = EstimatePopulation(Series.Cumulative[Row],Series.Rates[Row])
+            Row -= 1
+        if ( Population ) : Populations[Area] = Population
+
+    return Populations
+
+# This procedure returns the count 'Value' per 100,000 of 'Population'.
+def ReturnPerCapita(Value,Population) :
+
+    "This procedure returns the count 'Value' per 100,000 of 'Population'"
+
+    return Value * PerCapita / Population
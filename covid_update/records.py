@@ -0,0 +1,108 @@
+# covid_update/records.py
+#
+# Description
+# -----------
+# This module provides the compact representation of the parsed data rows
+# of an area. Rather than a list of strings per row the rows of an area are
+# held column by column ( a 'struct of arrays' ), only the columns which are
+# used being stored and each being converted once when the row is parsed:
+#
+# Names      - list of area names as given in the data file
+# Dates      - array of date ordinals ( date.toordinal() )
+# Daily      - array of daily case counts
+# Cumulative - array of cumulative case counts
+# Rates      - list of case rate strings, output unchanged
+#
+# The area names are interned so that the rows of an area share one string
+# and each distinct date string is only converted once, through a cache of
+# ordinals keyed by date string ( see ReturnOrdinal ).
+#
+
+import sys
+from array import array
+from datetime import date
+
+# Array type code of the integer columns
+IntegerType = 'l'
+
+# The parsed data rows of a single area.
+class AreaSeries :
+
+    "The parsed data rows of a single area"
+
+    __slots__ = ['Area','Type','Names','Dates','Daily','Cumulative','Rates']
+
+    def __init__(self,Area,Type) :
+
+        self.Area = sys.intern(Area)
+        self.Type = sys.intern(Type)
+        self.Names = []
+        self.Dates = array(IntegerType)
+        self.Daily = array(IntegerType)
+        self.Cumulative = array(IntegerType)
+        self.Rates = []
+
+    def __len__(self) :
+
+        return len(self.Dates)
+
+    # This procedure appends a data row to the series.
+    def Append(self,Name,Ordinal,Daily,Cumulative,Rate) :
+
+        "This procedure appends a data row to the series"
+
+        self.Names.append(sys.intern(Name))
+        self.Dates.append(Ordinal)
+        self.Daily.append(Daily)
+        self.Cumulative.append(Cumulative)
+        self.Rates.append(Rate)
+
+    # This procedure reverses the order of the rows of the series.
+    def Reverse(self) :
+
+        "This procedure reverses the order of the rows of the series"
+
+        self.Names.reverse()
+        self.Dates.reverse()
+        self.Daily.reverse()
+        self.Cumulative.reverse()
+        self.Rates.reverse()
+
+    # This procedure puts the rows of the series, given in descending date
+    # order, into ascending date order. Rows out of order are sorted by date,
+    # rows of the same date keeping their order.
+    def Sort(self) :
+
+        "This procedure puts the rows of the series into ascending date order"
+
+        self.Reverse()
+        Dates = self.Dates
+        if ( all(Dates[Index] <= Dates[Index + 1] for Index in range(len(Dates) - 1)) ) : return
+
+        Order = sorted(range(len(Dates)),key=Dates.__getitem__)
+        self.Names = [self.Names[Index] for Index in Order]
+        self.Dates = array(IntegerType,[Dates[Index] for Index in Order])
+        self.Daily = array(IntegerType,[self.Daily[Index] for Index in Order])
+        self.Cumulative = array(IntegerType,[self.Cumulative[Index] for Index in Order])
+        self.Rates = [self.Rates[Index] for Index in Order]
+
+    # This procedure returns the date of row 'Index' as a date object.
+    def ReturnDate(self,Index) :
+
+        "This procedure returns the date of row 'Index' as a date object"
+
+        return date.fromordinal(self.Dates[Index])
+
+# This procedure returns the ordinal of the date string 'DateString'
+# converted by 'Converter', caching the result in 'Ordinals' so that each
+# distinct date is only converted once.
+def ReturnOrdinal(DateString,Converter,Ordinals) :
+
+    "This procedure returns the ordinal of the date string 'DateString' converted by 'Converter'"
+
+    Ordinal = Ordinals.get(DateString)
+    if ( Ordinal is None ) :
+        Ordinal = Converter(DateString).toordinal()
+        Ordinals[DateString] = Ordinal
+
+    return Ordinal
@@ -0,0 +1,117 @@
+# covid_update/revisions.py
+#
+# Description
+# -----------
+# This module detects the rows of a downloaded file which have been added
+# or revised since the previous run without keeping the previous file. A
+# short hash of the values of each row is kept, keyed by the area and date
+# of the row, in a hash file of the form:
+#
+# <area>,<date>,<hash>
+# ...
+#
+# Each new download is compared with the hash file in a single pass and
+# only the added and revised rows are returned, after which the hash file
+# is replaced by the hashes of the new download. Rows present in the hash
+# file but not in the new download are counted as removed.
+#
+# Added and revised rows are reported in a revisions file of the form:
+#
+# area,date,change
+# <area>,<date>,added|revised
+# ...
+#
+
+import hashlib
+import os
+
+# Change types
+added = 'added'
+revised = 'revised'
+
+# Number of bytes of each row hash
+HashSize = 8
+
+# Revisions file header
+Header = 'area,date,change'
+
+# This procedure returns the hash of the list of value strings 'Values'.
+def ReturnRowHash(Values) :
+
+    "This procedure returns the hash of the list of value strings 'Values'"
+
+    return hashlib.blake2b(','.join(Values).encode(),digest_size=HashSize).hexdigest()
+
+# This procedure reads the hash file 'Filename' and returns a dictionary
+# of hashes keyed by ( area, date ). An empty dictionary is returned if
+# the file does not exist.
+def ReadHashes(Filename) :
+
+    "This procedure reads the hash file 'Filename' and returns a dictionary of hashes keyed by ( area, date )"
+
+    Hashes = {}
+    if ( not os.path.exists(Filename) ) : return Hashes
+
+    with open(Filename,encoding='utf-8') as FileObject :
+        for Line in FileObject :
+            Area,Date,Hash = Line.rstrip('\n').rsplit(',',2)
+            Hashes[(Area,Date)] = Hash
+
+    return Hashes
+
+# This procedure replaces the hash file 'Filename' with 'Hashes'.
+def WriteHashes(Filename,Hashes) :
+
+    "This procedure replaces the hash file 'Filename' with 'Hashes'"
+
+    TemporaryFilename = Filename + '.%i' % os.getpid()
+    with open(TemporaryFilename,'w',encoding='utf-8') as FileObject :
+        for (Area,Date),Hash in Hashes.items() : FileObject.write('%s,%s,%s\n' % (Area,Date,Hash))
+    os.replace(TemporaryFilename,Filename)
+
+# This procedure compares the ( ( area, date ), values ) pairs 'Rows'
+# with the hashes 'Previous' of the previous run. The hashes of 'Rows', a
+# list of ( area, date, change ) for each added or revised row and the
+# number of rows of 'Previous' not in 'Rows' are returned.
+def CompareRows(Rows,Previous) :
+
+    "This procedure compares the ( ( area, date ), values ) pairs 'Rows' with the hashes 'Previous' of the previous run"
+
+    Hashes = {}
+    Changes = []
+
+    for Key,Values in Rows :
+        Hash = ReturnRowHash(Values)
+        Hashes[Key] = Hash
+        PreviousHash = Previous.get(Key)
+        if ( PreviousHash is None ) :
+            Changes.append((Key[0],Key[1],added))
+        elif ( PreviousHash != Hash ) :
+            Changes.append((Key[0],Key[1],revised))
+
+    Removed = len([Key for Key in Previous if Key not in Hashes])
+
+    return Hashes,Changes,Removed
+
+# This procedure returns the earliest date of the revised rows of each
+# area in 'Changes', from which any derived values must be recomputed.
+# Added rows are ignored.
+def ReturnRevisedAreas(Changes) :
+
+    "This procedure returns the earliest date of the revised rows of each area in 'Changes'"
+
+    Areas = {}
+    for Area,Date,Change in Changes :
+        if ( Change == revised and ( Area not in Areas or Date < Areas[Area] ) ) : Areas[Area] = Date
+
+    return Areas
+
+# This procedure will generate the lines of the revisions file, including
+# the header line, for 'Changes'.
+def GenerateRevisionLines(Changes) :
+
+    "This procedure will generate the lines of the revisions file for 'Changes'"
+
+    yield Header + '\n'
+
+    for Area,Date,Change in Changes : yield '%s,%s,%s\n' % (Area,Date,Change)
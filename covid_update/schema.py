@@ -0,0 +1,102 @@
+# covid_update/schema.py
+#
+# Description
+# -----------
+# This module resolves the columns of the downloaded csv files by name from
+# the header line of the file rather than by fixed position. A schema is a
+# list of ( column name, header name, default index ) entries:
+#
+# column name  - Name used by the scripts e.g. 'Cumulative'
+# header name  - Name of the column in the header line ( case is ignored )
+# default index - Position used if the header name is not found
+#
+# The data rows of a file are remapped to the 'canonical' layout of the
+# schema, in which the column of entry n is at position n, by a mapper
+# built once per file from the resolved indexes. Changes of file layout
+# from a given date are described by a list of ( date, schema entries )
+# pairs, each entry replacing the schema entry of the same column name.
+#
+
+import operator
+
+# This procedure returns a dictionary of the canonical position of each
+# column name of 'Schema'.
+def ReturnColumns(Schema) :
+
+    "This procedure returns a dictionary of the canonical position of each column name of 'Schema'"
+
+    Columns = {}
+    for Position,(Name,HeaderName,Default) in enumerate(Schema) : Columns[Name] = Position
+
+    return Columns
+
+# This procedure returns the index in the header line 'HeaderLine' of each
+# column of 'Schema' as a dictionary keyed by column name together with the
+# list of column names not found, for which the default index is used.
+def ResolveColumns(HeaderLine,Schema) :
+
+    "This procedure returns the index in the header line 'HeaderLine' of each column of 'Schema'"
+
+    HeaderFields = [Field.strip().lower() for Field in HeaderLine.split(',')]
+
+    Indexes = {}
+    Unresolved = []
+    for Name,HeaderName,Default in Schema :
+        if ( HeaderName.lower() in HeaderFields ) :
+            Indexes[Name] = HeaderFields.index(HeaderName.lower())
+        else :
+            Indexes[Name] = Default
+            Unresolved.append(Name)
+
+    return Indexes,Unresolved
+
+# This procedure returns a copy of 'Schema' with the entries of 'Changes'
+# replacing the entries of the same column name.
+def ApplyLayoutChange(Schema,Changes) :
+
+    "This procedure returns a copy of 'Schema' with the entries of 'Changes' replacing those of the same column name"
+
+    Replacements = {}
+    for Entry in Changes : Replacements[Entry[0]] = Entry
+
+    return [Replacements.get(Entry[0],Entry) for Entry in Schema]
+
+# This procedure returns a procedure which remaps a data row split from a
+# file with header line 'HeaderLine' to the canonical layout of 'Schema'.
+def ReturnRowMapper(HeaderLine,Schema) :
+
+    "This procedure returns a procedure which remaps a data row to the canonical layout of 'Schema'"
+
+    Indexes,Unresolved = ResolveColumns(HeaderLine,Schema)
+    Getter = operator.itemgetter(*[Indexes[Entry[0]] for Entry in Schema])
+
+    if ( len(Schema) == 1 ) : return lambda DataRow : [Getter(DataRow)]
+
+    return lambda DataRow : list(Getter(DataRow))
+
+# This procedure returns a list of ( date, row mapper ) pairs, in ascending
+# date order, for 'Schema' and the layout changes 'LayoutChanges' of a file
+# with header line 'HeaderLine'. The first pair applies from the earliest
+# date 'StartDate'.
+def ReturnLayoutMappers(HeaderLine,Schema,LayoutChanges,StartDate) :
+
+    "This procedure returns a list of ( date, row mapper ) pairs for 'Schema' and the layout changes 'LayoutChanges'"
+
+    Mappers = [(StartDate,ReturnRowMapper(HeaderLine,Schema))]
+    for ChangeDate,Changes in sorted(LayoutChanges,key=lambda Change : Change[0]) :
+        Schema = ApplyLayoutChange(Schema,Changes)
+        Mappers.append((ChangeDate,ReturnRowMapper(HeaderLine,Schema)))
+
+    return Mappers
+
+# This procedure returns the row mapper of 'Mappers' ( see
+# ReturnLayoutMappers ) which applies on 'RowDate'.
+def SelectMapper(Mappers,RowDate) :
+
+    "This procedure returns the row mapper of 'Mappers' which applies on 'RowDate'"
+
+    Selected = Mappers[0][1]
+    for ChangeDate,Mapper in Mappers :
+        if ( RowDate >= ChangeDate ) : Selected = Mapper
+
+    return Selected
@@ -0,0 +1,449 @@
+# covid_update/server.py
+#
+# Description
+# -----------
+# This module serves the latest results of the scripts over HTTP from
+# memory so that dashboards may poll them without reading the statistics
+# files or running the scripts. The latest statistics file of each Pillar 1
+# tier, Pillar 2 series and the trust deaths file in the data directory
+# are loaded into a snapshot, which is replaced as a whole when a run of a
+# script completes ( its run report in the log directory changes ). The
+# following resources are served:
+#
+# /                          Index of the loaded files, tiers, areas, series and trusts
+# /pillar1/<tier>            Latest row of each area of tier <tier> ( e.g. lower )
+# /pillar1/<tier>/<area>     Infectious series of <area>
+# /pillar2/<type>            Rolling series of <type> ( testing or death )
+# /trust_deaths              Last death date of each trust
+# /trust_deaths/<trust>      Daily deaths series of <trust>
+# /alerts                    Latest increasing/decreasing indicator of each series
+#
+# Resources are JSON, or csv if the path ends in '.csv'. Each response is
+# built once per snapshot and served with an ETag, a matching If-None-Match
+# request receiving 304 Not Modified, and gzip compressed if the client
+# accepts it.
+#
+# Usage
+# -----
+# python -m covid_update serve [--port 8080] [--bind 127.0.0.1] [--interval 30] [--variation 5]
+#
+# The directory options of paths.py may also be given.
+#
+
+import csv
+import gzip
+import hashlib
+import http.server
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import date,datetime
+
+import covid_update.pillar1 as Pillar1
+import covid_update.pillar2 as Pillar2
+import covid_update.population as Population
+from covid_update.common import ReturnDateDeath,MonthConverter
+
+# Statistics file name patterns
+Pillar1Pattern = re.compile(r'^pillar1_(.+)_(\d{8})\.csv$')
+Pillar2Pattern = re.compile(r'^pillar2_(.+)_(\d{8})\.csv$')
+TrustPattern = re.compile(r'^trust_deaths_(\d{8})\.csv$')
+
+# Run report file name pattern ( see instrument.py )
+ReportPattern = re.compile(r'_report\.json$')
+
+# Defaults
+DefaultPort = 8080
+DefaultBind = '127.0.0.1'
+DefaultInterval = 30
+DefaultVariation = 5
+
+# Pillar 2 alert value and default variation of each series type
+Pillar2Values = {Pillar2.testing:'Percentage',Pillar2.death:'Rolling'}
+Pillar2Variations = {Pillar2.testing:0.02,Pillar2.death:30}
+
+# Number of days since a death for which a trust is flagged
+TrustDays = 7
+
+# Minimum size in bytes of a compressed response
+CompressSize = 512
+
+# This procedure returns the name of the latest statistics file matching
+# 'Pattern' in 'DataDir' for each value of the first group of the pattern.
+def FindLatestFiles(DataDir,Pattern) :
+
+    "This procedure returns the name of the latest statistics file matching 'Pattern' for each value of its first group"
+
+    Latest = {}
+    for Filename in sorted(os.listdir(DataDir)) :
+        Match = Pattern.match(Filename)
+        if ( Match ) : Latest[Match.group(1)] = os.path.join(DataDir,Filename)
+
+    return Latest
+
+# This procedure reads the csv file 'Filename' and returns the header and
+# the list of data rows.
+def ReadRows(Filename) :
+
+    "This procedure reads the csv file 'Filename' and returns the header and the list of data rows"
+
+    with open(Filename,newline='') as FileObject : Rows = list(csv.reader(FileObject))
+
+    return Rows[0],Rows[1:]
+
+# This procedure returns 'String' as an int or float, or unchanged if it
+# is neither.
+def ReturnNumber(String) :
+
+    "This procedure returns 'String' as an int or float, or unchanged if it is neither"
+
+    for Converter in [int,float] :
+        try :
+            return Converter(String)
+        except ValueError :
+            pass
+
+    return String
+
+# This procedure loads a Pillar 1 statistics file and returns a
+# dictionary of lists of row dictionaries keyed by area.
+def LoadPillar1(Filename) :
+
+    "This procedure loads a Pillar 1 statistics file"
+
+    Header,Rows = ReadRows(Filename)
+    Areas = {}
+    for Row in Rows :
+        Values = dict(zip(Header,Row))
+        for Column in ['Daily','Infectious','Cumulative','Rate'] : Values[Column] = ReturnNumber(Values[Column])
+        Areas.setdefault(Values['Area'],[]).append(Values)
+
+    return Areas
+
+# This procedure loads a Pillar 2 statistics file and returns a list of
+# row dictionaries.
+def LoadPillar2(Filename) :
+
+    "This procedure loads a Pillar 2 statistics file"
+
+    Header,Rows = ReadRows(Filename)
+    Series = []
+    for Row in Rows :
+        Values = dict(zip(Header,Row))
+        for Column in Header[1:] : Values[Column] = ReturnNumber(Values[Column])
+        Series.append(Values)
+
+    return Series
+
+# This procedure loads a trust deaths file and returns a dictionary of
+# lists of ( date, deaths ) row dictionaries keyed by trust. Columns which
+# are not dates ( the totals ) are ignored.
+def LoadTrustDeaths(Filename) :
+
+    "This procedure loads a trust deaths file"
+
+    Header,Rows = ReadRows(Filename)
+
+    Dates = []
+    for Column in Header[1:] :
+        try :
+            Dates.append(ReturnDateDeath(Column,MonthConverter).isoformat())
+        except ( IndexError,KeyError,ValueError ) :
+            break
+
+    Trusts = {}
+    for Row in Rows :
+        Trusts[Row[0]] = [{'Date':Date,'Deaths':int(Deaths)} for Date,Deaths in zip(Dates,Row[1:]) if len(Deaths) > 0]
+
+    return Trusts
+
+# This procedure returns the date of the last death in the trust deaths
+# series 'Series', or None if there are none.
+def ReturnLastDeath(Series) :
+
+    "This procedure returns the date of the last death in the trust deaths series 'Series'"
+
+    LastDeath = None
+    for Row in Series :
+        if ( Row['Deaths'] > 0 ) : LastDeath = Row['Date']
+
+    return LastDeath
+
+# This procedure returns the variation of each Pillar 2 series type from
+# the configuration file 'ConfigurationFilename' if present, otherwise the
+# default variations. Each variation is a ( variation, population ) pair,
+# the population of England being read from the population index
+# 'PopulationFilename' for a per capita death variation ( e.g. '2.5/100k',
+# see population.py ) and None otherwise. A per capita variation without a
+# population, or of another series, is left out so the series is not
+# alerted rather than compared with raw counts.
+def ReturnPillar2Variations(ConfigurationFilename,PopulationFilename=None) :
+
+    "This procedure returns the variation of each Pillar 2 series type"
+
+    Variations = dict([(DataType,(Variation,None)) for DataType,Variation in Pillar2Variations.items()])
+    if ( not os.path.exists(ConfigurationFilename) ) : return Variations
+
+    NationPopulation = None
+    if ( PopulationFilename and os.path.exists(PopulationFilename) ) :
+        with open(PopulationFilename) as FileObject : NationPopulation = Population.ReadPopulations(FileObject.read()).get(Pillar2.NationArea)
+
+    with open(ConfigurationFilename) as FileObject :
+        for Line in FileObject.read().splitlines() :
+            Fields = Line.split(',')
+            if ( len(Fields) <= 5 or Fields[0] not in Variations ) : continue
+            Variation,PerCapita = Population.ParseVariation(Fields[5],float)
+            if ( not PerCapita ) : Variations[Fields[0]] = (Variation,None)
+            elif ( NationPopulation and Fields[0] == Pillar2.death ) : Variations[Fields[0]] = (Variation,NationPopulation)
+            else : del Variations[Fields[0]]
+
+    return Variations
+
+# This procedure returns the list of alert dictionaries of 'Snapshot'.
+# The latest change of each Pillar 1 area and Pillar 2 series is compared
+# with 'Variation' and the Pillar 2 variations 'Variations' ( see
+# ReturnPillar2Variations ), per 100,000 people if a series has a
+# population, and trusts with a death in the last 'TrustDays' days are
+# flagged.
+def ReturnAlerts(Snapshot,Variation,Variations) :
+
+    "This procedure returns the list of alert dictionaries of 'Snapshot'"
+
+    Alerts = []
+
+    for Tier,Areas in Snapshot['pillar1'].items() :
+        for Area,Series in Areas.items() :
+            if ( len(Series) < 2 ) : continue
+            Indicator = Pillar1.ReturnIndicator(Series[-1]['Infectious'] - Series[-2]['Infectious'],Variation)
+            Alerts.append({'source':'pillar1','tier':Tier,'name':Area,'date':Series[-1]['Date'],'value':Series[-1]['Infectious'],
+                           'indicator':Indicator,'attention':Indicator == 'Increasing'})
+
+    for DataType,Series in Snapshot['pillar2'].items() :
+        if ( len(Series) < 2 or DataType not in Pillar2Values or DataType not in Variations ) : continue
+        Value = Pillar2Values[DataType]
+        Variation,NationPopulation = Variations[DataType]
+        Current,Previous = Series[-1][Value],Series[-2][Value]
+        if ( NationPopulation ) : Current,Previous = Population.ReturnPerCapita(Current,NationPopulation),Population.ReturnPerCapita(Previous,NationPopulation)
+        Indicator = Pillar2.ReturnIndicator(Current - Previous,Variation)
+        Alerts.append({'source':'pillar2','name':DataType,'date':Series[-1]['Date'],'value':Current,
+                       'indicator':Indicator,'attention':Indicator == 'Increasing'})
+
+    Today = date.today()
+    for Trust,Series in Snapshot['trust_deaths'].items() :
+        LastDeath = ReturnLastDeath(Series)
+        Attention = ( LastDeath is not None and ( Today - date.fromisoformat(LastDeath) ).days <= TrustDays )
+        Alerts.append({'source':'trust_deaths','name':Trust,'date':LastDeath,'attention':Attention})
+
+    return Alerts
+
+# This procedure loads the latest statistics files in 'DataDir' and
+# returns the snapshot dictionary served.
+def LoadSnapshot(DataDir,Variation,Variations) :
+
+    "This procedure loads the latest statistics files in 'DataDir' and returns the snapshot dictionary"
+
+    Snapshot = {'loaded':datetime.now().isoformat(timespec='seconds'),'files':[],'pillar1':{},'pillar2':{},'trust_deaths':{},'responses':{}}
+
+    for Tier,Filename in FindLatestFiles(DataDir,Pillar1Pattern).items() :
+        Snapshot['pillar1'][Tier] = LoadPillar1(Filename)
+        Snapshot['files'].append(os.path.basename(Filename))
+
+    for DataType,Filename in FindLatestFiles(DataDir,Pillar2Pattern).items() :
+        Snapshot['pillar2'][DataType] = LoadPillar2(Filename)
+        Snapshot['files'].append(os.path.basename(Filename))
+
+    TrustFiles = sorted(FindLatestFiles(DataDir,TrustPattern).values())
+    if ( TrustFiles ) :
+        Snapshot['trust_deaths'] = LoadTrustDeaths(TrustFiles[-1])
+        Snapshot['files'].append(os.path.basename(TrustFiles[-1]))
+
+    Snapshot['alerts'] = ReturnAlerts(Snapshot,Variation,Variations)
+
+    return Snapshot
+
+# This procedure returns the data of resource 'Path' of 'Snapshot' as a
+# list of row dictionaries or a dictionary, or None if not found.
+def ReturnResource(Snapshot,Path) :
+
+    "This procedure returns the data of resource 'Path' of 'Snapshot'"
+
+    Parts = [urllib.parse.unquote(Part) for Part in Path.strip('/').split('/') if Part]
+
+    if ( len(Parts) == 0 ) :
+        return {'loaded':Snapshot['loaded'],'files':Snapshot['files'],
+                'pillar1':dict([(Tier,sorted(Areas)) for Tier,Areas in Snapshot['pillar1'].items()]),
+                'pillar2':sorted(Snapshot['pillar2']),'trust_deaths':sorted(Snapshot['trust_deaths'])}
+
+    Source = Parts[0]
+
+    if ( Source == 'alerts' and len(Parts) == 1 ) : return Snapshot['alerts']
+
+    if ( Source == 'pillar1' and len(Parts) == 2 and Parts[1] in Snapshot['pillar1'] ) :
+        return [Series[-1] for Area,Series in sorted(Snapshot['pillar1'][Parts[1]].items()) if Series]
+
+    if ( Source == 'pillar1' and len(Parts) == 3 and Parts[1] in Snapshot['pillar1'] ) :
+        return Snapshot['pillar1'][Parts[1]].get(Parts[2])
+
+    if ( Source == 'pillar2' and len(Parts) == 2 ) : return Snapshot['pillar2'].get(Parts[1])
+
+    if ( Source == 'trust_deaths' and len(Parts) == 1 ) :
+        return [{'Trust':Trust,'LastDeath':ReturnLastDeath(Series)} for Trust,Series in sorted(Snapshot['trust_deaths'].items())]
+
+    if ( Source == 'trust_deaths' and len(Parts) == 2 ) : return Snapshot['trust_deaths'].get(Parts[1])
+
+    return None
+
+# This procedure returns 'Data' as csv text. A dictionary is returned as a
+# single row.
+def ReturnCSV(Data) :
+
+    "This procedure returns 'Data' as csv text"
+
+    if ( isinstance(Data,dict) ) : Data = [Data]
+
+    Columns = []
+    for Row in Data :
+        for Column in Row :
+            if ( Column not in Columns ) : Columns.append(Column)
+
+    Text = io.StringIO()
+    Writer = csv.DictWriter(Text,Columns,lineterminator='\n')
+    Writer.writeheader()
+    for Row in Data : Writer.writerow(dict([(Column,'' if Value is None else Value) for Column,Value in Row.items()]))
+
+    return Text.getvalue()
+
+# This procedure returns the ( body, compressed body, content type, ETag )
+# of resource 'Path' of 'Snapshot', built once per snapshot, or None if
+# not found.
+def ReturnResponse(Snapshot,Path) :
+
+    "This procedure returns the ( body, compressed body, content type, ETag ) of resource 'Path' of 'Snapshot'"
+
+    Response = Snapshot['responses'].get(Path)
+    if ( Response is not None ) : return Response
+
+    Format = 'json'
+    ResourcePath = Path
+    if ( Path.endswith('.csv') ) :
+        Format = 'csv'
+        ResourcePath = Path[:-4]
+
+    Data = ReturnResource(Snapshot,ResourcePath)
+    if ( Data is None ) : return None
+
+    if ( Format == 'csv' ) :
+        Body = ReturnCSV(Data).encode()
+        ContentType = 'text/csv; charset=utf-8'
+    else :
+        Body = json.dumps(Data,default=str).encode()
+        ContentType = 'application/json'
+
+    Compressed = None
+    if ( len(Body) >= CompressSize ) : Compressed = gzip.compress(Body)
+
+    Response = (Body,Compressed,ContentType,'"%s"' % hashlib.sha1(Body).hexdigest())
+    Snapshot['responses'][Path] = Response
+
+    return Response
+
+# Request handler serving the snapshot of the server.
+class SnapshotHandler(http.server.BaseHTTPRequestHandler) :
+
+    "Request handler serving the snapshot of the server"
+
+    def do_GET(self) :
+
+        Path = urllib.parse.urlsplit(self.path).path
+        Response = ReturnResponse(self.server.Snapshot,Path)
+
+        if ( Response is None ) :
+            self.send_error(404)
+            return
+
+        Body,Compressed,ContentType,ETag = Response
+
+        if ( self.headers.get('If-None-Match') == ETag ) :
+            self.send_response(304)
+            self.send_header('ETag',ETag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type',ContentType)
+        self.send_header('ETag',ETag)
+        self.send_header('Cache-Control','no-cache')
+        self.send_header('Vary','Accept-Encoding')
+        if ( Compressed is not None and 'gzip' in self.headers.get('Accept-Encoding','') ) :
+            Body = Compressed
+            self.send_header('Content-Encoding','gzip')
+        self.send_header('Content-Length',str(len(Body)))
+        self.end_headers()
+        self.wfile.write(Body)
+
+    def log_message(self,format,*args) :
+        pass
+
+# This procedure returns the modification times of the run reports in
+# 'LogDir', which change when a run of a script completes.
+def ReturnReportTimes(LogDir) :
+
+    "This procedure returns the modification times of the run reports in 'LogDir'"
+
+    Times = {}
+    if ( not os.path.isdir(LogDir) ) : return Times
+    for Filename in os.listdir(LogDir) :
+        if ( ReportPattern.search(Filename) ) : Times[Filename] = os.path.getmtime(os.path.join(LogDir,Filename))
+
+    return Times
+
+# This procedure reloads the snapshot of 'Server' from 'DataDir' whenever
+# a run report in 'LogDir' changes, checking every 'Interval' seconds. The
+# snapshot is replaced as a whole so a request is always served from a
+# complete snapshot. If a file cannot be loaded ( e.g. while a script is
+# writing it ) the error is reported, the previous snapshot is kept and
+# the snapshot is reloaded again after the next interval.
+def RefreshSnapshot(Server,DataDir,LogDir,Interval,Variation,Variations) :
+
+    "This procedure reloads the snapshot of 'Server' whenever a run report changes"
+
+    Times = ReturnReportTimes(LogDir)
+    Failure = None
+    while ( True ) :
+        time.sleep(Interval)
+        NewTimes = ReturnReportTimes(LogDir)
+        if ( NewTimes == Times ) : continue
+        try :
+            Server.Snapshot = LoadSnapshot(DataDir,Variation,Variations)
+        except Exception as Error :
+            Message = str(Error) or type(Error).__name__
+            if ( Message != Failure ) :
+                print('Could not reload %s, serving the snapshot loaded %s: %s' % (DataDir,Server.Snapshot['loaded'],Message),file=sys.stderr)
+            Failure = Message
+            continue
+        Times = NewTimes
+        Failure = None
+
+# This procedure creates the server for the data directory 'DataDir' and
+# log directory 'LogDir' listening on 'Bind' and 'Port' and starts the
+# refresh thread. The server is returned.
+def StartServer(DataDir,LogDir,Bind=DefaultBind,Port=DefaultPort,Interval=DefaultInterval,Variation=DefaultVariation,ConfigDir=None) :
+
+    "This procedure creates the server for the data directory 'DataDir' and starts the refresh thread"
+
+    Variations = dict([(DataType,(Variation,None)) for DataType,Variation in Pillar2Variations.items()])
+    if ( ConfigDir ) : Variations = ReturnPillar2Variations(os.path.join(ConfigDir,'pillar2_configuration.csv'),os.path.join(ConfigDir,Population.IndexFileName))
+
+    Server = http.server.ThreadingHTTPServer((Bind,Port),SnapshotHandler)
+    Server.daemon_threads = True
+    Server.Snapshot = LoadSnapshot(DataDir,Variation,Variations)
+
+    Thread = threading.Thread(target=RefreshSnapshot,args=(Server,DataDir,LogDir,Interval,Variation,Variations),daemon=True)
+    Thread.start()
+
+    return Server
@@ -0,0 +1,186 @@
+# covid_update/store.py
+#
+# Description
+# -----------
+# This module provides an optional SQLite store of the results of each run
+# of the scripts, kept in addition to the dated statistics files so that
+# the history of each area, series or trust may be queried without
+# downloading the data again. The store has a table per script:
+#
+# pillar1      - tier, area, date, daily, infectious, cumulative, rate
+# pillar2      - type, date, daily, cumulative_daily, positive, percentage,
+#                cumulative_positive, cumulative, rolling
+# trust_deaths - trust, date, deaths
+#
+# Each table has a 'run_date' column holding the date of the run in which
+# the row was first stored or last revised. Rows are keyed by area ( or
+# series or trust ) and date and are upserted, so a day revised in a later
+# download replaces the stored day and unchanged days are left as they
+# are. Each table is indexed by area and date and by run date. The store
+# is opened in WAL mode so that it may be queried while a run is writing.
+#
+# Options
+# -------
+# The following command line option is removed from the script arguments
+# by ParseOptions(). It may also be given by the environment variable
+# shown, the command line option taking precedence:
+#
+# --store=<file>        COVID_UPDATE_STORE     Store the results in SQLite database <file>
+#
+
+import os
+import sqlite3
+
+from covid_update.common import ReturnDateDeath,MonthConverter
+from covid_update.trust_deaths import TotalColumns
+
+# Environment variable
+EnvironmentVariable = 'COVID_UPDATE_STORE'
+
+# Table definitions. Each is ( table, key columns, value columns ).
+pillar1 = ('pillar1',['tier','area','date'],['daily','infectious','cumulative','rate'])
+pillar2 = ('pillar2',['type','date'],['daily','cumulative_daily','positive','percentage','cumulative_positive','cumulative','rolling'])
+trust_deaths = ('trust_deaths',['trust','date'],['deaths'])
+Tables = [pillar1,pillar2,trust_deaths]
+
+# Pillar 2 output columns stored in each pillar2 table column
+Pillar2Columns = {'daily':'Daily','cumulative_daily':'CumulativeDaily','positive':'Positive','percentage':'Percentage',
+                  'cumulative_positive':'CumulativePositive','cumulative':'Cumulative','rolling':'Rolling'}
+
+# Query returning the runs of consecutive days on which the infectious
+# cases of an area rose. A run is numbered by the difference between the
+# row number of the day and its row number among the rising days.
+RisingQuery = '''
+WITH Changes AS (
+    SELECT area,date,infectious,
+           infectious > LAG(infectious) OVER (PARTITION BY area ORDER BY date) AS rising,
+           ROW_NUMBER() OVER (PARTITION BY area ORDER BY date) AS day
+    FROM pillar1 WHERE tier = ?
+), Runs AS (
+    SELECT area,date,infectious,day - ROW_NUMBER() OVER (PARTITION BY area ORDER BY date) AS run
+    FROM Changes WHERE rising
+)
+SELECT area,MIN(date),MAX(date),COUNT(*),MAX(infectious) FROM Runs
+GROUP BY area,run HAVING COUNT(*) >= ?
+ORDER BY MAX(date) DESC,COUNT(*) DESC,area
+'''
+
+# This procedure removes the store option from the list of command line
+# 'Arguments'. The remaining arguments and a dictionary of the options
+# are returned.
+def ParseOptions(Arguments,Environment=None) :
+
+    "This procedure removes the store option from 'Arguments'"
+
+    if ( Environment is None ) : Environment = os.environ
+
+    Options = {'store':Environment.get(EnvironmentVariable) or None}
+    Remaining = []
+
+    for Argument in Arguments :
+        if ( Argument.startswith('--store=') ) :
+            Options['store'] = Argument.split('=',1)[1]
+        else :
+            Remaining.append(Argument)
+
+    return Remaining,Options
+
+# This procedure opens the store 'Filename', creating the tables and
+# indexes if not present, and returns the connection.
+def Open(Filename) :
+
+    "This procedure opens the store 'Filename', creating the tables and indexes if not present"
+
+    Connection = sqlite3.connect(Filename)
+    Connection.execute('PRAGMA journal_mode=WAL')
+    Connection.execute('PRAGMA synchronous=NORMAL')
+
+    for Table,Keys,Values in Tables :
+        Connection.execute('CREATE TABLE IF NOT EXISTS %s (%s,run_date TEXT NOT NULL,PRIMARY KEY (%s))' % (Table,','.join(Keys + Values),','.join(Keys)))
+        Connection.execute('CREATE INDEX IF NOT EXISTS %s_%s ON %s (%s,date)' % (Table,Keys[-2],Table,Keys[-2]))
+        Connection.execute('CREATE INDEX IF NOT EXISTS %s_run_date ON %s (run_date)' % (Table,Table))
+    Connection.commit()
+
+    return Connection
+
+# This procedure returns the upsert statement of 'Table'. A stored row is
+# only replaced if one of its values has changed.
+def ReturnUpsert(Table) :
+
+    "This procedure returns the upsert statement of 'Table'"
+
+    Table,Keys,Values = Table
+    Columns = Keys + Values + ['run_date']
+    Updates = ','.join(['%s=excluded.%s' % (Column,Column) for Column in Values + ['run_date']])
+    Changed = ' OR '.join(['%s IS NOT excluded.%s' % (Column,Column) for Column in Values])
+
+    return 'INSERT INTO %s (%s) VALUES (%s) ON CONFLICT (%s) DO UPDATE SET %s WHERE %s' % (Table,','.join(Columns),','.join(['?'] * len(Columns)),','.join(Keys),Updates,Changed)
+
+# This procedure upserts 'Rows' into 'Table' in a single transaction and
+# returns the number of rows inserted or revised.
+def Upsert(Connection,Table,Rows) :
+
+    "This procedure upserts 'Rows' into 'Table' in a single transaction"
+
+    with Connection :
+        Before = Connection.total_changes
+        Connection.executemany(ReturnUpsert(Table),Rows)
+        return Connection.total_changes - Before
+
+# This procedure stores the Pillar 1 'AreaResults' ( see
+# pillar1.ComputeInfectious ) of tier type 'TierString' for the run on
+# 'RunDate'. The number of rows inserted or revised is returned.
+def StorePillar1(Connection,TierString,AreaResults,RunDate) :
+
+    "This procedure stores the Pillar 1 'AreaResults' of tier type 'TierString'"
+
+    Rows = []
+    for Area in AreaResults :
+        for OutData in AreaResults[Area] :
+            Rows.append((TierString,OutData['Area'],OutData['Date'].isoformat(),OutData['Daily'],OutData['Infectious'],
+                         OutData['Cumulative'],OutData['Rate'],RunDate.isoformat()))
+
+    return Upsert(Connection,pillar1,Rows)
+
+# This procedure stores the Pillar 2 'SeriesResults' ( see
+# pillar2.ComputeSeries ) of type 'DataType' for the run on 'RunDate'.
+# The number of rows inserted or revised is returned.
+def StorePillar2(Connection,DataType,SeriesResults,RunDate) :
+
+    "This procedure stores the Pillar 2 'SeriesResults' of type 'DataType'"
+
+    Rows = []
+    for OutData in SeriesResults :
+        Values = [OutData.get(Pillar2Columns[Column]) for Column in pillar2[2]]
+        Rows.append(tuple([DataType,OutData['Date'].isoformat()] + Values + [RunDate.isoformat()]))
+
+    return Upsert(Connection,pillar2,Rows)
+
+# This procedure stores the daily deaths of each of the trust deaths
+# 'Matches' ( see trust_deaths.MatchTrusts ) with header 'HeaderList' for
+# the run on 'RunDate'. Empty fields are not stored. The number of rows
+# inserted or revised is returned.
+def StoreTrustDeaths(Connection,HeaderList,Matches,RunDate) :
+
+    "This procedure stores the daily deaths of each of the trust deaths 'Matches'"
+
+    SpecimenDates = []
+    for Date in HeaderList[6:(len(HeaderList) - TotalColumns)] : SpecimenDates.append(ReturnDateDeath(Date,MonthConverter).isoformat())
+
+    Rows = []
+    for Trust,CSVFileDataList in Matches :
+        for SpecimenDate,Deaths in zip(SpecimenDates,CSVFileDataList[6:(len(CSVFileDataList) - TotalColumns)]) :
+            if ( len(Deaths) == 0 ) : continue
+            Rows.append((CSVFileDataList[4],SpecimenDate,int(Deaths),RunDate.isoformat()))
+
+    return Upsert(Connection,trust_deaths,Rows)
+
+# This procedure returns the runs of at least 'Days' consecutive days on
+# which the infectious cases of an area of tier type 'TierString' rose,
+# latest first. A list of ( area, first date, last date, days, highest
+# infectious cases ) is returned.
+def ReturnRisingAreas(Connection,TierString,Days) :
+
+    "This procedure returns the runs of at least 'Days' consecutive days on which the infectious cases of an area rose"
+
+    return Connection.execute(RisingQuery,(TierString,Days)).fetchall()
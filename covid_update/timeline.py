@@ -0,0 +1,129 @@
+# covid_update/timeline.py
+#
+# Description
+# -----------
+# This module provides the dense calendar representation of a daily series
+# used for window lookups. The values of a series are held in an array with
+# one element per day from its first to its last date, the day being the
+# number of days since the fixed epoch 'Epoch', together with a mask of the
+# days present in the data:
+#
+# Start   - day of the first element ( days since 'Epoch' )
+# Values  - array of values, one per day
+# Present - array of flags, 1 if the day is present in the data
+#
+# so that the value a given number of days earlier is found by index
+# arithmetic rather than by scanning back through the rows. The rows may be
+# in any order, a later row for the same day replacing an earlier one.
+#
+# The value of a missing day depends on the fill policy of the series:
+#
+# forward - the value of the latest present day before it ( cumulative counts )
+# zero    - zero ( daily counts )
+# none    - no value, the lookup default being returned
+#
+
+from array import array
+from datetime import date
+
+# Fixed epoch from which days are numbered
+Epoch = date(2020,1,1).toordinal()
+
+# Fill policies for missing days
+forward = 'forward'
+zero = 'zero'
+none = 'none'
+FillPolicies = [forward,zero,none]
+
+# Array type codes of the values and the mask
+ValueType = 'l'
+MaskType = 'b'
+
+# This procedure returns the day of the date ordinal 'Ordinal', the number
+# of days since 'Epoch'.
+def ReturnDay(Ordinal) :
+
+    "This procedure returns the day of the date ordinal 'Ordinal'"
+
+    return Ordinal - Epoch
+
+# A daily series held as a dense array indexed by day.
+class DaySeries :
+
+    "A daily series held as a dense array indexed by day"
+
+    __slots__ = ['Start','Values','Present','Fill']
+
+    def __init__(self,Start,Length,Fill=forward) :
+
+        if ( Fill not in FillPolicies ) : raise ValueError('Unknown fill policy %s' % Fill)
+
+        self.Start = Start
+        self.Values = array(ValueType,bytes(array(ValueType).itemsize * Length))
+        self.Present = array(MaskType,bytes(Length))
+        self.Fill = Fill
+
+    def __len__(self) :
+
+        return len(self.Values)
+
+    # This procedure returns the index of the date ordinal 'Ordinal', which
+    # is outside the series if negative or not less than its length.
+    def ReturnIndex(self,Ordinal) :
+
+        "This procedure returns the index of the date ordinal 'Ordinal'"
+
+        return ReturnDay(Ordinal) - self.Start
+
+    # This procedure returns True if the date ordinal 'Ordinal' is present
+    # in the data.
+    def IsPresent(self,Ordinal) :
+
+        "This procedure returns True if the date ordinal 'Ordinal' is present in the data"
+
+        Index = self.ReturnIndex(Ordinal)
+
+        return ( 0 <= Index < len(self.Present) and self.Present[Index] == 1 )
+
+    # This procedure returns the value of the date ordinal 'Ordinal', filled
+    # if missing, or 'Default' if it is outside the series or missing with
+    # no fill.
+    def ReturnValue(self,Ordinal,Default=None) :
+
+        "This procedure returns the value of the date ordinal 'Ordinal'"
+
+        Index = self.ReturnIndex(Ordinal)
+        if ( Index < 0 or Index >= len(self.Values) ) : return Default
+        if ( self.Fill == none and self.Present[Index] == 0 ) : return Default
+
+        return self.Values[Index]
+
+    # This procedure returns the number of missing days of the series.
+    def ReturnMissingCount(self) :
+
+        "This procedure returns the number of missing days of the series"
+
+        return len(self.Present) - sum(self.Present)
+
+# This procedure returns the dense series of the 'Values' on the date
+# ordinals 'Ordinals', in any order, with missing days filled by policy
+# 'Fill'.
+def BuildDaySeries(Ordinals,Values,Fill=forward) :
+
+    "This procedure returns the dense series of the 'Values' on the date ordinals 'Ordinals'"
+
+    if ( len(Ordinals) == 0 ) : return DaySeries(0,0,Fill)
+
+    Start = ReturnDay(min(Ordinals))
+    Series = DaySeries(Start,ReturnDay(max(Ordinals)) - Start + 1,Fill)
+    for Ordinal,Value in zip(Ordinals,Values) :
+        Index = ReturnDay(Ordinal) - Start
+        Series.Values[Index] = Value
+        Series.Present[Index] = 1
+
+    # Carry the latest present value forward over missing days
+    if ( Fill == forward ) :
+        for Index in range(1,len(Series)) :
+            if ( Series.Present[Index] == 0 ) : Series.Values[Index] = Series.Values[Index - 1]
+
+    return Series
@@ -0,0 +1,405 @@
+# covid_update/trust_deaths.py
+#
+# Description
+# -----------
+# This module contains the processing phases of 'nhs_trust_deaths.py'.
+# Each phase is a separate procedure so that it may be timed or reused
+# independently of the download and conversion of the Excel file:
+#
+# ParseTrustData     - Split the converted csv file into a header and data rows
+# GenerateTrustData  - Split the header of the converted csv file, generating the data rows
+# MatchTrusts        - Select the data rows of the monitored trusts
+# GenerateAlerts     - Generate last death log messages and the attention flag
+# GenerateTrustLines - Generate the lines of the deaths file
+#
+# together with the procedure Main which runs nhs_trust_deaths.py
+#
+
+import os
+from datetime import date
+
+from covid_update.common import GenerateCSVRow,ReturnDateDeath,MonthConverter,info,warning
+
+# Script names
+module = 'nhs_trust_deaths.py'
+
+# Spreadsheet
+Spreadsheet = 'excel.exe'
+
+# Web page constants
+WebPage = 'https://www.england.nhs.uk/statistics/statistical-work-areas/covid-19-daily-deaths/'
+FileNamePattern = r'https://www.england.nhs.uk/statistics/wp-content/uploads/sites/2/\d{4}/\d{2}/COVID-19-total-announced-deaths-\d*-.*-\d{4}.*.xlsx'
+
+# Number of trailing total columns in the data rows. Of these the last
+# 14 are not included in the deaths file.
+TotalColumns = 18
+ExcludedColumns = 14
+
+# This procedure will find the highest index of the list
+# where the value is non-zero
+def FindLastDeath(list) :
+
+    "This procedure will find the highest index (date) of the list where the value is non-zero"
+
+    index = 0
+
+    for item in list:
+
+        # Protect against empty elements
+        if (len(item) == 0) : continue
+
+        # Determine number of deaths
+        value = int(item)
+        if ( value > 0 ) : result = index
+        index += 1
+
+    return result
+
+# This procedure will split the lines of the converted csv file
+# 'CSVFileDataLines' into the header list and a list of data rows.
+def ParseTrustData(CSVFileDataLines) :
+
+    "This procedure will split 'CSVFileDataLines' into the header list and a list of data rows"
+
+    CSVFileDataLists = []
+    for CSVFileDataLine in CSVFileDataLines :
+        CSVFileDataLists.append(CSVFileDataLine.split(','))
+
+    HeaderList = CSVFileDataLists.pop(0)
+
+    return HeaderList,CSVFileDataLists
+
+# This procedure will split the header line of 'CSVFileDataLines' and
+# return it with a generator of the data rows, so that the lines are only
+# read once and only the rows kept by MatchTrusts are held.
+def GenerateTrustData(CSVFileDataLines) :
+
+    "This procedure will split the header line of 'CSVFileDataLines' and return it with a generator of the data rows"
+
+    CSVFileDataLists = ( CSVFileDataLine.split(',') for CSVFileDataLine in CSVFileDataLines )
+    HeaderList = next(CSVFileDataLists,[])
+
+    return HeaderList,CSVFileDataLists
+
+# This procedure will return a list of ( trust, data row ) pairs for
+# each data row in 'CSVFileDataLists' whose trust name starts with one
+# of the names in 'TrustsList'.
+def MatchTrusts(CSVFileDataLists,TrustsList) :
+
+    "This procedure will return a list of ( trust, data row ) pairs for the trusts in 'TrustsList'"
+
+    Matches = []
+
+    for CSVFileDataList in CSVFileDataLists :
+        TrustName = CSVFileDataList[4]
+        for Trust in TrustsList :
+            if ( TrustName.startswith(Trust) ) : Matches.append((Trust,CSVFileDataList))
+
+    return Matches
+
+# This procedure will generate the last death log messages for each of
+# 'Matches'. A list of ( message, level ) pairs and the attention flag are
+# returned. The attention flag is set if a death has occured in any of the
+# trusts in the week up to 'DateToday'. If the alert state 'State' ( see
+# alertstate.py ) is given only new messages are returned and the attention
+# flag is only set for a newly raised alert. The trusts raising the flag
+# are appended to the list 'Flagged' if given.
+def GenerateAlerts(HeaderList,Matches,DateToday,State=None,Flagged=None) :
+
+    "This procedure will generate the last death log messages for each of 'Matches'"
+
+    Messages = []
+    AttentionFlag = False
+
+    # Build list of specimen dates
+    SpecimenDates = []
+    for Date in HeaderList[6:(len(HeaderList) - TotalColumns)] :
+        SpecimenDates.append(ReturnDateDeath(Date,MonthConverter))
+
+    for Trust,CSVFileDataList in Matches :
+        DailyList = CSVFileDataList[6:(len(CSVFileDataList) - TotalColumns)]
+        DateLastDeath = SpecimenDates[FindLastDeath(DailyList)]
+        DaysLapsed = DateToday - DateLastDeath
+        Recent = ( DaysLapsed.days  <= 7 )
+        Attention = Recent
+        if ( State is not None ) : Attention = State.IsRaised(Trust,'last_death',DateLastDeath,Recent)
+        if ( Attention ) : AttentionFlag = True
+        if ( Attention and Flagged is not None ) : Flagged.append(Trust)
+        if ( State is not None and not State.IsNew(Trust,'last_death',DateLastDeath,Recent) ) : continue
+        if ( Recent ) :
+            Message = 'The last death in %s was on %s which is a week or less ago ' % (Trust,str(DateLastDeath))
+            Messages.append((Message,warning))
+        else:
+            Message = 'The last death in %s was on %s' % (Trust,str(DateLastDeath))
+            Messages.append((Message,info))
+
+    return Messages,AttentionFlag
+
+# This procedure will generate the lines of the deaths file, including
+# the header line, for each of 'Matches'.
+def GenerateTrustLines(HeaderList,Matches) :
+
+    "This procedure will generate the lines of the deaths file for each of 'Matches'"
+
+    # Display total headers.
+    yield HeaderList[4] + ',' + GenerateCSVRow(HeaderList[6:(len(HeaderList) - ExcludedColumns)]) + '\n'
+
+    # Display total lines.
+    for Trust,CSVFileDataList in Matches :
+        yield CSVFileDataList[4] + ',' + GenerateCSVRow(CSVFileDataList[6:(len(CSVFileDataList) - ExcludedColumns)]) + '\n'
+
+# This procedure runs nhs_trust_deaths for the command line
+# 'Arguments' ( see nhs_trust_deaths.py ).
+def Main(Arguments) :
+
+    "This procedure runs nhs_trust_deaths for the command line 'Arguments'"
+
+    import File.Operations as File
+    import Interface.Prompts as Interface
+    import covid_update.instrument as Instrument
+    import covid_update.logstore as LogStore
+    import covid_update.paths as Paths
+    import covid_update.httpclient as HttpClient
+    import covid_update.store as Store
+    import covid_update.columnar as Columnar
+    import covid_update.alertstate as AlertState
+    import covid_update.budget as Budget
+    import covid_update.attention as Attention
+    from covid_update.discovery import FindDownloadFiles
+    from covid_update.common import WriteLines,ReturnOutputFileName,failure,empty,error
+
+
+    # Allowed variation in infetctious count.
+    Variation = 5
+
+    # Process path options
+    Arguments,PathOptions = Paths.ParseOptions(Arguments)
+    Directories = Paths.ReturnDirectories(PathOptions)
+
+    # File names and modes
+    Currentdir = os.getcwd()
+    LogDir = Directories[Paths.log]
+    ErrorFilename = os.path.join(LogDir,'log.txt')
+    ConfigDir = Directories[Paths.config]
+    ConfigurationFilename = os.path.join(ConfigDir,'trust_deaths.csv')
+    DataDir = Directories[Paths.data]
+    TempDir = Directories[Paths.scratch]
+    ExcelFileName = os.path.join(TempDir,'trust_deaths.xlsx')
+    CSVFileName = os.path.join(TempDir,'trust_deaths.csv')
+    append = 'a'
+    read = 'r'
+    overwrite = 'w'
+
+    # Data variables
+    DateToday = date.today()
+
+    # Conversion script details
+    ConversionScript = os.path.join(Currentdir,'convert_workbook.vbs')
+    ConversionWait = 20
+
+    # Process HTTP client options
+    Arguments,HttpOptions = HttpClient.ParseOptions(Arguments)
+    HttpClient.Configure(HttpOptions)
+
+    # Process results store option
+    Arguments,StoreOptions = Store.ParseOptions(Arguments)
+
+    # Process columnar output option
+    Arguments,ColumnarOptions = Columnar.ParseOptions(Arguments)
+
+    # Process alert state option
+    Arguments,AlertOptions = AlertState.ParseOptions(Arguments)
+
+    # Process memory budget option
+    Arguments,BudgetOptions = Budget.ParseOptions(Arguments)
+
+    # Process attention report option
+    Arguments,AttentionOptions = Attention.ParseOptions(Arguments)
+
+    # Process instrumentation options and start run report
+    Arguments,Options = Instrument.ParseOptions(Arguments)
+    ReportFilename = Options['report'] or Instrument.ReturnReportFileName(LogDir,module)
+    Report = Instrument.RunReport(module)
+    Profiler = Instrument.StartProfiling(Options['profile'])
+
+    # Store log messages in the log store, rotating the text log
+    File = LogStore.ReturnRecordingFile(File,LogDir,ErrorFilename)
+
+    # Create/open log file
+    ErrorFileObject = File.Open(ErrorFilename,append,failure)
+    ErrorMessage = 'Could not open ' + ErrorFilename
+    if ( ErrorFileObject == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,error)
+
+    # Log start of script
+    File.Logerror(ErrorFileObject,module,'Started',info)
+
+    # Log progress messages
+    ErrorMessage = 'Reading configuration file %s ' % ConfigurationFilename
+    File.Logerror(ErrorFileObject,module,ErrorMessage,info)
+
+    # Open and parse configuration file
+    Phase = Report.Start('config',file=ConfigurationFilename)
+    ConfigurationFileObject = File.Open(ConfigurationFilename,read,failure)
+    ErrorMessage = 'Could not open ' + ConfigurationFilename
+    if ( ConfigurationFileObject == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,error)
+
+    ConfigurationFileData = File.Read(ConfigurationFileObject,empty)
+    if ( ConfigurationFileData != empty ) :
+        ConfigurationFileDataLines = ConfigurationFileData.splitlines()
+    else:
+        ErrorMessage = 'No data in ' + ConfigurationFilename
+        File.Logerror(ErrorFileObject,module,ErrorMessage,error)
+
+    # Create list of trusts.
+    TrustsList = []
+    for ConfigurationFileDataLine in ConfigurationFileDataLines :
+        Trusts = ConfigurationFileDataLine.split(',')
+        for Trust in Trusts :
+            TrustsList.append(Trust)
+
+    # Close Configuration file
+    ErrorMessage = 'Could not close ' + ConfigurationFilename
+    if ( File.Close(ConfigurationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+    Report.Stop(Phase,trusts=len(TrustsList))
+
+    # Determine donload file name
+    Phase = Report.Start('discovery',url=WebPage)
+    FileUrl = FindDownloadFiles([(WebPage,FileNamePattern)],TempDir)[0]
+    Report.Stop(Phase,found=(len(FileUrl) > 0))
+
+    # Log progress messages
+    ErrorMessage = 'Downloading file %s ' % FileUrl
+    File.Logerror(ErrorFileObject,module,ErrorMessage,info)
+
+    # Download excel spreadsheet in chunks to the excel output file.
+    Phase = Report.Start('download',url=FileUrl)
+    Result = HttpClient.Download(FileUrl,ExcelFileName)
+    Report.Stop(Phase,status=Result['status'],bytes=Result['bytes'],wire=Result['wire'],retries=Result['retries'],resumes=Result['resumes'],sha256=Result['sha256'])
+    if ( not Result['complete'] ) :
+        ErrorMessage = 'GET operation for %s failed' % FileUrl
+        File.Logerror(ErrorFileObject,module,ErrorMessage,error)
+
+    # Log progress messages
+    ErrorMessage = 'Converting Excel file %s ' % ExcelFileName
+    File.Logerror(ErrorFileObject,module,ErrorMessage,info)
+
+    # Extract data to csv file
+    Phase = Report.Start('conversion',script=ConversionScript)
+    Interface.RunScript(ConversionScript,ConversionWait)
+    Report.Stop(Phase)
+
+    # Log progress messages
+    ErrorMessage = 'Extracting data from temporary csv file %s ' % CSVFileName
+    File.Logerror(ErrorFileObject,module,ErrorMessage,info)
+
+    # Open CSV file
+    CSVFileObject = File.Open(CSVFileName,read,failure)
+    ErrorMessage = 'Could not open ' + CSVFileName
+    if ( CSVFileObject == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,error)
+
+    # Read CSV file data. With a memory budget a file larger than the budget
+    # is read from disk a line at a time and only the matching rows are kept.
+    Phase = Report.Start('parse',file=CSVFileName)
+    if ( BudgetOptions['budget'] is None ) :
+        CSVFileData = File.Read(CSVFileObject,empty)
+        if ( CSVFileData != empty ) :
+            CSVFileDataLines = CSVFileData.splitlines()
+        else:
+            Errormessage = 'No data in ' + CSVFileName
+            File.Logerror(ErrorFileObject,module,Errormessage,error)
+
+        # Build data structure
+        HeaderList,CSVFileDataLists = ParseTrustData(CSVFileDataLines)
+    else :
+        CSVFileDataLines = Budget.ReturnLines(CSVFileName,None,BudgetOptions['budget'])
+        HeaderList,CSVFileDataLists = GenerateTrustData(CSVFileDataLines)
+    TrustMatches = MatchTrusts(CSVFileDataLists,TrustsList)
+    Report.Stop(Phase,lines=len(CSVFileDataLines),rows=len(TrustMatches))
+
+    # Determine deaths file name
+    DeathsFileName = os.path.join(DataDir,ReturnOutputFileName('trust_deaths'))
+
+    # Log progress messages
+    ErrorMessage = 'Writing data to file %s ' % DeathsFileName
+    File.Logerror(ErrorFileObject,module,ErrorMessage,info)
+
+    # Open deaths file
+    DeathsFileObject = File.Open(DeathsFileName,overwrite,failure)
+    ErrorMessage = 'Could not open ' + DeathsFileName
+    if ( DeathsFileObject == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,error)
+
+    # Output header and data lines
+    Phase = Report.Start('output',file=DeathsFileName)
+    OutputBytes = WriteLines(DeathsFileObject,GenerateTrustLines(HeaderList,TrustMatches))
+    Report.Stop(Phase,bytes=OutputBytes)
+
+    # Write columnar copy of results
+    if ( ColumnarOptions['columnar'] ) :
+        ColumnarFilename = Columnar.ReturnColumnarFileName(DeathsFileName,ColumnarOptions['columnar'])
+        Phase = Report.Start('columnar',file=ColumnarFilename)
+        try :
+            ColumnarBytes = Columnar.WriteTable(Columnar.BuildTrustTable(HeaderList,TrustMatches),ColumnarFilename,ColumnarOptions['columnar'])
+        except ImportError :
+            ColumnarBytes = 0
+            ErrorMessage = 'pyarrow is not installed, %s not written' % ColumnarFilename
+            File.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+        Report.Stop(Phase,bytes=ColumnarBytes)
+
+    # Store results, replacing any revised days
+    if ( StoreOptions['store'] ) :
+        Phase = Report.Start('store',file=StoreOptions['store'])
+        Connection = Store.Open(StoreOptions['store'])
+        StoredRows = Store.StoreTrustDeaths(Connection,HeaderList,TrustMatches,DateToday)
+        Connection.close()
+        Report.Stop(Phase,rows=StoredRows)
+        ErrorMessage = '%i rows stored or revised in %s' % (StoredRows,StoreOptions['store'])
+        File.Logerror(ErrorFileObject,module,ErrorMessage,info)
+
+    # Generate warning messages
+    Phase = Report.Start('alert')
+    State = None
+    if ( AlertOptions['alertstate'] ) : State = AlertState.AlertState(AlertState.ReturnStateFileName(LogDir,module),DateToday)
+    Flagged = []
+    Messages,AttentionFlag = GenerateAlerts(HeaderList,TrustMatches,DateToday,State,Flagged)
+    for Message,Level in Messages : File.Logerror(ErrorFileObject,module,Message,Level)
+    if ( State is not None ) :
+        for Message in AlertState.GenerateClearedMessages(State) : File.Logerror(ErrorFileObject,module,Message,info)
+        State.Write()
+        Report.Count('suppressed',State.Suppressed)
+    Report.Stop(Phase,messages=len(Messages),attention=AttentionFlag)
+
+    # Processes attention flags, writing an attention report of the flagged trusts to view if requested.
+    if ( AttentionFlag ) :
+        ViewFileName = DeathsFileName
+        if ( AttentionOptions['attention'] ) :
+            ViewFileName = Attention.ReturnReportFileName(DeathsFileName,AttentionOptions['attention'])
+            Phase = Report.Start('attention',file=ViewFileName)
+            Heading,Rows = Attention.BuildTrustReport(HeaderList,TrustMatches,Flagged,DateToday)
+            AttentionBytes = Attention.WriteReport(ViewFileName,AttentionOptions['attention'],'Trust deaths attention report',Heading,Rows)
+            Report.Stop(Phase,bytes=AttentionBytes,trusts=len(Flagged))
+        ErrorMessage = 'Attention flag set for %s please view' % ViewFileName
+        File.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+        if ( not PathOptions['headless'] ) : Interface.ViewSpeadsheet(Spreadsheet,ViewFileName)
+
+    # Close deaths file
+    ErrorMessage = 'Could not close ' + DeathsFileName
+    if ( File.Close(DeathsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+
+    # Close CSV file
+    ErrorMessage = 'Could not close ' + CSVFileName
+    if ( File.Close(CSVFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+
+    # Stop any profiling and write run report
+    ProfileFilename = Instrument.StopProfiling(Profiler,Options['profile'],ReportFilename,Report)
+    if ( ProfileFilename ) : File.Logerror(ErrorFileObject,module,'Profile written to %s' % ProfileFilename,info)
+    Report.Write(ReportFilename)
+    File.Logerror(ErrorFileObject,module,'Run report written to %s' % ReportFilename,info)
+
+    # Log end of script
+    File.Logerror(ErrorFileObject,module,'Completed',info)
+
+    # Close error log file
+    ErrorMessage = 'Could not close ' + ErrorFilename
+    if ( File.Close(ErrorFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,ErrorMessage,warning)
+
+    return 0
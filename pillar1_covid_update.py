@@ -11,7 +11,11 @@
 # number of infectious people is potentially or (almost) certainly increasing or decreasing 
 # are also generated for the latest rolling period. The rolling average period is the same 
 # as 'InfectiousPeriod'. A threshold 'Variation' is set above which caes are defintely 
-# increasing or decresing. For further details on the data used see:
+# increasing or decresing. If 'Variation' ends in '/100k', e.g. '2.5/100k', it is 
+# a number of infectious people per 100,000 and each area is compared per capita, 
+# the population being taken from config\area_population.csv or estimated from 
+# the case rate ( see covid_update/population.py ). For further details on the 
+# data used see:
 # 
 # https://coronavirus.data.gov.uk/about-data
 # 
@@ -24,6 +28,72 @@
 # python pillar1_covid_update.py
 # python pillar1_covid_update.py <configuration file name>
 #
+# The options '--report=<file>' and '--profile=cprofile|tracemalloc'
+# described in covid_update/instrument.py may also be specified.
+#
+# The log, configuration, data and scratch directories may be changed
+# and a separate set of directories used for each of several parallel
+# runs with the options '--log-dir=<dir>', '--config-dir=<dir>',
+# '--data-dir=<dir>', '--scratch-dir=<dir>' and '--instance=<name>'
+# described in covid_update/paths.py. The option '--headless', the
+# default if not running on Windows, prevents the spreadsheet launch.
+#
+# Downloads share one pooled connection, are compressed in transfer and are
+# retried with a backoff if the server throttles or fails the request. The
+# options '--timeout=<seconds>' and '--retries=<count>' described in
+# covid_update/httpclient.py change the read timeout and number of retries.
+# The downloads may be recorded as fixtures and replayed offline with the
+# options '--record=<dir>' and '--replay=<dir>'.
+#
+# With the option '--store=<file>' the results are also stored in the SQLite
+# database <file> described in covid_update/store.py, revised days replacing
+# those already stored.
+#
+# With the option '--columnar=arrow|parquet' a columnar copy of the results
+# is also written alongside the statistics file ( see covid_update/columnar.py ).
+# This requires the pyarrow module.
+#
+# With the option '--attention-report=xlsx|html' an attention report of
+# the last days of the flagged areas with trend columns is written
+# alongside the statistics file when the attention flag is set, and is
+# viewed in place of it ( see covid_update/attention.py ).
+#
+# With the option '--memory-budget=<MB>' a data file larger than <MB>
+# megabytes is read from disk as it is processed rather than into memory
+# ( see covid_update/budget.py ), so that several scripts may run in
+# parallel in a small amount of memory.
+#
+# With the option '--alert-state' only alert messages which are new since
+# the previous run are logged and the spreadsheet is only launched for a
+# newly raised alert. The alert state is kept in the log directory ( see
+# covid_update/alertstate.py ).
+#
+# With the option '--rollup' the data of a higher tier is derived from the
+# lower tier local authority file, which is downloaded once and cached in
+# the scratch directory for use by the runs of each tier. This requires the
+# area hierarchy file .\config\area_hierarchy.csv described in
+# covid_update/hierarchy.py. Case rates are not available for rolled up data.
+#
+# With the option '--scan=<count>' every area of the tier in the downloaded
+# file is ranked by the growth in infectious cases over the last 7 days and
+# the <count> fastest growing areas are logged, e.g.
+#
+# Hotspot <area> infectious cases <n> on <date>, up <increase> ( +<growth>% ) in 7 days
+#
+# With the option '--growth=<days>' the daily growth rate of the infectious
+# cases of each area is estimated over the last <days> days with a 95%
+# confidence band and the doubling ( or halving ) time ( see
+# covid_update/growth.py ) and logged. With the option '--growth-alert=<percent>'
+# the spreadsheet is launched if the whole band of any area is at least
+# <percent> a day rather than on the increase in infectious cases, so areas
+# of any size are compared alike.
+#
+# With the option '--revisions' every row of the tier is compared with the
+# previous run using the row hashes kept in .\data\pillar1_<tier>_hashes.txt
+# ( see covid_update/revisions.py ). The added and revised rows are listed in
+# .\data\revisions_<tier>_<YYYYMMDD>.csv and the earliest revised date of
+# each configured area is logged.
+#
 # The script will launch 'spreadsheet' to display the generated csv
 # if the number of infectious people has just gone up in the last
 # rolling average period.
@@ -68,326 +138,21 @@
 # Logging
 # -------
 # This script logs error and status messages to the file .\log\log.txt
+# and writes a run report of the time taken, bytes and rows processed in
+# each phase to .\log\pillar1_covid_update_report.json
+# The messages are also stored in the SQLite database .\log\log.db, which
+# may be queried with 'python -m covid_update logs' ( see covid_update/logstore.py ),
+# and .\log\log.txt is rotated to log.txt.1 to log.txt.5 once it reaches 5 MB.
+#
+# The processing is carried out by covid_update/cli.py which may also be
+# run directly as 'python -m covid_update pillar1'.
 #
 
-import re
-import requests
-from datetime import date,timedelta
-import time
-import os
 import sys
-import subprocess
-import File.Operations as File
-import Interface.Prompts as Interface
-
-# This procedure will determine if 'string' is present
-# at 'index' in 'list'
-def IsPresent(string,index,list) :
-
-    "This procedure will determine if 'string' is  present at 'index' in 'list'"
-    
-    result = False
-    if ( re.match(string,list[index]) ) : result = True
-    
-    return result
- 
-# This procedure will return a string containing the
-# elements of list separated by a comma. All elements are
-# cast to strings.
-def GenerateCSVRow(list) :
- 
-    "This procedure will generate a string containing the elements of 'list' separated by a comma"
- 
-    string = ''
-    for item in list : string = string + str(item) + ',' 
-    string = string.rstrip(',')
-    
-    return string
-    
-# This procedure will return a list of values contained
-# in 'dictionary' referenced by 'keys'.
-def GenerateFieldList(keys,dictionary) : 
-
-    "This procedure will return a list of values contained in 'dictionary' referenced by 'keys'"
-    
-    list = []
-    for key in keys : list.append(dictionary[key])
-    
-    return list
-    
-# This procedure returns a date object from a 'specimendate'.
-def ReturnDate(specimendate) :
-
-    "This procedure returns a date object from a 'specimendate'"
-    
-    list = specimendate.split('-')
-    year = int(list[0])
-    month = int(list[1])
-    day = int(list[2])
-    
-    return date(year, month, day)
-    
-# This procedure will return a tier type string
-def ReturnTierType(string) :
+from covid_update.cli import main
 
-    "This procedure will return a shortened teir type string"
-    
-    result = string
-    
-    if ( string.startswith('utla') ) : result = 'upper'
-    if ( string.startswith('ltla') ) : result = 'lower'
-        
-    return result
-    
-# This procedure returns a file name string based on todays date
-# a 'base' string and a teir type string.
-def ReturnFileName(base,type) :
-
-    "This procedure returns a file name string based on todays date and a 'base' name"
-    
-    today = date.today()
-    month = str(today.month)
-    year = str(today.year) 
-    day = str((today.day))    
-    
-    # Add leading 0 if required
-    if ( len(month) == 1 ) : month = '0' + month 
-    if ( len(day) == 1 ) : day = '0' + day
-    
-    name = base + '_' + type + '_' + year + month + day + '.csv'
-    
-    return name
-
-# This procedure will remove the decimal part of a string representation
-# of a float.
-def GetDecimalPart(string) :
-
-    "This procedure will remove the decimal part of a string representation of a float"
-    
-    part = string.split('.')[0]
-    # Protection against empty fields in csv file.
-    if ( len(part) == 0 ) : part = '0'
-    
-    return part
-           
 ############
 ### MAIN ###
 ############
 
-# File names and modes
-Currentdir = os.getcwd()
-LogDir = Currentdir + '\\log'
-ErrorFilename = LogDir + '\\' + 'log.txt'
-ConfigDir = Currentdir + '\\config'
-ConfigurationFilename = ConfigDir + '\\' + 'pillar1_configuration.csv'
-DataDir = Currentdir + '\\data'
-append = 'a'
-read = 'r'
-overwrite = 'w'
-
-# Function return values
-invalid = failure = 0
-empty = ''
-success = 1
-
-# Error levels
-error = 'ERROR'
-warning = 'WARNING'
-info = 'INFO'
-
-# Script names
-module = 'pillar1_covid_update'
-
-# Spreadsheet
-Spreadsheet = 'excel.exe'
-
-# Input data column numbers
-Columns = {'Area':1,'Type':2,'Date':3,'Daily':6,'Cumulative':4,'Rate':5}
-
-# Output data columns
-OutColumns = ['Area','Date','Daily','Infectious','Cumulative','Rate']
-
-# Create/open log file
-ErrorFileObject = File.Open(ErrorFilename,append,failure)
-Errormessage = 'Could not open ' + ErrorFilename
-if ( ErrorFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
-
-# Log start of script
-File.Logerror(ErrorFileObject,module,'Started',info)
-
-# Process optional configuration file argument
-if ( len(sys.argv) > 1 ) : ConfigurationFilename = ConfigDir + '\\' + sys.argv[1]
-
-# Log progress messages
-Errormessage = 'Reading configuration file %s ' % ConfigurationFilename
-File.Logerror(ErrorFileObject,module,Errormessage,info)
-
-# Open and parse configuration file
-ConfigurationFileObject = File.Open(ConfigurationFilename,read,failure)
-Errormessage = 'Could not open ' + ConfigurationFilename
-if ( ConfigurationFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
-
-ConfigurationFileData = File.Read(ConfigurationFileObject,empty)
-if ( ConfigurationFileData != empty ) : 
-    ConfigurationFileDataList = ConfigurationFileData.split(',')
-    CovidPage = ConfigurationFileDataList[0]
-    TierString = ConfigurationFileDataList[1]
-    StatisticsFilename = DataDir + '\\' + ReturnFileName('pillar1',ReturnTierType(TierString))
-    InfectiousPeriod = int(ConfigurationFileDataList[2])
-    Variation = int(ConfigurationFileDataList[3])
-    Areas = ConfigurationFileDataList[4:]
-else:
-    Errormessage = 'No data in ' + ConfigurationFilename
-    File.Logerror(ErrorfileObject,module,Errormessage,error)
-
-# Close Configuration file
-Errormessage = 'Could not close ' + ConfigurationFilename
-if ( File.Close(ConfigurationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
-
-# Log progress messages
-Errormessage = 'Retrieving file %s ' % CovidPage
-File.Logerror(ErrorFileObject,module,Errormessage,info)
-
-# 'Download' data file
-Response = requests.get(CovidPage)
-if ( Response.status_code != 200 ) :
-    Errormessage = 'GET operation for %s failed' % CovidPage
-    File.Logerror(ErrorFileObject,module,Errormessage,error)
-     
-ResponseLines = Response.text.splitlines()
-if ( len(ResponseLines) == 0 ) :
-    Errormessage = '%s is an empty file' % CovidPage
-    File.Logerror(ErrorFileObject,module,Errormessage,error)
-    
-# Log progress messages
-Errormessage = 'Extracting data for %s %s ' % (TierString,str(Areas))
-File.Logerror(ErrorFileObject,module,Errormessage,info)
-
-# Intialize Area data sets
-AreaData = {}
-for Area in Areas : AreaData[Area] = []
-
-# Initialize area line counts
-AreaDataCount = {}
-for Area in Areas : AreaDataCount[Area] = 0
-
-# Extract data for specified Area's.
-for ResponseLine in ResponseLines :
-    
-    # Protect against empty lines.
-    if ( len(ResponseLine) == 0 ) : break
-    
-    DataRow = ResponseLine.split(',')
-    if ( IsPresent(TierString,Columns['Type'],DataRow) ) :
-        for Area in Areas :     
-            if ( IsPresent(Area,Columns['Area'],DataRow) ) :  
-            
-                AreaDataCount[Area] += 1
-                
-                # Replace date string with date object so date
-                # differences can be calculated.
-                DataRow[Columns['Date']] = ReturnDate(DataRow[Columns['Date']])
-                
-                # Protects against decimal and null values in these fields which makes no sense.
-                DataRow[Columns['Daily']]  = GetDecimalPart(DataRow[Columns['Daily']])
-                DataRow[Columns['Cumulative']]  = GetDecimalPart(DataRow[Columns['Cumulative']])
-                
-                # Note: data is provided in descending date order and must be reversed
-                AreaData[Area].insert(0,DataRow)
-                
-# Dislay the number of data items detected for each area
-for Area in Areas :
-    Errormessage = '%i data rows were found for %s %s ' % (AreaDataCount[Area],TierString,Area)
-    File.Logerror(ErrorFileObject,module,Errormessage,info)
-                          
-# Open Statics file
-StatisticsFileObject = File.Open(StatisticsFilename,overwrite,failure)
-Errormessage = 'Could not open ' + StatisticsFilename
-if ( StatisticsFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
-
-# Set alarm to false
-AttentionFlag = False
-
-# Print enhanced data
-
-# Column headings
-Headings = GenerateCSVRow(OutColumns)
-Headings = Headings + '\n'
-File.Writeline(StatisticsFileObject,Headings,failure)
-
-for Area in AreaData : 
-    
-    # Initialize infectious totals
-    Infectious = 0
-    InfectiousPrevious = 0
-    
-    for SpecimenPeriod in range(0,(len(AreaData[Area]))) :
-               
-        OutData = {}
-        for Column in Columns : OutData[Column] = AreaData[Area][SpecimenPeriod][Columns[Column]]
-               
-        # Log increase/decrease messages
-        if ( InfectiousPrevious != 0 ) :
-            Indicator = 'Decreasing'
-            InfectiousIncrease = Infectious - InfectiousPrevious
-            if ( InfectiousIncrease > 0 ) : Indicator = 'Potentially Increasing'
-            if ( InfectiousIncrease >= Variation  ) : Indicator = 'Increasing'
-            if ( len(AreaData[Area]) - SpecimenPeriod < InfectiousPeriod ) :
-                Errormessage = 'Infectious cases %s in %s on %s' % (Indicator,Area,str(CurrentSpecimenDate))
-                File.Logerror(ErrorFileObject,module,Errormessage,info)
-        
-        # Save previous infectious numbers for attention flag and increase/decrease warnings.
-        InfectiousPrevious = Infectious
-        
-        # Determine number of cases no longer infectious (Recovered)
-        Recovered = 0
-        
-        CurrentSpecimenDate = AreaData[Area][SpecimenPeriod][Columns['Date']]
-        for PreviousPeriod in range(SpecimenPeriod,0,-1) : 
-            PreviousSpecimenDate = AreaData[Area][PreviousPeriod][Columns['Date']]
-            SpecimenDateDiff = CurrentSpecimenDate - PreviousSpecimenDate
-            if ( SpecimenDateDiff.days >= InfectiousPeriod ) :
-                Recovered = int(AreaData[Area][PreviousPeriod][Columns['Cumulative']])
-                break
-                   
-        Cumulative = OutData['Cumulative'] 
-        Infectious = int(Cumulative) - Recovered
-        OutData['Infectious'] = str(Infectious)
-               
-        # Data row
-        Row =  GenerateCSVRow(GenerateFieldList(OutColumns,OutData)) 
-        Row = Row + '\n'
-        File.Writeline(StatisticsFileObject,Row,failure)
-    
-    # Generate final trend message and determine if attention flag should be raised
-    Indicator = 'Decreasing'
-    InfectiousIncrease = Infectious - InfectiousPrevious  
-    if ( InfectiousIncrease > 0 ) : Indicator = 'Potentially Increasing'
-    if ( InfectiousIncrease >= Variation  ) : 
-        Indicator = 'Increasing'
-        AttentionFlag = True
-    Errormessage = 'Infectious cases %s in %s on %s' % (Indicator,Area,str(CurrentSpecimenDate))
-    File.Logerror(ErrorFileObject,module,Errormessage,info)
-    
-    # Log some good news
-    if ( Infectious == 0  ) :
-        Errormessage = 'No infectious Pillar 1 cases in %s on %s' % (Area,str(CurrentSpecimenDate))
-        File.Logerror(ErrorFileObject,module,Errormessage,info)
-        
-        
-# Close Statistics file
-Errormessage = 'Could not close ' + StatisticsFilename
-if ( File.Close(StatisticsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)   
-
-# Display manual step message and launch Excel if increase in infectious total detected
-if ( AttentionFlag )  :
-    Errormessage = 'Increase in infectious count detected, please view %s' % StatisticsFilename
-    File.Logerror(ErrorFileObject,module,Errormessage,warning)
-    Interface.ViewSpeadsheet(Spreadsheet,StatisticsFilename)     
-        
-# Log end of script
-File.Logerror(ErrorFileObject,module,'Completed',info)
-
-# Close error log file
-Errormessage = 'Could not close ' + ErrorFilename
-if ( File.Close(ErrorFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
+sys.exit(main(['pillar1'] + sys.argv[1:]))
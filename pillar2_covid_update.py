@@ -19,8 +19,10 @@
 # deaths in a rolling period are decreasing or increasing are generated during the 
 # processing of the respective data files. 'Variation' values for each of the data sets 
 # are defined in the scripts configuration file which will modify the increasing/decreasing 
-# messages to highlight where the increase detected is small (not significant). For further 
-# details regarding Pillar 2 data see:
+# messages to highlight where the increase detected is small (not significant). A death 
+# 'Variation' ending in '/100k' is a number of deaths per 100,000 people, the population 
+# of England being taken from config\area_population.csv ( see covid_update/population.py ).
+# For further details regarding Pillar 2 data see:
 # 
 # https://www.gov.uk/guidance/coronavirus-covid-19-information-for-the-public
 # 
@@ -31,6 +33,46 @@
 #
 # python pillar2_covid_update.py
 #
+# The options '--report=<file>' and '--profile=cprofile|tracemalloc'
+# described in covid_update/instrument.py may also be specified.
+#
+# The log, configuration, data and scratch directories may be changed
+# and a separate set of directories used for each of several parallel
+# runs with the options '--log-dir=<dir>', '--config-dir=<dir>',
+# '--data-dir=<dir>', '--scratch-dir=<dir>' and '--instance=<name>'
+# described in covid_update/paths.py. The option '--headless', the
+# default if not running on Windows, prevents the spreadsheet launch.
+#
+# Downloads share one pooled connection, are compressed in transfer and are
+# retried with a backoff if the server throttles or fails the request. The
+# options '--timeout=<seconds>' and '--retries=<count>' described in
+# covid_update/httpclient.py change the read timeout and number of retries.
+# The downloads may be recorded as fixtures and replayed offline with the
+# options '--record=<dir>' and '--replay=<dir>'.
+#
+# With the option '--store=<file>' the results are also stored in the SQLite
+# database <file> described in covid_update/store.py, revised days replacing
+# those already stored.
+#
+# With the option '--columnar=arrow|parquet' a columnar copy of the results
+# is also written alongside the statistics file ( see covid_update/columnar.py ).
+# This requires the pyarrow module.
+#
+# With the option '--attention-report=xlsx|html' an attention report of
+# the last days of the flagged series with trend columns is written
+# alongside the statistics file when the attention flag is set, and is
+# viewed in place of it ( see covid_update/attention.py ).
+#
+# With the option '--memory-budget=<MB>' a data file larger than <MB>
+# megabytes is read from disk as it is processed rather than into memory
+# ( see covid_update/budget.py ), so that several scripts may run in
+# parallel in a small amount of memory.
+#
+# With the option '--alert-state' only alert messages which are new since
+# the previous run are logged and the spreadsheet is only launched for a
+# newly raised alert. The alert state is kept in the log directory ( see
+# covid_update/alertstate.py ).
+#
 # The script will launch 'spreadsheet' to display the generated csv
 # file(s) if the number of deaths in the latest rolling period is greater 
 # than in the previous rolling period, or the percentage of positive
@@ -78,488 +120,29 @@
 # - 'rolling period' is set to the length of the rolling period in days.
 # - 'variation' is set to a increase in percentage or rolling value that is deemed to be insignificant.   
 #
+# The optional file .\config\pillar2_corrections.csv contains the data correction
+# rules applied to the downloaded data ( see covid_update/corrections.py ). If it is
+# not present the rules built into covid_update/pillar2.py are used. The number of
+# rows affected by each rule is logged.
+#
 # Logging
 # -------
 # This script logs error and status messages to the file .\log\log.txt
+# and writes a run report of the time taken, bytes and rows processed in
+# each phase to .\log\pillar2_covid_update_report.json
+# The messages are also stored in the SQLite database .\log\log.db, which
+# may be queried with 'python -m covid_update logs' ( see covid_update/logstore.py ),
+# and .\log\log.txt is rotated to log.txt.1 to log.txt.5 once it reaches 5 MB.
+#
+# The processing is carried out by covid_update/cli.py which may also be
+# run directly as 'python -m covid_update pillar2'.
 #
-import re
-import requests
-from datetime import date,timedelta
-import time
-import os
-import sys
-import subprocess
-import File.Operations as File
-import Interface.Prompts as Interface
-
-# Finds url for download file
-def FindDownloadFile(url,content) :
-
-    "Finds url for download file"
-	
-    Link = ""
-     
-    Httpresponse = requests.get(url)
-    Httplines = Httpresponse.text.split('\n')
-	
-    # Search for content
-	
-    for Httpline in Httplines : 
-        Httpmatch = re.search(content,Httpline)
-        if Httpmatch: 
-            Link = Httpmatch.group(0)
-            break
-			
-    return Link
-    
-# This procedure will determine if the data type specified
-# by string is valid. It compares string with all the key 
-# values of dictionary.
-def ConfigurationDataTypeValid(string,dictionary) :
-
-    "This procedure will determine if the data type specified by string is valid"
-    
-    result = False
-    
-    for key in dictionary : 
-        if ( key == string ) : result = True
-    
-    return result
-    
-# This procedure will determine if 'string' is present
-# at 'index' in 'list'
-def IsPresent(string,index,list) :
-
-    "This procedure will determine if 'string' is  present at 'index' in 'list'"
-    
-    result = False
-    if ( re.match(string,list[index]) ) : result = True
-    
-    return result
-    
-    # This procedure will return a string containing the
-# elements of list separated by a comma. All elements are
-# cast to strings.
-def GenerateCSVRow(list) :
- 
-    "This procedure will generate a string containing the elements of 'list' separated by a comma"
- 
-    string = ''
-    for item in list : string = string + str(item) + ',' 
-    string = string.rstrip(',')
-    
-    return string
-    
-# This procedure will return a list of values contained
-# in 'dictionary' referenced by 'keys'.
-def GenerateFieldList(keys,dictionary) : 
-
-    "This procedure will return a list of values contained in 'dictionary' referenced by 'keys'"
-    
-    list = []
-    for key in keys : list.append(dictionary[key])
-    
-    return list
-    
-# This procedure returns a date object from a 'specimendate'.
-# The dictionary 'conversion' is used to convert month strings
-# to month numbers
-def ReturnDateDeath(specimendate,conversion) :
-
-    "This procedure returns a date object from a 'specimendate. The dictionary 'conversion' is used to convert month strings to month numbers"
-    
-    list = specimendate.split('-')
-    yearstring = '20' + list[2]
-    year = int(yearstring)
-    daystring = list[0]
-    day = int(daystring)
-    monthstring = list[1]
-    month = conversion[monthstring]
-       
-    return date(year, month, day)
-    
-# This procedure returns a date object from a 'specimendate'.
-def ReturnDateTesting(specimendate) :
-
-    "This procedure returns a date object from a 'specimendate. The dictionary 'conversion' is used to convert month strings to month numbers"
-    
-    # Fix for bad data. Hopefully this will be corrected soon.
-    if ( specimendate.startswith('the') ) : specimendate = '20/06/2020'
-    
-    list = specimendate.split('/')
-    year = int(list[2])
-    month = int(list[1])
-    day = int(list[0])
-    
-    return date(year, month, day)
-    
-# This procedure returns a file name string based on todays date
-# a 'base' string and a teir type string.
-def ReturnFileName(base,type) :
-
-    "This procedure returns a file name string based on todays date and a 'base' name"
-    
-    today = date.today()
-    month = str(today.month)
-    year = str(today.year) 
-    day = str((today.day))    
-    
-    # Add leading 0 if required
-    if ( len(month) == 1 ) : month = '0' + month 
-    if ( len(day) == 1 ) : day = '0' + day
-    
-    name = base + '_' + type + '_' + year + month + day + '.csv'
-    
-    return name
 
-# This procedure will remove the decimal part of a string representation
-# of a float.
-def GetDecimalPart(string) :
+import sys
+from covid_update.cli import main
 
-    "This procedure will remove the decimal part of a string representation of a float"
-    
-    part = string.split('.')[0]
-    # Protection against empty fields in csv file.
-    if ( len(part) == 0 ) : part = '0'
-    
-    return part
-	
 ############
 ### MAIN ###
 ############
 
-# File names and modes
-Currentdir = os.getcwd()
-LogDir = Currentdir + '\\log'
-ErrorFilename = LogDir + '\\' + 'log.txt'
-ConfigDir = Currentdir + '\\config'
-ConfigurationFilename = ConfigDir + '\\' + 'pillar2_configuration.csv'
-DataDir = Currentdir + '\\data'
-append = 'a'
-read = 'r'
-overwrite = 'w'
-
-# Function return values
-invalid = failure = 0
-empty = ''
-success = 1
-
-# Error levels
-error = 'ERROR'
-warning = 'WARNING'
-info = 'INFO'
-
-# Script names
-module = 'pillar2_covid_update'
-
-# Spreadsheet
-Spreadsheet = 'excel.exe'
-
-# Month conversion data
-MonthConverter = {'Jan':1,'Feb':2,'Mar':3,'Apr':4,'May':5,'Jun':6,'Jul':7,'Aug':8,'Sep':9,'Oct':10,'Nov':11,'Dec':12}
-
-# Data (file) types
-testing = 'testing'
-death = 'death'
-ConfigurationDataTypes = [testing,death]
-ConfigurationDataTypePresent = {}
-ConfigurationDataTypeIndex = {}
-AttentionFlag = {}
-
-for ConfigurationDataType in ConfigurationDataTypes : 
-    ConfigurationDataTypePresent[ConfigurationDataType] = False
-    ConfigurationDataTypeIndex[ConfigurationDataType] = 0
-    AttentionFlag[ConfigurationDataType] = False
-
-# Input data column numbers
-Columns = {}
-Columns[testing] = {'Date':0,'Pillar':3,'Daily':6,'CumulativeDaily':7,'Positive':10,'CumulativePositive':11}
-Columns[death] = {'Date':0,'Daily':3,'Cumulative':2}
-
-# Data format change date whe neww columns relevant
-# Columns[testing] = {'Date':0,'Pillar':3,'Daily':6,'CumulativeDaily':7,'Positive':12,'CumulativePositive':13}
-TestingDataChangeDate = date(2020,7,1)
-DeathDataFailDate = date(2020,7,16)
-DataDecrement = 30301
-
-# Output data columns
-Output = {}
-Output[testing] = {'Date':0,'Daily':1,'CumulativeDaily':2,'Positive':3,'Percentage':4,'CumulativePositive':5,'Rolling':6}
-Output[death] = {'Date':0,'Daily':1,'Cumulative':2,'Rolling':3}
-
-# Create/open log file
-ErrorFileObject = File.Open(ErrorFilename,append,failure)
-Errormessage = 'Could not open ' + ErrorFilename
-if ( ErrorFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
-
-# Log start of script
-File.Logerror(ErrorFileObject,module,'Started',info)
-
-# Log progress messages
-Errormessage = 'Reading configuration file %s ' % ConfigurationFilename
-File.Logerror(ErrorFileObject,module,Errormessage,info)
-
-# Open and parse configuration file
-ConfigurationFileObject = File.Open(ConfigurationFilename,read,failure)
-Errormessage = 'Could not open ' + ConfigurationFilename
-if ( ConfigurationFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
-
-ConfigurationFileData = File.Read(ConfigurationFileObject,empty)
-if ( ConfigurationFileData != empty ) : 
-    ConfigurationFileDataLines = ConfigurationFileData.split('\n')
-else:
-    Errormessage = 'No data in ' + ConfigurationFilename
-    File.Logerror(ErrorfileObject,module,Errormessage,error)
-
-# Close Configuration file
-Errormessage = 'Could not close ' + ConfigurationFilename
-if ( File.Close(ConfigurationFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
-
-# Parse configuration file.
-ConfigurationFileDataLists = []
-DataIndex = 0
-
-for ConfigurationFileDataLine in ConfigurationFileDataLines :
-
-    ConfigurationFileDataList = ConfigurationFileDataLine.split(',')
-    ConfigurationDataType = ConfigurationFileDataList[0]
-    
-    if ( ConfigurationDataTypeValid(ConfigurationDataType,ConfigurationDataTypePresent) ) :
-        ConfigurationFileDataLists.append(ConfigurationFileDataList)
-        ConfigurationDataTypePresent[ConfigurationDataType] = True
-        ConfigurationDataTypeIndex[ConfigurationDataType] = DataIndex
-    else :
-        Errormessage = 'Data type %s specified in line %i is not valid ' % (ConfigurationDataType,(DataIndex + 1))
-        File.Logerror(ErrorFileObject,module,Errormessage,warning)
-
-    DataIndex += 1
-    
-# Determine url's for download files.
-DownLoadFiles = []
-
-for ConfigurationFileDataList in ConfigurationFileDataLists :
-
-    # Scrape web content to determine download file urls.
-    ConfigurationDataType = ConfigurationFileDataList[0]
-    DownLoadWebPage = ConfigurationFileDataList[1]
-    DownLoadFilePattern = ConfigurationFileDataList[2]
-    DownLoadFile = FindDownloadFile(DownLoadWebPage,DownLoadFilePattern)
-     
-    if ( len(DownLoadFile) == 0 ) : 
-        Errormessage = 'No download file for data type %s found' % ConfigurationDataType
-        File.Logerror(ErrorFileObject,module,Errormessage,error)
-    else:
-        DownLoadFiles.append(DownLoadFile)
-
-
-# Intialize series data sets
-SeriesData = {}
-for ConfigurationDataType in ConfigurationDataTypes : SeriesData[ConfigurationDataType] = []
-
-# Initialize series line counts
-SeriesDataCount = {}
-for ConfigurationDataType in ConfigurationDataTypes : SeriesDataCount[ConfigurationDataType] = 0
-
-# Download and parse data files 
-for ConfigurationDataType in ConfigurationDataTypes :
-        
-    if ( ConfigurationDataTypePresent[ConfigurationDataType] ) : 
-    
-        # Retrieve configuration items
-        DownLoadFile = DownLoadFiles[ConfigurationDataTypeIndex[ConfigurationDataType]]
-        ConfigurationFileDataList = ConfigurationFileDataLists[ConfigurationDataTypeIndex[ConfigurationDataType]]
-        PillarString = ConfigurationFileDataList[3]
-        
-        # Log progress messages
-        Errormessage = 'Retrieving %s data file ' % ConfigurationDataType
-        File.Logerror(ErrorFileObject,module,Errormessage,info)
-        
-        Response = requests.get(DownLoadFile)
-        if ( Response.status_code != 200 ) :
-            Errormessage = 'GET operation for %s failed' % DownLoadFile
-            File.Logerror(ErrorFileObject,module,Errormessage,error)
-     
-        ResponseLines = Response.text.splitlines()
-        if ( len(ResponseLines) == 0 ) :
-            Errormessage = '%s is an empty file' % DownLoadFile
-            File.Logerror(ErrorFileObject,module,Errormessage,error)
-        
-        # Remove header line of file
-        ResponseLines.pop(0)
-        
-        for ResponseLine in ResponseLines :
-        
-            # Protect against empty lines
-            if ( len(ResponseLine) == 0 ) : break
-            
-            # split data line
-            DataRow = ResponseLine.split(',')
-             
-            # Skip any data lines in testing data that do not contain the right Pillar identification     
-            # or are empty
-            if ( ConfigurationDataType == testing ) :  
-                if not ( IsPresent(PillarString,Columns[testing]['Pillar'],DataRow ) ) : continue
-                if ( len(DataRow[Columns[testing]['Daily']]) == 0 ) : continue
-                
-            # Skip any data lines with non numeric data where there should be.
-            if ( ConfigurationDataType == death ) :
-                if not ( DataRow[Columns[death]['Cumulative']].isdigit() ) : continue
-
-            # Process date information
-            if ( ConfigurationDataType == death ) :
-                DataRow[Columns[ConfigurationDataType]['Date']] = ReturnDateDeath(DataRow[Columns[ConfigurationDataType]['Date']],MonthConverter)
-                            
-            if ( ConfigurationDataType == testing ) :
-                ConvertedDate = ReturnDateTesting(DataRow[Columns[ConfigurationDataType]['Date']])
-                DataRow[Columns[ConfigurationDataType]['Date']] = ConvertedDate
-                
-                # Correct data after data change date.
-                if ( ConvertedDate >= TestingDataChangeDate ) : 
-                
-                    DataRow[Columns[ConfigurationDataType]['Positive']] = DataRow[12]
-                    
-                    # Protect against non numerical values
-                    if not ( DataRow[Columns[testing]['Positive']].isdigit() ) : continue
-                    
-                    CovertedCumlativePositive = str(int(DataRow[13]) + DataDecrement)
-                    DataRow[Columns[ConfigurationDataType]['CumulativePositive']] = CovertedCumlativePositive          
-                        
-            # Build data structure
-            SeriesDataCount[ConfigurationDataType] = SeriesDataCount[ConfigurationDataType] + 1
-            SeriesData[ConfigurationDataType].append(DataRow)
-            
-
-# Process file data.
-for ConfigurationDataType in ConfigurationDataTypes :
-
-    # Log progress messages
-    Errormessage = 'Processing %s data file ' % ConfigurationDataType
-    File.Logerror(ErrorFileObject,module,Errormessage,info)
-    
-    # Retrieve configuration information
-    ConfigurationFileDataList = ConfigurationFileDataLists[ConfigurationDataTypeIndex[ConfigurationDataType]]
-    RollingPeriod =  int(ConfigurationFileDataList[4])
-    if ( ConfigurationDataType == death) : Variation = int(ConfigurationFileDataList[5])
-    if ( ConfigurationDataType == testing) : Variation = float(ConfigurationFileDataList[5])
-    
-    # Generate statistics file name
-    StatisticsFilename = DataDir + '\\' + ReturnFileName('pillar2',ConfigurationDataType)
-    
-    # Open statics file
-    StatisticsFileObject = File.Open(StatisticsFilename,overwrite,failure)
-    Errormessage = 'Could not open ' + StatisticsFilename
-    if ( StatisticsFileObject == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,error)
-    
-    # Column headings
-    Headings = GenerateCSVRow(Output[ConfigurationDataType])
-    Headings = Headings + '\n'
-    File.Writeline(StatisticsFileObject,Headings,failure)
-    
-    # Generate derived data
-    PercentagePrevious = 0
-    RollingPrevious = 0
-    Percentage = 0
-    Rolling = 0
-    
-    for SpecimenPeriod in range(0,(len(SeriesData[ConfigurationDataType]))) :
-        
-        OutData = {} 
-        for Column in Columns[ConfigurationDataType] : OutData[Column] = SeriesData[ConfigurationDataType][SpecimenPeriod][Columns[ConfigurationDataType][Column]]
-        
-        if ( ConfigurationDataType == death ) :
-        
-            if ( RollingPrevious != 0 ) :
-                Indicator = 'Decreasing'
-                RollingIncrease = Rolling - RollingPrevious
-                if ( RollingIncrease > 0 ) : Indicator = 'Potentially increasing'
-                if ( RollingIncrease >= Variation ) : Indicator = 'Increasing'
-                Errormessage = 'The rolling number of deaths was %s on %s' % (Indicator,CurrentSpecimenDate)
-                File.Logerror(ErrorFileObject,module,Errormessage,info)
-            
-            RollingPrevious = Rolling
-            
-            CurrentSpecimenDate = SeriesData[death][SpecimenPeriod][Columns[death]['Date']]
-            for PreviousPeriod in range(SpecimenPeriod,0,-1) : 
-                PreviousSpecimenDate = SeriesData[death][PreviousPeriod][Columns[death]['Date']]
-                SpecimenDateDiff = CurrentSpecimenDate - PreviousSpecimenDate
-                if ( SpecimenDateDiff.days >= RollingPeriod) :
-                    Rolling = int(SeriesData[death][SpecimenPeriod][Columns[death]['Cumulative']]) - int(SeriesData[death][PreviousPeriod][Columns[death]['Cumulative']])
-                    break
-            
-            # Output derived fields
-            OutData['Rolling'] = Rolling      
-        
-        if ( ConfigurationDataType == testing ) :
-            
-            if ( PercentagePrevious != 0 ) :
-                Indicator = 'Decreasing'
-                PercentageIncrease = Percentage - PercentagePrevious
-                if ( PercentageIncrease > 0 ) : Indicator = 'Potentially increasing'
-                if ( PercentageIncrease >= Variation ) : Indicator = 'Increasing'
-                Errormessage = 'The  percentage number of positive tests was %s on %s' % (Indicator,CurrentSpecimenDate)
-                File.Logerror(ErrorFileObject,module,Errormessage,info)
-            
-            PercentagePrevious = Percentage
-            
-            CurrentSpecimenDate = SeriesData[testing][SpecimenPeriod][Columns[testing]['Date']]
-            for PreviousPeriod in range(SpecimenPeriod,0,-1) : 
-                PreviousSpecimenDate = SeriesData[testing][PreviousPeriod][Columns[testing]['Date']]
-                SpecimenDateDiff = CurrentSpecimenDate - PreviousSpecimenDate
-                if ( SpecimenDateDiff.days >= RollingPeriod) :
-                    Rolling = int(SeriesData[testing][SpecimenPeriod][Columns[testing]['CumulativePositive']]) - int(SeriesData[testing][PreviousPeriod][Columns[testing]['CumulativePositive']])
-                    break
-              
-            # Correct data after data change date.
-            if ( CurrentSpecimenDate >= TestingDataChangeDate ) : OutData['CumulativePositive'] = str(int(SeriesData[testing][SpecimenPeriod][Columns[testing]['CumulativePositive']]) -  DataDecrement)
-            
-            # Output derived fields
-            OutData['Rolling'] = Rolling    
-            Percentage = (int(SeriesData[testing][SpecimenPeriod][Columns[testing]['Positive']])/int(SeriesData[testing][SpecimenPeriod][Columns[testing]['Daily']])) * 100
-            Percentage = round(Percentage,2)
-            OutData['Percentage'] = str(Percentage)
-            
-        # Data row
-        Row =  GenerateCSVRow(GenerateFieldList(Output[ConfigurationDataType],OutData)) 
-        Row = Row + '\n'
-        File.Writeline(StatisticsFileObject,Row,failure)
-        
-    # Generate final trend messages and determine if an attention flag should be set   
-    if ( ConfigurationDataType == death ) :
-        Indicator = 'Decreasing'
-        RollingIncrease = Rolling - RollingPrevious
-        if ( RollingIncrease > 0 ) : Indicator = 'Potentially increasing'
-        if ( RollingIncrease >= Variation ) : 
-            Indicator = 'Increasing'
-            AttentionFlag[death] = True
-        Errormessage = 'The rolling number of deaths was %s on %s' % (Indicator,CurrentSpecimenDate)
-        File.Logerror(ErrorFileObject,module,Errormessage,info)
-        
-    
-    if ( ConfigurationDataType == testing ) :
-        Indicator = 'Decreasing'
-        PercentageIncrease = Percentage - PercentagePrevious
-        if ( PercentageIncrease > 0 ) : Indicator = 'Potentially increasing'
-        if ( PercentageIncrease >= Variation ) : 
-            Indicator = 'Increasing'
-            AttentionFlag[testing] = True
-        Errormessage = 'The  percentage number of positive tests was %s on %s' % (Indicator,CurrentSpecimenDate)
-        File.Logerror(ErrorFileObject,module,Errormessage,info)
-             
-    # Close Statistics file
-    Errormessage = 'Could not close ' + StatisticsFilename
-    if ( File.Close(StatisticsFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
-            
-# Processes attention flags.
-for ConfigurationDataType in ConfigurationDataTypes :
-    StatisticsFilename = DataDir + '\\' + ReturnFileName('pillar2',ConfigurationDataType)
-    if ( AttentionFlag[ConfigurationDataType] ) :
-        Errormessage = 'Attention flag set for %s please view' % StatisticsFilename
-        File.Logerror(ErrorFileObject,module,Errormessage,warning)
-        Interface.ViewSpeadsheet(Spreadsheet,StatisticsFilename) 
-  
-# Log end of script
-File.Logerror(ErrorFileObject,module,'Completed',info)
-
-# Close error log file
-Errormessage = 'Could not close ' + ErrorFilename
-if ( File.Close(ErrorFileObject,failure) == failure ) : File.Logerror(ErrorFileObject,module,Errormessage,warning)
\ No newline at end of file
+sys.exit(main(['pillar2'] + sys.argv[1:]))
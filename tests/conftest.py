@@ -0,0 +1,12 @@
+# tests/conftest.py
+#
+# Description
+# -----------
+# Puts the repository directory on the module search path so that the
+# covid_update package may be imported by the tests however pytest is run.
+#
+
+import os
+import sys
+
+sys.path.insert(0,os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+# tests/test_alertstate.py
+#
+# Description
+# -----------
+# Tests of the alert state kept between runs of covid_update/alertstate.py
+# and its use by the Pillar 1 alerts of covid_update/pillar1.py. Repeated
+# and changed alert messages, the raising and clearing of attention alerts,
+# the expiry of old keys when the state is written and reloaded and a
+# repeated run of the alerts over the same results are checked.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+from datetime import date,timedelta
+
+import covid_update.alertstate as AlertState
+import covid_update.pillar1 as Pillar1
+
+# Run date, infectious period and variation of the alerts
+RunDate = date(2020,10,1)
+InfectiousPeriod = 7
+Variation = 5
+
+# This procedure returns the infectious cases 'Values' on consecutive days
+# ending the day before the run date as the area results of 'Area'.
+def ReturnAreaResults(Values,Area='Area 1') :
+
+    "This procedure returns the infectious cases 'Values' on consecutive days as area results"
+
+    Start = RunDate - timedelta(days=len(Values))
+
+    return {Area:[{'Date':Start + timedelta(days=Day),'Infectious':Value} for Day,Value in enumerate(Values)]}
+
+def test_repeat_message_suppressed(tmp_path) :
+
+    "A message whose state is unchanged is suppressed and one whose state has changed is not"
+
+    State = AlertState.AlertState(str(tmp_path / 'alerts.json'),RunDate)
+
+    assert State.IsNew('Area 1','infectious',RunDate,'Increasing')
+    assert not State.IsNew('Area 1','infectious',RunDate,'Increasing')
+    assert State.IsNew('Area 1','infectious',RunDate,'Decreasing')
+    assert State.IsNew('Area 2','infectious',RunDate,'Decreasing')
+    assert State.Suppressed == 1
+
+def test_alert_raised_and_cleared(tmp_path) :
+
+    "An alert is raised only when its condition starts to hold and is listed as cleared when it stops"
+
+    State = AlertState.AlertState(str(tmp_path / 'alerts.json'),RunDate)
+    Raised = RunDate - timedelta(days=2)
+
+    assert not State.IsRaised('Area 1','infectious',Raised - timedelta(days=1),False)
+    assert State.IsRaised('Area 1','infectious',Raised,True)
+    assert not State.IsRaised('Area 1','infectious',Raised + timedelta(days=1),True)
+    assert State.Cleared == []
+    assert not State.IsRaised('Area 1','infectious',RunDate,False)
+
+    assert State.Cleared == [('Area 1','infectious',str(Raised),str(RunDate))]
+    assert list(AlertState.GenerateClearedMessages(State)) == ['Alert for Area 1 infectious raised on %s cleared on %s' % (Raised,RunDate)]
+    assert State.IsRaised('Area 1','infectious',RunDate,True)
+
+def test_write_drops_old_keys(tmp_path) :
+
+    "Keys not seen for more than the retained days are dropped when the state is written and reloaded"
+
+    Filename = str(tmp_path / 'alerts.json')
+    Earlier = RunDate - timedelta(days=AlertState.RetainDays + 1)
+    State = AlertState.AlertState(Filename,Earlier)
+    State.IsNew('Area 1','infectious',Earlier,'Increasing')
+    State.IsRaised('Area 1','infectious',Earlier,True)
+    State.Write()
+
+    State = AlertState.AlertState(Filename,RunDate)
+    State.IsNew('Area 2','infectious',RunDate,'Decreasing')
+    State.Write()
+
+    Reloaded = AlertState.AlertState(Filename,RunDate)
+    assert list(Reloaded.Seen) == [('Area 2','infectious',str(RunDate))]
+    assert Reloaded.Seen[('Area 2','infectious',str(RunDate))] == ('Decreasing',str(RunDate))
+    assert Reloaded.Active == {('Area 1','infectious'):(str(Earlier),str(Earlier))}
+    assert not Reloaded.IsNew('Area 2','infectious',RunDate,'Decreasing')
+    assert Reloaded.IsNew('Area 1','infectious',Earlier,'Increasing')
+
+def test_repeated_run_quiet(tmp_path) :
+
+    "A second run of the alerts over the same results with the same state returns no messages and no attention"
+
+    Filename = str(tmp_path / 'alerts.json')
+    AreaResults = ReturnAreaResults([10,20,30,40,50,60,70,80,90,100])
+    State = AlertState.AlertState(Filename,RunDate)
+
+    Messages,AttentionFlag = Pillar1.GenerateAlerts(AreaResults,InfectiousPeriod,Variation,State)
+    assert AttentionFlag
+    assert len(Messages) == InfectiousPeriod
+
+    assert Pillar1.GenerateAlerts(AreaResults,InfectiousPeriod,Variation,State) == ([],False)
+
+    State.Write()
+    Reloaded = AlertState.AlertState(Filename,RunDate)
+    assert Pillar1.GenerateAlerts(AreaResults,InfectiousPeriod,Variation,Reloaded) == ([],False)
+
+    Messages,AttentionFlag = Pillar1.GenerateAlerts(ReturnAreaResults([10,20,30,40,50,60,70,80,90,90]),InfectiousPeriod,Variation,Reloaded)
+    assert not AttentionFlag
+    assert Messages == [('Infectious cases Decreasing in Area 1 on %s' % (RunDate - timedelta(days=1)),Pillar1.info)]
+    assert len(Reloaded.Cleared) == 1
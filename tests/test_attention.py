@@ -0,0 +1,66 @@
+# tests/test_attention.py
+#
+# Description
+# -----------
+# Tests of the Pillar 1 attention report of covid_update/attention.py. The
+# areas of a synthetic Pillar 1 file made by generators.py are flagged by
+# the growth alert and the growth rate and trend of the report compared
+# with those of the alert.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import covid_update.attention as Attention
+import covid_update.generators as Generators
+import covid_update.growth as Growth
+import covid_update.pillar1 as Pillar1
+
+# Size of the synthetic Pillar 1 file, infectious period and growth window
+Areas = 6
+Days = 40
+InfectiousPeriod = 7
+GrowthWindow = 7
+
+# This procedure returns the infectious cases of the synthetic Pillar 1
+# file by area.
+def ReturnAreaResults() :
+
+    "This procedure returns the infectious cases of the synthetic Pillar 1 file by area"
+
+    Watched = [Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+    AreaData = Pillar1.ParseData(Generators.GeneratePillar1Data(Areas,Days).splitlines(),'ltla',Watched)[0]
+
+    return Pillar1.ComputeInfectious(AreaData,InfectiousPeriod)
+
+def test_growth_report_matches_growth_alert() :
+
+    "Areas flagged by the growth alert are reported with the alert's growth rate and indicator"
+
+    AreaResults = ReturnAreaResults()
+    Threshold = -1.0
+    Flagged = []
+    Pillar1.GenerateGrowthAlerts(AreaResults,GrowthWindow,Threshold,Flagged=Flagged)
+    Heading,Rows = Attention.BuildPillar1Report(AreaResults,Flagged,5,'Infectious',GrowthWindow,Threshold)
+    Rows = list(Rows)
+
+    assert Flagged
+    assert Heading[-4:] == ['Growth %/day','Lower %/day','Upper %/day','Trend']
+    assert len(Rows) == len(Flagged) * Attention.Window
+    for Area in Flagged :
+        Latest = [Row for Row in Rows if Row[0] == Area][-1]
+        Estimate = Growth.ReturnGrowthSeries([OutData['Date'].toordinal() for OutData in AreaResults[Area]],[OutData['Infectious'] for OutData in AreaResults[Area]],GrowthWindow)[-1]
+        assert Latest[1] == AreaResults[Area][-1]['Date']
+        assert Latest[-4:-1] == [round(Rate * 100,2) for Rate in Estimate]
+        assert Latest[-1] == Growth.ReturnIndicator(Estimate,Threshold) == 'Increasing'
+
+def test_report_without_growth_alert() :
+
+    "Without the growth alert the trend is that of the variation in infectious cases"
+
+    AreaResults = ReturnAreaResults()
+    Heading,Rows = Attention.BuildPillar1Report(AreaResults,list(AreaResults),5)
+
+    assert Heading == ['Area','Date','Daily','Infectious','Change','Weekly Change','Trend']
+    assert all([len(Row) == len(Heading) for Row in Rows])
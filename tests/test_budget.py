@@ -0,0 +1,72 @@
+# tests/test_budget.py
+#
+# Description
+# -----------
+# Tests of the memory budget mode of covid_update/budget.py. The lines of a
+# synthetic Pillar 1 file made by generators.py are read from disk and
+# compared with those read into memory, and the peak memory of processing
+# the reference file of benchmark.py is measured in a separate interpreter
+# and compared with the benchmark limit, as a memory regression test.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import covid_update.benchmark as Benchmark
+import covid_update.budget as Budget
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+
+# Size of the synthetic Pillar 1 file
+Areas = 6
+Days = 40
+
+# This procedure writes a synthetic Pillar 1 file to 'Directory' and
+# returns its file name.
+def WriteDataFile(Directory) :
+
+    "This procedure writes a synthetic Pillar 1 file to 'Directory' and returns its file name"
+
+    Filename = str(Directory / 'pillar1.csv')
+    with open(Filename,'w',newline='') as FileObject : FileObject.write(Generators.GeneratePillar1Data(Areas,Days))
+
+    return Filename
+
+def test_file_lines_match_lines_in_memory(tmp_path) :
+
+    "The lines of a file larger than the budget are read from disk and match those read into memory"
+
+    Filename = WriteDataFile(tmp_path)
+    Lines = Budget.ReturnLines(Filename)
+    Spilled = Budget.ReturnLines(Filename,'utf-8',1024)
+
+    assert not Budget.IsSpilled(Lines)
+    assert Budget.IsSpilled(Spilled)
+    assert list(Spilled) == Lines
+    assert len(Spilled) == len(Lines)
+    assert Spilled[0] == Lines[0]
+    assert Spilled[5] == Lines[5]
+    assert list(Spilled[1:4]) == Lines[1:4]
+
+def test_parse_data_same_with_budget(tmp_path) :
+
+    "The areas parsed from lines read from disk are those parsed from lines in memory"
+
+    Filename = WriteDataFile(tmp_path)
+    Watched = [Generators.ReturnAreaName(Index) for Index in range(0,3)]
+    AreaData,AreaDataCount = Pillar1.ParseData(Budget.ReturnLines(Filename),'ltla',Watched)
+    SpilledData,SpilledCount = Pillar1.ParseData(Budget.ReturnLines(Filename,'utf-8',1024),'ltla',Watched)
+
+    assert SpilledCount == AreaDataCount
+    for Area in Watched : assert list(SpilledData[Area].Dates) == list(AreaData[Area].Dates)
+
+def test_peak_memory_within_limit(tmp_path) :
+
+    "The peak memory traced processing the reference file with a budget is within the benchmark limit"
+
+    Peak = Benchmark.MeasurePeakMemory(str(tmp_path),Benchmark.PeakSize[0],Benchmark.PeakSize[1],Benchmark.DefaultWatch)
+
+    assert Peak['budgeted']['trace'] < Benchmark.DefaultPeakLimit * Budget.Megabyte
+    assert Peak['budgeted']['trace'] < Peak['full']['trace']
+    assert Benchmark.ComparePeakMemory(None,{'peak':Peak}) == []
@@ -0,0 +1,134 @@
+# tests/test_corrections.py
+#
+# Description
+# -----------
+# Tests of the data correction rules of covid_update/corrections.py and the
+# default rules of covid_update/pillar2.py. A synthetic testing series made
+# by generators.py, with the date of one day published as text, is parsed
+# with the default rules and checked against the fixes made by the original
+# script: the date replaced by 20/06/2020 and the cumulative positive tests
+# from the data change date increased by 'DataDecrement' when the rolling
+# count is calculated, the cumulative count itself being output unchanged.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+from datetime import date,timedelta
+
+import pytest
+
+import covid_update.corrections as Corrections
+import covid_update.generators as Generators
+import covid_update.pillar2 as Pillar2
+
+# Number of days of the synthetic testing series, spanning the data
+# change date, and the rolling period
+Days = 100
+RollingPeriod = 7
+
+# Pillar matched and the date published as text
+PillarString = 'Pillar 2'
+TextDate = date(2020,6,20)
+
+# This procedure returns the lines of the synthetic testing series with the
+# date of 'TextDate' published as text.
+def ReturnLines() :
+
+    "This procedure returns the lines of the synthetic testing series with the date of 'TextDate' published as text"
+
+    DateString = '%02i/%02i/%i' % (TextDate.day,TextDate.month,TextDate.year)
+
+    return [Line.replace(DateString,'the 20th',1) for Line in Generators.GenerateTestingData(Days).splitlines()]
+
+# This procedure returns the cumulative positive tests of each day of the
+# Pillar 2 rows of 'Lines' as published and as corrected by the original
+# script, from the new column increased by 'DataDecrement' from the data
+# change date.
+def ReturnBaselineTotals(Lines) :
+
+    "This procedure returns the cumulative positive tests of each day as published and as corrected by the original script"
+
+    Header = Lines[0].split(',')
+    Published = {}
+    Corrected = {}
+    for Day in range(0,Days) :
+        SpecimenDate = Generators.StartDate + timedelta(days=Day)
+        Fields = [Line.split(',') for Line in Lines[1:] if PillarString in Line][Day]
+        if ( SpecimenDate >= Pillar2.TestingDataChangeDate ) :
+            Published[SpecimenDate] = int(Fields[Header.index('CumulativePositiveNew')])
+            Corrected[SpecimenDate] = Published[SpecimenDate] + Pillar2.DataDecrement
+        else :
+            Published[SpecimenDate] = int(Fields[Header.index('CumulativePositive')])
+            Corrected[SpecimenDate] = Published[SpecimenDate]
+
+    return Published,Corrected
+
+def test_read_corrections() :
+
+    "Rules are read from a rules file ignoring comments and blank lines, an invalid rule raising ValueError"
+
+    Rules = Corrections.ReadCorrections('# rules\n\ntesting,Date,replace,the,20/06/2020\ndeath,Cumulative,offset,2020-07-16,-5\n')
+
+    assert Rules == [{'type':'testing','column':'Date','rule':'replace','argument':'the','value':'20/06/2020'},
+                     {'type':'death','column':'Cumulative','rule':'offset','argument':date(2020,7,16),'value':-5}]
+    assert Corrections.SelectRules(Rules,'death','Cumulative',Corrections.offset) == Rules[1:]
+    assert Corrections.DescribeRule(Rules[1]) == 'death Cumulative offset by -5 from 2020-07-16'
+
+    for Line in ['testing,Date,remove,the,x','testing,Date,replace,the'] :
+        with pytest.raises(ValueError) :
+            Corrections.ReadCorrections(Line)
+
+def test_replace_and_offset_rules() :
+
+    "Replace rules change the values starting with their argument and offset rules apply from their date"
+
+    Rules = Corrections.ReadCorrections('testing,Date,replace,the,20/06/2020\ntesting,CumulativePositive,offset,2020-07-01,100\n')
+
+    Values,Applied = Corrections.ApplyReplaceRules(['19/06/2020','the 20th','the 20th','21/06/2020'],Rules[:1])
+    assert Values == ['19/06/2020','20/06/2020','20/06/2020','21/06/2020']
+    assert Applied == [("testing Date values starting 'the' replaced by 20/06/2020",2)]
+
+    Offsets,Applied = Corrections.ReturnOffsets([date(2020,6,30),date(2020,7,1),date(2020,7,2)],Rules[1:])
+    assert Offsets == [0,100,100]
+    assert Applied == [('testing CumulativePositive offset by 100 from 2020-07-01',2)]
+
+def test_default_rules_reproduce_baseline() :
+
+    "The default rules date the text date row and give the rolling count of the original script across the data change"
+
+    Lines = ReturnLines()
+    Published,Corrected = ReturnBaselineTotals(Lines)
+
+    SeriesData,Applied = Pillar2.ParseSeries(Lines,Pillar2.testing,PillarString)
+    SeriesResults = Pillar2.ComputeSeries(SeriesData,Pillar2.testing,RollingPeriod)
+
+    assert dict(Applied)["testing Date values starting 'the' replaced by 20/06/2020"] == 1
+    assert dict(Applied)['testing CumulativePositive offset by %i from %s' % (Pillar2.DataDecrement,Pillar2.TestingDataChangeDate)] == Days - (Pillar2.TestingDataChangeDate - Generators.StartDate).days
+    assert [OutData['Date'] for OutData in SeriesResults] == sorted(Published)
+
+    for OutData in SeriesResults :
+        SpecimenDate = OutData['Date']
+        Rolling = 0
+        if ( SpecimenDate - timedelta(days=RollingPeriod) > Generators.StartDate ) : Rolling = Corrected[SpecimenDate] - Corrected[SpecimenDate - timedelta(days=RollingPeriod)]
+        assert OutData['CumulativePositive'] == Published[SpecimenDate]
+        assert OutData['Rolling'] == Rolling
+
+def test_rules_file_matches_default_rules() :
+
+    "A rules file holding the default corrections gives the default results, and no rules give a different rolling count"
+
+    Lines = ReturnLines()
+    Default = Pillar2.ComputeSeries(Pillar2.ParseSeries(Lines,Pillar2.testing,PillarString)[0],Pillar2.testing,RollingPeriod)
+    FromFile = Pillar2.ComputeSeries(Pillar2.ParseSeries(Lines,Pillar2.testing,PillarString,Corrections.ReadCorrections(Pillar2.DefaultCorrections))[0],Pillar2.testing,RollingPeriod)
+
+    assert FromFile == Default
+
+    # The text date cannot be parsed without the rules
+    Lines = Generators.GenerateTestingData(Days).splitlines()
+    Default = Pillar2.ComputeSeries(Pillar2.ParseSeries(Lines,Pillar2.testing,PillarString)[0],Pillar2.testing,RollingPeriod)
+    Uncorrected = Pillar2.ComputeSeries(Pillar2.ParseSeries(Lines,Pillar2.testing,PillarString,[])[0],Pillar2.testing,RollingPeriod)
+    Change = [OutData['Date'] for OutData in Default].index(Pillar2.TestingDataChangeDate)
+    assert Uncorrected[Change]['Rolling'] == Default[Change]['Rolling'] - Pillar2.DataDecrement
+    assert Uncorrected[Change - 1]['Rolling'] == Default[Change - 1]['Rolling']
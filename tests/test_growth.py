@@ -0,0 +1,91 @@
+# tests/test_growth.py
+#
+# Description
+# -----------
+# Tests of the rolling least squares growth rate of covid_update/growth.py
+# and the growth alerts of covid_update/pillar1.py, for an exponential
+# series of known rate, a flat series, a window including a zero count and
+# a series shorter than the window.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import math
+from datetime import date
+
+import pytest
+
+import covid_update.growth as Growth
+import covid_update.pillar1 as Pillar1
+
+# Start date of the series
+StartDate = date(2020,9,1)
+
+# This procedure returns the infectious cases 'Values' on consecutive days
+# as the area results of area 'Area'.
+def ReturnAreaResults(Values,Area='Area 1') :
+
+    "This procedure returns the infectious cases 'Values' on consecutive days as area results"
+
+    return {Area:[{'Date':date.fromordinal(StartDate.toordinal() + Day),'Infectious':Value} for Day,Value in enumerate(Values)]}
+
+def test_exponential_series_rate() :
+
+    "The rate of an exponential series is its exponent, with a narrow band above a zero threshold"
+
+    Values = [10 * math.exp(0.1 * Day) for Day in range(0,20)]
+    Series = Growth.ReturnGrowthSeries(list(range(0,20)),Values,7)
+
+    assert Series[:6] == [None] * 6
+    for Rate,Lower,Upper in Series[6:] :
+        assert Rate == pytest.approx(0.1)
+        assert Lower <= Rate <= Upper
+    assert Growth.ReturnIndicator(Series[-1],0.0) == 'Increasing'
+    assert Growth.ReturnDoublingTime(Series[-1][0]) == pytest.approx(math.log(2) / 0.1)
+
+@pytest.mark.parametrize('Value',[120,5,37])
+def test_flat_series_not_increasing(Value) :
+
+    "A flat series has a zero rate, no doubling time and is not increasing at a zero threshold"
+
+    Rate,Lower,Upper = Growth.ReturnGrowthSeries(list(range(0,10)),[Value] * 10,7)[-1]
+
+    assert Rate == 0.0
+    assert Growth.ReturnDoublingTime(Rate) is None
+    assert Growth.ReturnIndicator((Rate,Lower,Upper),0.0) == 'Decreasing'
+
+def test_flat_series_alert() :
+
+    "The growth alert of a flat series neither flags the area nor gives a doubling time"
+
+    Flagged = []
+    Messages,AttentionFlag = Pillar1.GenerateGrowthAlerts(ReturnAreaResults([120] * 10),7,0.0,Flagged=Flagged)
+
+    assert not AttentionFlag
+    assert Flagged == []
+    assert len(Messages) == 1
+    assert 'Decreasing' in Messages[0][0]
+    assert 'doubling' not in Messages[0][0] and 'halving' not in Messages[0][0]
+
+def test_window_with_zero_count() :
+
+    "Windows including a zero count have no estimate"
+
+    Values = [10,12,14,0,18,20,22,25,28,31,35,39]
+    Series = Growth.ReturnGrowthSeries(list(range(0,len(Values))),Values,4)
+
+    assert Series[3:7] == [None] * 4
+    assert Series[7] is not None
+    assert Series[-1][0] > 0
+
+def test_series_shorter_than_window() :
+
+    "A series shorter than the window has no estimates and raises no alert"
+
+    Series = Growth.ReturnGrowthSeries([0,1,2],[10,20,40],7)
+
+    assert Series == [None] * 3
+    assert Growth.ReturnGrowthSeries([],[],7) == []
+    assert Pillar1.GenerateGrowthAlerts(ReturnAreaResults([10,20,40]),7,0.0) == ([],False)
@@ -0,0 +1,172 @@
+# tests/test_hierarchy.py
+#
+# Description
+# -----------
+# Tests of the tier roll up of covid_update/hierarchy.py. A synthetic lower
+# tier file made by generators.py is rolled up with the small area
+# hierarchy of fixtures/area_hierarchy.csv and each higher tier compared
+# with the sums of its lower tier areas. The lower tier file of
+# fixtures/pillar1_ltla.csv is rolled up and compared with the official
+# upper tier and region files of fixtures/pillar1_utla.csv and
+# fixtures/pillar1_region.csv, as by the rollup-check subcommand, the
+# region file having one area whose counts differ on one day.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import os
+
+import pytest
+
+import covid_update.cli as Cli
+import covid_update.generators as Generators
+import covid_update.hierarchy as Hierarchy
+import covid_update.pillar1 as Pillar1
+
+# Area hierarchy fixture
+HierarchyFilename = os.path.join(os.path.dirname(__file__),'fixtures','area_hierarchy.csv')
+
+# Lower tier and official higher tier data file fixtures
+LtlaFilename = os.path.join(os.path.dirname(__file__),'fixtures','pillar1_ltla.csv')
+OfficialFilenames = {Hierarchy.utla:os.path.join(os.path.dirname(__file__),'fixtures','pillar1_utla.csv'),
+                     Hierarchy.region:os.path.join(os.path.dirname(__file__),'fixtures','pillar1_region.csv')}
+
+# Difference of the region file fixture from the rolled up lower tier file
+RegionDifference = 'Region South 2020-04-03 cumulative/daily 341/113 rolled up, 342/114 official'
+
+# Size of the synthetic lower tier file
+Areas = 6
+Days = 40
+
+# This procedure returns the area hierarchy of the fixture.
+def ReturnHierarchy() :
+
+    "This procedure returns the area hierarchy of the fixture"
+
+    with open(HierarchyFilename) as FileObject : return Hierarchy.ReadHierarchy(FileObject.read())
+
+# This procedure returns the lines of the data file 'Filename'.
+def ReadLines(Filename) :
+
+    "This procedure returns the lines of the data file 'Filename'"
+
+    with open(Filename) as FileObject : return FileObject.read().splitlines()
+
+# This procedure returns the lines of the synthetic lower tier file.
+def ReturnLtlaLines() :
+
+    "This procedure returns the lines of the synthetic lower tier file"
+
+    return Generators.GeneratePillar1Data(Areas,Days).splitlines()
+
+# This procedure returns the summed daily and cumulative counts, keyed by
+# area and date, of the lower tier 'Lines' mapped to tier 'TierString' by
+# 'AreaHierarchy'.
+def ReturnSums(Lines,AreaHierarchy,TierString) :
+
+    "This procedure returns the summed daily and cumulative counts of the lower tier 'Lines'"
+
+    Sums = {}
+    for Line in Lines[1:] :
+        Fields = Line.split(',')
+        Key = (AreaHierarchy[TierString][Fields[1]],Fields[3])
+        Cumulative,Daily = Sums.get(Key,(0,0))
+        Sums[Key] = (Cumulative + int(Fields[4]),Daily + int(Fields[6]))
+
+    return Sums
+
+# This procedure returns the daily and cumulative counts, keyed by area and
+# date, of the rolled up 'Lines'.
+def ReturnCounts(Lines) :
+
+    "This procedure returns the daily and cumulative counts of the rolled up 'Lines'"
+
+    Counts = {}
+    for Line in Lines[1:] :
+        Fields = Line.split(',')
+        Counts[(Fields[1],Fields[3])] = (int(Fields[4]),int(Fields[6]))
+
+    return Counts
+
+@pytest.mark.parametrize('TierString',[Hierarchy.utla,Hierarchy.region,Hierarchy.nation])
+def test_rollup_matches_summed_tiers(TierString) :
+
+    "The rolled up counts of each tier are the sums of its lower tier areas"
+
+    AreaHierarchy = ReturnHierarchy()
+    Lines = ReturnLtlaLines()
+
+    RolledLines,Unmapped = Hierarchy.RollUp(Lines,AreaHierarchy,TierString)
+
+    assert Unmapped == []
+    assert RolledLines[0] == Hierarchy.Header
+    assert ReturnCounts(RolledLines) == ReturnSums(Lines,AreaHierarchy,TierString)
+
+def test_rollup_parses_as_tier_file() :
+
+    "The rolled up lines parse as an official tier file in descending date order"
+
+    RolledLines = Hierarchy.RollUp(ReturnLtlaLines(),ReturnHierarchy(),Hierarchy.region)[0]
+    AreaData,AreaDataCount = Pillar1.ParseData(RolledLines,Hierarchy.region,['Region North','Region South'])
+
+    assert AreaDataCount == {'Region North':Days,'Region South':Days}
+    assert AreaData['Region North'].ReturnDate(0) == Generators.StartDate
+    assert AreaData['Region North'].Dates[-1] - AreaData['Region North'].Dates[0] == Days - 1
+    assert Hierarchy.CompareTiers(RolledLines,RolledLines,Hierarchy.region) == []
+
+def test_rollup_selects_areas_as_parse_data() :
+
+    "Configured areas select rolled up areas by the same prefix match as ParseData"
+
+    Lines = ReturnLtlaLines()
+    RolledLines = Hierarchy.RollUp(Lines,ReturnHierarchy(),Hierarchy.utla,['Upper 0','Upper 03'])[0]
+    Selected = Hierarchy.RollUp(Lines,ReturnHierarchy(),Hierarchy.utla,['Upper 03'])[0]
+
+    assert set([Area for Area,Date in ReturnCounts(RolledLines)]) == set(['Upper 01','Upper 02','Upper 03','Upper 04'])
+    assert set([Area for Area,Date in ReturnCounts(Selected)]) == set(['Upper 03'])
+    assert Pillar1.ParseData(RolledLines,Hierarchy.utla,['Upper 0'])[1]['Upper 0'] == 4 * Days
+
+def test_rollup_reports_unmapped_areas() :
+
+    "Lower tier areas missing from the hierarchy are returned and left out"
+
+    Lines = Generators.GeneratePillar1Data(Areas + 1,Days).splitlines()
+    RolledLines,Unmapped = Hierarchy.RollUp(Lines,ReturnHierarchy(),Hierarchy.nation)
+
+    assert Unmapped == [Generators.ReturnAreaName(Areas)]
+    Key = ('England',str(Generators.StartDate))
+    assert ReturnCounts(RolledLines)[Key] == ReturnSums(ReturnLtlaLines(),ReturnHierarchy(),Hierarchy.nation)[Key]
+
+def test_compare_with_official_tiers() :
+
+    "The rolled up lower tier file matches the official upper tier file and differs from the region file on one day"
+
+    LtlaLines = ReadLines(LtlaFilename)
+
+    RolledLines = Hierarchy.RollUp(LtlaLines,ReturnHierarchy(),Hierarchy.utla)[0]
+    assert Hierarchy.CompareTiers(RolledLines,ReadLines(OfficialFilenames[Hierarchy.utla]),Hierarchy.utla) == []
+
+    RolledLines = Hierarchy.RollUp(LtlaLines,ReturnHierarchy(),Hierarchy.region)[0]
+    assert Hierarchy.CompareTiers(RolledLines,ReadLines(OfficialFilenames[Hierarchy.region]),Hierarchy.region) == [RegionDifference]
+
+def test_compare_reports_missing_days() :
+
+    "Days of the official file missing from the rolled up lower tier file are reported"
+
+    LtlaLines = [Line for Line in ReadLines(LtlaFilename) if not Line.startswith('E00000002,Area 00002,ltla,2020-04-05')]
+    RolledLines = Hierarchy.RollUp(LtlaLines,ReturnHierarchy(),Hierarchy.utla)[0]
+
+    assert Hierarchy.CompareTiers(RolledLines,ReadLines(OfficialFilenames[Hierarchy.utla]),Hierarchy.utla) == ['Upper 02 2020-04-05 missing from rolled up data']
+
+@pytest.mark.parametrize('TierString,Status',[(Hierarchy.utla,0),(Hierarchy.region,1)])
+def test_rollup_check_command(TierString,Status,capsys) :
+
+    "The rollup-check subcommand lists the differences from the official file and fails if there are any"
+
+    assert Cli.RollUpCheck([LtlaFilename,OfficialFilenames[TierString],HierarchyFilename,'--tier',TierString]) == Status
+
+    Lines = capsys.readouterr().out.splitlines()
+    if ( Status ) : assert Lines == [RegionDifference,'10 rows rolled up, 1 differences']
+    else : assert Lines == ['20 rows rolled up, 0 differences']
@@ -0,0 +1,159 @@
+# tests/test_httpclient.py
+#
+# Description
+# -----------
+# Tests of the chunked downloads of covid_update/httpclient.py against the
+# replay server of covid_update/fixtures.py. A partial file left by an
+# interrupted download is resumed with a range request conditional on its
+# validator, downloaded again in full if the validator no longer matches
+# or is not known, and a download cut short of the length sent by the
+# server is not completed but resumed by the next download.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import json
+import os
+
+import pytest
+
+import covid_update.fixtures as Fixtures
+import covid_update.generators as Generators
+import covid_update.httpclient as HttpClient
+
+# Size of the synthetic Pillar 1 file, several chunks long
+Areas = 20
+Days = 200
+
+# Url the synthetic file is recorded for and its validator
+Url = 'https://example.org/pillar1/data.csv'
+ETag = '"v1"'
+
+# This procedure configures the HTTP client with the command line
+# 'Arguments', the environment being ignored.
+def ConfigureClient(Arguments) :
+
+    "This procedure configures the HTTP client with the command line 'Arguments'"
+
+    HttpClient.Configure(HttpClient.ParseOptions(Arguments,{})[1])
+
+# This procedure records 'Body' as the fixture of 'Url' in 'Directory'
+# with the validator 'ETag'.
+def RecordBody(Directory,Body) :
+
+    "This procedure records 'Body' as the fixture of 'Url' with the validator 'ETag'"
+
+    Fixtures.RecordContent(Directory,Url,Body,{'Content-Type':'text/csv','ETag':ETag})
+
+# This procedure writes the partial file of a download to 'Filename'
+# holding 'Content' and with the validator 'Validator' if given.
+def WritePartial(Filename,Content,Validator=None) :
+
+    "This procedure writes the partial file of a download to 'Filename'"
+
+    with open(Filename + HttpClient.PartialSuffix,'wb') as FileObject : FileObject.write(Content)
+    if ( Validator is not None ) :
+        with open(Filename + HttpClient.PartialSuffix + HttpClient.ValidatorSuffix,'w') as FileObject : FileObject.write(Validator)
+
+# This procedure returns the contents of the file 'Filename'.
+def ReadFile(Filename) :
+
+    "This procedure returns the contents of the file 'Filename'"
+
+    with open(Filename,'rb') as FileObject : return FileObject.read()
+
+@pytest.fixture
+def Replayed(tmp_path,monkeypatch) :
+
+    "The HTTP client replaying a fixture of a synthetic Pillar 1 file, yielding the fixtures directory, body and download file name"
+
+    Directory = str(tmp_path / 'fixtures')
+    Body = Generators.GeneratePillar1Data(Areas,Days).encode()
+    RecordBody(Directory,Body)
+    ConfigureClient(['--replay=' + Directory,'--retries=1'])
+    monkeypatch.setattr(HttpClient,'Backoff',0)
+
+    yield Directory,Body,str(tmp_path / 'download.csv')
+    ConfigureClient([])
+
+def test_resume_partial_file(Replayed) :
+
+    "A partial file with a matching validator is resumed with a range request for the remaining bytes"
+
+    Directory,Body,Filename = Replayed
+    Offset = len(Body) // 3
+    WritePartial(Filename,Body[:Offset],ETag)
+
+    Result = HttpClient.Download(Url,Filename)
+
+    assert Result['status'] == 206
+    assert Result['resumes'] == 1
+    assert Result['wire'] == len(Body) - Offset
+    assert Result['bytes'] == len(Body)
+    assert Result['complete']
+    assert ReadFile(Filename) == Body
+    assert not os.path.exists(Filename + HttpClient.PartialSuffix)
+    assert ReadFile(Filename + HttpClient.ValidatorSuffix).decode() == ETag
+
+def test_changed_file_downloaded_in_full(Replayed) :
+
+    "A partial file whose validator no longer matches, or is not known, is replaced by the whole file"
+
+    Directory,Body,Filename = Replayed
+
+    WritePartial(Filename,b'stale partial file','"v0"')
+    Result = HttpClient.Download(Url,Filename)
+    assert (Result['status'],Result['resumes'],Result['wire']) == (200,0,len(Body))
+    assert ReadFile(Filename) == Body
+
+    os.remove(Filename)
+    WritePartial(Filename,Body[:10])
+    Result = HttpClient.Download(Url,Filename)
+    assert (Result['status'],Result['resumes'],Result['wire']) == (200,0,len(Body))
+    assert ReadFile(Filename) == Body
+
+def test_partial_file_longer_than_file(Replayed) :
+
+    "A partial file longer than the file on the server is discarded and the whole file downloaded"
+
+    Directory,Body,Filename = Replayed
+    WritePartial(Filename,Body + b'extra',ETag)
+
+    Result = HttpClient.Download(Url,Filename)
+
+    assert Result['status'] == 200
+    assert Result['retries'] == 1
+    assert Result['complete']
+    assert ReadFile(Filename) == Body
+
+def test_short_download_resumed(Replayed) :
+
+    "A download cut short of the length sent by the server is not completed and is resumed by the next download"
+
+    Directory,Body,Filename = Replayed
+    Offset = len(Body) // 2
+
+    # Serve half of the body with the length of the whole body
+    BodyFilename,DescriptionFilename = Fixtures.ReturnFixtureFileNames(Directory,Url)
+    with open(DescriptionFilename) as FileObject : Description = json.load(FileObject)
+    with open(BodyFilename,'wb') as FileObject : FileObject.write(Body[:Offset])
+    assert Description['bytes'] == len(Body)
+
+    Result = HttpClient.Download(Url,Filename)
+    Partial = ReadFile(Filename + HttpClient.PartialSuffix)
+    assert not Result['complete']
+    assert not os.path.exists(Filename)
+    assert 0 < len(Partial) <= Offset
+    assert Body.startswith(Partial)
+
+    RecordBody(Directory,Body)
+    Result = HttpClient.Download(Url,Filename)
+
+    assert Result['status'] == 206
+    assert Result['resumes'] == 1
+    assert Result['wire'] == len(Body) - len(Partial)
+    assert Result['complete']
+    assert Result['sha256'] == Description['sha256']
+    assert ReadFile(Filename) == Body
@@ -0,0 +1,138 @@
+# tests/test_logstore.py
+#
+# Description
+# -----------
+# Tests of the SQLite log store of covid_update/logstore.py. The kind, area,
+# date and state of the alert messages generated by covid_update/pillar1.py
+# and covid_update/pillar2.py are extracted, the areas with messages of a
+# kind logged since the start of the last run are listed by the logs
+# subcommand of covid_update/cli.py, and the text log is rotated.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import os
+from datetime import date,timedelta
+
+import covid_update.cli as Cli
+import covid_update.generators as Generators
+import covid_update.logstore as LogStore
+import covid_update.pillar1 as Pillar1
+import covid_update.pillar2 as Pillar2
+
+# Size of the synthetic Pillar 1 file, infectious period and growth window
+Areas = 6
+Days = 40
+InfectiousPeriod = 7
+GrowthWindow = 7
+
+# Module whose runs are logged and the times of its runs
+Module = 'covid_update_pillar1'
+FirstRun = '2020-10-01T08:00:00'
+SecondRun = '2020-10-02T08:00:00'
+
+# This procedure returns the infectious cases of the synthetic Pillar 1
+# file by area and the lines of the file.
+def ReturnAreaResults() :
+
+    "This procedure returns the infectious cases of the synthetic Pillar 1 file by area and the lines of the file"
+
+    Lines = Generators.GeneratePillar1Data(Areas,Days).splitlines()
+    Watched = [Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+    AreaData = Pillar1.ParseData(Lines,'ltla',Watched)[0]
+
+    return Pillar1.ComputeInfectious(AreaData,InfectiousPeriod),Lines
+
+# This procedure returns the series results of the rolling column
+# 'Column' taking the values 'Values' on consecutive days.
+def ReturnSeriesResults(Column,Values) :
+
+    "This procedure returns the series results of the rolling column 'Column' taking the values 'Values'"
+
+    return [{'Date':date(2020,9,1) + timedelta(days=Day),Column:Value} for Day,Value in enumerate(Values)]
+
+# This procedure stores the message 'Message' logged by 'Module' at the
+# ISO time 'Time'.
+def RecordAt(Connection,Time,Module,Message) :
+
+    "This procedure stores the message 'Message' logged by 'Module' at the ISO time 'Time'"
+
+    Kind,Area,Date,State = LogStore.ReturnMessageFields(Message)
+    Connection.execute('INSERT INTO log (%s) VALUES (?,?,?,?,?,?,?,?)' % ','.join(LogStore.Columns),
+                       (Time,Module,'INFO',Kind,Area,Date,State,Message))
+
+def test_message_fields_of_alerts() :
+
+    "The kind, area, date and state of each kind of alert message are extracted"
+
+    AreaResults,Lines = ReturnAreaResults()
+    Area = Generators.ReturnAreaName(0)
+    Latest = str(AreaResults[Area][-1]['Date'])
+
+    Growth = [Message for Message,Level in Pillar1.GenerateGrowthAlerts(AreaResults,GrowthWindow,-1.0)[0] if ' %s ' % Area in Message][0]
+    Infectious = [Message for Message,Level in Pillar1.GenerateAlerts(AreaResults,InfectiousPeriod,1)[0] if Message.endswith('in %s on %s' % (Area,Latest))][0]
+    Zero = Pillar1.GenerateAlerts({Area:[dict(Row,Infectious=0) for Row in AreaResults[Area]]},InfectiousPeriod,1)[0][-1][0]
+    Hotspots = Pillar1.ScanHotspots(Lines,'ltla',InfectiousPeriod,1,0)
+    Hotspot = Pillar1.ReturnHotspotMessages(Hotspots)[0][0]
+    Rolling = Pillar2.GenerateAlerts(ReturnSeriesResults('Rolling',[5,5,9]),Pillar2.death,1)[0][-1][0]
+    Percentage = Pillar2.GenerateAlerts(ReturnSeriesResults('Percentage',[5.0,5.0,4.0]),Pillar2.testing,1)[0][-1][0]
+
+    assert LogStore.ReturnMessageFields(Growth)[:3] == ('growth',Area,Latest)
+    assert LogStore.ReturnMessageFields(Growth)[3] in ['Increasing','Potentially increasing','Decreasing']
+    assert LogStore.ReturnMessageFields(Infectious)[:3] == ('infectious',Area,Latest)
+    assert LogStore.ReturnMessageFields(Zero) == ('zero',Area,Latest,None)
+    assert LogStore.ReturnMessageFields(Hotspot) == ('hotspot',Hotspots[0][2],Hotspots[0][5],None)
+    assert LogStore.ReturnMessageFields(Rolling) == ('rolling',None,'2020-09-03','Increasing')
+    assert LogStore.ReturnMessageFields(Percentage) == ('percentage',None,'2020-09-03','Decreasing')
+    assert LogStore.ReturnMessageFields('The last death in Trust A was on 2020-09-01 which is a week or less ago ') == ('last_death','Trust A','2020-09-01',None)
+    assert LogStore.ReturnMessageFields('The last death in Trust A was on 2020-09-01') == ('last_death','Trust A','2020-09-01',None)
+
+    for Message in ['Started','Infectious cases Increasing in Area 1 on 1 September','Downloaded 10 bytes'] :
+        assert LogStore.ReturnMessageFields(Message) == (None,None,None,None)
+
+def test_areas_of_last_run(tmp_path,capsys) :
+
+    "The areas with messages of a kind logged since the start of the last run are listed, most recent first"
+
+    Connection = LogStore.Open(str(tmp_path / LogStore.StoreFileName))
+    RecordAt(Connection,FirstRun,Module,'Started')
+    RecordAt(Connection,'2020-10-01T08:01:00',Module,'No infectious Pillar 1 cases in Area 1 on 2020-09-28')
+    RecordAt(Connection,SecondRun,Module,'Started')
+    RecordAt(Connection,'2020-10-02T08:01:00',Module,'No infectious Pillar 1 cases in Area 2 on 2020-09-28')
+    RecordAt(Connection,'2020-10-02T08:01:00',Module,'No infectious Pillar 1 cases in Area 3 on 2020-09-29')
+    RecordAt(Connection,'2020-10-02T08:02:00',Module,'No infectious Pillar 1 cases in Area 2 on 2020-09-29')
+
+    assert LogStore.ReturnLastRun(Connection,Module) == SecondRun
+    assert LogStore.ReturnLastRun(Connection,'covid_update_pillar2') is None
+    assert LogStore.ReturnAreas(Connection,'zero',SecondRun) == [('Area 2',2,'2020-09-28','2020-09-29'),('Area 3',1,'2020-09-29','2020-09-29')]
+    assert [Row[0] for Row in LogStore.ReturnAreas(Connection,'zero')] == ['Area 2','Area 3','Area 1']
+    Connection.close()
+
+    assert Cli.Logs(['--log-dir=' + str(tmp_path),'--kind','zero','--areas','--last-run','--module',Module]) == 0
+    assert capsys.readouterr().out.splitlines() == ['area,messages,first,last','Area 2,2,2020-09-28,2020-09-29','Area 3,1,2020-09-29,2020-09-29']
+
+    assert Cli.Logs(['--log-dir=' + str(tmp_path),'--kind','zero','--areas','--last-run']) == 1
+    assert capsys.readouterr().out.splitlines() == ['No run of covid_update_pipeline in the log store']
+
+def test_rotate_log(tmp_path,monkeypatch) :
+
+    "The text log is rotated once it reaches its size, the latest log being .1 and the oldest dropped"
+
+    monkeypatch.setattr(LogStore,'RotateBytes',10)
+    monkeypatch.setattr(LogStore,'RotateCount',2)
+    Filename = str(tmp_path / 'log.txt')
+
+    assert not LogStore.RotateLog(Filename)
+    with open(Filename,'w') as FileObject : FileObject.write('short')
+    assert not LogStore.RotateLog(Filename)
+
+    for Run in range(1,4) :
+        with open(Filename,'w') as FileObject : FileObject.write('log of run %i' % Run)
+        assert LogStore.RotateLog(Filename)
+        assert not os.path.exists(Filename)
+
+    with open(Filename + '.1') as FileObject : assert FileObject.read() == 'log of run 3'
+    with open(Filename + '.2') as FileObject : assert FileObject.read() == 'log of run 2'
+    assert not os.path.exists(Filename + '.3')
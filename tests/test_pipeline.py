@@ -0,0 +1,70 @@
+# tests/test_pipeline.py
+#
+# Description
+# -----------
+# Tests of the task graph of covid_update/pipeline.py. The tasks built for
+# a configuration file are checked to follow the Pillar 1 options and the
+# keys of the cached tasks to change with them, so that a cached result is
+# not used once an option changes.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import covid_update.pillar1 as Pillar1
+import covid_update.pipeline as Pipeline
+
+# This procedure writes a configuration file to the config directory of
+# 'Directory' and returns the directories of the pipeline.
+def ReturnDirectories(Directory) :
+
+    "This procedure writes a configuration file and returns the directories of the pipeline"
+
+    Directories = {}
+    for Name in ['config','data','log','scratch'] :
+        (Directory / Name).mkdir()
+        Directories[Name] = str(Directory / Name)
+    (Directory / 'config' / 'upper.csv').write_text('http://127.0.0.1/data?areaType=utla,utla,7,2,Upper 01')
+
+    return Directories
+
+# This procedure returns the tasks built for the command line options
+# 'Arguments', keyed by name.
+def ReturnTasks(Directories,Arguments) :
+
+    "This procedure returns the tasks built for the command line options 'Arguments'"
+
+    Remaining,ProcessingOptions = Pillar1.ParseOptions(Arguments)
+    Options = {'store':None,'columnar':None,'alertstate':'--alert-state' in Remaining}
+
+    return dict([(Task.Name,Task) for Task in Pipeline.BuildTasks(['upper.csv'],[],Directories,(),ProcessingOptions,Options)])
+
+def test_options_add_tasks(tmp_path) :
+
+    "The roll up, revisions and scan options add their tasks and inputs"
+
+    Directories = ReturnDirectories(tmp_path)
+    Plain = ReturnTasks(Directories,[])
+    Tasks = ReturnTasks(Directories,['--rollup','--revisions','--scan=5','--alert-state'])
+
+    assert sorted(Plain) == sorted(['config:upper.csv','fetch:upper.csv','parse:upper.csv','compute:upper.csv','alert:upper.csv','write:upper.csv'])
+    assert sorted(set(Tasks) - set(Plain)) == ['hierarchy','revisions:upper.csv','scan:upper.csv']
+    assert Tasks['parse:upper.csv'].Inputs[-1] == 'hierarchy'
+    assert Plain['alert:upper.csv'].Cached
+    assert not Tasks['alert:upper.csv'].Cached
+
+def test_options_change_task_keys(tmp_path) :
+
+    "The keys of the cached parse and alert tasks change with the options they use"
+
+    Directories = ReturnDirectories(tmp_path)
+    InputKeys = ['config','compute']
+    Keys = {}
+    for Arguments in [[],['--growth=7'],['--growth-alert=1'],['--scan=5']] :
+        Tasks = ReturnTasks(Directories,Arguments)
+        Keys[str(Arguments)] = (Pipeline.ReturnTaskKey(Tasks['parse:upper.csv'],InputKeys),Pipeline.ReturnTaskKey(Tasks['alert:upper.csv'],InputKeys))
+
+    assert len(set([Alert for Parse,Alert in list(Keys.values())[:3]])) == 3
+    assert Keys['[]'][0] != Keys[str(['--scan=5'])][0]
+    assert Keys['[]'][1] == Keys[str(['--scan=5'])][1]
@@ -0,0 +1,89 @@
+# tests/test_population.py
+#
+# Description
+# -----------
+# Tests of the area populations of covid_update/population.py. Per capita
+# variations are parsed, a population index is read, and the population of
+# each area of a synthetic Pillar 1 file made by generators.py is taken from
+# the index or estimated from its latest case rate, giving the infectious
+# cases per 100,000 people computed by covid_update/pillar1.py.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+import covid_update.population as Population
+
+# Size of the synthetic Pillar 1 file and the infectious period
+Areas = 3
+Days = 20
+InfectiousPeriod = 7
+
+# Population of the indexed area
+IndexedPopulation = 250000
+
+# This procedure returns the lines of the synthetic Pillar 1 file with the
+# case rate of the latest row of area 'Blanked' removed, and the areas
+# monitored.
+def ReturnLines(Blanked) :
+
+    "This procedure returns the lines of the synthetic Pillar 1 file with the case rate of the latest row of area 'Blanked' removed"
+
+    Lines = Generators.GeneratePillar1Data(Areas,Days).splitlines()
+    Latest = [Line for Line in Lines if ',%s,' % Blanked in Line][0]
+    Fields = Latest.split(',')
+    Fields[Generators.Pillar1Headers.index('cumCasesBySpecimenDateRate')] = ''
+    Lines[Lines.index(Latest)] = ','.join(Fields)
+
+    return Lines,[Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+
+def test_parse_variation() :
+
+    "A variation ending in '/100k' is per capita, any other being converted by the converter"
+
+    assert Population.ParseVariation('2.5/100k') == (2.5,True)
+    assert Population.ParseVariation(' 10/100k ') == (10.0,True)
+    assert Population.ParseVariation('5') == (5,False)
+    assert Population.ParseVariation('0.5',float) == (0.5,False)
+
+def test_read_populations() :
+
+    "A population index is keyed by area code and name, the header and invalid lines being ignored"
+
+    Populations = Population.ReadPopulations('code,name,population\nE00000001, Area 00001 ,250000\nE00000002,Area 00002,unknown\n\n')
+
+    assert Populations == {'E00000001':250000,'Area 00001':250000}
+
+def test_estimate_population() :
+
+    "The population is estimated from the cumulative cases and case rate, no rate giving no population"
+
+    assert Population.EstimatePopulation(500,'200.0') == 250000
+    assert Population.EstimatePopulation(1,'3') == 33333
+    assert Population.EstimatePopulation(500,'') is None
+    assert Population.EstimatePopulation(500,'0') is None
+    assert Population.EstimatePopulation(0,'200.0') is None
+
+def test_area_populations() :
+
+    "Areas take the indexed population, or the population estimated from the latest row with a case rate"
+
+    Lines,Watched = ReturnLines(Generators.ReturnAreaName(2))
+    AreaData = Pillar1.ParseData(Lines,'ltla',Watched)[0]
+
+    Populations = Population.ReturnAreaPopulations(AreaData,{Watched[0]:IndexedPopulation})
+
+    assert Populations[Watched[0]] == IndexedPopulation
+    for Area,Row in [(Watched[1],-1),(Watched[2],-2)] :
+        Series = AreaData[Area]
+        assert Populations[Area] == Population.EstimatePopulation(Series.Cumulative[Row],Series.Rates[Row])
+    assert AreaData[Watched[2]].Rates[-1] == ''
+
+    AreaResults = Pillar1.ComputeInfectious(AreaData,InfectiousPeriod,Populations)
+    for Area in Watched :
+        for OutData in AreaResults[Area] :
+            assert OutData['InfectiousRate'] == OutData['Infectious'] * Population.PerCapita / Populations[Area]
+    assert 'InfectiousRate' not in Pillar1.ComputeInfectious(AreaData,InfectiousPeriod,{})[Watched[0]][0]
@@ -0,0 +1,228 @@
+# tests/test_replay.py
+#
+# Description
+# -----------
+# Tests of the recording and replay of downloads of covid_update/fixtures.py
+# and covid_update/httpclient.py. A synthetic Pillar 1 file made by
+# generators.py is recorded as a fixture with the 'fixtures generate' and
+# 'fixtures add' subcommands and the Pillar 1 script run against the replay
+# server with '--replay=<dir>'. The not modified and range responses of the
+# replay server and the checksum check of a replayed download are checked.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import json
+import os
+import urllib.error
+import urllib.request
+
+import pytest
+
+import covid_update.cli as Cli
+import covid_update.fixtures as Fixtures
+import covid_update.generators as Generators
+import covid_update.httpclient as HttpClient
+import covid_update.pillar1 as Pillar1
+
+# Size of the synthetic Pillar 1 file, infectious period and variation
+Areas = 3
+Days = 40
+InfectiousPeriod = 7
+Variation = 5
+
+# Urls the synthetic file is recorded for
+GeneratedUrl = 'https://example.org/pillar1/generated.csv'
+AddedUrl = 'https://example.org/pillar1/added.csv'
+
+# This procedure returns the configuration file line of the Pillar 1
+# script monitoring the synthetic areas of 'Url'.
+def ReturnConfigurationLine(Url) :
+
+    "This procedure returns the configuration file line monitoring the synthetic areas of 'Url'"
+
+    return ','.join([Url,'ltla',str(InfectiousPeriod),str(Variation)] + [Generators.ReturnAreaName(Index) for Index in range(0,Areas)])
+
+# This procedure configures the HTTP client with the command line
+# 'Arguments', the environment being ignored.
+def ConfigureClient(Arguments) :
+
+    "This procedure configures the HTTP client with the command line 'Arguments'"
+
+    HttpClient.Configure(HttpClient.ParseOptions(Arguments,{})[1])
+
+# This procedure requests the fixture of 'Url' from the replay server
+# 'BaseUrl' with 'Headers' and returns the status, headers and body of the
+# response.
+def Request(BaseUrl,Url,Headers=None) :
+
+    "This procedure requests the fixture of 'Url' from the replay server and returns the status, headers and body"
+
+    try :
+        with urllib.request.urlopen(urllib.request.Request(Fixtures.ReturnReplayUrl(BaseUrl,Url),headers=Headers or {})) as Response :
+            return Response.status,Response.headers,Response.read()
+    except urllib.error.HTTPError as Error :
+        return Error.code,Error.headers,Error.read()
+
+@pytest.fixture
+def Recorded(tmp_path,capsys) :
+
+    "A fixtures directory holding a synthetic Pillar 1 file generated and added for two urls"
+
+    Directory = str(tmp_path / 'fixtures')
+    Filename = str(tmp_path / 'pillar1.csv')
+    with open(Filename,'w',newline='') as FileObject : FileObject.write(Generators.GeneratePillar1Data(Areas,Days))
+
+    assert Cli.FixturesCommand(['generate',Directory,GeneratedUrl,'--kind','pillar1','--size','%ix%i' % (Areas,Days)]) == 0
+    assert Cli.FixturesCommand(['add',Directory,AddedUrl,Filename]) == 0
+    capsys.readouterr()
+
+    yield Directory,Filename
+    ConfigureClient([])
+
+@pytest.fixture
+def Replayed(Recorded) :
+
+    "A replay server for the recorded fixtures, yielding its base url and the fixtures"
+
+    Directory,Filename = Recorded
+    Server,BaseUrl = Fixtures.StartReplayServer(Directory)
+    yield BaseUrl,Directory,Filename
+    Server.shutdown()
+    Server.server_close()
+
+def test_generated_and_added_fixtures_match(Recorded,capsys) :
+
+    "The generated and added fixtures of the same synthetic file have the same checksum and are listed"
+
+    Directory,Filename = Recorded
+    Descriptions = {Description['url']:Description for Description in Fixtures.ReturnFixtures(Directory)}
+
+    assert sorted(Descriptions) == sorted([GeneratedUrl,AddedUrl])
+    assert Descriptions[GeneratedUrl]['sha256'] == Descriptions[AddedUrl]['sha256'] == HttpClient.ReturnChecksum(Filename)
+    assert Descriptions[AddedUrl]['type'] == 'text/csv'
+
+    Cli.FixturesCommand(['list',Directory])
+    assert len(capsys.readouterr().out.splitlines()) == 3
+
+def test_replay_matches_local_file(Recorded,tmp_path) :
+
+    "A replayed download is that of the recorded file and is processed as the local file"
+
+    Directory,Filename = Recorded
+    ConfigurationFilename = str(tmp_path / 'pillar1_configuration.csv')
+    with open(ConfigurationFilename,'w') as FileObject : FileObject.write(ReturnConfigurationLine(GeneratedUrl))
+
+    ConfigureClient(['--replay=' + Directory])
+    DownloadFilename = str(tmp_path / 'download.csv')
+    Result = HttpClient.Download(GeneratedUrl,DownloadFilename)
+
+    assert Result['status'] == 200
+    assert Result['complete']
+    assert Result['sha256'] == HttpClient.ReturnChecksum(Filename)
+    assert Pillar1.Replay(DownloadFilename,ConfigurationFilename) == Pillar1.Replay(Filename,ConfigurationFilename)
+
+def test_revalidated_download_not_modified(Recorded,tmp_path) :
+
+    "A revalidated download of an unchanged fixture receives 304 and keeps the file"
+
+    Directory,Filename = Recorded
+    ConfigureClient(['--replay=' + Directory])
+    DownloadFilename = str(tmp_path / 'download.csv')
+    HttpClient.Download(AddedUrl,DownloadFilename)
+
+    Result = HttpClient.Download(AddedUrl,DownloadFilename,Revalidate=True)
+
+    assert Result['status'] == 304
+    assert Result['complete']
+    assert Result['wire'] == 0
+    assert Result['sha256'] == HttpClient.ReturnChecksum(Filename)
+
+def test_not_modified_response(Replayed) :
+
+    "The replay server answers a request with the validator of the fixture with 304"
+
+    BaseUrl,Directory,Filename = Replayed
+
+    Status,Headers,Body = Request(BaseUrl,GeneratedUrl)
+    assert Status == 200
+    assert Headers['Content-Type'] == 'text/csv'
+
+    Status,Headers,Body = Request(BaseUrl,GeneratedUrl,{'If-None-Match':Headers['ETag']})
+    assert Status == 304
+    assert Body == b''
+    assert Request(BaseUrl,GeneratedUrl,{'If-None-Match':'"other"'})[0] == 200
+    assert Request(BaseUrl,'https://example.org/nosuch.csv')[0] == 404
+
+def test_range_responses(Replayed) :
+
+    "The replay server sends the rest of the fixture for a range request whose If-Range validator matches"
+
+    BaseUrl,Directory,Filename = Replayed
+    Status,Headers,Body = Request(BaseUrl,GeneratedUrl)
+    ETag = Headers['ETag']
+    Start = len(Body) // 2
+
+    Status,Headers,Part = Request(BaseUrl,GeneratedUrl,{'Range':'bytes=%i-' % Start,'If-Range':ETag})
+    assert Status == 206
+    assert Headers['Content-Range'] == 'bytes %i-%i/%i' % (Start,len(Body) - 1,len(Body))
+    assert Part == Body[Start:]
+
+    Status,Headers,Whole = Request(BaseUrl,GeneratedUrl,{'Range':'bytes=%i-' % Start,'If-Range':'"other"'})
+    assert Status == 200
+    assert Whole == Body
+
+    Status,Headers,Empty = Request(BaseUrl,GeneratedUrl,{'Range':'bytes=%i-' % len(Body)})
+    assert Status == 416
+    assert Headers['Content-Range'] == 'bytes */%i' % len(Body)
+
+def test_checksum_mismatch(Recorded,tmp_path) :
+
+    "A replayed download whose body does not match the checksum of the fixture is not completed"
+
+    Directory,Filename = Recorded
+    BodyFilename = Fixtures.ReturnFixtureFileNames(Directory,GeneratedUrl)[0]
+    with open(BodyFilename,'r+b') as FileObject :
+        FileObject.seek(-2,os.SEEK_END)
+        Byte = FileObject.read(1)
+        FileObject.seek(-2,os.SEEK_END)
+        FileObject.write(bytes([Byte[0] ^ 1]))
+
+    ConfigureClient(['--replay=' + Directory])
+    DownloadFilename = str(tmp_path / 'download.csv')
+    Result = HttpClient.Download(GeneratedUrl,DownloadFilename)
+
+    assert Result['status'] == 200
+    assert not Result['complete']
+    assert Result['sha256'] != HttpClient.ReturnExpectedChecksum(GeneratedUrl)
+    assert not os.path.exists(DownloadFilename)
+    assert not os.path.exists(DownloadFilename + HttpClient.PartialSuffix)
+
+def test_pillar1_main_replay(Recorded,tmp_path) :
+
+    "The Pillar 1 script run against the replay server writes the statistics of the recorded file"
+
+    pytest.importorskip('File.Operations')
+
+    Directory,Filename = Recorded
+    Directories = {}
+    for Name in ['log','config','data','scratch'] :
+        Directories[Name] = tmp_path / Name
+        Directories[Name].mkdir()
+    with open(Directories['config'] / 'pillar1_configuration.csv','w') as FileObject : FileObject.write(ReturnConfigurationLine(GeneratedUrl))
+
+    Arguments = ['--%s-dir=%s' % (Name,Path) for Name,Path in Directories.items()]
+    Arguments += ['--headless','--replay=' + Directory,'--report=' + str(tmp_path / 'report.json')]
+    assert Pillar1.Main(Arguments) == 0
+
+    with open(tmp_path / 'report.json') as FileObject : Report = json.load(FileObject)
+    Download = [Phase for Phase in Report['phases'] if Phase['phase'] == 'download'][0]
+    assert Download['sha256'] == HttpClient.ReturnChecksum(Filename)
+
+    Output = str(tmp_path / 'expected.csv')
+    Pillar1.Replay(Filename,str(Directories['config'] / 'pillar1_configuration.csv'),Output)
+    Statistics = os.listdir(Directories['data'])
+    assert len(Statistics) == 1
+    with open(Directories['data'] / Statistics[0]) as FileObject, open(Output) as ExpectedObject : assert FileObject.read() == ExpectedObject.read()
@@ -0,0 +1,85 @@
+# tests/test_revisions.py
+#
+# Description
+# -----------
+# Tests of the revision detection of covid_update/revisions.py. Two
+# synthetic Pillar 1 downloads are compared, the second made from the first
+# made by generators.py by adding, revising and removing rows, and the
+# counts of the changes and the earliest revised date of each area checked.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+import covid_update.revisions as Revisions
+
+# Size of the synthetic Pillar 1 file
+Areas = 3
+Days = 10
+
+# Rows of the second download revised, removed and added, as ( area, date )
+RevisedRows = [(Generators.ReturnAreaName(1),'2020-04-05'),(Generators.ReturnAreaName(1),'2020-04-03')]
+RemovedRows = [(Generators.ReturnAreaName(2),'2020-04-01')]
+AddedRow = (Generators.ReturnAreaName(0),'2020-04-11')
+
+# This procedure returns the lines of the second download, made from the
+# lines 'Lines' of the first by revising the daily count of 'RevisedRows',
+# removing 'RemovedRows' and adding 'AddedRow'.
+def ReturnRevisedLines(Lines) :
+
+    "This procedure returns the lines of the second download made from the lines 'Lines' of the first"
+
+    Header = Lines[0].split(',')
+    AreaIndex,DateIndex,DailyIndex = Header.index('areaName'),Header.index('date'),Header.index('newCasesBySpecimenDate')
+
+    RevisedLines = [Lines[0]]
+    for Line in Lines[1:] :
+        DataRow = Line.split(',')
+        Key = (DataRow[AreaIndex],DataRow[DateIndex])
+        if ( Key in RemovedRows ) : continue
+        if ( Key in RevisedRows ) : DataRow[DailyIndex] = str(int(DataRow[DailyIndex]) + 1)
+        if ( Key[0] == AddedRow[0] and len(RevisedLines) == 1 ) :
+            AddedDataRow = list(DataRow)
+            AddedDataRow[DateIndex] = AddedRow[1]
+            RevisedLines.append(','.join(AddedDataRow))
+        RevisedLines.append(','.join(DataRow))
+
+    return RevisedLines
+
+def test_compare_downloads(tmp_path) :
+
+    "The added, revised and removed rows of a second download and the earliest revised dates are found"
+
+    Filename = str(tmp_path / 'pillar1_hashes.csv')
+    Lines = Generators.GeneratePillar1Data(Areas,Days).splitlines()
+
+    Hashes,Changes,Removed = Revisions.CompareRows(Pillar1.ReturnRevisionRows(Lines,'ltla'),Revisions.ReadHashes(Filename))
+    assert len(Changes) == Areas * Days
+    assert all([Change == Revisions.added for Area,Date,Change in Changes])
+    assert Removed == 0
+    Revisions.WriteHashes(Filename,Hashes)
+
+    Hashes,Changes,Removed = Revisions.CompareRows(Pillar1.ReturnRevisionRows(ReturnRevisedLines(Lines),'ltla'),Revisions.ReadHashes(Filename))
+
+    assert sorted([(Area,Date) for Area,Date,Change in Changes if Change == Revisions.revised]) == sorted(RevisedRows)
+    assert [(Area,Date) for Area,Date,Change in Changes if Change == Revisions.added] == [AddedRow]
+    assert Removed == len(RemovedRows)
+    assert len(Hashes) == Areas * Days
+    assert Revisions.ReturnRevisedAreas(Changes) == {Generators.ReturnAreaName(1):'2020-04-03'}
+
+    Messages = Pillar1.ReturnRevisionMessages(Changes,Removed,'revisions.csv','ltla',[Generators.ReturnAreaName(Index) for Index in range(0,Areas)])
+    assert [Message for Message,Level in Messages] == ['1 rows added, 2 rows revised and 1 rows removed since the previous run, see revisions.csv',
+                                                       'Data for ltla %s revised from 2020-04-03' % Generators.ReturnAreaName(1)]
+
+def test_unchanged_download() :
+
+    "A download identical to the previous one has no changes"
+
+    Lines = Generators.GeneratePillar1Data(Areas,Days).splitlines()
+    Hashes = Revisions.CompareRows(Pillar1.ReturnRevisionRows(Lines,'ltla'),{})[0]
+
+    assert Revisions.CompareRows(Pillar1.ReturnRevisionRows(Lines,'ltla'),Hashes)[1:] == ([],0)
+    assert list(Revisions.GenerateRevisionLines([])) == [Revisions.Header + '\n']
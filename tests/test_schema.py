@@ -0,0 +1,123 @@
+# tests/test_schema.py
+#
+# Description
+# -----------
+# Tests of the resolution of columns by header name of covid_update/schema.py
+# and its use by covid_update/pillar1.py and covid_update/pillar2.py. A
+# synthetic Pillar 1 file made by generators.py with its columns reordered
+# is parsed as the original file, a file whose header has drifted from the
+# schema is reported, and the testing series columns of the layout
+# applying on each date are selected.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+from datetime import date
+
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+import covid_update.pillar2 as Pillar2
+import covid_update.schema as Schema
+
+# Size of the synthetic files
+Areas = 3
+Days = 100
+
+# Schema of the layout tests and its layout change
+LayoutSchema = [('Date','Date',0),('Count','Count',1)]
+LayoutChangeDate = date(2020,7,1)
+LayoutChanges = [(LayoutChangeDate,[('Count','CountNew',2)])]
+
+# This procedure returns 'Lines' with the columns in the order 'Order' of
+# the column positions.
+def ReorderColumns(Lines,Order) :
+
+    "This procedure returns 'Lines' with the columns in the order 'Order'"
+
+    return [','.join([Line.split(',')[Position] for Position in Order]) for Line in Lines]
+
+# This procedure returns the lines of the synthetic Pillar 1 file and the
+# areas monitored.
+def ReturnLines() :
+
+    "This procedure returns the lines of the synthetic Pillar 1 file and the areas monitored"
+
+    return Generators.GeneratePillar1Data(Areas,10).splitlines(),[Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+
+def test_resolve_columns_by_name() :
+
+    "Columns are found by header name ignoring case and spaces, the default position being used for a missing column"
+
+    Indexes,Unresolved = Schema.ResolveColumns(' count , DATE ,Other',LayoutSchema)
+    assert (Indexes,Unresolved) == ({'Date':1,'Count':0},[])
+
+    Indexes,Unresolved = Schema.ResolveColumns('Date,Total',LayoutSchema)
+    assert (Indexes,Unresolved) == ({'Date':0,'Count':1},['Count'])
+    assert Schema.ReturnColumns(LayoutSchema) == {'Date':0,'Count':1}
+
+def test_reordered_columns_parsed() :
+
+    "A Pillar 1 file with its columns reordered parses as the original file with no warning"
+
+    Lines,Watched = ReturnLines()
+    Reordered = ReorderColumns(Lines,[6,3,1,0,5,2,4])
+
+    AreaData,AreaDataCount = Pillar1.ParseData(Lines,'ltla',Watched)
+    ReorderedData,ReorderedCount = Pillar1.ParseData(Reordered,'ltla',Watched)
+
+    assert ReorderedCount == AreaDataCount
+    for Area in Watched :
+        assert list(ReorderedData[Area].Dates) == list(AreaData[Area].Dates)
+        assert list(ReorderedData[Area].Cumulative) == list(AreaData[Area].Cumulative)
+        assert list(ReorderedData[Area].Daily) == list(AreaData[Area].Daily)
+    assert Pillar1.ReturnHeaderMessages(Reordered,'pillar1.csv') == []
+
+def test_header_drift_reported() :
+
+    "Columns of the schema no longer in the header are reported with the file"
+
+    Lines,Watched = ReturnLines()
+    Drifted = [Lines[0].replace('newCasesBySpecimenDate','newCases').replace('cumCasesBySpecimenDateRate','rate')] + Lines[1:]
+
+    Messages = Pillar1.ReturnHeaderMessages(Drifted,'pillar1.csv')
+
+    assert len(Messages) == 1
+    Message,Level = Messages[0]
+    assert Level == Pillar1.warning
+    assert Message == "Columns ['Daily', 'Rate'] not found in header of pillar1.csv, default positions used"
+    assert Pillar1.ParseData(Drifted,'ltla',Watched)[1] == Pillar1.ParseData(Lines,'ltla',Watched)[1]
+
+def test_layout_mapper_by_date() :
+
+    "Rows are remapped to the canonical layout with the columns of the layout applying on their date"
+
+    Mappers = Schema.ReturnLayoutMappers('Date,Count,CountNew',LayoutSchema,LayoutChanges,date.min)
+    Row = ['2020-07-01','5','7']
+
+    assert Schema.SelectMapper(Mappers,date(2020,6,30))(Row) == ['2020-07-01','5']
+    assert Schema.SelectMapper(Mappers,LayoutChangeDate)(Row) == ['2020-07-01','7']
+    assert Schema.ApplyLayoutChange(LayoutSchema,LayoutChanges[0][1]) == [('Date','Date',0),('Count','CountNew',2)]
+    assert Schema.ReturnRowMapper('Date',[('Date','Date',0)])(Row) == ['2020-07-01']
+
+def test_testing_series_layout_change() :
+
+    "Testing series rows after the data change date take their positive tests from the new columns"
+
+    Lines = Generators.GenerateTestingData(Days).splitlines()
+    Header = Lines[0].split(',')
+    SeriesData,Applied = Pillar2.ParseSeries(Lines,Pillar2.testing,'Pillar 2',[])
+
+    Raw = {}
+    for Line in Lines[1:] :
+        Fields = Line.split(',')
+        if ( Fields[Header.index('Pillar')] == Generators.Pillar2String ) : Raw[Pillar2.ReturnDateTesting(Fields[0])] = Fields
+
+    assert len(SeriesData) == Days
+    for DataRow in SeriesData :
+        SpecimenDate = DataRow[Pillar2.Columns[Pillar2.testing]['Date']]
+        Fields = Raw[SpecimenDate]
+        Positive = Header.index('PositiveNew')
+        if ( SpecimenDate < Pillar2.TestingDataChangeDate ) : Positive = Header.index('Positive')
+        assert DataRow[Pillar2.Columns[Pillar2.testing]['Positive']] == int(Fields[Positive])
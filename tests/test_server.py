@@ -0,0 +1,175 @@
+# tests/test_server.py
+#
+# Description
+# -----------
+# Tests of the HTTP read API of covid_update/server.py. The server is
+# started on a free port over a temporary data directory holding a Pillar 1
+# statistics file written from a synthetic data file made by generators.py,
+# and the JSON, csv, ETag and gzip responses and the reload of the snapshot
+# when a run report changes are checked.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import gzip
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+import covid_update.server as Server
+
+# Size of the synthetic Pillar 1 file and the infectious period
+Areas = 3
+Days = 40
+InfectiousPeriod = 7
+
+# Seconds between checks for completed runs and the longest wait for a reload
+Interval = 0.05
+Timeout = 5
+
+# Statistics file names
+Pillar1Filename = 'pillar1_lower_20201001.csv'
+LaterFilename = 'pillar1_lower_20201002.csv'
+
+# This procedure writes the Pillar 1 statistics file 'Filename' of the
+# first 'Count' synthetic areas to 'DataDir'.
+def WriteStatistics(DataDir,Filename,Count=Areas) :
+
+    "This procedure writes the Pillar 1 statistics file 'Filename' of the first 'Count' synthetic areas"
+
+    Watched = [Generators.ReturnAreaName(Index) for Index in range(0,Count)]
+    AreaData = Pillar1.ParseData(Generators.GeneratePillar1Data(Areas,Days).splitlines(),'ltla',Watched)[0]
+    with open(os.path.join(DataDir,Filename),'w') as FileObject :
+        for Line in Pillar1.GenerateStatisticsLines(Pillar1.ComputeInfectious(AreaData,InfectiousPeriod)) : FileObject.write(Line)
+
+# This procedure touches the run report in 'LogDir', as when a run of a
+# script completes.
+def TouchReport(LogDir) :
+
+    "This procedure touches the run report in 'LogDir'"
+
+    Filename = os.path.join(LogDir,'pillar1_covid_update_report.json')
+    with open(Filename,'w') as FileObject : FileObject.write('{}')
+    Now = time.time() + 1
+    os.utime(Filename,(Now,Now))
+
+# This procedure requests 'Path' from the server 'Url' with 'Headers' and
+# returns the status, headers and body of the response.
+def Request(Url,Path,Headers=None) :
+
+    "This procedure requests 'Path' from the server 'Url' and returns the status, headers and body"
+
+    try :
+        with urllib.request.urlopen(urllib.request.Request(Url + Path,headers=Headers or {})) as Response :
+            return Response.status,Response.headers,Response.read()
+    except urllib.error.HTTPError as Error :
+        return Error.code,Error.headers,Error.read()
+
+# This procedure waits until 'Condition' returns True, failing after
+# 'Timeout' seconds.
+def WaitFor(Condition) :
+
+    "This procedure waits until 'Condition' returns True"
+
+    Deadline = time.time() + Timeout
+    while ( not Condition() ) :
+        if ( time.time() > Deadline ) : pytest.fail('timed out')
+        time.sleep(Interval)
+
+@pytest.fixture
+def Served(tmp_path) :
+
+    "A server over a temporary data directory, yielding its url and directories"
+
+    DataDir = tmp_path / 'data'
+    LogDir = tmp_path / 'log'
+    DataDir.mkdir()
+    LogDir.mkdir()
+    WriteStatistics(str(DataDir),Pillar1Filename)
+
+    HTTPServer = Server.StartServer(str(DataDir),str(LogDir),'127.0.0.1',0,Interval)
+    Thread = threading.Thread(target=HTTPServer.serve_forever,daemon=True)
+    Thread.start()
+    yield 'http://127.0.0.1:%i' % HTTPServer.server_address[1],str(DataDir),str(LogDir),HTTPServer
+    HTTPServer.shutdown()
+    HTTPServer.server_close()
+
+def test_json_and_csv_resources(Served) :
+
+    "The latest rows of a tier are served as JSON and as csv"
+
+    Url,DataDir,LogDir,HTTPServer = Served
+
+    Status,Headers,Body = Request(Url,'/')
+    assert Status == 200
+    assert json.loads(Body)['files'] == [Pillar1Filename]
+
+    Status,Headers,Body = Request(Url,'/pillar1/lower')
+    Rows = json.loads(Body)
+    assert Headers['Content-Type'] == 'application/json'
+    assert [Row['Area'] for Row in Rows] == [Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+
+    Status,Headers,Body = Request(Url,'/pillar1/lower.csv')
+    Lines = Body.decode().splitlines()
+    assert Headers['Content-Type'].startswith('text/csv')
+    assert Lines[0].split(',') == list(Rows[0])
+    assert len(Lines) == Areas + 1
+
+    assert Request(Url,'/pillar1/nosuch')[0] == 404
+
+def test_etag_not_modified(Served) :
+
+    "A request with the ETag of the response receives 304 Not Modified"
+
+    Url,DataDir,LogDir,HTTPServer = Served
+
+    Status,Headers,Body = Request(Url,'/pillar1/lower')
+    ETag = Headers['ETag']
+
+    Status,Headers,Body = Request(Url,'/pillar1/lower',{'If-None-Match':ETag})
+    assert Status == 304
+    assert Body == b''
+    assert Request(Url,'/pillar1/lower',{'If-None-Match':'"other"'})[0] == 200
+
+def test_gzip_response(Served) :
+
+    "A response is gzip compressed if the client accepts it"
+
+    Url,DataDir,LogDir,HTTPServer = Served
+    Area = Generators.ReturnAreaName(0).replace(' ','%20')
+
+    Plain = Request(Url,'/pillar1/lower/' + Area)[2]
+    Status,Headers,Body = Request(Url,'/pillar1/lower/' + Area,{'Accept-Encoding':'gzip'})
+
+    assert Headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(Body) == Plain
+    assert len(json.loads(Plain)) == Days
+
+def test_reload_keeps_snapshot_on_error(Served,capsys) :
+
+    "An unreadable file keeps the previous snapshot, which is reloaded once the file is readable"
+
+    Url,DataDir,LogDir,HTTPServer = Served
+    Loaded = HTTPServer.Snapshot
+
+    with open(os.path.join(DataDir,LaterFilename),'w') as FileObject : FileObject.write('Area,Date,Daily\nArea 1,2020-10-02,5\n')
+    TouchReport(LogDir)
+    WaitFor(lambda : 'Could not reload' in capsys.readouterr().err)
+
+    assert HTTPServer.Snapshot is Loaded
+    assert json.loads(Request(Url,'/')[2])['files'] == [Pillar1Filename]
+
+    WriteStatistics(DataDir,LaterFilename,1)
+    WaitFor(lambda : HTTPServer.Snapshot is not Loaded)
+
+    assert json.loads(Request(Url,'/')[2])['files'] == [LaterFilename]
+    assert len(json.loads(Request(Url,'/pillar1/lower')[2])) == 1
@@ -0,0 +1,97 @@
+# tests/test_store.py
+#
+# Description
+# -----------
+# Tests of the SQLite results store of covid_update/store.py. Pillar 1
+# results are stored in an in-memory store, one day revised and the results
+# stored again, and the run date of the unchanged and revised rows and the
+# runs of rising infectious cases returned by the rising query checked.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+from datetime import date,timedelta
+
+import covid_update.cli as Cli
+import covid_update.store as Store
+
+# Dates of the first and second runs and of the first day stored
+FirstRun = date(2020,10,1)
+SecondRun = date(2020,10,2)
+StartDate = date(2020,9,20)
+
+# Infectious cases of each area on consecutive days, rising on five and
+# on two consecutive days
+Infectious = {'Area 1':[1,2,3,4,5,6,5,4],'Area 2':[5,6,7,3,3,3,3,3]}
+
+# This procedure returns the Pillar 1 area results of the 'Infectious'
+# cases of each area.
+def ReturnAreaResults() :
+
+    "This procedure returns the Pillar 1 area results of the 'Infectious' cases of each area"
+
+    AreaResults = {}
+    for Area,Values in Infectious.items() :
+        AreaResults[Area] = [{'Area':Area,'Date':StartDate + timedelta(days=Day),'Daily':Value,'Infectious':Value,'Cumulative':Day * 10,'Rate':1.5}
+                             for Day,Value in enumerate(Values)]
+
+    return AreaResults
+
+# This procedure returns the run date of each stored Pillar 1 row of
+# tier type 'TierString' keyed by ( area, date ).
+def ReturnRunDates(Connection,TierString) :
+
+    "This procedure returns the run date of each stored Pillar 1 row keyed by ( area, date )"
+
+    return {(Area,Date):RunDate for Area,Date,RunDate in Connection.execute('SELECT area,date,run_date FROM pillar1 WHERE tier = ?',(TierString,))}
+
+def test_revised_day_restored() :
+
+    "Storing the results again only replaces the revised day, the run date of unchanged rows being kept"
+
+    Connection = Store.Open(':memory:')
+    AreaResults = ReturnAreaResults()
+    RowCount = sum([len(Values) for Values in Infectious.values()])
+
+    assert Store.StorePillar1(Connection,'ltla',AreaResults,FirstRun) == RowCount
+    assert Store.StorePillar1(Connection,'ltla',AreaResults,SecondRun) == 0
+
+    AreaResults['Area 2'][3]['Daily'] += 1
+    assert Store.StorePillar1(Connection,'ltla',AreaResults,SecondRun) == 1
+
+    RunDates = ReturnRunDates(Connection,'ltla')
+    Revised = ('Area 2',(StartDate + timedelta(days=3)).isoformat())
+    assert len(RunDates) == RowCount
+    assert RunDates.pop(Revised) == SecondRun.isoformat()
+    assert set(RunDates.values()) == {FirstRun.isoformat()}
+    assert Connection.execute('SELECT daily FROM pillar1 WHERE area = ? AND date = ?',Revised).fetchone() == (4,)
+
+def test_rising_areas() :
+
+    "The runs of rising infectious cases of at least the given number of days are returned, latest first"
+
+    Connection = Store.Open(':memory:')
+    Store.StorePillar1(Connection,'ltla',ReturnAreaResults(),FirstRun)
+
+    assert Store.ReturnRisingAreas(Connection,'ltla',5) == [('Area 1',(StartDate + timedelta(days=1)).isoformat(),(StartDate + timedelta(days=5)).isoformat(),5,6)]
+    assert [Row[0] for Row in Store.ReturnRisingAreas(Connection,'ltla',2)] == ['Area 1','Area 2']
+    assert Store.ReturnRisingAreas(Connection,'ltla',6) == []
+    assert Store.ReturnRisingAreas(Connection,'utla',1) == []
+
+def test_rising_command(tmp_path,capsys) :
+
+    "The rising subcommand lists the runs of at least '--days' rising days of a store file"
+
+    Filename = str(tmp_path / 'results.db')
+    Connection = Store.Open(Filename)
+    Store.StorePillar1(Connection,'ltla',ReturnAreaResults(),FirstRun)
+    Connection.close()
+
+    assert Cli.Rising([Filename,'--days','2']) == 0
+    Lines = capsys.readouterr().out.splitlines()
+
+    assert Lines[0] == 'area,first,last,days,infectious'
+    assert Lines[1:] == ['Area 1,%s,%s,5,6' % (StartDate + timedelta(days=1),StartDate + timedelta(days=5)),
+                         'Area 2,%s,%s,2,7' % (StartDate + timedelta(days=1),StartDate + timedelta(days=2))]
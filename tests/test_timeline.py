@@ -0,0 +1,128 @@
+# tests/test_timeline.py
+#
+# Description
+# -----------
+# Tests of the dense day indexed series of covid_update/timeline.py and
+# their use in parsing and computing the infectious cases of a Pillar 1 file
+# by covid_update/pillar1.py. The fill policies of a series with missing
+# days, and the parsing of a synthetic file made by generators.py with
+# blank lines, unsorted rows and missing days are checked.
+#
+# Usage
+# -----
+# python -m pytest tests
+#
+
+import random
+from datetime import date,timedelta
+
+import pytest
+
+import covid_update.generators as Generators
+import covid_update.pillar1 as Pillar1
+import covid_update.timeline as Timeline
+
+# Size of the synthetic Pillar 1 file and the infectious period
+Areas = 3
+Days = 20
+InfectiousPeriod = 7
+
+# First date of the synthetic Pillar 1 file
+StartDate = date(2020,4,1)
+
+# Date ordinals and values of a series with the third and fourth days
+# missing, in no particular order
+Ordinals = [date(2020,5,Day).toordinal() for Day in [5,1,2,6]]
+Values = [50,10,20,60]
+
+# This procedure returns the lines of the synthetic Pillar 1 file and the
+# areas monitored.
+def ReturnLines() :
+
+    "This procedure returns the lines of the synthetic Pillar 1 file and the areas monitored"
+
+    return Generators.GeneratePillar1Data(Areas,Days).splitlines(),[Generators.ReturnAreaName(Index) for Index in range(0,Areas)]
+
+# This procedure returns the dates, cumulative cases and infectious cases
+# of each of the areas parsed from 'Lines'.
+def ReturnParsed(Lines,Watched) :
+
+    "This procedure returns the dates, cumulative cases and infectious cases of each of the areas parsed from 'Lines'"
+
+    AreaData,AreaDataCount = Pillar1.ParseData(Lines,'ltla',Watched)
+    AreaResults = Pillar1.ComputeInfectious(AreaData,InfectiousPeriod)
+
+    return {Area:[(OutData['Date'],OutData['Cumulative'],OutData['Infectious']) for OutData in AreaResults[Area]] for Area in Watched},AreaDataCount
+
+def test_fill_policies() :
+
+    "Missing days take the value of the previous day, zero or no value by fill policy"
+
+    Forward = Timeline.BuildDaySeries(Ordinals,Values,Timeline.forward)
+    Zero = Timeline.BuildDaySeries(Ordinals,Values,Timeline.zero)
+    Unfilled = Timeline.BuildDaySeries(Ordinals,Values,Timeline.none)
+    Missing = date(2020,5,3).toordinal()
+
+    assert len(Forward) == 6
+    assert Forward.ReturnMissingCount() == 2
+    assert list(Forward.Values) == [10,20,20,20,50,60]
+    assert list(Zero.Values) == [10,20,0,0,50,60]
+    assert Unfilled.ReturnValue(Missing,-1) == -1
+    assert not Forward.IsPresent(Missing)
+    assert Forward.IsPresent(Ordinals[0])
+    assert Forward.ReturnValue(date(2020,4,30).toordinal()) is None
+    assert Forward.ReturnValue(date(2020,5,7).toordinal(),0) == 0
+    assert len(Timeline.BuildDaySeries([],[])) == 0
+
+    with pytest.raises(ValueError) :
+        Timeline.BuildDaySeries(Ordinals,Values,'backward')
+
+def test_blank_lines_skipped() :
+
+    "Blank lines in the middle of a file are skipped, the rows after them being parsed"
+
+    Lines,Watched = ReturnLines()
+    Blanked = Lines[:Days] + [''] + Lines[Days:2 * Days] + ['',''] + Lines[2 * Days:]
+
+    Parsed,AreaDataCount = ReturnParsed(Blanked,Watched)
+
+    assert (Parsed,AreaDataCount) == ReturnParsed(Lines,Watched)
+    assert list(AreaDataCount.values()) == [Days] * Areas
+
+def test_unsorted_rows() :
+
+    "Rows in any order are sorted by date and give the infectious cases of the rows in order"
+
+    Lines,Watched = ReturnLines()
+    Shuffled = Lines[1:]
+    random.Random(1).shuffle(Shuffled)
+
+    Parsed,AreaDataCount = ReturnParsed([Lines[0]] + Shuffled,Watched)
+
+    assert (Parsed,AreaDataCount) == ReturnParsed(Lines,Watched)
+    for Area in Watched : assert [Row[0] for Row in Parsed[Area]] == [StartDate + timedelta(days=Day) for Day in range(0,Days)]
+
+def test_missing_days_forward_filled() :
+
+    "The infectious cases of a day whose earlier day is missing use the cumulative cases of the latest earlier day"
+
+    Lines,Watched = ReturnLines()
+    Area = Watched[1]
+    Gap = StartDate + timedelta(days=8)
+    Full = ReturnParsed(Lines,Watched)[0][Area]
+    Cumulative = {Row[0]:Row[1] for Row in Full}
+
+    Removed = [Line for Line in Lines if not ( Area in Line and Gap.isoformat() in Line )]
+    Parsed,AreaDataCount = ReturnParsed(Removed,Watched)
+    Infectious = {Row[0]:Row[2] for Row in Parsed[Area]}
+    After = Gap + timedelta(days=InfectiousPeriod)
+
+    assert AreaDataCount[Area] == Days - 1
+    assert Gap not in Infectious
+    assert Infectious[After] == Cumulative[After] - Cumulative[Gap - timedelta(days=1)]
+    assert Infectious[After + timedelta(days=1)] == Cumulative[After + timedelta(days=1)] - Cumulative[Gap + timedelta(days=1)]
+    assert Infectious[Gap + timedelta(days=1)] == Cumulative[Gap + timedelta(days=1)] - Cumulative[Gap + timedelta(days=1 - InfectiousPeriod)]
+
+    AreaData,AreaDataCount = Pillar1.ParseData(Removed,'ltla',Watched)
+    Messages = Pillar1.ReturnAreaMessages(AreaData,AreaDataCount,'ltla',Watched)
+    assert [Message for Message,Level in Messages if Level == Pillar1.warning] == ['1 days missing from the data for ltla %s, the cumulative cases of the previous day used' % Area]